@@ -0,0 +1,274 @@
+"""In-memory DynamoDB stand-in.
+This module keeps the params table in memory for the benchmarks. It serves the get and
+upsert calls of the concurdatascience dynamo handle and the conditional operations of
+the DynamoTableClient with the same semantics, so many JobRunner pods of one process can
+compete for the same keys. Every call can be slowed down and made to fail.
+
+Usage:
+    table = InMemoryDynamoTable(latency_seconds=0.005, failure_rate=0.01)
+    table.install(PersistencyManager.get_persistency_manager(config.icbc_params_table_name))
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+from service.dynamo.dynamotableclient import DynamoTableClient
+
+
+class InMemoryDynamoError(Exception):
+    """Failure injected into a call of the stand-in."""
+
+
+class InMemoryDynamoTable:
+    """Thread-safe in-memory table with the interfaces of the dynamo handle and the DynamoTableClient."""
+
+    def __init__(self, latency_seconds: float = 0.0, failure_rate: float = 0.0, seed: int = None):
+        """Creates the instance of InMemoryDynamoTable.
+        Args:
+            latency_seconds: time every call waits before it runs, like a round trip to DynamoDB
+            failure_rate: probability of a call to fail, from 0 to 1
+            seed: seed of the injected failures
+        Raises:
+            ValueError: If the latency is negative or the failure rate is not a probability.
+        """
+        if latency_seconds < 0:
+            raise ValueError("Please give a latency which is not negative")
+        if not 0 <= failure_rate <= 1:
+            raise ValueError("Please give a failure rate from 0 to 1")
+        self.latency_seconds: float = latency_seconds
+        self.failure_rate: float = failure_rate
+        self.random = random.Random(seed)
+        # {key: [value, expiry in epoch seconds]}
+        self.items: dict = {}
+        self.calls: Counter = Counter()
+        self.failures: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def install(self, persistency_manager):
+        """Makes a PersistencyManager read and write this table.
+        Args:
+            persistency_manager: PersistencyManager of the table
+        """
+        persistency_manager.dynamo_handle = self
+        persistency_manager.table_client = self
+
+    def call(self, operation: str) -> bool:
+        """Counts a call, waits for the latency and draws the injected failure.
+        Args:
+            operation: name of the operation
+        Returns:
+            True if the call fails
+        """
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self.lock:
+            self.calls[operation] += 1
+            failed: bool = self.random.random() < self.failure_rate
+            if failed:
+                self.failures[operation] += 1
+            return failed
+
+    def raise_failure(self, operation: str):
+        """Counts a call of the DynamoTableClient interface, it raises the injected failure.
+        Args:
+            operation: name of the operation
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        if self.call(operation):
+            raise InMemoryDynamoError(f'{operation} failed')
+
+    @staticmethod
+    def copy(value):
+        """Copies a value the way it goes through the serialization of DynamoDB.
+        Args:
+            value: value
+        Returns:
+            copy of the value
+        """
+        return None if value is None else json.loads(json.dumps(value, default=str))
+
+    def read(self, key: str):
+        """Reads a value which is not expired, the caller holds the lock.
+        Args:
+            key: key of the table.
+        Returns:
+            The value of the key, None if the key does not exist or expired.
+        """
+        item: list = self.items.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item[0]
+
+    def write(self, key: str, value, ttl: int):
+        """Writes a value, the caller holds the lock.
+        Args:
+            key: key of the table.
+            value: value of the key
+            ttl: time to live in seconds
+        """
+        self.items[key] = [self.copy(value), time.time() + int(ttl)]
+
+    def get(self, key: str, correlation_id: str = None):
+        """Reads the value of a key, like the dynamo handle.
+        Args:
+            key: key of the table.
+            correlation_id: correlation_id
+        Returns:
+            The value of the key, None if the key does not exist.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('get')
+        with self.lock:
+            return self.copy(self.read(key))
+
+    def upsert(self, key: str, value: dict, correlation_id: str = None, ttl: int = 86400) -> bool:
+        """Writes the value of a key, like the dynamo handle.
+        Args:
+            key: key of the table.
+            value: value of the key
+            correlation_id: correlation_id
+            ttl: time to live in seconds
+        Returns:
+            True if the value is written
+        """
+        if self.call('upsert'):
+            return False
+        with self.lock:
+            self.write(key, value, ttl)
+        return True
+
+    def put_lease(self, key: str, value: dict, now: int, ttl: int) -> bool:
+        """Writes the lease only if the key is absent, or the lease on it expired before now,
+        see DynamoTableClient.put_lease.
+        Args:
+            key: key of the table.
+            value: lease value
+            now: current time in epoch seconds
+            ttl: time to live in seconds
+        Returns:
+            True if the lease is written, False if the lease is held by another owner.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('put_lease')
+        with self.lock:
+            current: dict = self.read(key)
+            if current is not None and (DynamoTableClient.COMPLETION_TIME_FIELD in current or
+                                        current.get(DynamoTableClient.LEASE_EXPIRY_FIELD, now - 1) >= now):
+                return False
+            self.write(key, value, ttl)
+        return True
+
+    def renew_lease(self, key: str, owner: str, lease_expiry: int) -> bool:
+        """Moves the expiry of the lease, see DynamoTableClient.renew_lease.
+        Args:
+            key: key of the table.
+            owner: owner of the lease
+            lease_expiry: new expiry of the lease in epoch seconds
+        Returns:
+            True if the lease is renewed, False if the lease is not held by the owner any more.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('renew_lease')
+        with self.lock:
+            current: dict = self.read(key)
+            if current is None or current.get(DynamoTableClient.LEASE_OWNER_FIELD) != owner or \
+                    DynamoTableClient.COMPLETION_TIME_FIELD in current:
+                return False
+            current[DynamoTableClient.LEASE_EXPIRY_FIELD] = lease_expiry
+        return True
+
+    def complete_lease(self, key: str, owner: str, value: dict, ttl: int) -> bool:
+        """Writes the value of the completed job, see DynamoTableClient.complete_lease.
+        Args:
+            key: key of the table.
+            owner: owner of the lease
+            value: value of the completed job
+            ttl: time to live in seconds
+        Returns:
+            True if the value is written, False if the lease is not held by the owner any more.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('complete_lease')
+        with self.lock:
+            current: dict = self.read(key)
+            if current is None or current.get(DynamoTableClient.LEASE_OWNER_FIELD) != owner or \
+                    DynamoTableClient.COMPLETION_TIME_FIELD in current:
+                return False
+            self.write(key, value, ttl)
+        return True
+
+    def put_member(self, key: str, member: str, heartbeat: int, ttl: int) -> dict:
+        """Writes the heartbeat of a member, see DynamoTableClient.put_member.
+        Args:
+            key: key of the table.
+            member: name of the member
+            heartbeat: time of the heartbeat in epoch seconds
+            ttl: time to live in seconds
+        Returns:
+            dict: {member: last heartbeat} of every member of the key
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('put_member')
+        with self.lock:
+            members: dict = dict(self.read(key) or {}, **{member: heartbeat})
+            self.write(key, members, ttl)
+            return self.copy(members)
+
+    def remove_members(self, key: str, members: list):
+        """Removes members, see DynamoTableClient.remove_members.
+        Args:
+            key: key of the table.
+            members: names of the members
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('remove_members')
+        with self.lock:
+            current: dict = self.read(key)
+            for member in members if current is not None else []:
+                current.pop(member, None)
+
+    def batch_get(self, keys: list) -> dict:
+        """Reads the values of the keys, see DynamoTableClient.batch_get.
+        Args:
+            keys: keys of the table.
+        Returns:
+            dict: {key: value}, the keys which do not exist in the table are left out.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('batch_get')
+        with self.lock:
+            values: dict = {key: self.copy(self.read(key)) for key in keys}
+        return {key: value for key, value in values.items() if value is not None}
+
+    def batch_put(self, items: list) -> bool:
+        """Writes the items, see DynamoTableClient.batch_put.
+        Args:
+            items: list of {'key': key, 'value': value, 'ttl': ttl}
+        Returns:
+            True if every item is written.
+        Raises:
+            InMemoryDynamoError: If the call fails.
+        """
+        self.raise_failure('batch_put')
+        with self.lock:
+            for item in items:
+                self.write(item['key'], item['value'], item['ttl'])
+        return True
+
+    def stats(self) -> dict:
+        """Gets the number of calls and of injected failures of every operation.
+        Returns:
+            dict: {'calls': {operation: count}, 'failures': {operation: count}}
+        """
+        with self.lock:
+            return {'calls': dict(self.calls), 'failures': dict(self.failures)}
\ No newline at end of file
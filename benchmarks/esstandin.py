@@ -0,0 +1,717 @@
+"""Local Elasticsearch stand-in.
+This module answers the search and the multi search requests of the KPIReport from a
+synthetic log corpus held in columnar NumPy arrays, so the KPI queries can be run end to
+end without a cluster. It evaluates the constructs which the KPIQuery emits: the bool,
+term, terms, range (with date math), exists and match_all queries, and the filter,
+filters, sum, date_range, terms and composite aggregations. A construct which is not
+supported is answered with a 400 parsing_exception, like a query which the cluster rejects.
+
+Usage:
+    corpus = EventCorpus.generate(events=10 ** 6, model_versions=['v2US2'], seed=7)
+    with ESStandInServer(corpus) as server:
+        payload = KPIReport(logging_service_endpoint=server.url).query_es(request)
+"""
+import calendar
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from service.configs import config
+
+# a healthy model: about 1 in 100 auditor fails is passed by the model.
+TASK_EVENT_WEIGHTS: dict = {
+    'pass-pass': 0.8695,
+    'pass-bypass': 0.08,
+    'pass-fail': 0.0001,
+    'pass-pend': 0.0001,
+    'pass-none': 0.0001,
+    'pass-pwe': 0.0001,
+    'pass-99': 0.0001,
+    'fail-fail': 0.03,
+    'fail-pend': 0.005,
+    'fail-none': 0.005,
+    'fail-pwe': 0.005,
+    'fail-99': 0.005
+}
+ML_AUDIT_APPLICATION: str = 'datascience-ml-audit'
+ML_AUDIT_MESSAGE: str = 'total audit questions parsed'
+DAY_MILLIS: int = 24 * 3600 * 1000
+UNIT_MILLIS: dict = {'s': 1000, 'm': 60 * 1000, 'h': 3600 * 1000, 'H': 3600 * 1000, 'd': DAY_MILLIS,
+                     'w': 7 * DAY_MILLIS}
+DATE_MATH_OPERATION = re.compile(r'([+-])(\d+)([yMwdhHms])|/([yMwdhHms])')
+
+
+class EventCorpus:
+    """Columns of the log events, the keyword fields are kept as codes of a sorted vocabulary."""
+
+    def __init__(self, dates: dict, numbers: dict, keywords: dict):
+        """Creates the instance of EventCorpus.
+        Args:
+            dates: {field: epoch milliseconds as int64}
+            numbers: {field: values as floats, NaN where the event has no value}
+            keywords: {field: (codes, vocabulary)}, the code is -1 where the event has no value
+        Raises:
+            ValueError: If the columns do not have the same length.
+        """
+        self.dates: dict = {field: np.asarray(values, dtype=np.int64) for field, values in dates.items()}
+        self.numbers: dict = {field: np.asarray(values) for field, values in numbers.items()}
+        self.keywords: dict = {field: self.sort_vocabulary(*column) for field, column in keywords.items()}
+        lengths: set = {len(values) for values in [*self.dates.values(), *self.numbers.values()]} | \
+            {len(codes) for codes, _ in self.keywords.values()}
+        if len(lengths) > 1:
+            raise ValueError("Please give the columns with the same length")
+        self.size: int = lengths.pop() if lengths else 0
+
+    @staticmethod
+    def sort_vocabulary(codes, vocabulary: list) -> tuple:
+        """Sorts the vocabulary of a keyword field, so the order of the codes is the order of the values.
+        Args:
+            codes: codes of the events
+            vocabulary: values of the codes
+        Returns:
+            tuple: (codes, sorted vocabulary)
+        """
+        codes = np.asarray(codes)
+        order: np.ndarray = np.argsort(np.asarray(vocabulary, dtype=object), kind='stable')
+        if np.array_equal(order, np.arange(len(vocabulary))):
+            return codes, list(vocabulary)
+        remap: np.ndarray = np.empty(len(vocabulary) + 1, dtype=codes.dtype)
+        remap[order] = np.arange(len(vocabulary), dtype=codes.dtype)
+        # the last entry maps the missing code -1 to itself.
+        remap[-1] = -1
+        return remap[codes], [vocabulary[index] for index in order]
+
+    @staticmethod
+    def flatten(document: dict, prefix: str = '') -> dict:
+        """Flattens a document to the dotted field names.
+        Args:
+            document: nested document
+            prefix: field name of the document
+        Returns:
+            dict: {dotted field: value}
+        """
+        fields: dict = {}
+        for name, value in document.items():
+            if isinstance(value, dict):
+                fields.update(EventCorpus.flatten(value, prefix=f'{prefix}{name}.'))
+            else:
+                fields[f'{prefix}{name}'] = value
+        return fields
+
+    @classmethod
+    def from_documents(cls, documents: list) -> 'EventCorpus':
+        """Creates the corpus of some documents. The @timestamp is an ISO 8601 date, a string is a
+        keyword and a number is a number.
+        Args:
+            documents: log documents
+        Returns:
+            EventCorpus: corpus of the documents
+        """
+        rows: list = [cls.flatten(document) for document in documents]
+        fields: set = {field for row in rows for field in row}
+        dates: dict = {}
+        numbers: dict = {}
+        keywords: dict = {}
+        for field in sorted(fields):
+            values: list = [row.get(field) for row in rows]
+            if field == '@timestamp':
+                dates[field] = [parse_date_math(value, now_millis=0) for value in values]
+            elif any(isinstance(value, str) for value in values):
+                vocabulary: list = sorted({value for value in values if value is not None})
+                codes: dict = {value: code for code, value in enumerate(vocabulary)}
+                keywords[field] = (np.array([codes.get(value, -1) for value in values], dtype=np.int32), vocabulary)
+            else:
+                numbers[field] = np.array([np.nan if value is None else value for value in values], dtype=float)
+        return cls(dates=dates, numbers=numbers, keywords=keywords)
+
+    @classmethod
+    def generate(cls, events: int, model_versions: list, days: int = 14, now_millis: int = None,
+                 ml_audit_rate: float = 0.01, unsampled_rate: float = 0.05, companies: int = 50,
+                 seed: int = None) -> 'EventCorpus':
+        """Generates synthetic log events of the last days. The ml audit events carry the number of
+        audit questions, the other events are pfc events whose task event follows TASK_EVENT_WEIGHTS.
+        An event takes about 20 bytes, so 10^8 events take about 2 GB.
+        Args:
+            events: number of events
+            model_versions: metric paths of the pfc events, chosen uniformly
+            days: the events are spread uniformly over the last days
+            now_millis: current time in epoch milliseconds, the current time if not given
+            ml_audit_rate: share of the ml audit events
+            unsampled_rate: share of the pfc events without task event
+            companies: number of companies of the pfc events
+            seed: seed of the generator
+        Returns:
+            EventCorpus: synthetic corpus
+        """
+        rng: np.random.Generator = np.random.default_rng(seed)
+        now_millis = int(time.time() * 1000) if now_millis is None else now_millis
+        ml_audit: np.ndarray = rng.random(events) < ml_audit_rate
+
+        def keyword(vocabulary: list, weights: list = None, missing: np.ndarray = ml_audit) -> tuple:
+            codes: np.ndarray = rng.choice(len(vocabulary), size=events, p=weights).astype(
+                np.int8 if len(vocabulary) < 128 else np.int32)
+            codes[missing] = -1
+            return codes, vocabulary
+
+        task_event_missing: np.ndarray = ml_audit | (rng.random(events) < unsampled_rate)
+        audit_codes: np.ndarray = np.where(ml_audit, 0, -1).astype(np.int8)
+        number1: np.ndarray = np.full(events, np.nan, dtype=np.float32)
+        number1[ml_audit] = rng.integers(1, 20, size=int(np.count_nonzero(ml_audit)))
+        metric_value: np.ndarray = (rng.random(events) < 0.9).astype(np.float32)
+        metric_value[ml_audit] = np.nan
+        return cls(
+            dates={'@timestamp': rng.integers(now_millis - days * DAY_MILLIS, now_millis, size=events)},
+            numbers={'metric.value': metric_value, 'datascience_data.number1': number1},
+            keywords={
+                'metric.service': keyword(['pfc_stable', 'pfc_canary', 'other'], [0.8, 0.1, 0.1]),
+                'metric.path': keyword(list(model_versions)),
+                'davinci_data.task_event': keyword(list(TASK_EVENT_WEIGHTS), list(TASK_EVENT_WEIGHTS.values()),
+                                                   missing=task_event_missing),
+                'datascience_data.param2': keyword(['allowed', 'entity_not_in_allow_list'], [0.7, 0.3]),
+                config.company_field: keyword([f'company{index:04d}' for index in range(companies)]),
+                'application': (audit_codes, [ML_AUDIT_APPLICATION]),
+                'datascience_data.message': (audit_codes.copy(), [ML_AUDIT_MESSAGE])
+            })
+
+
+def add_months(moment: datetime, months: int) -> datetime:
+    """Adds months to a date, the day is clipped to the end of the month like in the date math.
+    Args:
+        moment: date
+        months: months to add, negative to subtract
+    Returns:
+        datetime: moved date
+    """
+    month_index: int = moment.year * 12 + moment.month - 1 + months
+    [year, month] = divmod(month_index, 12)
+    day: int = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+def round_down(moment: datetime, unit: str) -> datetime:
+    """Rounds a date down to the start of the unit.
+    Args:
+        moment: date
+        unit: date math unit
+    Returns:
+        datetime: start of the unit
+    """
+    moment = moment.replace(microsecond=0)
+    if unit in 'ymMwdhH':
+        moment = moment.replace(second=0)
+    if unit in 'yMwdhH':
+        moment = moment.replace(minute=0)
+    if unit in 'yMwd':
+        moment = moment.replace(hour=0)
+    if unit == 'w':
+        moment -= timedelta(days=moment.weekday())
+    if unit in 'yM':
+        moment = moment.replace(day=1)
+    if unit == 'y':
+        moment = moment.replace(month=1)
+    return moment
+
+
+def parse_date_math(expression, now_millis: int, round_up: bool = False) -> int:
+    """Evaluates a date math expression like now-24h or 2024-01-05||/d.
+    Args:
+        expression: date math, ISO 8601 date or epoch milliseconds
+        now_millis: value of now in epoch milliseconds
+        round_up: a rounding gives the last millisecond of the unit, as for the lte and gt bounds
+    Returns:
+        int: epoch milliseconds
+    Raises:
+        ValueError: If the expression is not a date math expression.
+    """
+    if isinstance(expression, (int, float)):
+        return int(expression)
+    if expression.startswith('now'):
+        [anchor, operations] = [datetime.fromtimestamp(now_millis / 1000, tz=timezone.utc), expression[3:]]
+    else:
+        [date_text, _, operations] = expression.partition('||')
+        anchor = datetime.fromisoformat(date_text)
+        anchor = anchor.replace(tzinfo=timezone.utc) if anchor.tzinfo is None else anchor
+    position: int = 0
+    for match in DATE_MATH_OPERATION.finditer(operations):
+        if match.start() != position:
+            break
+        position = match.end()
+        [sign, amount, unit, rounding] = match.groups()
+        if rounding is not None:
+            start: datetime = round_down(anchor, rounding)
+            if not round_up:
+                anchor = start
+            elif rounding in 'yM':
+                anchor = add_months(start, 12 if rounding == 'y' else 1) - timedelta(milliseconds=1)
+            else:
+                anchor = start + timedelta(milliseconds=UNIT_MILLIS[rounding] - 1)
+        elif unit in 'yM':
+            anchor = add_months(anchor, (1 if sign == '+' else -1) * int(amount) * (12 if unit == 'y' else 1))
+        else:
+            anchor += timedelta(milliseconds=(1 if sign == '+' else -1) * int(amount) * UNIT_MILLIS[unit])
+    if position != len(operations):
+        raise ValueError(f"failed to parse date math [{expression}]")
+    return int(anchor.timestamp() * 1000)
+
+
+class SearchEvaluator:
+    """Evaluates one search request on the corpus, the mask of every query clause is computed once."""
+
+    def __init__(self, corpus: EventCorpus, now_millis: int):
+        """Creates the instance of SearchEvaluator.
+        Args:
+            corpus: corpus of the events
+            now_millis: value of now in the date math, epoch milliseconds
+        """
+        self.corpus: EventCorpus = corpus
+        self.now_millis: int = now_millis
+        # {clause as json: mask}, the same bucket filter repeated in the aggregations is evaluated once.
+        self.masks: dict = {}
+
+    @staticmethod
+    def get_single(clause: dict, name: str) -> tuple:
+        """Gets the field and the argument of a single field clause like {"term": {field: value}}.
+        Args:
+            clause: argument of the clause
+            name: name of the clause
+        Returns:
+            tuple: (field, argument)
+        Raises:
+            ValueError: If the clause does not have one field.
+        """
+        if not isinstance(clause, dict) or len(clause) != 1:
+            raise ValueError(f"[{name}] query malformed, it must have exactly one field")
+        return next(iter(clause.items()))
+
+    def evaluate(self, clause: dict) -> np.ndarray:
+        """Evaluates a query clause.
+        Args:
+            clause: query clause
+        Returns:
+            np.ndarray: boolean mask of the matching events
+        Raises:
+            ValueError: If the clause is not supported.
+        """
+        key: str = json.dumps(clause, sort_keys=True)
+        if key not in self.masks:
+            [name, argument] = self.get_single(clause, 'query')
+            handler = getattr(self, f'evaluate_{name}', None)
+            if handler is None:
+                raise ValueError(f"unknown query [{name}]")
+            self.masks[key] = handler(argument)
+        return self.masks[key]
+
+    def evaluate_match_all(self, argument: dict) -> np.ndarray:
+        """Matches every event."""
+        return np.ones(self.corpus.size, dtype=bool)
+
+    def evaluate_bool(self, argument: dict) -> np.ndarray:
+        """Evaluates the filter, must, must_not and should clauses of a bool query."""
+        unknown: set = set(argument) - {'filter', 'must', 'must_not', 'should', 'minimum_should_match'}
+        if unknown:
+            raise ValueError(f"[bool] query does not support {sorted(unknown)}")
+
+        def clauses(occur: str) -> list:
+            value = argument.get(occur, [])
+            return value if isinstance(value, list) else [value]
+
+        mask: np.ndarray = np.ones(self.corpus.size, dtype=bool)
+        for clause in clauses('filter') + clauses('must'):
+            mask &= self.evaluate(clause)
+        for clause in clauses('must_not'):
+            mask &= ~self.evaluate(clause)
+        should: list = clauses('should')
+        positive: list = clauses('filter') + clauses('must')
+        minimum: int = int(argument.get('minimum_should_match', 0 if positive else 1 if should else 0))
+        if should and minimum > 0:
+            matches: np.ndarray = np.sum([self.evaluate(clause) for clause in should], axis=0, dtype=np.int32)
+            mask &= matches >= minimum
+        return mask
+
+    def keyword_codes(self, field: str, values: list) -> tuple:
+        """Gets the codes of the keyword values.
+        Args:
+            field: keyword field
+            values: values of the field
+        Returns:
+            tuple: (codes of the events, codes of the values which exist in the vocabulary)
+        """
+        [codes, vocabulary] = self.corpus.keywords[field]
+        positions: dict = {value: code for code, value in enumerate(vocabulary)}
+        return codes, [positions[str(value)] for value in values if str(value) in positions]
+
+    def evaluate_terms(self, argument: dict) -> np.ndarray:
+        """Matches the events whose field has one of the values."""
+        [field, values] = self.get_single(argument, 'terms')
+        if not isinstance(values, list):
+            raise ValueError("[terms] query does not support the terms lookup")
+        if field in self.corpus.keywords:
+            [codes, value_codes] = self.keyword_codes(field, values)
+            if len(value_codes) == 1:
+                return codes == value_codes[0]
+            return np.isin(codes, value_codes)
+        if field in self.corpus.numbers:
+            return np.isin(self.corpus.numbers[field], [float(value) for value in values])
+        if field in self.corpus.dates:
+            return np.isin(self.corpus.dates[field], [parse_date_math(value, self.now_millis) for value in values])
+        return np.zeros(self.corpus.size, dtype=bool)
+
+    def evaluate_term(self, argument: dict) -> np.ndarray:
+        """Matches the events whose field has the value."""
+        [field, value] = self.get_single(argument, 'term')
+        if isinstance(value, dict):
+            value = value['value']
+        return self.evaluate_terms({field: [value]})
+
+    def evaluate_exists(self, argument: dict) -> np.ndarray:
+        """Matches the events which have a value of the field."""
+        field: str = argument['field']
+        if field in self.corpus.keywords:
+            return self.corpus.keywords[field][0] >= 0
+        if field in self.corpus.numbers:
+            return ~np.isnan(self.corpus.numbers[field])
+        if field in self.corpus.dates:
+            return np.ones(self.corpus.size, dtype=bool)
+        return np.zeros(self.corpus.size, dtype=bool)
+
+    def evaluate_range(self, argument: dict) -> np.ndarray:
+        """Matches the events whose field is in the range, from and to are inclusive unless
+        include_lower or include_upper is false."""
+        [field, bounds] = self.get_single(argument, 'range')
+        bounds = dict(bounds)
+        include_lower: bool = bounds.pop('include_lower', True)
+        include_upper: bool = bounds.pop('include_upper', True)
+        lower = bounds.pop('from', None)
+        upper = bounds.pop('to', None)
+        bounds.pop('format', None)
+        unknown: set = set(bounds) - {'gt', 'gte', 'lt', 'lte'}
+        if unknown:
+            raise ValueError(f"[range] query does not support {sorted(unknown)}")
+        if lower is not None:
+            bounds['gte' if include_lower else 'gt'] = lower
+        if upper is not None:
+            bounds['lte' if include_upper else 'lt'] = upper
+        if field in self.corpus.dates:
+            values: np.ndarray = self.corpus.dates[field]
+
+            def bound(operator: str, value) -> int:
+                # like the cluster, the lte and gt bounds round up, the gte and lt bounds round down.
+                return parse_date_math(value, self.now_millis, round_up=operator in ['lte', 'gt'])
+        elif field in self.corpus.numbers:
+            values: np.ndarray = self.corpus.numbers[field]
+
+            def bound(operator: str, value) -> float:
+                return float(value)
+        else:
+            return np.zeros(self.corpus.size, dtype=bool)
+        mask: np.ndarray = np.ones(self.corpus.size, dtype=bool)
+        for [operator, value] in bounds.items():
+            limit = bound(operator, value)
+            if operator == 'gt':
+                mask &= values > limit
+            elif operator == 'gte':
+                mask &= values >= limit
+            elif operator == 'lt':
+                mask &= values < limit
+            else:
+                mask &= values <= limit
+        return mask
+
+    def aggregate(self, aggregations: dict, mask: np.ndarray) -> dict:
+        """Evaluates the aggregations on the matching events.
+        Args:
+            aggregations: {name: aggregation}
+            mask: boolean mask of the events of the parent bucket
+        Returns:
+            dict: {name: result of the aggregation}
+        Raises:
+            ValueError: If an aggregation is not supported.
+        """
+        results: dict = {}
+        for name, aggregation in aggregations.items():
+            sub_aggregations: dict = aggregation.get('aggs', aggregation.get('aggregations', {}))
+            types: list = [key for key in aggregation if key not in ['aggs', 'aggregations', 'meta']]
+            if len(types) != 1:
+                raise ValueError(f"[{name}] aggregation must have exactly one type")
+            handler = getattr(self, f'aggregate_{types[0]}', None)
+            if handler is None:
+                raise ValueError(f"unknown aggregation type [{types[0]}]")
+            results[name] = handler(aggregation[types[0]], mask, sub_aggregations)
+        return results
+
+    def bucket(self, mask: np.ndarray, sub_aggregations: dict, **fields) -> dict:
+        """Gets a bucket with its doc count and its sub aggregations.
+        Args:
+            mask: boolean mask of the events of the bucket
+            sub_aggregations: aggregations of the bucket
+            fields: fields of the bucket before the doc count
+        Returns:
+            dict: bucket
+        """
+        return dict(fields, doc_count=int(np.count_nonzero(mask)), **self.aggregate(sub_aggregations, mask))
+
+    def aggregate_filter(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a filter aggregation."""
+        return self.bucket(mask & self.evaluate(argument), sub_aggregations)
+
+    def aggregate_filters(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a filters aggregation with keyed or anonymous filters."""
+        filters = argument['filters']
+        if isinstance(filters, list):
+            return {'buckets': [self.bucket(mask & self.evaluate(clause), sub_aggregations) for clause in filters]}
+        return {'buckets': {key: self.bucket(mask & self.evaluate(clause), sub_aggregations)
+                            for key, clause in filters.items()}}
+
+    def aggregate_sum(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a sum aggregation, the events without the field count as 0."""
+        field: str = argument['field']
+        if field not in self.corpus.numbers:
+            return {'value': 0.0}
+        values: np.ndarray = self.corpus.numbers[field][mask]
+        return {'value': float(np.nansum(values, dtype=np.float64))}
+
+    def aggregate_date_range(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a date_range aggregation, from is inclusive and to is exclusive."""
+        values: np.ndarray = self.corpus.dates[argument['field']]
+        buckets: list = []
+        for date_range in argument['ranges']:
+            range_mask: np.ndarray = mask.copy()
+            fields: dict = {}
+            if date_range.get('key') is not None:
+                fields['key'] = date_range['key']
+            for [bound, operator] in [('from', np.greater_equal), ('to', np.less)]:
+                if date_range.get(bound) is not None:
+                    millis: int = parse_date_math(date_range[bound], self.now_millis)
+                    range_mask &= operator(values, millis)
+                    fields[bound] = float(millis)
+                    fields[f'{bound}_as_string'] = datetime.fromtimestamp(
+                        millis / 1000, tz=timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+            buckets.append(self.bucket(range_mask, sub_aggregations, **fields))
+        if argument.get('keyed'):
+            return {'buckets': {bucket.pop('key', f"{bucket.get('from_as_string', '*')}-"
+                                                     f"{bucket.get('to_as_string', '*')}"): bucket
+                                for bucket in buckets}}
+        return {'buckets': buckets}
+
+    def aggregate_terms(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a terms aggregation of a keyword field, the buckets are sorted by doc count."""
+        field: str = argument['field']
+        if field not in self.corpus.keywords:
+            raise ValueError(f"[terms] aggregation is only supported on the keyword fields, not [{field}]")
+        [codes, vocabulary] = self.corpus.keywords[field]
+        selected: np.ndarray = codes[mask]
+        counts: np.ndarray = np.bincount(selected[selected >= 0].astype(np.int64), minlength=len(vocabulary))
+        include: set = set(argument['include']) if isinstance(argument.get('include'), list) else None
+        candidates: list = [code for code in np.flatnonzero(counts)
+                            if include is None or vocabulary[code] in include]
+        candidates.sort(key=lambda code: (-counts[code], vocabulary[code]))
+        size: int = int(argument.get('size', 10))
+        return {
+            'doc_count_error_upper_bound': 0,
+            'sum_other_doc_count': int(sum(counts[code] for code in candidates[size:])),
+            'buckets': [self.bucket(mask & (codes == code), sub_aggregations, key=vocabulary[code])
+                        for code in candidates[:size]]
+        }
+
+    def aggregate_composite(self, argument: dict, mask: np.ndarray, sub_aggregations: dict) -> dict:
+        """Evaluates a composite aggregation of terms sources on keyword fields, a page of buckets
+        sorted by key starts after the after key."""
+        names: list = []
+        columns: list = []
+        vocabularies: list = []
+        for source in argument['sources']:
+            [name, value_source] = self.get_single(source, 'composite')
+            field: str = value_source.get('terms', {}).get('field')
+            if field not in self.corpus.keywords:
+                raise ValueError("[composite] aggregation only supports terms sources on the keyword fields")
+            names.append(name)
+            columns.append(self.corpus.keywords[field][0])
+            vocabularies.append(self.corpus.keywords[field][1])
+        present: np.ndarray = mask.copy()
+        for codes in columns:
+            present &= codes >= 0
+        keys: np.ndarray = np.unique(np.stack([codes[present] for codes in columns], axis=1), axis=0)
+        values: list = [tuple(vocabulary[code] for vocabulary, code in zip(vocabularies, key)) for key in keys]
+        after: dict = argument.get('after')
+        if after is not None:
+            after_values: tuple = tuple(after[name] for name in names)
+            [keys, values] = [[key for key, value in zip(keys, values) if value > after_values],
+                              [value for value in values if value > after_values]]
+        size: int = int(argument.get('size', 10))
+        buckets: list = []
+        for key, value in zip(keys[:size], values[:size]):
+            bucket_mask: np.ndarray = present.copy()
+            for codes, code in zip(columns, key):
+                bucket_mask &= codes == code
+            buckets.append(self.bucket(bucket_mask, sub_aggregations, key=dict(zip(names, value))))
+        result: dict = {'buckets': buckets}
+        if buckets:
+            result = dict({'after_key': buckets[-1]['key']}, **result)
+        return result
+
+    def search(self, body: dict) -> dict:
+        """Runs a search request.
+        Args:
+            body: search request
+        Returns:
+            dict: search response
+        Raises:
+            ValueError: If the request is not supported.
+        """
+        started: float = time.perf_counter()
+        unknown: set = set(body) - {'query', 'aggs', 'aggregations', 'size', 'track_total_hits', 'profile'}
+        if unknown:
+            raise ValueError(f"unknown key {sorted(unknown)} in the search request")
+        if int(body.get('size', 10)) != 0:
+            raise ValueError("the stand-in only answers the aggregations, please give size 0")
+        mask: np.ndarray = self.evaluate(body.get('query', {'match_all': {}}))
+        aggregations: dict = self.aggregate(body.get('aggs', body.get('aggregations', {})), mask)
+        response: dict = {
+            'took': int((time.perf_counter() - started) * 1000),
+            'timed_out': False,
+            '_shards': {'total': 1, 'successful': 1, 'skipped': 0, 'failed': 0},
+            'hits': {'total': {'value': int(np.count_nonzero(mask)), 'relation': 'eq'}, 'max_score': None,
+                     'hits': []}
+        }
+        if aggregations:
+            response['aggregations'] = aggregations
+        return response
+
+
+class ESStandInServer:
+    """HTTP server which answers the _search and the _msearch requests of any index from a corpus."""
+
+    def __init__(self, corpus: EventCorpus, host: str = '127.0.0.1', port: int = 0, now_millis: int = None):
+        """Creates the instance of ESStandInServer.
+        Args:
+            corpus: corpus of the events
+            host: host to listen on
+            port: port to listen on, a free port if 0
+            now_millis: value of now in the date math, epoch milliseconds, the current time of every
+                request if not given
+        """
+        self.corpus: EventCorpus = corpus
+        self.now_millis: int = now_millis
+        self.requests: int = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self.get_handler())
+        self.server.daemon_threads = True
+        self.thread: threading.Thread = None
+
+    @property
+    def url(self) -> str:
+        """Gets the endpoint of the server, it is given to the KPIReport as logging_service_endpoint.
+        Returns:
+            str: http://host:port
+        """
+        [host, port] = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def search(self, body: dict) -> dict:
+        """Runs a search request at the current time.
+        Args:
+            body: search request
+        Returns:
+            dict: search response
+        Raises:
+            ValueError: If the request is not supported.
+        """
+        with self.lock:
+            self.requests += 1
+        now_millis: int = int(time.time() * 1000) if self.now_millis is None else self.now_millis
+        return SearchEvaluator(self.corpus, now_millis=now_millis).search(body)
+
+    @staticmethod
+    def get_error(ex: Exception) -> dict:
+        """Gets the error response of a request which is not supported.
+        Args:
+            ex: error
+        Returns:
+            dict: error response with the status 400
+        """
+        return {'error': {'root_cause': [{'type': 'parsing_exception', 'reason': str(ex)}],
+                          'type': 'parsing_exception', 'reason': str(ex)}, 'status': 400}
+
+    def msearch(self, body: bytes) -> dict:
+        """Runs a multi search request, every search gets its own response or error.
+        Args:
+            body: NDJSON of the header and the body of every search
+        Returns:
+            dict: multi search response
+        """
+        started: float = time.perf_counter()
+        lines: list = [line for line in body.decode().split('\n') if line.strip()]
+        responses: list = []
+        for search_body in lines[1::2]:
+            try:
+                responses.append(dict(self.search(json.loads(search_body)), status=200))
+            except (ValueError, KeyError, TypeError) as ex:
+                responses.append(self.get_error(ex))
+        return {'took': int((time.perf_counter() - started) * 1000), 'responses': responses}
+
+    def get_handler(self):
+        """Gets the request handler class of the server.
+        Returns:
+            the request handler class
+        """
+        stand_in: ESStandInServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 keeps the connections of the pooled sessions alive.
+            protocol_version = 'HTTP/1.1'
+            # the headers and the body are written apart, Nagle would hold the body for a delayed ack.
+            disable_nagle_algorithm = True
+
+            def send_json(self, status: int, response: dict):
+                payload: bytes = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                body: bytes = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                path: str = self.path.split('?')[0]
+                try:
+                    if path.endswith('/_msearch'):
+                        self.send_json(200, stand_in.msearch(body))
+                    elif path.endswith('/_search'):
+                        self.send_json(200, stand_in.search(json.loads(body or b'{}')))
+                    else:
+                        self.send_json(404, {'error': f'no handler for [{path}]', 'status': 404})
+                except (ValueError, KeyError, TypeError) as ex:
+                    self.send_json(400, stand_in.get_error(ex))
+
+            def log_message(self, format, *args):
+                # the benchmarks print only their results.
+                pass
+
+        return Handler
+
+    def start(self) -> 'ESStandInServer':
+        """Serves the requests on a daemon thread.
+        Returns:
+            ESStandInServer: the server
+        """
+        self.thread = threading.Thread(target=self.server.serve_forever, name='es-stand-in', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+
+    def __enter__(self) -> 'ESStandInServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
\ No newline at end of file
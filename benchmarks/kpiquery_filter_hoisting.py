@@ -0,0 +1,150 @@
+"""Benchmark of the hoisted KPI query.
+This script compares the KPI query which repeats the time range and the metric service
+filters in every bucket with the query which applies them once, on a local
+ES-compatible stand-in (Elasticsearch or OpenSearch in a container).
+
+Usage:
+    python -m benchmarks.kpiquery_filter_hoisting --url http://localhost:9200 --index kpi-bench --seed 200000
+"""
+import argparse
+import copy
+import json
+import random
+import statistics
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+from service.elasticsearch.kpiquery import KPIQuery
+
+TASK_EVENTS: list = ['fail-fail', 'fail-pend', 'fail-none', 'fail-pwe', 'fail-99', 'pass-fail', 'pass-pend',
+                     'pass-none', 'pass-pwe', 'pass-99', 'pass-bypass', 'pass-pass']
+
+
+def post(url: str, body: bytes, content_type: str = 'application/json') -> dict:
+    """Posts the body and gives back the decoded response.
+    Args:
+        url: url of the stand-in
+        body: request body
+        content_type: content type of the body
+    Returns:
+        dict: response of the stand-in
+    """
+    request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': content_type})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def seed(url: str, index: str, documents: int, model_version: str):
+    """Writes the synthetic documents of the last 7 days to the index.
+    Args:
+        url: url of the stand-in
+        index: index name
+        documents: number of documents
+        model_version: metric path of the pfc documents
+    """
+    now: datetime = datetime.now(timezone.utc)
+    services: list = ['pfc_stable', 'pfc_canary', 'other']
+    paths: list = [model_version, 'v1']
+    for start in range(0, documents, 5000):
+        lines: list = []
+        for _ in range(start, min(start + 5000, documents)):
+            timestamp: datetime = now - timedelta(seconds=random.randint(0, 14 * 24 * 3600))
+            lines.append(json.dumps({'index': {'_index': index}}))
+            lines.append(json.dumps({
+                '@timestamp': timestamp.isoformat(),
+                'metric': {'service': random.choice(services), 'path': random.choice(paths),
+                           'value': random.randint(0, 1)},
+                'davinci_data': {'task_event': random.choice(TASK_EVENTS)},
+                'datascience_data': {'param2': random.choice(['entity_not_in_allow_list', 'allowed'])}
+            }))
+        post(f'{url}/_bulk?refresh=true', ('\n'.join(lines) + '\n').encode(), 'application/x-ndjson')
+
+
+def legacy_query(query: dict) -> dict:
+    """Gives back the previous form of the query, where every bucket repeats the shared filters.
+    Args:
+        query: hoisted query built by KPIQuery.construct_query
+    Returns:
+        dict: query with the time range and the metric service term in every bucket
+    """
+    query = copy.deepcopy(query)
+    time_range: dict = query.pop('query')['bool']['filter'][0]
+    pfc_stable: dict = query['aggs'].pop('pfc_stable')
+    for bucket in query['aggs']['ml_audit']['filters']['filters'].values():
+        bucket['bool']['filter'].insert(0, time_range)
+    for bucket in pfc_stable['aggs']['pfc']['filters']['filters'].values():
+        bucket['bool']['filter'][:0] = [time_range, pfc_stable['filter']]
+    query['aggs']['pfc'] = pfc_stable['aggs']['pfc']
+    return query
+
+
+def shard_work_nanos(response: dict) -> int:
+    """Sums the query and the collector time of every shard of a profiled response.
+    Args:
+        response: profiled response
+    Returns:
+        int: time in nanoseconds
+    """
+    nanos: int = 0
+    for shard in response.get('profile', {}).get('shards', []):
+        for search in shard.get('searches', []):
+            nanos += sum(query.get('time_in_nanos', 0) for query in search.get('query', []))
+            nanos += sum(collector.get('time_in_nanos', 0) for collector in search.get('collector', []))
+        for aggregation in shard.get('aggregations', []):
+            nanos += aggregation.get('time_in_nanos', 0)
+    return nanos
+
+
+def run(url: str, index: str, query: dict, repeats: int) -> dict:
+    """Runs the query and measures it.
+    Args:
+        url: url of the stand-in
+        index: index name
+        query: query to run
+        repeats: number of measured runs
+    Returns:
+        dict: median latency, median took and median shard work
+    """
+    body: bytes = json.dumps(query).encode()
+    profiled: bytes = json.dumps(dict(query, profile=True)).encode()
+    latencies: list = []
+    tooks: list = []
+    shard_work: list = []
+    # the first run warms up the caches of the stand-in.
+    post(f'{url}/{index}/_search?request_cache=false', body)
+    for _ in range(repeats):
+        started: float = time.perf_counter()
+        response: dict = post(f'{url}/{index}/_search?request_cache=false', body)
+        latencies.append((time.perf_counter() - started) * 1000)
+        tooks.append(response['took'])
+        shard_work.append(shard_work_nanos(post(f'{url}/{index}/_search?request_cache=false', profiled)) / 1e6)
+    return {
+        'latency_ms': round(statistics.median(latencies), 2),
+        'took_ms': statistics.median(tooks),
+        'shard_work_ms': round(statistics.median(shard_work), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:9200')
+    parser.add_argument('--index', default='kpi-bench')
+    parser.add_argument('--seed', type=int, default=0, help='number of synthetic documents to write first')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--model-version', default='v2')
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.url, args.index, args.seed, args.model_version)
+    for window in [{'absolute_time_from_': 24, 'time_unit_': 'h'}, {'absolute_time_from_': 7, 'time_unit_': 'd'}]:
+        request: dict = dict(window, relative_time_from_=None, relative_time_to_=None,
+                             model_version=args.model_version)
+        hoisted: dict = KPIQuery().construct_query(request)
+        for name, query in [('per bucket', legacy_query(hoisted)), ('hoisted', hoisted)]:
+            print(f"{window['absolute_time_from_']}{window['time_unit_']:<2} {name:<11}",
+                  run(args.url, args.index, query, args.repeats))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Benchmark of the KPIReport on the local Elasticsearch stand-in.
+This script generates a synthetic corpus of every size, serves it with the stand-in and
+measures the end to end latency and the throughput of KPIReport.query_es, the time the
+stand-in takes to evaluate the query and the time of report_payload on its response.
+
+Usage:
+    python -m benchmarks.kpireport_standin --events 100000 1000000 10000000 --repeats 20
+    python -m benchmarks.kpireport_standin --events 100000000 --repeats 3 --concurrency 4
+"""
+import argparse
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.esstandin import ESStandInServer, EventCorpus
+from benchmarks.scheduler_contention import percentile
+from service.reports.kpisreport import KPIReport
+
+
+def run(events: int, repeats: int, concurrency: int, window: dict, model_version: str, seed: int = None) -> dict:
+    """Measures the KPIReport on a corpus of the given size.
+    Args:
+        events: number of synthetic events
+        repeats: number of measured queries
+        concurrency: number of queries sent at the same time in the throughput run
+        window: absolute_time_from_ and time_unit_ of the report
+        model_version: model version of the report
+        seed: seed of the corpus
+    Returns:
+        dict: result of the size, see the keys below
+    Raises:
+        ValueError: If the report of the stand-in is an error.
+    """
+    started: float = time.perf_counter()
+    corpus: EventCorpus = EventCorpus.generate(events=events, model_versions=[model_version], seed=seed)
+    generate_seconds: float = time.perf_counter() - started
+    request: dict = dict(window, relative_time_from_=None, relative_time_to_=None, model_version=model_version)
+    with ESStandInServer(corpus) as server:
+        kpi_report: KPIReport = KPIReport(logging_service_endpoint=server.url)
+        query: dict = kpi_report.get_kpi_query(request)
+        # the first query warms up the connection of the pooled session.
+        body: dict = kpi_report.post_query(query=query, correlation_id='benchmark').json()
+        latencies: list = []
+        tooks: list = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            payload: dict = kpi_report.query_es(request)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if 'error' in payload:
+                raise ValueError(f"report of the stand-in failed: {payload['error']}")
+            tooks.append(kpi_report.post_query(query=query, correlation_id='benchmark').json()['took'])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: kpi_report.query_es(request), range(repeats)))
+        throughput_seconds: float = time.perf_counter() - started
+
+    payload_runs: int = 1000
+    started = time.perf_counter()
+    for _ in range(payload_runs):
+        kpi_report.report_payload(body)
+    return {
+        'events': events,
+        'generate_s': round(generate_seconds, 2),
+        'query_es_p50_ms': round(percentile(latencies, 0.5), 2),
+        'query_es_p95_ms': round(percentile(latencies, 0.95), 2),
+        'query_es_mean_ms': round(statistics.mean(latencies), 2),
+        'took_p50_ms': percentile(tooks, 0.5),
+        'queries_per_s': round(repeats / throughput_seconds, 2),
+        'report_payload_us': round((time.perf_counter() - started) * 1e6 / payload_runs, 2),
+        'total_recall': payload['icbc_calculation_kpis']['total_recall']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, nargs='+', default=[10 ** 5, 10 ** 6],
+                        help='sizes of the corpus, 10^8 events take about 2 GB')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4, help='queries sent at the same time')
+    parser.add_argument('--window', choices=['24h', '7d'], default='7d')
+    parser.add_argument('--model-version', default='v2US2')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    # the reports log every query, the benchmark prints only its results.
+    logging.disable(logging.CRITICAL)
+    window: dict = {'absolute_time_from_': int(args.window[:-1]), 'time_unit_': args.window[-1]}
+    for events in args.events:
+        print(run(events=events, repeats=args.repeats, concurrency=args.concurrency, window=window,
+                  model_version=args.model_version, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
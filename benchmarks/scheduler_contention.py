@@ -0,0 +1,172 @@
+"""Benchmark of the scheduler pods competing for the same jobs.
+This script runs many JobRunner pods in one process against the in-memory DynamoDB
+stand-in. In every round, the pods call check_job_to_schedule at the same time, and the
+script reports the jobs which ran more than once, the calls to the table per tick and
+the percentiles of the tick latency.
+
+Usage:
+    python -m benchmarks.scheduler_contention --pods 8 --rounds 3 --model-versions 4 --latency-ms 5
+    python -m benchmarks.scheduler_contention --pods 8 --sharding --failure-rate 0.02
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+from collections import Counter
+
+from benchmarks.dynamostandin import InMemoryDynamoTable
+from service.common.modelutils import ModelUtils
+from service.configs import config
+from service.dynamo.jobrunner import JobRunner
+from service.dynamo.persistencymanager import PersistencyManager
+from service.scheduling.podmembership import PodMembership
+
+
+class SimulatedPod(JobRunner):
+    """JobRunner of one pod, its kpi report takes a fixed time and is counted."""
+
+    def __init__(self, pod_name: str, executions: Counter, executions_lock: threading.Lock,
+                 report_seconds: float, sharding: bool):
+        """Creates the instance of SimulatedPod.
+        Args:
+            pod_name: name of the pod
+            executions: {(model version, window): number of reports}, shared by the pods
+            executions_lock: lock of the executions
+            report_seconds: time of a kpi report
+            sharding: shard the jobs across the pods
+        """
+        super().__init__(concurrent=True, sharding=sharding)
+        self.pod_name: str = pod_name
+        self.executions: Counter = executions
+        self.executions_lock: threading.Lock = executions_lock
+        self.report_seconds: float = report_seconds
+
+    def get_pod_name(self) -> str:
+        """Gets the name of the simulated pod.
+        Returns:
+          str: pod name
+        """
+        return self.pod_name
+
+    def get_kpi_report(self, request: dict, correlation_id: str) -> dict:
+        """Counts the report and gives back a healthy one.
+        Args:
+            request: kpi report request
+            correlation_id: correlation_id
+        Returns:
+            dict: kpi report
+        """
+        with self.executions_lock:
+            self.executions[(request['model_version'], f"{request['absolute_time_from_']}"
+                                                       f"{request['time_unit_']}")] += 1
+        time.sleep(self.report_seconds)
+        return {'icbc_calculation_kpis': {'total_recall': '99.9', 'auditor_fails_count': '1'},
+                'status': 'good', 'kibana_kpis': 'Total Recall: 99.9%'}
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Gets a percentile with the nearest rank.
+    Args:
+        values: measured values
+        fraction: percentile from 0 to 1
+    Returns:
+        float: value at the percentile
+    """
+    ordered: list = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def run(pods: int, rounds: int, model_versions: int, latency_seconds: float, failure_rate: float,
+        report_seconds: float, sharding: bool, seed: int = None) -> list:
+    """Runs the rounds of ticks of the pods.
+    Args:
+        pods: number of pods
+        rounds: number of rounds, every pod ticks once in a round
+        model_versions: number of model versions next to the stable one
+        latency_seconds: latency of a call to the table
+        failure_rate: probability of a call to the table to fail
+        report_seconds: time of a kpi report
+        sharding: shard the jobs across the pods
+        seed: seed of the injected failures
+    Returns:
+        list: result of every round, see the keys below
+    """
+    PersistencyManager.clear_registry()
+    table: InMemoryDynamoTable = InMemoryDynamoTable(seed=seed)
+    table.install(PersistencyManager.get_persistency_manager(config.icbc_params_table_name))
+    table.upsert(key=ModelUtils.MODEL_VERSIONS_KEY,
+                 value={'versions': [f'bench{index}' for index in range(model_versions)]})
+    pod_names: list = [f'pod{index}' for index in range(pods)]
+    if sharding:
+        # the pods know each other before the first round, like pods which run for a while.
+        for pod_name in pod_names:
+            PodMembership(pod_name=pod_name).heartbeat()
+    # the calls of the setup are not measured.
+    table.calls.clear()
+    table.latency_seconds = latency_seconds
+    table.failure_rate = failure_rate
+
+    executions: Counter = Counter()
+    executions_lock = threading.Lock()
+    results: list = []
+    for round_number in range(rounds):
+        runners: list = [SimulatedPod(pod_name=pod_name, executions=executions, executions_lock=executions_lock,
+                                      report_seconds=report_seconds, sharding=sharding)
+                         for pod_name in pod_names]
+        barrier = threading.Barrier(pods)
+        latencies: list = []
+        errors: list = []
+        calls_before: int = sum(table.calls.values())
+
+        def tick(runner: SimulatedPod):
+            barrier.wait()
+            started: float = time.perf_counter()
+            try:
+                runner.check_job_to_schedule()
+            except Exception as exc:
+                errors.append(f'{type(exc).__name__} - {exc}')
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        threads: list = [threading.Thread(target=tick, args=(runner,)) for runner in runners]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.append({
+            'round': round_number + 1,
+            'jobs_run': len(executions),
+            'duplicate_executions': sum(count - 1 for count in executions.values()),
+            'dynamo_calls_per_tick': round((sum(table.calls.values()) - calls_before) / pods, 2),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'mean_ms': round(statistics.mean(latencies), 2),
+            'tick_errors': len(errors)
+        })
+    PersistencyManager.clear_registry()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pods', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--model-versions', type=int, default=2, help='model versions next to the stable one')
+    parser.add_argument('--latency-ms', type=float, default=5.0, help='latency of a call to the table')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='probability of a call to fail')
+    parser.add_argument('--report-ms', type=float, default=50.0, help='time of a kpi report')
+    parser.add_argument('--sharding', action='store_true', help='shard the jobs across the pods')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    # the jobs log every write, the benchmark prints only its results.
+    logging.disable(logging.CRITICAL)
+    for result in run(pods=args.pods, rounds=args.rounds, model_versions=args.model_versions,
+                      latency_seconds=args.latency_ms / 1000, failure_rate=args.failure_rate,
+                      report_seconds=args.report_ms / 1000, sharding=args.sharding, seed=args.seed):
+        print(result)
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
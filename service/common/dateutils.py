@@ -2,7 +2,7 @@
 This module contains some utility functions that can help other components
 of the service.
 """
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 class DateUtils:
@@ -17,6 +17,15 @@ class DateUtils:
         """
         return datetime.today().now()
 
+    @staticmethod
+    def get_current_utc_time() -> datetime:
+        """It gives the current datetime in UTC, the days of the elastic search are UTC days.
+        Args:
+        Returns:
+          datetime
+        """
+        return datetime.now(timezone.utc)
+
     @staticmethod
     def get_datetime_in_iso_format() -> str:
         """It gives the datetime in iso format.
@@ -0,0 +1,52 @@
+"""Consistent hash ring.
+Every member has many points on a ring of hashes, and a key belongs to the member of
+the first point after the hash of the key. When a member joins or leaves, only the
+keys next to its points move to another member.
+"""
+import bisect
+import hashlib
+
+from service.configs import config
+
+
+class HashRing:
+    """Maps the keys to the members with consistent hashing."""
+
+    def __init__(self, members: list, replicas: int = None):
+        """Creates the instance of HashRing.
+        Args:
+            members: names of the members
+            replicas: number of points of every member, config.hash_ring_replicas if not given
+        Raises:
+            ValueError: If there is no member or replicas is not positive.
+        """
+        replicas = config.hash_ring_replicas if replicas is None else replicas
+        if not members:
+            raise ValueError("Please give at least one member")
+        if replicas <= 0:
+            raise ValueError("Please give a positive number of replicas")
+        self.members: list = sorted(set(members))
+        points: list = sorted((HashRing.get_hash(f'{member}#{replica}'), member)
+                              for member in self.members for replica in range(replicas))
+        self.hashes: list = [point_hash for point_hash, _ in points]
+        self.owners: list = [member for _, member in points]
+
+    @staticmethod
+    def get_hash(key: str) -> int:
+        """Gets the position of a key on the ring, it is the same in every process.
+        Args:
+            key: key
+        Returns:
+            int: 64 bits hash of the key
+        """
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+    def get_owner(self, key: str) -> str:
+        """Gets the member of a key.
+        Args:
+            key: key
+        Returns:
+            str: name of the member
+        """
+        index: int = bisect.bisect_right(self.hashes, self.get_hash(key))
+        return self.owners[index % len(self.owners)]
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""Pooled HTTP session.
+This module keeps one HTTP session per process, so the requests to the logging
+service reuse the keep-alive connections instead of paying a new TCP/TLS
+handshake on every report. The async session does the same for every event loop.
+"""
+import asyncio
+import atexit
+import threading
+
+import aiohttp
+from concurdatascience.utility import create_http_client
+from requests.adapters import HTTPAdapter
+
+from service.configs import config
+
+
+class PooledHTTPSession:
+    """Process wide HTTP session with a bounded pool of keep-alive connections."""
+
+    session = None
+    requests_sent: int = 0
+    session_lock = threading.Lock()
+
+    @staticmethod
+    def get_session():
+        """Gets the HTTP session of the process, it is created only once.
+        Returns:
+          HTTP session
+        """
+        if PooledHTTPSession.session is None:
+            with PooledHTTPSession.session_lock:
+                if PooledHTTPSession.session is None:
+                    session = create_http_client()
+                    # the retries are done by envoy, the adapter only keeps the connections.
+                    adapter = HTTPAdapter(pool_connections=config.http_pool_size,
+                                          pool_maxsize=config.http_pool_size,
+                                          max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    PooledHTTPSession.session = session
+        return PooledHTTPSession.session
+
+    @staticmethod
+    def post(**kwargs):
+        """Posts the request with the session of the process.
+        Args:
+            kwargs: arguments of the post of the session, like url, json, headers and timeout
+        Returns:
+          response
+        """
+        session = PooledHTTPSession.get_session()
+        with PooledHTTPSession.session_lock:
+            PooledHTTPSession.requests_sent += 1
+        return session.post(**kwargs)
+
+    @staticmethod
+    def get_stats() -> dict:
+        """Gets the connection reuse counters of the session.
+        Returns:
+          dict: requests sent, connections opened and requests which reused an open connection
+        """
+        with PooledHTTPSession.session_lock:
+            requests_sent: int = PooledHTTPSession.requests_sent
+            connections_opened: int = 0
+            if PooledHTTPSession.session is not None:
+                for adapter in set(PooledHTTPSession.session.adapters.values()):
+                    pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+                    if pools is None:
+                        continue
+                    for pool_key in pools.keys():
+                        pool = pools.get(pool_key)
+                        connections_opened += getattr(pool, 'num_connections', 0) if pool is not None else 0
+        return {
+            'requests': requests_sent,
+            'connections_opened': connections_opened,
+            'connections_reused': max(0, requests_sent - connections_opened)
+        }
+
+    @staticmethod
+    def close():
+        """Closes the pooled connections, the next request creates a new session."""
+        with PooledHTTPSession.session_lock:
+            if PooledHTTPSession.session is not None:
+                PooledHTTPSession.session.close()
+            PooledHTTPSession.session = None
+            PooledHTTPSession.requests_sent = 0
+
+
+class AsyncPooledHTTPSession:
+    """Non-blocking HTTP session with a bounded pool of keep-alive connections, one per event loop."""
+
+    sessions: dict = {}
+    session_lock = threading.Lock()
+
+    @staticmethod
+    def get_session() -> aiohttp.ClientSession:
+        """Gets the HTTP session of the running event loop, it is created only once per loop.
+        Returns:
+          aiohttp.ClientSession
+        """
+        loop = asyncio.get_running_loop()
+        with AsyncPooledHTTPSession.session_lock:
+            session: aiohttp.ClientSession = AsyncPooledHTTPSession.sessions.get(loop)
+            if session is None or session.closed:
+                session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=config.http_pool_size))
+                AsyncPooledHTTPSession.sessions[loop] = session
+            return session
+
+    @staticmethod
+    async def post(url: str, json: dict, headers: dict, timeout: tuple) -> [int, dict]:
+        """Posts the request with the session of the running event loop.
+        Args:
+            url: url of the request
+            json: body of the request
+            headers: headers of the request
+            timeout: (connect timeout, read timeout) in seconds
+        Returns:
+          [status code, body of the response], the body is None if the status code is not 200
+        """
+        session: aiohttp.ClientSession = AsyncPooledHTTPSession.get_session()
+        async with session.post(url, json=json, headers=headers,
+                                timeout=aiohttp.ClientTimeout(sock_connect=timeout[0],
+                                                              sock_read=timeout[1])) as resp:
+            body: dict = await resp.json(content_type=None) if resp.status == 200 else None
+            return [resp.status, body]
+
+    @staticmethod
+    async def close():
+        """Closes the pooled connections of the running event loop."""
+        loop = asyncio.get_running_loop()
+        with AsyncPooledHTTPSession.session_lock:
+            session: aiohttp.ClientSession = AsyncPooledHTTPSession.sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+
+atexit.register(PooledHTTPSession.close)
\ No newline at end of file
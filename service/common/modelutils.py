@@ -12,6 +12,9 @@ from service.enums.timetoliveenum import TimeToLive
 class ModelUtils:
     """ModelUtils."""
 
+    # key of the params table with the other model versions to schedule, {'versions': ['v3', ...]}
+    MODEL_VERSIONS_KEY: str = 'model_versions'
+
     @staticmethod
     def get_model_version_with_environment_suffix() -> str:
         """It gives model version with environment suffix.
@@ -21,6 +24,20 @@ class ModelUtils:
         """
         return config.model_stable_version + "_" + config.model_environment
 
+    @staticmethod
+    def get_model_versions_with_environment_suffix(model_versions_detail: dict = None) -> list:
+        """It gives the model versions to schedule with environment suffix.
+        Args:
+            model_versions_detail: value of the model_versions key of the params table
+        Returns:
+            list: the stable model version first, then config.model_versions and the model
+                versions of the params table, without duplicates.
+        """
+        model_versions: list = [config.model_stable_version] + list(config.model_versions)
+        if model_versions_detail:
+            model_versions += list(model_versions_detail.get('versions') or [])
+        return list(dict.fromkeys(f'{model_version}_{config.model_environment}' for model_version in model_versions))
+
     @staticmethod
     def insert_deployment_detail(correlation_id: str, key: str) -> dict:
         """Gets the day or an hour from the date of deployment till the current date.
@@ -103,5 +120,6 @@ class ModelUtils:
         deployment_detail: dict = PersistencyManager.get_persistency_manager(
             config.icbc_params_table_name).get_the_value(
             key=deployment_key,
-            correlation_id=correlation_id)
+            correlation_id=correlation_id,
+            cache_ttl=TimeToLive.ONE_YEAR_TTL.value)
         return deployment_detail
\ No newline at end of file
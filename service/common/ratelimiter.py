@@ -0,0 +1,37 @@
+"""Rate limiter.
+This module spaces the requests of many threads, so a burst of jobs does not send
+more requests per second to the logging service than it is allowed to take.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Lets at most max_requests_per_second requests start every second, shared by the threads."""
+
+    def __init__(self, max_requests_per_second: float):
+        """Creates the instance of RateLimiter.
+        Args:
+            max_requests_per_second: max number of requests started per second
+        Raises:
+            ValueError: If max_requests_per_second is not positive.
+        """
+        if max_requests_per_second <= 0:
+            raise ValueError("Please give a positive max_requests_per_second")
+        self.interval: float = 1.0 / max_requests_per_second
+        self.next_request_time: float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Waits until the next request can start.
+        Returns:
+          float: seconds waited
+        """
+        with self.lock:
+            now: float = time.monotonic()
+            request_time: float = max(now, self.next_request_time)
+            self.next_request_time = request_time + self.interval
+        wait: float = request_time - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
\ No newline at end of file
@@ -45,6 +45,70 @@ class ServiceConfig:
     # datascience_icbc_params table name
     icbc_params_table_name: str = os.environ.get('ICBC_PARAMS_TABLE_NAME', 'datascience-icbc-params')
 
+    # Attribute names of the key, the value and the time to live of the dynamo tables
+    dynamo_key_attribute: str = os.environ.get('DYNAMO_KEY_ATTRIBUTE', 'key')
+    dynamo_value_attribute: str = os.environ.get('DYNAMO_VALUE_ATTRIBUTE', 'value')
+    dynamo_ttl_attribute: str = os.environ.get('DYNAMO_TTL_ATTRIBUTE', 'ttl')
+
+    # How long (seconds) a pod holds the lease of a job before other pods can take it over, and how
+    # often (seconds) the running pod renews it. A crashed pod stops renewing, so its job is taken over
+    # once the lease expires.
+    job_lease_seconds: int = int(os.environ.get('JOB_LEASE_SECONDS', 60))
+    job_lease_heartbeat_seconds: int = int(os.environ.get('JOB_LEASE_HEARTBEAT_SECONDS', 15))
+
+    # Other model versions (without the environment suffix) scheduled by this service next to the stable one,
+    # comma separated. More model versions can be added in the params table.
+    model_versions: list = field(default_factory=lambda: [
+        model_version.strip() for model_version in os.environ.get('MODEL_VERSIONS', '').split(',')
+        if model_version.strip()])
+
+    # Flag to run the 24 hours and the 7 days jobs of a scheduler tick at the same time
+    concurrent_jobs: bool = bool(strtobool(os.environ.get('CONCURRENT_JOBS', 'False')))
+
+    # Max number of pooled connections to DynamoDB per table
+    dynamo_max_pool_connections: int = int(os.environ.get('DYNAMO_MAX_POOL_CONNECTIONS', 16))
+
+    # Retries and the initial backoff (ms) of the unprocessed items of the dynamo batch operations
+    dynamo_batch_max_retries: int = int(os.environ.get('DYNAMO_BATCH_MAX_RETRIES', 5))
+    dynamo_batch_backoff_ms: int = int(os.environ.get('DYNAMO_BATCH_BACKOFF_MS', 50))
+
+    # In-process read-through cache of the dynamo values: flag, max entries per table and max age (seconds)
+    dynamo_read_cache_enabled: bool = bool(strtobool(os.environ.get('DYNAMO_READ_CACHE_ENABLED', 'False')))
+    dynamo_read_cache_max_entries: int = int(os.environ.get('DYNAMO_READ_CACHE_MAX_ENTRIES', 1024))
+    dynamo_read_cache_max_age_seconds: int = int(os.environ.get('DYNAMO_READ_CACHE_MAX_AGE_SECONDS', 3600))
+
+    # Flag to compute the 7 days report from the daily KPI counters stored in the params table
+    daily_kpi_counters_enabled: bool = bool(strtobool(os.environ.get('DAILY_KPI_COUNTERS_ENABLED', 'False')))
+
+    # Flag to check the recall of every company of the 7 days report, the field of the company in the
+    # logging service documents and the number of companies of a page of the query
+    company_recall_enabled: bool = bool(strtobool(os.environ.get('COMPANY_RECALL_ENABLED', 'False')))
+    company_field: str = os.environ.get('COMPANY_FIELD', 'datascience_data.company_id')
+    company_buckets_size: int = int(os.environ.get('COMPANY_BUCKETS_SIZE', 10000))
+
+    # Backfill of the past days: number of days queried at the same time and max queries per second
+    backfill_max_workers: int = int(os.environ.get('BACKFILL_MAX_WORKERS', 4))
+    backfill_max_requests_per_second: float = float(os.environ.get('BACKFILL_MAX_REQUESTS_PER_SECOND', 2.0))
+
+    # The scheduler sleeps until the next job is due: max sleep (seconds) before the job keys are read again,
+    # and the delay (seconds) before the job keys are read again when the table could not be read
+    scheduler_max_sleep_seconds: int = int(os.environ.get('SCHEDULER_MAX_SLEEP_SECONDS', 300))
+    scheduler_retry_seconds: int = int(os.environ.get('SCHEDULER_RETRY_SECONDS', 60))
+
+    # Flag to shard the jobs across the scheduler pods: every job key is attempted only by its owner pod on a
+    # consistent hash ring of the alive pods. A pod is alive for pod_heartbeat_ttl_seconds after its heartbeat,
+    # every pod has hash_ring_replicas points on the ring.
+    job_sharding_enabled: bool = bool(strtobool(os.environ.get('JOB_SHARDING_ENABLED', 'False')))
+    pod_heartbeat_ttl_seconds: int = int(os.environ.get('POD_HEARTBEAT_TTL_SECONDS', 900))
+    hash_ring_replicas: int = int(os.environ.get('HASH_RING_REPLICAS', 64))
+
+    # Max number of pooled keep-alive connections to the logging service per process
+    http_pool_size: int = int(os.environ.get('HTTP_POOL_SIZE', 10))
+
+    # Flag to read only the aggregation fields of the KPI reports from the byte stream of the logging service
+    # response, instead of decoding the whole body
+    es_streaming_parse_enabled: bool = bool(strtobool(os.environ.get('ES_STREAMING_PARSE_ENABLED', 'False')))
+
  
 
    
@@ -0,0 +1,290 @@
+"""Async Job Runner.
+This class runs the scheduler tick of the JobRunner on an event loop. The table is
+read and written through the AsyncPersistencyManager, and the kpi report is queried
+with the non-blocking KPIReport.query_es_async, so the jobs of a tick wait for the
+I/O at the same time on one thread. The job keys of a tick are read, and the due jobs
+are chosen, by the same helpers as the JobRunner. The event loop, and so its pooled
+HTTP session, is kept from one tick to the next.
+"""
+import asyncio
+import functools
+import uuid
+
+from service.common.httpsession import AsyncPooledHTTPSession
+from service.common.modelutils import ModelUtils
+from service.configs import config
+from service.dynamo.asyncpersistencymanager import AsyncPersistencyManager
+from service.dynamo.jobrunner import JobRunner
+from service.dynamo.leaseheartbeat import LeaseHeartbeat
+from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+from service.reports.kpisreport import KPIReport
+
+
+class AsyncJobRunner(JobRunner):
+    """Triggers the jobs on an event loop."""
+
+    def __init__(self, kpi_report: KPIReport = None):
+        """Creates the instance of AsyncJobRunner.
+        Args:
+            kpi_report: KPIReport which queries the elastic search without blocking, the
+                blocking get_pfc_kpi_report endpoint runs on the thread pool if not given.
+        """
+        super().__init__(concurrent=True, kpi_report=kpi_report)
+        # event loop of the ticks, it keeps the pooled HTTP session of the ticks alive.
+        self.loop: asyncio.AbstractEventLoop = None
+
+    @staticmethod
+    async def run_blocking(operation, *args, **kwargs):
+        """Runs a blocking operation on the thread pool of the AsyncPersistencyManager.
+        Args:
+            operation: blocking function
+            args: positional arguments of the operation
+            kwargs: keyword arguments of the operation
+        Returns:
+          result of the operation
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(AsyncPersistencyManager.get_executor(),
+                                          functools.partial(operation, *args, **kwargs))
+
+    async def get_kpi_report_async(self, request: dict, correlation_id: str) -> dict:
+        """Gets the kpi report of a model version, see JobRunner.get_kpi_report.
+        Args:
+            request: kpi report request
+            correlation_id: correlation_id
+        Returns:
+            dict: kpi report
+        """
+        if self.kpi_report is None or config.daily_kpi_counters_enabled:
+            # the daily kpi counters are read and written on the table, the report runs on the thread pool.
+            return await self.run_blocking(self.get_kpi_report, request, correlation_id=correlation_id)
+        return await self.kpi_report.query_es_async(request, correlation_id=correlation_id)
+
+    async def get_kpi_reports_async(self, requests: dict, correlation_id: str) -> dict:
+        """Gets the kpi reports of many model versions for the same time window, see JobRunner.get_kpi_reports.
+        Args:
+            requests: {model_version: kpi report request}
+            correlation_id: correlation_id
+        Returns:
+            dict: {model_version: kpi report}
+        """
+        request: dict = self.get_multi_version_request(requests)
+        if request is None:
+            reports: list = await asyncio.gather(*[
+                self.get_kpi_report_async(request, correlation_id=correlation_id) for request in requests.values()])
+            return dict(zip(requests.keys(), reports))
+        return self.split_multi_version_reports(requests, reports=await self.run_blocking(
+            self.kpi_report.query_es_multi_version, request, correlation_id=correlation_id))
+
+    async def trigger_the_job_async(self, key: str, deployment_detail: dict, correlation_id: str = None,
+                                    model_version: str = None) -> dict:
+        """It triggers the job to get the report, see JobRunner.trigger_the_job.
+        Args:
+             key: key to be inserted. It is in the format of 24-hours-<date> or 7-days-<date>
+             deployment_detail: dict
+             correlation_id: Correlation id
+             model_version: model version of the job, the stable model version if not given
+        Returns:
+                   dict:
+        """
+        job_detail: dict = self.start_job(key=key, model_version=model_version)
+        persistency_manager: AsyncPersistencyManager = AsyncPersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        lease_status: LeaseStatus = await persistency_manager.acquire_lease(
+            **self.get_lease_request(job_detail=job_detail, correlation_id=correlation_id))
+        # another pod won the lease, it runs the job, or there is some issue to write the lease.
+        if lease_status != LeaseStatus.ACQUIRED:
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=lease_status)
+
+        # the lease is renewed by a task of the event loop while the job runs, so a slow report is not run
+        # again by another pod, and no thread is started per job.
+        heartbeat: LeaseHeartbeat = self.get_lease_heartbeat(
+            job_detail=job_detail, correlation_id=correlation_id).start_async()
+        try:
+            response: dict = await self.get_kpi_report_async(
+                self.get_report_request(job_detail=job_detail), correlation_id=correlation_id)
+            return await self.finish_job_async(job_detail=job_detail, response=response,
+                                               deployment_detail=deployment_detail, correlation_id=correlation_id,
+                                               heartbeat=heartbeat)
+        finally:
+            await heartbeat.stop_async()
+
+    async def trigger_the_jobs_async(self, keys: dict, deployment_details: dict, correlation_id: str) -> dict:
+        """It triggers the jobs of a time window of many model versions, see JobRunner.trigger_the_jobs.
+        Args:
+            keys: {model_version: job key}
+            deployment_details: {model_version: deployment detail}
+            correlation_id: correlation_id
+        Returns:
+            dict: {model_version: response}
+        """
+        persistency_manager: AsyncPersistencyManager = AsyncPersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        job_details: dict = {model_version: self.start_job(key=key, model_version=model_version)
+                             for model_version, key in keys.items()}
+        lease_statuses: list = await asyncio.gather(*[
+            persistency_manager.acquire_lease(**self.get_lease_request(job_detail=job_detail,
+                                                                       correlation_id=correlation_id))
+            for job_detail in job_details.values()])
+        responses: dict = {}
+        leased_jobs: dict = {}
+        for [model_version, job_detail], lease_status in zip(job_details.items(), lease_statuses):
+            if lease_status == LeaseStatus.ACQUIRED:
+                leased_jobs[model_version] = job_detail
+            else:
+                responses[model_version] = self.lease_not_acquired(key=job_detail['key'], job_detail=job_detail,
+                                                                   lease_status=lease_status)
+        if not leased_jobs:
+            return responses
+
+        heartbeats: dict = {model_version: self.get_lease_heartbeat(
+            job_detail=job_detail, correlation_id=correlation_id).start_async()
+            for model_version, job_detail in leased_jobs.items()}
+        try:
+            reports: dict = await self.get_kpi_reports_async(
+                requests={model_version: self.get_report_request(job_detail=job_detail)
+                          for model_version, job_detail in leased_jobs.items()},
+                correlation_id=correlation_id)
+            finished: list = await asyncio.gather(*[
+                self.finish_job_async(job_detail=job_detail, response=reports[model_version],
+                                      deployment_detail=deployment_details.get(model_version),
+                                      correlation_id=correlation_id, heartbeat=heartbeats[model_version])
+                for model_version, job_detail in leased_jobs.items()])
+            responses.update(zip(leased_jobs.keys(), finished))
+        finally:
+            await asyncio.gather(*[heartbeat.stop_async() for heartbeat in heartbeats.values()])
+        return responses
+
+    async def finish_job_async(self, job_detail: dict, response: dict, deployment_detail: dict,
+                               correlation_id: str, heartbeat: LeaseHeartbeat = None) -> dict:
+        """Checks the model performance with the report of a leased job and marks the job completed,
+        see JobRunner.finish_job.
+        Args:
+             job_detail: detail of the job given by start_job
+             response: kpi report of the job
+             deployment_detail: dict
+             correlation_id: Correlation id
+             heartbeat: heartbeat of the lease of the job, the lease is not checked if not given
+        Returns:
+                   dict:
+        """
+        key: str = job_detail['key']
+        model_version: str = job_detail['model_version']
+        persistency_manager: AsyncPersistencyManager = AsyncPersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        if 'error' in response:
+            self.set_job_status(key=key, status=JobStatus.JOB_ABORTED.name, model_version=model_version)
+            return response
+        if self.is_lease_lost(heartbeat):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.HELD_BY_OTHER)
+
+        deployment_key: str = f'deployment_date_{model_version}'
+        model_deployment_detail: dict = await self.run_blocking(
+            ModelUtils.get_kpi_report_header_based_on_deployment_date,
+            deployment_key=deployment_key,
+            correlation_id=correlation_id,
+            deployment_detail=deployment_detail
+        )
+        self.log_report(job_detail=job_detail, response=response,
+                        model_deployment_detail=model_deployment_detail, correlation_id=correlation_id)
+
+        for post_action in self.get_post_actions(key=key, model_deployment_detail=model_deployment_detail):
+            [response, completed] = await self.run_blocking(post_action, self, job_detail=job_detail,
+                                                            response=response, correlation_id=correlation_id)
+            if not completed:
+                return response
+
+        if self.is_lease_lost(heartbeat):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.HELD_BY_OTHER)
+        completion_request: dict = self.get_completion_request(job_detail=job_detail, correlation_id=correlation_id)
+        # the completion is written only while the pod holds the lease, the job runs again once its lease expires.
+        if not await persistency_manager.complete_lease(**completion_request):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.FAILED)
+        # a completed job does not change any more, it is not read again on the next ticks of its period.
+        persistency_manager.remember_value(key=key, value=completion_request['value'],
+                                           cache_ttl=completion_request['ttl'])
+        return self.complete_job(key=key, response=response, model_version=model_version)
+
+    async def check_job_result_async(self, key: str, job_result: dict, correlation_id: str,
+                                     deployment_detail: dict, model_version: str = None):
+        """It checks the job result read from the table, see JobRunner.check_job_result.
+        Args:
+            key: key
+            job_result: value of the key in the table, None if the job is not started
+            correlation_id: correlation_id
+            deployment_detail: dict
+            model_version: model version of the job, the stable model version if not given
+        """
+        if self.is_job_due(key=key, job_result=job_result, model_version=model_version):
+            await self.trigger_the_job_async(key=key, deployment_detail=deployment_detail,
+                                             correlation_id=correlation_id, model_version=model_version)
+
+    async def check_window_jobs_async(self, keys: dict, values: dict, correlation_id: str,
+                                      deployment_details: dict):
+        """It checks the jobs of a time window of many model versions, see JobRunner.check_window_jobs.
+        Args:
+            keys: {model_version: job key}
+            values: values of the job keys read from the table
+            correlation_id: correlation_id
+            deployment_details: {model_version: deployment detail}
+        """
+        keys_to_trigger: dict = {model_version: key for model_version, key in keys.items()
+                                 if self.is_job_due(key=key, job_result=values.get(key), model_version=model_version)}
+        if keys_to_trigger:
+            await self.trigger_the_jobs_async(keys=keys_to_trigger, deployment_details=deployment_details,
+                                              correlation_id=correlation_id)
+
+    async def check_job_to_schedule_async(self, model_versions: list = None):
+        """It checks the jobs of every model version of the tick and triggers them at the same time, see
+        JobRunner.check_job_to_schedule.
+        Args:
+            model_versions: model versions with the environment suffix, the stable model version,
+                config.model_versions and the model versions of the params table if not given.
+        """
+        correlation_id: str = str(uuid.uuid4())
+        tick_jobs: list = await self.run_blocking(self.read_tick_jobs, correlation_id=correlation_id,
+                                                  model_versions=model_versions)
+        if tick_jobs is None:
+            return
+        [job_keys, values, deployment_details] = tick_jobs
+
+        if len(job_keys) == 1:
+            [model_version] = job_keys.keys()
+            jobs: list = [
+                self.check_job_result_async(key=key, job_result=values.get(key), correlation_id=correlation_id,
+                                            deployment_detail=deployment_details[model_version],
+                                            model_version=model_version)
+                for key in job_keys[model_version][1:]
+            ]
+        else:
+            # the jobs of a time window are queried together for every model version.
+            jobs: list = [
+                self.check_window_jobs_async(keys=window_keys, values=values, correlation_id=correlation_id,
+                                             deployment_details=deployment_details)
+                for window_keys in self.get_window_keys(job_keys)
+            ]
+        # the jobs wait for their reports at the same time.
+        await asyncio.gather(*jobs)
+
+    def check_job_to_schedule(self, model_versions: list = None):
+        """Runs the async scheduler tick to completion, it keeps the synchronous API of the JobRunner.
+        The event loop is kept for the next ticks, so they reuse the pooled HTTP session.
+        Args:
+            model_versions: model versions with the environment suffix, see JobRunner.check_job_to_schedule
+        """
+        if self.loop is None or self.loop.is_closed():
+            self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.check_job_to_schedule_async(model_versions=model_versions))
+
+    def close(self):
+        """Closes the pooled HTTP session and the event loop of the ticks."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.run_until_complete(AsyncPooledHTTPSession.close())
+        finally:
+            self.loop.close()
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""Manages the given table operation on an event loop.
+The dynamo wrapper and boto3 are blocking, so the calls run on one small thread pool
+shared by the process. The event loop is never blocked, and the number of threads
+does not grow with the number of jobs awaiting the table.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from service.configs import config
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.leasestatus import LeaseStatus
+
+
+class AsyncPersistencyManager:
+    """Async counterpart of PersistencyManager, it runs the operations of the
+    PersistencyManager of the table, so both share the handles and the cache."""
+
+    registry: dict = {}
+    executor: ThreadPoolExecutor = None
+    registry_lock = threading.Lock()
+
+    def __init__(self, table: str):
+        """Creates the instance of AsyncPersistencyManager.
+        Args:
+            table: Table which you want to insert/upsert/delete
+        Raises:
+            ValueError: If table is empty.
+        """
+        if not table:
+            raise ValueError("Please give the table name")
+        self.table = table
+
+    @staticmethod
+    def get_persistency_manager(table_name: str) -> 'AsyncPersistencyManager':
+        """Gets the Async Persistency Manager of the table from the registry.
+        Args:
+            table_name
+        Returns:
+          Async Persistent Manager
+        """
+        with AsyncPersistencyManager.registry_lock:
+            persistency_manager: AsyncPersistencyManager = AsyncPersistencyManager.registry.get(table_name)
+            if persistency_manager is None:
+                persistency_manager = AsyncPersistencyManager(table_name)
+                AsyncPersistencyManager.registry[table_name] = persistency_manager
+            return persistency_manager
+
+    @staticmethod
+    def get_executor() -> ThreadPoolExecutor:
+        """Gets the thread pool which runs the blocking table calls, it is created only once.
+        Returns:
+          ThreadPoolExecutor
+        """
+        if AsyncPersistencyManager.executor is None:
+            with AsyncPersistencyManager.registry_lock:
+                if AsyncPersistencyManager.executor is None:
+                    AsyncPersistencyManager.executor = ThreadPoolExecutor(
+                        max_workers=config.dynamo_max_pool_connections, thread_name_prefix='async-dynamo')
+        return AsyncPersistencyManager.executor
+
+    @staticmethod
+    def clear_registry():
+        """Removes every manager from the registry and shuts the thread pool down."""
+        with AsyncPersistencyManager.registry_lock:
+            AsyncPersistencyManager.registry.clear()
+            if AsyncPersistencyManager.executor is not None:
+                AsyncPersistencyManager.executor.shutdown(wait=True)
+            AsyncPersistencyManager.executor = None
+
+    @property
+    def persistency_manager(self) -> PersistencyManager:
+        """Gets the PersistencyManager of the table from its registry.
+        Returns:
+          Persistent Manager
+        """
+        return PersistencyManager.get_persistency_manager(self.table)
+
+    async def run(self, operation, **kwargs):
+        """Runs a blocking operation of the PersistencyManager on the thread pool.
+        Args:
+            operation: method of the PersistencyManager
+            kwargs: arguments of the operation
+        Returns:
+          result of the operation
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), functools.partial(operation, **kwargs))
+
+    def remember_value(self, key: str, value, cache_ttl: int):
+        """Caches a value which was read from the table and will not change any more.
+        Args:
+            key: key of the table.
+            value: value of the key
+            cache_ttl: how long the value can be served from the cache
+        """
+        self.persistency_manager.remember_value(key=key, value=value, cache_ttl=cache_ttl)
+
+    async def get_the_value(self, key: str, correlation_id: str = None, cache_ttl: int = None):
+        """This method reads the value for a given key, see PersistencyManager.get_the_value.
+        Args:
+            key: key of the table.
+            correlation_id: correlation_id
+            cache_ttl: how long the value can be served from the cache
+        Returns:
+          The value of the key
+        """
+        return await self.run(self.persistency_manager.get_the_value,
+                              key=key, correlation_id=correlation_id, cache_ttl=cache_ttl)
+
+    async def upsert_value(self, key: str, value: dict, logging_msg: dict, correlation_id: str = None,
+                           ttl: int = 86400) -> bool:
+        """This method updates the value for a given key, see PersistencyManager.upsert_value.
+        Args:
+            key: key of the table.
+            value: value which should be stored against the key
+            logging_msg: success and error messages
+            correlation_id: correlation_id
+            ttl: time to live in seconds
+        Returns:
+          True if the value is written
+        """
+        return await self.run(self.persistency_manager.upsert_value, key=key, value=value,
+                              logging_msg=logging_msg, correlation_id=correlation_id, ttl=ttl)
+
+    async def acquire_lease(self, key: str, owner: str, value: dict, lease_seconds: int, logging_msg: dict,
+                            correlation_id: str = None, ttl: int = 86400) -> LeaseStatus:
+        """This method takes the lease of a key, see PersistencyManager.acquire_lease.
+        Args:
+            key: key of the table.
+            owner: name of the pod which takes the lease
+            value: value which should be stored against the key
+            lease_seconds: how long the lease is held
+            logging_msg: success and error messages
+            correlation_id: correlation_id
+            ttl: time to live in seconds
+        Returns:
+          LeaseStatus
+        """
+        return await self.run(self.persistency_manager.acquire_lease, key=key, owner=owner, value=value,
+                              lease_seconds=lease_seconds, logging_msg=logging_msg,
+                              correlation_id=correlation_id, ttl=ttl)
+
+    async def renew_lease(self, key: str, owner: str, lease_seconds: int, correlation_id: str = None) -> LeaseStatus:
+        """This method extends the lease of a key held by the owner, see PersistencyManager.renew_lease.
+        Args:
+            key: key of the table.
+            owner: name of the pod which holds the lease
+            lease_seconds: how long the lease is held from now
+            correlation_id: correlation_id
+        Returns:
+          LeaseStatus
+        """
+        return await self.run(self.persistency_manager.renew_lease, key=key, owner=owner,
+                              lease_seconds=lease_seconds, correlation_id=correlation_id)
+
+    async def complete_lease(self, key: str, owner: str, value: dict, logging_msg: dict, correlation_id: str = None,
+                             ttl: int = 86400) -> bool:
+        """This method writes the value of a completed job, see PersistencyManager.complete_lease.
+        Args:
+            key: key of the table.
+            owner: name of the pod which holds the lease
+            value: value which should be stored against the key
+            logging_msg: success and error messages
+            correlation_id: correlation_id
+            ttl: time to live in seconds
+        Returns:
+          True if the value is written
+        """
+        return await self.run(self.persistency_manager.complete_lease, key=key, owner=owner, value=value,
+                              logging_msg=logging_msg, correlation_id=correlation_id, ttl=ttl)
+
+    async def batch_get(self, keys: list, correlation_id: str = None, cache_ttls: dict = None):
+        """This method reads the values of many keys, see PersistencyManager.batch_get.
+        Args:
+            keys: keys of the table.
+            correlation_id: correlation_id
+            cache_ttls: {key: how long the value can be served from the cache}
+        Returns:
+          dict: {key: value}, None if the values are not read
+        """
+        return await self.run(self.persistency_manager.batch_get, keys=keys,
+                              correlation_id=correlation_id, cache_ttls=cache_ttls)
+
+    async def batch_upsert(self, items: list, logging_msg: dict, correlation_id: str = None) -> bool:
+        """This method updates the values of many keys, see PersistencyManager.batch_upsert.
+        Args:
+            items: list of {'key': key, 'value': value, 'ttl': ttl}
+            logging_msg: success and error messages
+            correlation_id: correlation_id
+        Returns:
+          True if every value is written
+        """
+        return await self.run(self.persistency_manager.batch_upsert, items=items,
+                              logging_msg=logging_msg, correlation_id=correlation_id)
\ No newline at end of file
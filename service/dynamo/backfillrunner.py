@@ -0,0 +1,224 @@
+"""Backfill Runner.
+This class runs the 24 hours jobs of past days, which were lost while the scheduler was
+down or the elastic search query failed. A day is a day of the local time of the scheduler,
+like the period of its job key, and it is queried from its midnight to the next one. The
+days run on a bounded thread pool and the queries are spaced by a rate limiter. A day runs
+the pipeline of the scheduled job, and its result is kept in the params table, so an
+interrupted backfill starts again from the days which are not completed. The key of a
+day completed by the scheduler expires after a day, so a day whose counts are kept by the
+DailyKPICounters is done as well.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from service.common.dateutils import DateUtils
+from service.common.modelutils import ModelUtils
+from service.common.ratelimiter import RateLimiter
+from service.configs import config
+from service.dynamo.dailykpicounters import DailyKPICounters
+from service.dynamo.jobrunner import JobRunner
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+from service.enums.timetoliveenum import TimeToLive
+from service.reports.kpisreport import KPIReport
+from service.scheduling.jobregistry import T_24_HOURS_JOB
+
+
+class BackfillRunner(JobRunner):
+    """Triggers the 24 hours jobs of past days."""
+
+    def __init__(self, kpi_report: KPIReport = None, max_workers: int = None,
+                 max_requests_per_second: float = None):
+        """Creates the instance of BackfillRunner.
+        Args:
+            kpi_report: KPIReport which queries the elastic search, the get_pfc_kpi_report endpoint
+                is called if not given.
+            max_workers: number of days queried at the same time, config.backfill_max_workers if not given
+            max_requests_per_second: max queries per second to the elastic search,
+                config.backfill_max_requests_per_second if not given
+        """
+        super().__init__(concurrent=True, kpi_report=kpi_report)
+        self.max_workers: int = config.backfill_max_workers if max_workers is None else max_workers
+        self.rate_limiter: RateLimiter = RateLimiter(
+            config.backfill_max_requests_per_second if max_requests_per_second is None else max_requests_per_second)
+
+    @staticmethod
+    def get_day_start(day: date) -> datetime:
+        """Gets the local midnight which starts the day.
+        Args:
+            day: local day
+        Returns:
+            datetime: start of the day with the offset of the local time
+        """
+        return datetime.combine(day, datetime.min.time()).astimezone()
+
+    @staticmethod
+    def get_day_key(day: date, model_version: str) -> str:
+        """Gets the key of the 24 hours job of a day, it is the key of the scheduler tick of that day.
+        Args:
+            day: local day
+            model_version: model version with the environment suffix
+        Returns:
+            str: 24-hours - dd-mm-yyyy, it ends with the model version for the non stable model versions
+        """
+        key_model_version: str = None if model_version == ModelUtils.get_model_version_with_environment_suffix() \
+            else model_version
+        return T_24_HOURS_JOB.get_key(model_version=key_model_version,
+                                      now=BackfillRunner.get_day_start(day).timestamp())
+
+    @staticmethod
+    def get_day_request(day: date, model_version: str) -> dict:
+        """Gets the kpi report request of a complete local day, from its midnight to the next one.
+        Args:
+            day: local day
+            model_version: model version with the environment suffix
+        Returns:
+            dict: kpi report request
+        """
+        return {
+            'absolute_time_from_': None,
+            'time_unit_': None,
+            'relative_time_from_': BackfillRunner.get_day_start(day).isoformat(),
+            'relative_time_to_': BackfillRunner.get_day_start(day + timedelta(days=1)).isoformat(),
+            'model_version': model_version
+        }
+
+    @staticmethod
+    def get_days(date_from: date, date_to: date) -> list:
+        """Gets the days of the backfill.
+        Args:
+            date_from: first day
+            date_to: last day, it must be before the current local day
+        Returns:
+            list: days from date_from to date_to
+        Raises:
+            ValueError: If the range is empty or reaches the current day.
+        """
+        if date_from > date_to:
+            raise ValueError("Please give date_from before date_to")
+        if date_to >= DateUtils.get_current_time().date():
+            raise ValueError("Please give the days before today, today is run by the scheduler")
+        return [date_from + timedelta(days=days) for days in range((date_to - date_from).days + 1)]
+
+    @staticmethod
+    def get_completion_request(job_detail: dict, correlation_id: str) -> dict:
+        """Gets the arguments of the write of the completed day, it keeps the kpis of the report of the day.
+        Args:
+            job_detail: detail of the job given by start_job, with the icbc_calculation_kpis of the report
+            correlation_id: correlation_id
+        Returns:
+            dict: arguments of PersistencyManager.complete_lease
+        """
+        completion_request: dict = JobRunner.get_completion_request(job_detail=job_detail,
+                                                                    correlation_id=correlation_id)
+        completion_request['value'].update(status=JobStatus.JOB_COMPLETED.name,
+                                           icbc_calculation_kpis=job_detail.get('icbc_calculation_kpis'))
+        return completion_request
+
+    def run_day(self, day: date, key: str, model_version: str, deployment_detail: dict, correlation_id: str) -> str:
+        """Runs the 24 hours job of a day, like the scheduler tick of that day runs it.
+        Args:
+            day: local day
+            key: key of the job of the day
+            model_version: model version with the environment suffix
+            deployment_detail: deployment detail of the model version
+            correlation_id: correlation_id
+        Returns:
+            str: JobStatus name
+        """
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        job_detail: dict = self.start_job(key=key, model_version=model_version)
+        # the day is kept for a year, so a backfill of the same days skips it.
+        job_detail.update(message_detail=f"{job_detail['message_detail']} of {day.isoformat()}",
+                          ttl=TimeToLive.ONE_YEAR_TTL.value)
+        lease_status: LeaseStatus = persistency_manager.acquire_lease(
+            **self.get_lease_request(job_detail=job_detail, correlation_id=correlation_id))
+        # another pod runs the day, or there is some issue to write the lease.
+        if lease_status == LeaseStatus.HELD_BY_OTHER:
+            return JobStatus.JOB_IN_PROGRESS.name
+        if lease_status != LeaseStatus.ACQUIRED:
+            return JobStatus.JOB_ABORTED.name
+
+        # the lease is renewed while the day runs, so a slow report is not run again by another pod.
+        with self.get_lease_heartbeat(job_detail=job_detail, correlation_id=correlation_id) as heartbeat:
+            self.rate_limiter.acquire()
+            response: dict = self.get_kpi_report(self.get_day_request(day=day, model_version=model_version),
+                                                 correlation_id=correlation_id)
+            job_detail['icbc_calculation_kpis'] = response.get('icbc_calculation_kpis')
+            # the report is logged and the post actions run before the day is completed. A failed day is
+            # not completed, so the next backfill takes it again once its lease expires.
+            response = self.finish_job(job_detail=job_detail, response=response, deployment_detail=deployment_detail,
+                                       correlation_id=correlation_id, heartbeat=heartbeat)
+        return JobStatus.JOB_COMPLETED.name if response.get(T_24_HOURS_JOB.status_attribute) == \
+            JobStatus.JOB_COMPLETED else JobStatus.JOB_ABORTED.name
+
+    def backfill(self, date_from: date, date_to: date, model_version: str = None,
+                 correlation_id: str = None) -> dict:
+        """Runs the 24 hours jobs of the days which are not completed.
+        Args:
+            date_from: first day
+            date_to: last day, it must be before the current local day
+            model_version: model version with the environment suffix, the stable model version if not given
+            correlation_id: correlation_id
+        Returns:
+            dict: {day in iso format: JobStatus name}, empty if the jobs of the days are not read
+        Raises:
+            ValueError: If the range is empty or reaches the current day.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        if model_version is None:
+            model_version = ModelUtils.get_model_version_with_environment_suffix()
+        keys: dict = {day: self.get_day_key(day=day, model_version=model_version)
+                      for day in self.get_days(date_from=date_from, date_to=date_to)}
+
+        counter_keys: dict = {day: DailyKPICounters.get_day_key(model_version=model_version, day=day)
+                              for day in keys.keys()}
+        deployment_key: str = f'deployment_date_{model_version}'
+
+        # the job keys, the daily kpi counters and the deployment date are read with one batched call.
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        values: dict = persistency_manager.batch_get(
+            keys=list(keys.values()) + list(counter_keys.values()) + [deployment_key], correlation_id=correlation_id)
+        if values is None:
+            logging.error(
+                'backfill job keys are not read', extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'backfill job keys are not read',
+                        'param1': 'scheduler'
+                    }})
+            return {}
+
+        statuses: dict = {}
+        pending_days: list = []
+        for day, key in keys.items():
+            # the key of a day completed by the scheduler has expired, the counts of the day are still kept.
+            if values.get(key) is not None and 'completion_time' in values[key] or \
+                    values.get(counter_keys[day]) is not None:
+                statuses[day.isoformat()] = JobStatus.JOB_COMPLETED.name
+            else:
+                pending_days.append(day)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending_days))),
+                                thread_name_prefix='backfill') as executor:
+            futures: dict = {day: executor.submit(self.run_day, day=day, key=keys[day], model_version=model_version,
+                                                  deployment_detail=values.get(deployment_key),
+                                                  correlation_id=correlation_id)
+                             for day in pending_days}
+            for day, future in futures.items():
+                statuses[day.isoformat()] = future.result()
+
+        logging.info(
+            statuses, extra={
+                'correlation_id': correlation_id,
+                'ds_object': {
+                    'message': f'backfill of {len(pending_days)} of {len(keys)} days is done',
+                    'param1': 'scheduler'
+                }})
+        return dict(sorted(statuses.items()))
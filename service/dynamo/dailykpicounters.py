@@ -0,0 +1,97 @@
+"""Provides the daily KPI counters.
+The counts of the KPI buckets of a complete UTC day are stored in the params table,
+so the 7 days report adds the stored days instead of counting the whole week again.
+"""
+from datetime import date, timedelta
+
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.timetoliveenum import TimeToLive
+
+
+class DailyKPICounters:
+    """Reads and writes the KPI counts of the days."""
+
+    # the counts of a day are stored once the day is settled, so the late documents are counted.
+    SETTLED_DAYS: int = 2
+    # the stored days of the 7 days report, from the oldest to the newest.
+    STORED_DAYS_OF_WEEK: list = [6, 5, 4, 3, 2]
+
+    def __init__(self, table_name: str):
+        """Creates the instance of DailyKPICounters.
+        Args:
+            table_name: Table which keeps the counters
+        """
+        self.persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            table_name)
+
+    @staticmethod
+    def get_day_key(model_version: str, day: date) -> str:
+        """Gets the key of the counts of a day.
+        Args:
+            model_version: model version with the environment suffix
+            day: UTC day
+        Returns:
+            str: kpi_counts_<model_version>_<yyyy-mm-dd>
+        """
+        return f'kpi_counts_{model_version}_{day.isoformat()}'
+
+    @staticmethod
+    def get_settled_day(today: date) -> date:
+        """Gets the newest settled day, its counts are stored by the 24 hours job.
+        Args:
+            today: current UTC day
+        Returns:
+            date
+        """
+        return today - timedelta(days=DailyKPICounters.SETTLED_DAYS)
+
+    @staticmethod
+    def get_stored_days(today: date) -> list:
+        """Gets the days of the last 7 days whose counts are read from the table.
+        Args:
+            today: current UTC day
+        Returns:
+            list: days from the oldest to the newest
+        """
+        return [today - timedelta(days=days) for days in DailyKPICounters.STORED_DAYS_OF_WEEK]
+
+    def get_days(self, model_version: str, days: list, correlation_id: str = None):
+        """Gets the counts of the days.
+        Args:
+            model_version: model version with the environment suffix
+            days: UTC days
+            correlation_id: correlation_id
+        Returns:
+            dict: {day: counts}, the counts are None if the day is not stored. None if the table is not read.
+        """
+        keys: dict = {day: DailyKPICounters.get_day_key(model_version, day) for day in days}
+        # the counts of a settled day do not change any more.
+        values: dict = self.persistency_manager.batch_get(
+            keys=list(keys.values()), correlation_id=correlation_id,
+            cache_ttls={key: TimeToLive.ONE_DAY_TTL.value for key in keys.values()})
+        if values is None:
+            return None
+        return {day: values.get(key) for day, key in keys.items()}
+
+    def put_day(self, model_version: str, day: date, counts: dict, correlation_id: str = None) -> bool:
+        """Stores the counts of a day, they are kept as long as the 7 days report reads them.
+        Args:
+            model_version: model version with the environment suffix
+            day: UTC day
+            counts: counts of the KPI buckets
+            correlation_id: correlation_id
+        Returns:
+            True if the counts are stored
+        """
+        logging_msg: dict = {
+            'success_message': f'kpi counts of {day.isoformat()} are entered successfully',
+            'error_message': f'kpi counts of {day.isoformat()} are not entered successfully',
+            'param1': 'scheduler'
+        }
+        return self.persistency_manager.upsert_value(
+            key=DailyKPICounters.get_day_key(model_version, day),
+            value=counts,
+            correlation_id=correlation_id,
+            ttl=TimeToLive.SEVEN_DAY_TTL.value + TimeToLive.ONE_DAY_TTL.value,
+            logging_msg=logging_msg
+        )
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""DynamoDB table client.
+This module talks to DynamoDB directly for the operations which the
+concurdatascience dynamo wrapper does not provide, like the conditional writes.
+Items are stored in the layout of the wrapper: the attributes of the key, the value
+and the time to live are named by config.dynamo_key_attribute, dynamo_value_attribute
+and dynamo_ttl_attribute, and the numbers of the value are DynamoDB numbers. The
+round trip tests of the wrapper check this layout on a real table, see
+TestDynamoTableClientRoundTrip.
+"""
+import json
+import time
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from service.configs import config
+
+
+class DynamoTableClient:
+    """Runs the conditional operations on a given table."""
+
+    LEASE_OWNER_FIELD: str = 'job_runner_name'
+    LEASE_EXPIRY_FIELD: str = 'lease_expiry'
+    COMPLETION_TIME_FIELD: str = 'completion_time'
+    BATCH_GET_LIMIT: int = 100
+    BATCH_WRITE_LIMIT: int = 25
+
+    def __init__(self, table: str, client=None):
+        """Creates the instance of DynamoTableClient.
+        Args:
+            table: Table which you want to query
+            client: boto3 dynamodb client, a new one is created if not given
+        Raises:
+            ValueError: If table is empty.
+        """
+        if not table:
+            raise ValueError("Please give the table name")
+        self.table = table
+        self.client = client if client is not None else boto3.client('dynamodb')
+        self.serializer = TypeSerializer()
+        self.deserializer = TypeDeserializer()
+
+    def to_item(self, key: str, value: dict, ttl: int) -> dict:
+        """Converts the key and value to a serialized DynamoDB item.
+        Args:
+            key: key of the table.
+            value: value which should be stored against the key
+            ttl: time to live in seconds
+        Returns:
+            dict: serialized item
+        """
+        # DynamoDB does not accept floats, they are stored as numbers through Decimal.
+        value = json.loads(json.dumps(value, default=str), parse_float=Decimal)
+        item: dict = {
+            config.dynamo_key_attribute: key,
+            config.dynamo_value_attribute: value,
+            config.dynamo_ttl_attribute: int(time.time()) + int(ttl)
+        }
+        return {name: self.serializer.serialize(attribute) for name, attribute in item.items()}
+
+    def from_item(self, item: dict):
+        """Gets the value from a serialized DynamoDB item.
+        Args:
+            item: serialized item
+        Returns:
+            The value stored against the key, None if the item has no value.
+        """
+        if config.dynamo_value_attribute not in item:
+            return None
+        value = self.deserializer.deserialize(item[config.dynamo_value_attribute])
+        return DynamoTableClient.from_decimal(value)
+
+    @staticmethod
+    def from_decimal(value):
+        """Converts the Decimal numbers given back by boto3 to int or float.
+        Args:
+            value: deserialized value
+        Returns:
+            value without Decimal numbers
+        """
+        if isinstance(value, dict):
+            return {name: DynamoTableClient.from_decimal(attribute) for name, attribute in value.items()}
+        if isinstance(value, list):
+            return [DynamoTableClient.from_decimal(attribute) for attribute in value]
+        if isinstance(value, Decimal):
+            return int(value) if value == value.to_integral_value() else float(value)
+        return value
+
+    def put_lease(self, key: str, value: dict, now: int, ttl: int) -> bool:
+        """Writes the lease only if the key is absent, or the lease on it expired before now.
+        A completed job is never leased again.
+        Args:
+            key: key of the table.
+            value: lease value, it must have the owner and the expiry of the lease
+            now: current time in epoch seconds
+            ttl: time to live in seconds
+        Returns:
+            True if the lease is written, False if the lease is held by another owner.
+        Raises:
+            ClientError: If DynamoDB fails for any other reason.
+        """
+        try:
+            self.client.put_item(
+                TableName=self.table,
+                Item=self.to_item(key=key, value=value, ttl=ttl),
+                ConditionExpression=(
+                    'attribute_not_exists(#key) OR '
+                    '(attribute_not_exists(#value.#completion_time) AND '
+                    '(attribute_not_exists(#value.#lease_expiry) OR #value.#lease_expiry < :now))'),
+                ExpressionAttributeNames={
+                    '#key': config.dynamo_key_attribute,
+                    '#value': config.dynamo_value_attribute,
+                    '#completion_time': self.COMPLETION_TIME_FIELD,
+                    '#lease_expiry': self.LEASE_EXPIRY_FIELD
+                },
+                ExpressionAttributeValues={':now': self.serializer.serialize(now)}
+            )
+        except ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def renew_lease(self, key: str, owner: str, lease_expiry: int) -> bool:
+        """Moves the expiry of the lease, only if the owner still holds it and the job is not completed.
+        Args:
+            key: key of the table.
+            owner: owner of the lease
+            lease_expiry: new expiry of the lease in epoch seconds
+        Returns:
+            True if the lease is renewed, False if the lease is not held by the owner any more.
+        Raises:
+            ClientError: If DynamoDB fails for any other reason.
+        """
+        try:
+            self.client.update_item(
+                TableName=self.table,
+                Key={config.dynamo_key_attribute: self.serializer.serialize(key)},
+                UpdateExpression='SET #value.#lease_expiry = :lease_expiry',
+                ConditionExpression=(
+                    '#value.#owner = :owner AND attribute_not_exists(#value.#completion_time)'),
+                ExpressionAttributeNames={
+                    '#value': config.dynamo_value_attribute,
+                    '#owner': self.LEASE_OWNER_FIELD,
+                    '#completion_time': self.COMPLETION_TIME_FIELD,
+                    '#lease_expiry': self.LEASE_EXPIRY_FIELD
+                },
+                ExpressionAttributeValues={
+                    ':owner': self.serializer.serialize(owner),
+                    ':lease_expiry': self.serializer.serialize(lease_expiry)
+                }
+            )
+        except ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def complete_lease(self, key: str, owner: str, value: dict, ttl: int) -> bool:
+        """Writes the value of the completed job, only if the owner still holds the lease and the job is not
+        completed yet.
+        Args:
+            key: key of the table.
+            owner: owner of the lease
+            value: value of the completed job
+            ttl: time to live in seconds
+        Returns:
+            True if the value is written, False if the lease is not held by the owner any more.
+        Raises:
+            ClientError: If DynamoDB fails for any other reason.
+        """
+        try:
+            self.client.put_item(
+                TableName=self.table,
+                Item=self.to_item(key=key, value=value, ttl=ttl),
+                ConditionExpression=(
+                    '#value.#owner = :owner AND attribute_not_exists(#value.#completion_time)'),
+                ExpressionAttributeNames={
+                    '#value': config.dynamo_value_attribute,
+                    '#owner': self.LEASE_OWNER_FIELD,
+                    '#completion_time': self.COMPLETION_TIME_FIELD
+                },
+                ExpressionAttributeValues={':owner': self.serializer.serialize(owner)}
+            )
+        except ClientError as exc:
+            if exc.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+                return False
+            raise
+        return True
+
+    def put_member(self, key: str, member: str, heartbeat: int, ttl: int) -> dict:
+        """Writes the heartbeat of a member into the map of members of the key, the other members are kept.
+        The item is created if the key is absent.
+        Args:
+            key: key of the table.
+            member: name of the member, i.e. the pod name
+            heartbeat: time of the heartbeat in epoch seconds
+            ttl: time to live in seconds, the item expires when no member writes a heartbeat
+        Returns:
+            dict: {member: last heartbeat} of every member of the key
+        Raises:
+            ClientError: If DynamoDB fails.
+        """
+        try:
+            response: dict = self.client.update_item(
+                TableName=self.table,
+                Key={config.dynamo_key_attribute: self.serializer.serialize(key)},
+                UpdateExpression='SET #value.#member = :heartbeat, #ttl = :ttl',
+                ExpressionAttributeNames={
+                    '#value': config.dynamo_value_attribute,
+                    '#member': member,
+                    '#ttl': config.dynamo_ttl_attribute
+                },
+                ExpressionAttributeValues={
+                    ':heartbeat': self.serializer.serialize(heartbeat),
+                    ':ttl': self.serializer.serialize(int(time.time()) + int(ttl))
+                },
+                ReturnValues='ALL_NEW'
+            )
+        except ClientError as exc:
+            # the map of members does not exist yet, it is created with the first member.
+            if exc.response.get('Error', {}).get('Code') != 'ValidationException':
+                raise
+            try:
+                self.client.put_item(
+                    TableName=self.table,
+                    Item=self.to_item(key=key, value={member: heartbeat}, ttl=ttl),
+                    ConditionExpression='attribute_not_exists(#key)',
+                    ExpressionAttributeNames={'#key': config.dynamo_key_attribute}
+                )
+                return {member: heartbeat}
+            except ClientError as put_exc:
+                # another member created the map at the same time.
+                if put_exc.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+            return self.put_member(key=key, member=member, heartbeat=heartbeat, ttl=ttl)
+        return self.from_item(response.get('Attributes', {})) or {}
+
+    def remove_members(self, key: str, members: list):
+        """Removes members from the map of members of the key.
+        Args:
+            key: key of the table.
+            members: names of the members
+        Raises:
+            ClientError: If DynamoDB fails.
+        """
+        if not members:
+            return
+        names: dict = {f'#member{index}': member for index, member in enumerate(members)}
+        self.client.update_item(
+            TableName=self.table,
+            Key={config.dynamo_key_attribute: self.serializer.serialize(key)},
+            UpdateExpression='REMOVE ' + ', '.join(f'#value.{name}' for name in names),
+            ExpressionAttributeNames=dict(names, **{'#value': config.dynamo_value_attribute})
+        )
+
+    def batch_get(self, keys: list) -> dict:
+        """Reads the values of the keys, in chunks of the DynamoDB BatchGetItem limit.
+        The keys which DynamoDB gives back as unprocessed are retried with a backoff.
+        Args:
+            keys: keys of the table.
+        Returns:
+            dict: {key: value}, the keys which do not exist in the table are left out.
+        Raises:
+            RuntimeError: If some keys are still unprocessed after the retries.
+        """
+        values: dict = {}
+        unique_keys: list = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), self.BATCH_GET_LIMIT):
+            request_items: dict = {
+                self.table: {
+                    'Keys': [{config.dynamo_key_attribute: self.serializer.serialize(key)}
+                             for key in unique_keys[start:start + self.BATCH_GET_LIMIT]],
+                    'ConsistentRead': True
+                }
+            }
+            for attempt in range(config.dynamo_batch_max_retries + 1):
+                if attempt > 0:
+                    self.backoff(attempt)
+                result: dict = self.client.batch_get_item(RequestItems=request_items)
+                for item in result.get('Responses', {}).get(self.table, []):
+                    key: str = self.deserializer.deserialize(item[config.dynamo_key_attribute])
+                    values[key] = self.from_item(item)
+                request_items = result.get('UnprocessedKeys') or {}
+                if not request_items:
+                    break
+            if request_items:
+                raise RuntimeError(f'keys are unprocessed after {config.dynamo_batch_max_retries} retries '
+                                   f'{request_items[self.table]["Keys"]}')
+        return values
+
+    def batch_put(self, items: list) -> bool:
+        """Writes the items, in chunks of the DynamoDB BatchWriteItem limit.
+        The items which DynamoDB gives back as unprocessed are retried with a backoff.
+        Args:
+            items: list of {'key': key, 'value': value, 'ttl': ttl}
+        Returns:
+            True if every item is written.
+        Raises:
+            RuntimeError: If some items are still unprocessed after the retries.
+        """
+        # BatchWriteItem rejects duplicated keys, the last value of a key wins.
+        unique_items: list = list({item['key']: item for item in items}.values())
+        for start in range(0, len(unique_items), self.BATCH_WRITE_LIMIT):
+            request_items: dict = {
+                self.table: [
+                    {'PutRequest': {'Item': self.to_item(key=item['key'], value=item['value'], ttl=item['ttl'])}}
+                    for item in unique_items[start:start + self.BATCH_WRITE_LIMIT]
+                ]
+            }
+            for attempt in range(config.dynamo_batch_max_retries + 1):
+                if attempt > 0:
+                    self.backoff(attempt)
+                result: dict = self.client.batch_write_item(RequestItems=request_items)
+                request_items = result.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+            if request_items:
+                raise RuntimeError(f'{len(request_items[self.table])} items are unprocessed after '
+                                   f'{config.dynamo_batch_max_retries} retries')
+        return True
+
+    @staticmethod
+    def backoff(attempt: int):
+        """Sleeps before retrying the unprocessed items, the sleep grows exponentially.
+        Args:
+            attempt: number of the retry, starting from 1
+        """
+        time.sleep(min(config.dynamo_batch_backoff_ms * (2 ** (attempt - 1)), 5000) / 1000)
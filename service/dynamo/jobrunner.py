@@ -3,31 +3,62 @@ This class triggers the kpi report generation based on job key exists or not.
 If job key[job-dd-mm-yyyy] is already exists, and if job is completed, then
 it will not trigger the job.
 """
-import json
+import functools
 import os
 import time
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from service.common.dateutils import DateUtils
+from service.common.hashring import HashRing
 from service.common.modelutils import ModelUtils
 from service.endpoints import get_pfc_kpi_report
 from datetime import datetime, timedelta
 from service.configs import config
+from service.dynamo.dynamotableclient import DynamoTableClient
+from service.dynamo.leaseheartbeat import LeaseHeartbeat
 from service.dynamo.persistencymanager import PersistencyManager
 from service.enums.timetoliveenum import TimeToLive
 from service.enums.icbcstatus import IcbcStatus
 from service.reports.icbcmanager import ICBCManager
+from service.reports.kpisreport import KPIReport
 from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+from service.scheduling.jobregistry import ICBC_EVALUATION, JobRegistry
+from service.scheduling.jobspec import JobSpec
+from service.scheduling.podmembership import PodMembership
 
 
 class JobRunner:
     """Triggers the job."""
 
-    def __init__(self):
-        """Creates the instance of JobRunner."""
+    # a job without a lease is aborted if it is not completed within this time span.
+    JOB_TIMEOUT: timedelta = timedelta(minutes=10)
+
+    def __init__(self, concurrent: bool = None, kpi_report: KPIReport = None, sharding: bool = None):
+        """Creates the instance of JobRunner.
+        Args:
+            concurrent: run the 24 hours and the 7 days jobs at the same time,
+                config.concurrent_jobs if not given.
+            kpi_report: KPIReport which queries the reports of many model versions with one
+                elastic search query, the get_pfc_kpi_report endpoint is called per model version if not given.
+            sharding: attempt only the jobs owned by this pod on the hash ring of the alive pods,
+                config.job_sharding_enabled if not given.
+        """
         self.t_24_hours_job_status = None
         self.t_7_days_job_status = None
         self.icbc_service_status = None
+        # status of the jobs of every model version, {model_version: {'24-hours': status, '7-days': status}}
+        self.job_statuses: dict = {}
+        self.concurrent: bool = config.concurrent_jobs if concurrent is None else concurrent
+        self.kpi_report: KPIReport = kpi_report
+        self.sharding: bool = config.job_sharding_enabled if sharding is None else sharding
+        # ring of the alive pods of the current tick, every job is attempted if None.
+        self.hash_ring: HashRing = None
+
+    def close(self):
+        """Releases what is kept from one tick to the next, the JobRunner keeps nothing."""
 
     @staticmethod
     def get_pod_name() -> str:
@@ -38,15 +69,17 @@ class JobRunner:
         """
         return os.environ.get('POD_NAME')
 
-    def trigger_the_job(self, key: str, deployment_detail: dict, correlation_id: str = None):
+    def trigger_the_job(self, key: str, deployment_detail: dict, correlation_id: str = None,
+                        model_version: str = None):
         """It triggers the job to get the report.
            It will insert with job_dictionary with key as 24-hours-<date> or 7-days-<date>
            {
            job_runner_name: pod1,
            initiated_time: time in datetime object
            }
-           It reads the table with same key. Checks the job_runner_name and pod name from
-           the environment. If both are same it calls the elastic search query 2 times.
+           The job dictionary is written as a lease with a single conditional write, it succeeds
+           only if the key is absent or the lease of the previous runner expired. Only the pod
+           which gets the lease calls the elastic search query 2 times.
            On first call, it will request for last 24 hours.
            On 2nd call, it will request for last 7 days.
            if any of the call fails, it treats as a fail, and will be re-executed on consequent call of
@@ -55,167 +88,371 @@ class JobRunner:
              key: key to be inserted. It is in the format of 24-hours-<date> or 7-days-<date>
              correlation_id: Correlation id
              deployment_detail: dict
+             model_version: model version of the job, the stable model version if not given
         Returns:
                    dict:
         """
-        report_type = ""
-        time_unit = ""
-        message_detail = ""
-        if "24-hours" in key:
-            self.t_24_hours_job_status = JobStatus.JOB_IN_PROGRESS.name
-            report_type = "24"
-            message_detail = "24 hours"
-            time_unit = "h"
-        if "7-days" in key:
-            self.t_7_days_job_status = JobStatus.JOB_IN_PROGRESS.name
-            report_type = "7"
-            message_detail = "7 days"
-            time_unit = "d"
+        job_detail: dict = self.start_job(key=key, model_version=model_version)
         persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
             config.icbc_params_table_name)
-        pod_name: str = JobRunner.get_pod_name()
-        initiated_time: str = DateUtils.get_datetime_in_iso_format()
-
-        job_dict: dict = {
-            'job_runner_name': pod_name,
-            'initiated_time': initiated_time
-        }
-
         if correlation_id is None:
             correlation_id: str = str(uuid.uuid4())
-        logging_msg: dict = {
-            'success_message': f'job detail for {message_detail} entered successfully',
-            'error_message': f'job detail for {message_detail} is not entered successfully',
-            'param1': 'scheduler'
-        }
 
-        is_value_inserted: bool = persistency_manager.upsert_value(
-            key=key, value=job_dict,
+        lease_status: LeaseStatus = persistency_manager.acquire_lease(
+            **self.get_lease_request(job_detail=job_detail, correlation_id=correlation_id))
+        # another pod won the lease, it runs the job, or there is some issue to write the lease.
+        if lease_status != LeaseStatus.ACQUIRED:
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=lease_status)
+
+        # the lease is renewed while the job runs, so a slow report is not run again by another pod.
+        with self.get_lease_heartbeat(job_detail=job_detail, correlation_id=correlation_id) as heartbeat:
+            # get the total recall for a time period ,i,e now - 24h or now - 7d
+            response: dict = self.get_kpi_report(self.get_report_request(job_detail=job_detail),
+                                                 correlation_id=correlation_id)
+            return self.finish_job(job_detail=job_detail, response=response, deployment_detail=deployment_detail,
+                                   correlation_id=correlation_id, heartbeat=heartbeat)
+
+    @staticmethod
+    def get_lease_heartbeat(job_detail: dict, correlation_id: str) -> LeaseHeartbeat:
+        """Gets the heartbeat which renews the lease of the job.
+        Args:
+            job_detail: detail of the job given by start_job
+            correlation_id: correlation_id
+        Returns:
+            LeaseHeartbeat, it renews the lease between its start and its stop
+        """
+        return LeaseHeartbeat(table_name=config.icbc_params_table_name, key=job_detail['key'],
+                              owner=job_detail['pod_name'], correlation_id=correlation_id)
+
+    @staticmethod
+    def is_lease_lost(heartbeat: LeaseHeartbeat) -> bool:
+        """Checks the pod lost the lease of the job while the job ran.
+        Args:
+            heartbeat: heartbeat of the lease of the job, None if the lease is not renewed
+        Returns:
+            True if another pod took the lease over or the lease expired
+        """
+        return heartbeat is not None and heartbeat.lease_lost.is_set()
+
+    def finish_job(self, job_detail: dict, response: dict, deployment_detail: dict, correlation_id: str,
+                   heartbeat: LeaseHeartbeat = None) -> dict:
+        """Logs the report of a leased job, checks the model performance and marks the job completed.
+        Nothing is logged or written once the lease is lost, the job belongs to the pod which took it over.
+        Args:
+            job_detail: detail of the job given by start_job
+            response: kpi report of the job
+            deployment_detail: deployment detail of the model version of the job
+            correlation_id: correlation_id
+            heartbeat: heartbeat of the lease of the job, the lease is not checked if not given
+        Returns:
+            dict: response with the job status, empty if the lease is lost
+        """
+        key: str = job_detail['key']
+        model_version: str = job_detail['model_version']
+        if 'error' in response:
+            self.set_job_status(key=key, status=JobStatus.JOB_ABORTED.name, model_version=model_version)
+            return response
+
+        if self.is_lease_lost(heartbeat):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.HELD_BY_OTHER)
+
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        deployment_key: str = f'deployment_date_{model_version}'
+        model_deployment_detail: dict = ModelUtils.get_kpi_report_header_based_on_deployment_date(
+            deployment_key=deployment_key,
             correlation_id=correlation_id,
-            ttl=TimeToLive.ONE_DAY_TTL.value,
-            logging_msg=logging_msg
+            deployment_detail=deployment_detail
         )
-        response = {}
-        # is_value_inserted == False--> there is some issue to upsert it.
-        if is_value_inserted is False:
-            error = {
+        self.log_report(job_detail=job_detail, response=response,
+                        model_deployment_detail=model_deployment_detail, correlation_id=correlation_id)
+
+        for post_action in self.get_post_actions(key=key, model_deployment_detail=model_deployment_detail):
+            [response, completed] = post_action(self, job_detail=job_detail, response=response,
+                                                correlation_id=correlation_id)
+            if not completed:
+                return response
+
+        if self.is_lease_lost(heartbeat):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.HELD_BY_OTHER)
+        completion_request: dict = self.get_completion_request(job_detail=job_detail, correlation_id=correlation_id)
+        # the completion is written only while the pod holds the lease, the job runs again once its lease expires.
+        if not persistency_manager.complete_lease(**completion_request):
+            return self.lease_not_acquired(key=key, job_detail=job_detail, lease_status=LeaseStatus.FAILED)
+        # a completed job does not change any more, it is not read again on the next ticks of its period.
+        persistency_manager.remember_value(key=key, value=completion_request['value'],
+                                           cache_ttl=completion_request['ttl'])
+        return self.complete_job(key=key, response=response, model_version=model_version)
+
+    def update_hash_ring(self, correlation_id: str):
+        """Writes the heartbeat of the pod and gets the ring of the alive pods for the tick, when the
+        jobs are sharded.
+        Args:
+            correlation_id: correlation_id
+        """
+        pod_name: str = self.get_pod_name()
+        self.hash_ring = None
+        if self.sharding and pod_name:
+            self.hash_ring = PodMembership(pod_name=pod_name).get_hash_ring(correlation_id=correlation_id)
+
+    def is_job_owner(self, key: str) -> bool:
+        """Checks this pod attempts the job. A job is owned by one alive pod on the hash ring, and its
+        jobs move to the other pods once its heartbeat expires.
+        Args:
+            key: key of the job
+        Returns:
+            True if the job is owned by this pod, or the jobs are not sharded
+        """
+        return self.hash_ring is None or self.hash_ring.get_owner(key) == self.get_pod_name()
+
+    @staticmethod
+    def get_job_ttl(key: str) -> int:
+        """Gets the time to live of a job key.
+        Args:
+            key: key of the job
+        Returns:
+            int: time to live of the registered job in seconds, one day if no registered job matches the key
+        """
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        return TimeToLive.ONE_DAY_TTL.value if job_spec is None else job_spec.ttl
+
+    @staticmethod
+    def get_post_actions(key: str, model_deployment_detail: dict) -> list:
+        """Gets the post actions of the job which are due for the deployment date of the model version.
+        Args:
+            key: key of the job
+            model_deployment_detail: report header based on the deployment date
+        Returns:
+            list: functions, see JobRegistry.register_post_action
+        """
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        if job_spec is None or model_deployment_detail['day'] < job_spec.post_actions_min_days:
+            return []
+        return [JobRegistry.get_post_action(name) for name in job_spec.post_actions]
+
+    def evaluate_icbc(self, job_detail: dict, response: dict, correlation_id: str) -> [dict, bool]:
+        """Checks the model performance of the report and actions the icbc service.
+        Args:
+            job_detail: detail of the job given by start_job
+            response: kpi report of the job
+            correlation_id: correlation_id
+        Returns:
+            [response of ICBCManager, False if the job is aborted]
+        """
+        company_counts = self.get_company_counts(job_detail=job_detail, correlation_id=correlation_id)
+        response: dict = (ICBCManager(response, company_counts=company_counts)
+                          .check_the_model_performance_and_actioned_icbc_service(
+                              correlation_id=correlation_id, model_version=job_detail['model_version']))
+        return [response, self.check_icbc_response(response=response, model_version=job_detail['model_version'],
+                                                   key=job_detail['key'])]
+
+    def start_job(self, key: str, model_version: str = None) -> dict:
+        """Marks the job in progress and gets the detail of its report.
+        Args:
+            key: key of the job. It is in the format of 24-hours-<date> or 7-days-<date>
+            model_version: model version of the job, the stable model version if not given
+        Returns:
+            dict: key, model_version, report_type, time_unit, message_detail, ttl, pod_name and initiated_time
+        """
+        if model_version is None:
+            model_version = ModelUtils.get_model_version_with_environment_suffix()
+        job_detail: dict = {
+            'key': key,
+            'model_version': model_version,
+            'report_type': "",
+            'time_unit': "",
+            'message_detail': "",
+            'ttl': TimeToLive.ONE_DAY_TTL.value,
+            'pod_name': self.get_pod_name(),
+            'initiated_time': DateUtils.get_datetime_in_iso_format()
+        }
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        if job_spec is not None:
+            job_detail.update(report_type=str(job_spec.window), time_unit=job_spec.time_unit,
+                              message_detail=job_spec.message_detail, ttl=job_spec.ttl)
+        self.set_job_status(key=key, status=JobStatus.JOB_IN_PROGRESS.name, model_version=model_version)
+        return job_detail
+
+    def set_job_status(self, key: str, status: str, model_version: str = None):
+        """Sets the status of the job.
+        Args:
+            key: key of the job
+            status: JobStatus name
+            model_version: model version of the job, the stable model version if not given
+        """
+        stable_model_version: str = ModelUtils.get_model_version_with_environment_suffix()
+        if model_version is None:
+            model_version = stable_model_version
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        # the status of a key of no registered job is not kept.
+        if job_spec is None:
+            return
+        self.job_statuses.setdefault(model_version, {})[job_spec.name] = status
+        # the statuses of the stable model version are kept in the attributes of the jobs which have one.
+        if model_version == stable_model_version and hasattr(self, job_spec.status_attribute):
+            setattr(self, job_spec.status_attribute, status)
+
+    @staticmethod
+    def get_lease_request(job_detail: dict, correlation_id: str) -> dict:
+        """Gets the arguments of the lease of the job.
+        Args:
+            job_detail: detail of the job given by start_job
+            correlation_id: correlation_id
+        Returns:
+            dict: arguments of PersistencyManager.acquire_lease
+        """
+        return {
+            'key': job_detail['key'],
+            'owner': job_detail['pod_name'],
+            'value': {
+                'job_runner_name': job_detail['pod_name'],
+                'initiated_time': job_detail['initiated_time']
+            },
+            'lease_seconds': config.job_lease_seconds,
+            'correlation_id': correlation_id,
+            'ttl': job_detail.get('ttl', TimeToLive.ONE_DAY_TTL.value),
+            'logging_msg': {
+                'success_message': f"job detail for {job_detail['message_detail']} entered successfully",
+                'error_message': f"job detail for {job_detail['message_detail']} is not entered successfully",
+                'param1': 'scheduler'
+            }
+        }
+
+    def lease_not_acquired(self, key: str, job_detail: dict, lease_status: LeaseStatus) -> dict:
+        """Gets the response of a job whose lease is not acquired.
+        Args:
+            key: key of the job
+            job_detail: detail of the job given by start_job
+            lease_status: status of the lease
+        Returns:
+            dict: error if the lease is not written, empty if another pod runs the job
+        """
+        response: dict = {}
+        # LeaseStatus.FAILED --> there is some issue to write the lease.
+        if lease_status == LeaseStatus.FAILED:
+            job_dict: dict = {
+                'job_runner_name': job_detail['pod_name'],
+                'initiated_time': job_detail['initiated_time']
+            }
+            response['error'] = {
                 'message': f'failed to insert for {key} task {job_dict}'
             }
-            response['error'] = error
-            if "24-hours" in key:
-                self.t_24_hours_job_status = JobStatus.JOB_ABORTED.name
-            if "7-days" in key:
-                self.t_7_days_job_status = JobStatus.JOB_ABORTED.name
-            return response
+            self.set_job_status(key=key, status=JobStatus.JOB_ABORTED.name, model_version=job_detail['model_version'])
+        return response
 
-        # query the table for checking the pod name in table
-        job_result: dict = persistency_manager.get_the_value(key=key, correlation_id=correlation_id)
-        if job_result:
-            stored_pod_name: str = job_result['job_runner_name']
-            logging.info(
-                json.dumps(job_result, default=str), extra={
-                    'correlation_id': correlation_id,
-                    'ds_object': {
-                        'message': 'job_result',
-                        'param1': 'scheduler'
-                    }})
-            if stored_pod_name == pod_name:
-                # get the total recall for a time period ,i,e now - 24h
-                request_object_dict: dict = {
-                    'absolute_time_from_': report_type,
-                    'time_unit_': time_unit,
-                    'relative_time_from_': None,
-                    'relative_time_to_': None,
-                    'model_version': ModelUtils.get_model_version_with_environment_suffix()
-                }
-                response: dict = get_pfc_kpi_report(request_object_dict)
-                if 'error' in response:
-                    if "24-hours" in key:
-                        self.t_24_hours_job_status = JobStatus.JOB_ABORTED.name
-                    if "7-days" in key:
-                        self.t_7_days_job_status = JobStatus.JOB_ABORTED.name
-                    return response
-
-                # get the total recall for a time period ,i,e now - 7d
-                deployment_key: str = f'deployment_date_{ModelUtils.get_model_version_with_environment_suffix()}'
-
-                model_deployment_detail: dict = ModelUtils.get_kpi_report_header_based_on_deployment_date(
-                    deployment_key=deployment_key,
-                    correlation_id=correlation_id,
-                    deployment_detail=deployment_detail
-                )
-
-                #  log to kibana
-                if "24-hours" in key:
-                    logging.info(response.get("kibana_kpis"),
-                                 extra={
-                                     'correlation_id': correlation_id,
-                                     'ds_object': {
-                                         'message': f'Report of last {message_detail}',
-                                         'param1': 'scheduler',
-                                         'param2': response.get("status"),
-                                         'number1': report_type
-                                     }})
-                if "7-days" in key:
-                    logging.info(response.get("kibana_kpis"),
-                                 extra={
-                                     'correlation_id': correlation_id,
-                                     'ds_object': {
-                                         'message': f"Report of last {model_deployment_detail['report_header_msg']}",
-                                         'param1': 'scheduler',
-                                         'param2': response.get("status"),
-                                         'number1': 168
-                                     }})
-                    # model should be checked for the performance only after 7 days of deployment of the model.#
-                    if model_deployment_detail['day'] >= 7:
-                        response: dict = (ICBCManager(response).check_the_model_performance_and_actioned_icbc_service(
-                            correlation_id=correlation_id))
-
-                        if 'error' not in response:
-                            if response['message'] == 'pfc is in silent mode':
-                                self.icbc_service_status = IcbcStatus.SILENT.name
-                            if response['message'] == 'company recall':
-                                self.icbc_service_status = IcbcStatus.ACTIVE.name
-                        else:
-                            response['t_7_days_job_status'] = JobStatus.JOB_ABORTED
-                            self.t_7_days_job_status = JobStatus.JOB_ABORTED.name
-                            return response
-
-                completion_time: str = DateUtils.get_datetime_in_iso_format()
-                job_dict: dict = {
-                    'job_runner_name': pod_name,
-                    'initiated_time': initiated_time,
-                    'completion_time': completion_time
-                }
-                logging_msg: dict = {
-                    'success_message': f'job detail for {message_detail} is updated successfully',
-                    'error_message': f'job detail for {message_detail} is not entered successfully',
-                    'param1': 'scheduler'
-                }
-                persistency_manager.upsert_value(
-                    key=key, value=job_dict,
-                    correlation_id=correlation_id,
-                    ttl=TimeToLive.ONE_DAY_TTL.value,
-                    logging_msg=logging_msg
-                )
-                if "24-hours" in key:
-                    response['t_24_hours_job_status'] = JobStatus.JOB_COMPLETED
-                    self.t_24_hours_job_status: str = JobStatus.JOB_COMPLETED.name
-                if "7-days" in key:
-                    response['t_7_days_job_status'] = JobStatus.JOB_COMPLETED
-                    self.t_7_days_job_status: str = JobStatus.JOB_COMPLETED.name
+    @staticmethod
+    def get_report_request(job_detail: dict) -> dict:
+        """Gets the request of the kpi report of the job.
+        Args:
+            job_detail: detail of the job given by start_job
+        Returns:
+            dict: kpi report request
+        """
+        return {
+            'absolute_time_from_': job_detail['report_type'],
+            'time_unit_': job_detail['time_unit'],
+            'relative_time_from_': None,
+            'relative_time_to_': None,
+            'model_version': job_detail['model_version']
+        }
 
-                return response
+    @staticmethod
+    def log_report(job_detail: dict, response: dict, model_deployment_detail: dict, correlation_id: str):
+        """Logs the report of the job to kibana.
+        Args:
+            job_detail: detail of the job given by start_job
+            response: kpi report
+            model_deployment_detail: report header based on the deployment date
+            correlation_id: correlation_id
+        """
+        job_spec: JobSpec = JobRegistry.get_job_spec(job_detail['key'])
+        if job_spec is None:
+            return
+        header: str = model_deployment_detail['report_header_msg'] if job_spec.deployment_header \
+            else job_detail['message_detail']
+        logging.info(response.get("kibana_kpis"),
+                     extra={
+                         'correlation_id': correlation_id,
+                         'ds_object': {
+                             'message': f"Report of last {header}",
+                             'param1': 'scheduler',
+                             'param2': response.get("status"),
+                             'number1': job_spec.hours
+                         }})
 
-    def check_job_executed_successfully(self, key: str, job_result: dict) -> str:
+    def check_icbc_response(self, response: dict, model_version: str = None, key: str = "7-days") -> bool:
+        """Sets the icbc service status from the response of the model performance check.
+        Args:
+            response: response of ICBCManager
+            model_version: model version of the job, the stable model version if not given
+            key: key of the job which checked the model performance, the 7 days job if not given
+        Returns:
+            True if the check succeeded, False if the job is aborted.
+        """
+        if 'error' not in response:
+            if response['message'] == 'pfc is in silent mode':
+                self.icbc_service_status = IcbcStatus.SILENT.name
+            if response['message'] == 'company recall':
+                self.icbc_service_status = IcbcStatus.ACTIVE.name
+            return True
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        if job_spec is not None:
+            response[job_spec.status_attribute] = JobStatus.JOB_ABORTED
+        self.set_job_status(key=key, status=JobStatus.JOB_ABORTED.name, model_version=model_version)
+        return False
+
+    @staticmethod
+    def get_completion_request(job_detail: dict, correlation_id: str) -> dict:
+        """Gets the arguments of the write of the completed job.
+        Args:
+            job_detail: detail of the job given by start_job
+            correlation_id: correlation_id
+        Returns:
+            dict: arguments of PersistencyManager.complete_lease
+        """
+        return {
+            'key': job_detail['key'],
+            'owner': job_detail['pod_name'],
+            'value': {
+                'job_runner_name': job_detail['pod_name'],
+                'initiated_time': job_detail['initiated_time'],
+                'completion_time': DateUtils.get_datetime_in_iso_format()
+            },
+            'correlation_id': correlation_id,
+            'ttl': job_detail.get('ttl', TimeToLive.ONE_DAY_TTL.value),
+            'logging_msg': {
+                'success_message': f"job detail for {job_detail['message_detail']} is updated successfully",
+                'error_message': f"job detail for {job_detail['message_detail']} is not entered successfully",
+                'param1': 'scheduler'
+            }
+        }
+
+    def complete_job(self, key: str, response: dict, model_version: str = None) -> dict:
+        """Marks the job completed.
+        Args:
+            key: key of the job
+            response: kpi report
+            model_version: model version of the job, the stable model version if not given
+        Returns:
+            dict: response with the job status
+        """
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        if job_spec is not None:
+            response[job_spec.status_attribute] = JobStatus.JOB_COMPLETED
+        self.set_job_status(key=key, status=JobStatus.JOB_COMPLETED.name, model_version=model_version)
+        return response
+
+    def check_job_executed_successfully(self, key: str, job_result: dict, model_version: str = None) -> str:
         """It checks the job executed successfully or not.
         Args:
             key: Unique key which checks the job status.
             job_result: job_result
+            model_version: model version of the job, the stable model version if not given
         Returns:
             'COMPLETED' if job completed successfully.
             'JOB_IN_PROGRESS' if job is in progress.
-            'JOB_ABORTED' if job is not completed within a time span of 10 minutes.
+            'JOB_ABORTED' if the lease of the job expired, or if a job without a lease is not completed
+            within a time span of 10 minutes.
         """
         if 'initiated_time' not in job_result:
             raise ValueError(f'initiated time key not exists for the {key}')
@@ -233,62 +470,344 @@ class JobRunner:
 
         if 'completion_time' not in job_result:
 
-            if now - datetime.fromisoformat(initiated_time) < timedelta(minutes=10):
+            if DynamoTableClient.LEASE_EXPIRY_FIELD in job_result:
+                # the running pod renews the lease, the job is aborted once the renewals stop.
+                if job_result[DynamoTableClient.LEASE_EXPIRY_FIELD] >= int(time.time()):
+                    status = JobStatus.JOB_IN_PROGRESS.name
+                else:
+                    status = JobStatus.JOB_ABORTED.name
+            elif now - datetime.fromisoformat(initiated_time) < JobRunner.JOB_TIMEOUT:
                 status = JobStatus.JOB_IN_PROGRESS.name
             else:
                 status = JobStatus.JOB_ABORTED.name
         else:
             status = JobStatus.JOB_COMPLETED.name
-        if '24-hours' in key:
-            self.t_24_hours_job_status = status
-        else:
-            self.t_7_days_job_status = status
+        self.set_job_status(key=key, status=status, model_version=model_version)
         return status
 
-    def check_job_to_schedule(self):
+    @staticmethod
+    def get_job_keys(model_version: str = None) -> list:
+        """Gets the keys of a scheduler tick, the key of every registered job is the key of its current period.
+        The job keys of the stable model version keep their format, the job keys of the other
+        model versions end with the model version.
+        Args:
+            model_version: model version of the jobs, the stable model version if not given
+        Returns:
+            [deployment key, job keys in the order of JobRegistry.get_job_specs]
+        """
+        stable_model_version: str = ModelUtils.get_model_version_with_environment_suffix()
+        if model_version is None:
+            model_version = stable_model_version
+        deployment_key: str = f'deployment_date_{model_version}'
+        key_model_version: str = None if model_version == stable_model_version else model_version
+        return [deployment_key] + [job_spec.get_key(model_version=key_model_version)
+                                   for job_spec in JobRegistry.get_job_specs()]
+
+    def read_tick_jobs(self, correlation_id: str, model_versions: list = None):
+        """Reads the job keys of every model version of a scheduler tick, it is shared by the JobRunner
+        and the AsyncJobRunner. The hash ring is updated, the deployment dates and the job keys are read
+        with batched calls, and a missing deployment date is reinserted.
+        Args:
+            correlation_id: correlation_id
+            model_versions: model versions with the environment suffix, the stable model version,
+                config.model_versions and the model versions of the params table if not given.
+        Returns:
+            [job_keys, values, deployment_details]: {model_version: keys given by get_job_keys}, values of
+                the keys, {model_version: deployment detail}, None if the keys are not read
+        """
+        self.update_hash_ring(correlation_id=correlation_id)
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        # the deployment date and the job keys are read with one batched call.
+        stable_keys: list = JobRunner.get_job_keys()
+        keys: list = stable_keys if model_versions is not None else stable_keys + [ModelUtils.MODEL_VERSIONS_KEY]
+        values: dict = persistency_manager.batch_get(
+            keys=keys,
+            correlation_id=correlation_id,
+            cache_ttls={stable_keys[0]: TimeToLive.ONE_YEAR_TTL.value,
+                        ModelUtils.MODEL_VERSIONS_KEY: TimeToLive.ONE_HOUR_TTL.value})
+        job_keys: dict = {}
+        if values is not None:
+            if model_versions is None:
+                model_versions = ModelUtils.get_model_versions_with_environment_suffix(
+                    values.get(ModelUtils.MODEL_VERSIONS_KEY))
+            job_keys = {model_version: JobRunner.get_job_keys(model_version=model_version)
+                        for model_version in model_versions}
+            # the keys of the other model versions are read with one more batched call.
+            other_keys: list = [key for model_version_keys in job_keys.values() for key in model_version_keys
+                                if key not in values]
+            if other_keys:
+                other_values: dict = persistency_manager.batch_get(
+                    keys=other_keys,
+                    correlation_id=correlation_id,
+                    cache_ttls={model_version_keys[0]: TimeToLive.ONE_YEAR_TTL.value
+                                for model_version_keys in job_keys.values()})
+                values = None if other_values is None else dict(values, **other_values)
+        if values is None:
+            # the jobs will be checked on consequent call of scheduling.
+            logging.error(
+                'job keys are not read', extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'job keys are not read',
+                        'param1': 'scheduler'
+                    }})
+            return None
+
+        # check the deployment date exists or not. if not reinsert it.
+        deployment_details: dict = {}
+        for model_version, [deployment_key, *_] in job_keys.items():
+            deployment_details[model_version] = values.get(deployment_key)
+            if deployment_details[model_version] is None:
+                deployment_details[model_version] = ModelUtils.insert_deployment_detail(
+                    correlation_id=correlation_id,
+                    key=deployment_key)
+        return [job_keys, values, deployment_details]
+
+    @staticmethod
+    def get_window_keys(job_keys: dict) -> list:
+        """Groups the job keys of a tick by time window, the jobs of a window are queried together.
+        Args:
+            job_keys: {model_version: keys given by get_job_keys}
+        Returns:
+            list: {model_version: job key} of every time window in the order of JobRegistry.get_job_specs
+        """
+        windows: int = len(next(iter(job_keys.values()))) if job_keys else 1
+        return [{model_version: model_version_keys[window] for model_version, model_version_keys in job_keys.items()}
+                for window in range(1, windows)]
+
+    def is_job_due(self, key: str, job_result: dict, model_version: str = None) -> bool:
+        """Decides whether this pod triggers a job of the tick, it is shared by the JobRunner and the
+        AsyncJobRunner. A completed job is remembered in the cache until its period ends.
+        Args:
+            key: key of the job
+            job_result: value of the key in the table, None if the job is not started
+            model_version: model version of the job, the stable model version if not given
+        Returns:
+            True if the job is not started and this pod owns it, or if the job is aborted or its lease expired
+        """
+        if job_result is None:
+            # the other pods leave a job which is not started to its owner on the hash ring.
+            return self.is_job_owner(key)
+        status: str = self.check_job_executed_successfully(key=key, job_result=job_result,
+                                                           model_version=model_version)
+        if status == JobStatus.JOB_COMPLETED.name:
+            # a completed job does not change any more, it is not read again on the next ticks.
+            PersistencyManager.get_persistency_manager(config.icbc_params_table_name).remember_value(
+                key=key, value=job_result, cache_ttl=JobRunner.get_job_ttl(key))
+        # an aborted job, or a job whose lease expired, is taken over by any pod, its owner may be down.
+        return status not in [JobStatus.JOB_COMPLETED.name, JobStatus.JOB_IN_PROGRESS.name]
+
+    def check_job_to_schedule(self, model_versions: list = None):
         """It checks the job triggered or not.
         If not executed, it will trigger the job. If it fails to update the job detail in table,
         it will be re-executed on consequent call of scheduling.
-        There are 2 calls to elastic search query. If any of the call fails,
+        Every job of the JobRegistry has one call to elastic search query. If any of the call fails,
         it treats as a fail, and will be re-executed on consequent call of
-        scheduling.
+        scheduling. In the concurrent mode, the calls run at the same time.
+        A completed job is remembered in the cache of the PersistencyManager until its period ends,
+        so a tick reads and checks only the jobs which are due.
+        Every model version has its own job keys and deployment date. When there are many
+        model versions, the jobs of a time window are queried together.
         Args:
+            model_versions: model versions with the environment suffix, the stable model version,
+                config.model_versions and the model versions of the params table if not given.
         Returns:
             True if the work was completed else False
         """
-        # check the deployment date exists or not. if not reinsert it.
         correlation_id: str = str(uuid.uuid4())
-        deployment_key: str = f'deployment_date_{ModelUtils.get_model_version_with_environment_suffix()}'
-        deployment_detail: dict = ModelUtils.get_model_detail_from_db(correlation_id=correlation_id,
-                                                                      deployment_key=deployment_key)
-        if deployment_detail is None:
-            deployment_detail = ModelUtils.insert_deployment_detail(
-                correlation_id=correlation_id,
-                key=deployment_key)
-
-        # check the job status for 24 hours
-        key: str = f'24-hours {"-"} {time.strftime("%d-%m-%Y")}'
-        self.check_job_status(key=key, correlation_id=correlation_id, deployment_detail=deployment_detail)
-
-        # check for job status for 7 days
-        key = f'7-days {"-"} {time.strftime("%d-%m-%Y")}'
-        self.check_job_status(key=key, correlation_id=correlation_id, deployment_detail=deployment_detail)
-
-    def check_job_status(self, key: str, correlation_id: str, deployment_detail: dict):
+        tick_jobs: list = self.read_tick_jobs(correlation_id=correlation_id, model_versions=model_versions)
+        if tick_jobs is None:
+            return
+        [job_keys, values, deployment_details] = tick_jobs
+
+        if len(job_keys) == 1:
+            [model_version] = job_keys.keys()
+            jobs: list = [
+                functools.partial(self.check_job_result, key=key, job_result=values.get(key),
+                                  correlation_id=correlation_id,
+                                  deployment_detail=deployment_details[model_version],
+                                  model_version=model_version)
+                for key in job_keys[model_version][1:]
+            ]
+        else:
+            # the jobs of a time window are queried together for every model version.
+            jobs: list = [
+                functools.partial(self.check_window_jobs, keys=window_keys, values=values,
+                                  correlation_id=correlation_id, deployment_details=deployment_details)
+                for window_keys in self.get_window_keys(job_keys)
+            ]
+        if not self.concurrent:
+            # check the job status of every registered job in the order of registration
+            for job in jobs:
+                job()
+            return
+
+        # the jobs are checked at the same time, so a slow query of a job does not delay the other jobs.
+        # Each job keeps its own status and its own lease.
+        with ThreadPoolExecutor(max_workers=max(1, min(config.num_worker_threads, len(jobs))),
+                                thread_name_prefix='job-runner') as executor:
+            futures: list = [executor.submit(job) for job in jobs]
+            for future in futures:
+                future.result()
+
+    def check_window_jobs(self, keys: dict, values: dict, correlation_id: str, deployment_details: dict):
+        """It checks the jobs of a time window of many model versions, and triggers the jobs which
+        are not started, or aborted, together.
+        Args:
+            keys: {model_version: job key}
+            values: values of the job keys read from the table
+            correlation_id: correlation_id
+            deployment_details: {model_version: deployment detail}
+        """
+        keys_to_trigger: dict = {model_version: key for model_version, key in keys.items()
+                                 if self.is_job_due(key=key, job_result=values.get(key), model_version=model_version)}
+        if keys_to_trigger:
+            self.trigger_the_jobs(keys=keys_to_trigger, deployment_details=deployment_details,
+                                  correlation_id=correlation_id)
+
+    def trigger_the_jobs(self, keys: dict, deployment_details: dict, correlation_id: str) -> dict:
+        """It triggers the jobs of a time window of many model versions, see trigger_the_job.
+        Each job takes its own lease, and the reports of the leased jobs are queried together.
+        Args:
+            keys: {model_version: job key}
+            deployment_details: {model_version: deployment detail}
+            correlation_id: correlation_id
+        Returns:
+            dict: {model_version: response}
+        """
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        responses: dict = {}
+        leased_jobs: dict = {}
+        for model_version, key in keys.items():
+            job_detail: dict = self.start_job(key=key, model_version=model_version)
+            lease_status: LeaseStatus = persistency_manager.acquire_lease(
+                **self.get_lease_request(job_detail=job_detail, correlation_id=correlation_id))
+            if lease_status == LeaseStatus.ACQUIRED:
+                leased_jobs[model_version] = job_detail
+            else:
+                responses[model_version] = self.lease_not_acquired(key=key, job_detail=job_detail,
+                                                                   lease_status=lease_status)
+        if not leased_jobs:
+            return responses
+
+        with ExitStack() as exit_stack:
+            heartbeats: dict = {
+                model_version: exit_stack.enter_context(
+                    self.get_lease_heartbeat(job_detail=job_detail, correlation_id=correlation_id))
+                for model_version, job_detail in leased_jobs.items()}
+            reports: dict = self.get_kpi_reports(
+                requests={model_version: self.get_report_request(job_detail=job_detail)
+                          for model_version, job_detail in leased_jobs.items()},
+                correlation_id=correlation_id)
+            for model_version, job_detail in leased_jobs.items():
+                responses[model_version] = self.finish_job(
+                    job_detail=job_detail, response=reports[model_version],
+                    deployment_detail=deployment_details.get(model_version), correlation_id=correlation_id,
+                    heartbeat=heartbeats[model_version])
+        return responses
+
+    def get_company_counts(self, job_detail: dict, correlation_id: str):
+        """Gets the pages of the counts of every company for the time window of the job.
+        The companies are counted when config.company_recall_enabled is set and a KPIReport is given.
+        Args:
+            job_detail: detail of the job given by start_job
+            correlation_id: correlation_id
+        Returns:
+            generator of DataFrame: see KPIReport.query_es_company_pages, None if the companies are not counted
+        """
+        if self.kpi_report is None or not config.company_recall_enabled:
+            return None
+        # the pages are read while the ICBCManager checks them, an error does not abort the job.
+        return self.kpi_report.query_es_company_pages(
+            self.get_report_request(job_detail=job_detail), correlation_id=correlation_id)
+
+    def get_kpi_report(self, request: dict, correlation_id: str) -> dict:
+        """Gets the kpi report of a model version.
+        The report is counted with the daily kpi counters when config.daily_kpi_counters_enabled
+        is set and a KPIReport is given, the get_pfc_kpi_report endpoint is called otherwise.
+        Args:
+            request: kpi report request
+            correlation_id: correlation_id
+        Returns:
+            dict: kpi report
+        """
+        if self.kpi_report is not None and config.daily_kpi_counters_enabled:
+            return self.kpi_report.query_es_incremental(request, correlation_id=correlation_id)
+        return get_pfc_kpi_report(request)
+
+    def get_kpi_reports(self, requests: dict, correlation_id: str) -> dict:
+        """Gets the kpi reports of many model versions for the same time window.
+        Args:
+            requests: {model_version: kpi report request}
+            correlation_id: correlation_id
+        Returns:
+            dict: {model_version: kpi report}
+        """
+        request: dict = self.get_multi_version_request(requests)
+        if request is None:
+            return {model_version: self.get_kpi_report(request, correlation_id=correlation_id)
+                    for model_version, request in requests.items()}
+        return self.split_multi_version_reports(
+            requests, reports=self.kpi_report.query_es_multi_version(request, correlation_id=correlation_id))
+
+    def get_multi_version_request(self, requests: dict) -> dict:
+        """Gets the request which queries the reports of many model versions with one elastic search query.
+        Args:
+            requests: {model_version: kpi report request}
+        Returns:
+            dict: request of KPIReport.query_es_multi_version, None if the reports are queried one by one
+        """
+        if self.kpi_report is None or len(requests) == 1 or config.daily_kpi_counters_enabled:
+            return None
+        request: dict = dict(next(iter(requests.values())), model_versions=list(requests.keys()))
+        request.pop('model_version')
+        return request
+
+    @staticmethod
+    def split_multi_version_reports(requests: dict, reports: dict) -> dict:
+        """Gets the report of every model version from the reports of KPIReport.query_es_multi_version.
+        Args:
+            requests: {model_version: kpi report request}
+            reports: reports of the model versions, or the error of the query
+        Returns:
+            dict: {model_version: kpi report}
+        """
+        # an error of the query is the error of every model version.
+        return {model_version: reports.get(model_version, {'error': reports.get('error')})
+                for model_version in requests.keys()}
+
+    def check_job_status(self, key: str, correlation_id: str, deployment_detail: dict, model_version: str = None):
         """It checks the job status, if not started, or aborted, it will trigger the job.
         Args:
             key: key
             correlation_id: correlation_id
             deployment_detail: dict
+            model_version: model version of the job, the stable model version if not given
         """
         persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
             config.icbc_params_table_name)
         job_result: dict = persistency_manager.get_the_value(key=key, correlation_id=correlation_id)
-        if job_result is None:
-            self.trigger_the_job(key=key, deployment_detail=deployment_detail, correlation_id=correlation_id)
-        else:
-            status: str = self.check_job_executed_successfully(key=key, job_result=job_result)
-            if status not in [JobStatus.JOB_COMPLETED.name, JobStatus.JOB_IN_PROGRESS.name]:
-                self.trigger_the_job(key=key,
-                                     deployment_detail=deployment_detail,
-                                     correlation_id=correlation_id)
\ No newline at end of file
+        self.check_job_result(key=key, job_result=job_result, correlation_id=correlation_id,
+                              deployment_detail=deployment_detail, model_version=model_version)
+
+    def check_job_result(self, key: str, job_result: dict, correlation_id: str, deployment_detail: dict,
+                         model_version: str = None):
+        """It checks the job result read from the table, if not started, or aborted, it will trigger the job.
+        Args:
+            key: key
+            job_result: value of the key in the table, None if the job is not started
+            correlation_id: correlation_id
+            deployment_detail: dict
+            model_version: model version of the job, the stable model version if not given
+        """
+        if not self.is_job_due(key=key, job_result=job_result, model_version=model_version):
+            return
+        self.trigger_the_job(key=key,
+                             deployment_detail=deployment_detail,
+                             correlation_id=correlation_id,
+                             model_version=model_version)
+
+
+JobRegistry.register_post_action(ICBC_EVALUATION, JobRunner.evaluate_icbc)
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""Lease heartbeat.
+The pod which runs a job keeps extending the lease of the job from a background thread,
+or from a task of the event loop of the AsyncJobRunner, so the lease can be short. A slow
+report is not taken over by another pod while the running pod is alive, and the job of a
+crashed pod is taken over as soon as its lease expires. A renewal which fails on the table
+is retried while the lease is still held, the lease is lost once another pod takes it over
+or it expires before a renewal succeeds.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+from service.configs import config
+from service.dynamo.asyncpersistencymanager import AsyncPersistencyManager
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.leasestatus import LeaseStatus
+
+
+class LeaseHeartbeat:
+    """Renews the lease of a job while the job runs."""
+
+    def __init__(self, table_name: str, key: str, owner: str, lease_seconds: int = None,
+                 interval_seconds: int = None, correlation_id: str = None):
+        """Creates the instance of LeaseHeartbeat.
+        Args:
+            table_name: Table which keeps the lease
+            key: key of the job
+            owner: name of the lease owner, i.e. the pod name
+            lease_seconds: how long the lease is held after every renewal, config.job_lease_seconds if not given
+            interval_seconds: time between the renewals, config.job_lease_heartbeat_seconds if not given
+            correlation_id: correlation_id
+        """
+        self.table_name: str = table_name
+        self.key: str = key
+        self.owner: str = owner
+        self.lease_seconds: int = config.job_lease_seconds if lease_seconds is None else lease_seconds
+        self.interval_seconds: int = config.job_lease_heartbeat_seconds if interval_seconds is None \
+            else interval_seconds
+        self.correlation_id: str = str(uuid.uuid4()) if correlation_id is None else correlation_id
+        self.renewals: int = 0
+        # the lease is acquired right before the heartbeat is created.
+        self.lease_expiry: float = time.time() + self.lease_seconds
+        self.lease_lost = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: threading.Thread = None
+        self.task: asyncio.Task = None
+
+    def check_renewal(self, lease_status: LeaseStatus, renewal_time: float) -> float:
+        """Checks the result of a renewal of the lease.
+        Args:
+            lease_status: LeaseStatus returned by renew_lease
+            renewal_time: epoch seconds when the renewal was sent
+        Returns:
+            float: seconds until the next renewal, None if the lease is lost
+        """
+        if lease_status == LeaseStatus.ACQUIRED:
+            self.lease_expiry = renewal_time + self.lease_seconds
+            self.renewals += 1
+            return self.interval_seconds
+
+        remaining_seconds: float = self.lease_expiry - time.time()
+        if lease_status == LeaseStatus.FAILED and remaining_seconds > 0:
+            # the table could not be updated, the renewal is retried before the lease expires.
+            return min(self.interval_seconds, remaining_seconds)
+
+        # the job is completed, another pod took the lease over, or the lease expired.
+        self.lease_lost.set()
+        logging.error(
+            self.key, extra={
+                'correlation_id': self.correlation_id,
+                'ds_object': {
+                    'message': f'lease of {self.key} is lost after {self.renewals} renewals',
+                    'param1': 'scheduler'
+                }})
+        return None
+
+    def run(self):
+        """Renews the lease every interval until the heartbeat is stopped or the lease is lost."""
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(self.table_name)
+        wait_seconds: float = self.interval_seconds
+        while wait_seconds is not None and not self.stopped.wait(wait_seconds):
+            renewal_time: float = time.time()
+            lease_status: LeaseStatus = persistency_manager.renew_lease(
+                key=self.key, owner=self.owner, lease_seconds=self.lease_seconds, correlation_id=self.correlation_id)
+            wait_seconds = self.check_renewal(lease_status=lease_status, renewal_time=renewal_time)
+
+    async def run_async(self):
+        """Renews the lease every interval on the event loop until the task is cancelled or the lease is lost."""
+        persistency_manager: AsyncPersistencyManager = AsyncPersistencyManager.get_persistency_manager(
+            self.table_name)
+        wait_seconds: float = self.interval_seconds
+        while wait_seconds is not None:
+            await asyncio.sleep(wait_seconds)
+            renewal_time: float = time.time()
+            lease_status: LeaseStatus = await persistency_manager.renew_lease(
+                key=self.key, owner=self.owner, lease_seconds=self.lease_seconds, correlation_id=self.correlation_id)
+            wait_seconds = self.check_renewal(lease_status=lease_status, renewal_time=renewal_time)
+
+    def start(self) -> 'LeaseHeartbeat':
+        """Starts renewing the lease on a daemon thread.
+        Returns:
+          LeaseHeartbeat
+        """
+        self.thread = threading.Thread(target=self.run, name=f'lease-heartbeat-{self.key}', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stops renewing the lease, it is called once the job wrote its result."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def start_async(self) -> 'LeaseHeartbeat':
+        """Starts renewing the lease with a task of the running event loop, no thread is started.
+        Returns:
+          LeaseHeartbeat
+        """
+        self.task = asyncio.get_running_loop().create_task(self.run_async(), name=f'lease-heartbeat-{self.key}')
+        return self
+
+    async def stop_async(self):
+        """Cancels the task which renews the lease, it is called once the job wrote its result."""
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            # the cancellation of the task is awaited, a cancellation of the caller is still raised.
+            await asyncio.wait([self.task])
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
\ No newline at end of file
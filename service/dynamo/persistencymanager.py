@@ -1,11 +1,29 @@
 """Manages the given table operation."""
+import threading
+import time
 import uuid
 from concurdatascience.dynamo import get_dynamo
 import logging
 
+import boto3
+from botocore.config import Config
+
+from service.configs import config
+from service.dynamo.dynamotableclient import DynamoTableClient
+from service.dynamo.readthroughcache import ReadThroughCache
+from service.enums.leasestatus import LeaseStatus
+
 
 class PersistencyManager:
-    """Manages the given table insert, update, delete."""
+    """Manages the given table insert, update, delete.
+    The managers are kept in a process wide registry, one per table, so the dynamo
+    handle and the pool of connections of a table are created once and shared by
+    every caller and every thread.
+    """
+
+    registry: dict = {}
+    handle_creations: dict = {}
+    registry_lock = threading.Lock()
 
     def __init__(self, table: str):
         """Creates the instance of PersistentManager.
@@ -17,29 +35,123 @@ class PersistencyManager:
         if not table:
             raise ValueError("Please give the table name")
         self.table = table
+        self.dynamo_handle = None
+        self.table_client = None
+        self.handle_lock = threading.Lock()
+        self.cache: ReadThroughCache = ReadThroughCache(
+            max_entries=config.dynamo_read_cache_max_entries,
+            max_age_seconds=config.dynamo_read_cache_max_age_seconds) if config.dynamo_read_cache_enabled else None
 
     @staticmethod
     def get_persistency_manager(table_name: str) -> 'PersistencyManager':
-        """Gets the Persistency Manager.
+        """Gets the Persistency Manager of the table from the registry.
         Args:
             table_name
         Returns:
           Persistent Manager
         """
-        return PersistencyManager(table_name)
+        with PersistencyManager.registry_lock:
+            persistency_manager: PersistencyManager = PersistencyManager.registry.get(table_name)
+            if persistency_manager is None:
+                persistency_manager = PersistencyManager(table_name)
+                PersistencyManager.registry[table_name] = persistency_manager
+            return persistency_manager
+
+    @staticmethod
+    def clear_registry():
+        """Removes every manager from the registry and resets the handle creation counters."""
+        with PersistencyManager.registry_lock:
+            PersistencyManager.registry.clear()
+            PersistencyManager.handle_creations.clear()
+
+    @staticmethod
+    def get_handle_creations() -> dict:
+        """Gets how many handles were created per table.
+        Returns:
+          dict: {table: {'dynamo': count, 'table_client': count}}
+        """
+        with PersistencyManager.registry_lock:
+            return {table: dict(counts) for table, counts in PersistencyManager.handle_creations.items()}
+
+    def count_handle_creation(self, handle: str):
+        """Counts the creation of a handle of the table.
+        Args:
+            handle: 'dynamo' or 'table_client'
+        """
+        with PersistencyManager.registry_lock:
+            counts: dict = PersistencyManager.handle_creations.setdefault(
+                self.table, {'dynamo': 0, 'table_client': 0})
+            counts[handle] += 1
+
+    def get_dynamo_handle(self):
+        """Gets the concurdatascience dynamo handle of the table, it is created only once.
+        Returns:
+          dynamo handle
+        """
+        if self.dynamo_handle is None:
+            with self.handle_lock:
+                if self.dynamo_handle is None:
+                    self.dynamo_handle = get_dynamo(self.table)
+                    self.count_handle_creation('dynamo')
+        return self.dynamo_handle
+
+    def get_table_client(self) -> DynamoTableClient:
+        """Gets the client for the conditional operations on the table, it is created only once.
+        The boto3 client behind it keeps its own pool of connections and is safe to be
+        shared across threads.
+        Returns:
+          DynamoTableClient
+        """
+        if self.table_client is None:
+            with self.handle_lock:
+                if self.table_client is None:
+                    client = boto3.session.Session().client(
+                        'dynamodb',
+                        config=Config(max_pool_connections=config.dynamo_max_pool_connections,
+                                      tcp_keepalive=True))
+                    self.table_client = DynamoTableClient(self.table, client=client)
+                    self.count_handle_creation('table_client')
+        return self.table_client
+
+    def get_cache_stats(self):
+        """Gets the hit and miss counters of the read-through cache of the table.
+        Returns:
+            dict: counters of the cache, None if the cache is disabled.
+        """
+        return self.cache.stats() if self.cache is not None else None
+
+    def remember_value(self, key: str, value, cache_ttl: int):
+        """Caches a value which was read from the table and will not change any more.
+        Args:
+            key: key of the table.
+            value: value of the key
+            cache_ttl: how long the value can be served from the cache
+        """
+        if self.cache is not None and value is not None:
+            self.cache.put(key, value, cache_ttl)
 
-    def get_the_value(self, key: str, correlation_id: str = None):
+    def get_the_value(self, key: str, correlation_id: str = None, cache_ttl: int = None):
         """This method reads the value for a given key.
+        A cached value is given back without reading the table. The value read from the
+        table is cached only if cache_ttl is given.
         Args:
             key: key of the table.
             correlation_id: Correlation id
+            cache_ttl: how long the value can be served from the cache, usually a TimeToLive value.
         Returns:
             For a given key, it returns the value.
         """
         if correlation_id is None:
             correlation_id: str = str(uuid.uuid4())
+        if self.cache is not None:
+            [is_cached, value] = self.cache.get(key)
+            if is_cached:
+                return value
         try:
-            return get_dynamo(self.table).get(key, correlation_id=correlation_id)
+            value = self.get_dynamo_handle().get(key, correlation_id=correlation_id)
+            if cache_ttl is not None:
+                self.remember_value(key, value, cache_ttl)
+            return value
         except Exception as exc:
             logging.error(
                 'Fatal error in the querying the table',
@@ -67,7 +179,9 @@ class PersistencyManager:
         param1: str = logging_msg['param1'] if 'param1' in logging_msg else self.table
         param2: str = logging_msg['param2'] if 'param2' in logging_msg else key
 
-        result: bool = get_dynamo(self.table).upsert(
+        if self.cache is not None:
+            self.cache.invalidate(key, ttl=ttl)
+        result: bool = self.get_dynamo_handle().upsert(
             key=key, value=value,
             correlation_id=correlation_id,
             ttl=ttl)
@@ -97,4 +211,298 @@ class PersistencyManager:
                         'param2': param2
                     }})
 
-        return result
\ No newline at end of file
+        return result
+
+    def acquire_lease(self, key: str, owner: str, value: dict, lease_seconds: int, logging_msg: dict,
+                      correlation_id: str = None, ttl: int = 86400) -> LeaseStatus:
+        """This method takes the lease of a key with a single conditional write.
+        The value is written only if the key does not exist, or if the lease on it
+        expired and the job behind it is not completed. So only one owner gets the
+        lease, however many of them try at the same time.
+        Args:
+            key: key of the table.
+            owner: name of the lease owner, i.e. the pod name
+            value: value which should be inserted against the key
+            lease_seconds: how long the lease is held by the owner
+            logging_msg: msg to be logged
+            correlation_id: identifies the unique transaction
+            ttl: time to live
+        Returns:
+            LeaseStatus.ACQUIRED if the owner got the lease,
+            LeaseStatus.HELD_BY_OTHER if the lease belongs to someone else,
+            LeaseStatus.FAILED if the table could not be updated.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        param1: str = logging_msg['param1'] if 'param1' in logging_msg else self.table
+        param2: str = logging_msg['param2'] if 'param2' in logging_msg else key
+
+        now: int = int(time.time())
+        lease_value: dict = dict(value)
+        lease_value[DynamoTableClient.LEASE_OWNER_FIELD] = owner
+        lease_value[DynamoTableClient.LEASE_EXPIRY_FIELD] = now + int(lease_seconds)
+        if self.cache is not None:
+            self.cache.invalidate(key, ttl=ttl)
+        try:
+            is_acquired: bool = self.get_table_client().put_lease(key=key, value=lease_value, now=now, ttl=ttl)
+        except Exception as exc:
+            error_message: str = logging_msg['error_message'] if 'error_message' in logging_msg \
+                else 'Lease write to DynamoDB table failed'
+            logging.error(
+                lease_value, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'{error_message} - {type(exc).__name__} - {exc}',
+                        'param1': param1,
+                        'param2': param2
+                    }})
+            return LeaseStatus.FAILED
+
+        if not is_acquired:
+            logging.info(
+                lease_value, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'Lease is held by another owner',
+                        'param1': param1,
+                        'param2': param2
+                    }})
+            return LeaseStatus.HELD_BY_OTHER
+
+        success_message: str = logging_msg['success_message'] if 'success_message' in logging_msg \
+            else 'Lease write to DynamoDB table succeeded'
+        logging.info(
+            lease_value, extra={
+                'correlation_id': correlation_id,
+                'ds_object': {
+                    'message': success_message,
+                    'param1': param1,
+                    'param2': param2
+                }})
+        return LeaseStatus.ACQUIRED
+
+    def renew_lease(self, key: str, owner: str, lease_seconds: int, correlation_id: str = None) -> LeaseStatus:
+        """This method extends the lease of a key held by the owner with a single conditional write.
+        Args:
+            key: key of the table.
+            owner: name of the lease owner, i.e. the pod name
+            lease_seconds: how long the lease is held from now
+            correlation_id: identifies the unique transaction
+        Returns:
+            LeaseStatus.ACQUIRED if the lease is renewed,
+            LeaseStatus.HELD_BY_OTHER if the owner lost the lease or the job is completed,
+            LeaseStatus.FAILED if the table could not be updated, the lease may still be held.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        lease_expiry: int = int(time.time()) + int(lease_seconds)
+        if self.cache is not None:
+            self.cache.invalidate(key)
+        try:
+            is_renewed: bool = self.get_table_client().renew_lease(key=key, owner=owner, lease_expiry=lease_expiry)
+        except Exception as exc:
+            logging.error(
+                owner, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'Lease renewal failed - {type(exc).__name__} - {exc}',
+                        'param1': self.table,
+                        'param2': key
+                    }})
+            return LeaseStatus.FAILED
+
+        if not is_renewed:
+            logging.info(
+                owner, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'Lease is not held by the owner any more',
+                        'param1': self.table,
+                        'param2': key
+                    }})
+            return LeaseStatus.HELD_BY_OTHER
+        return LeaseStatus.ACQUIRED
+
+    def complete_lease(self, key: str, owner: str, value: dict, logging_msg: dict, correlation_id: str = None,
+                       ttl: int = 86400) -> bool:
+        """This method writes the value of a completed job with a single conditional write.
+        The value is written only if the owner still holds the lease on the key, so a pod
+        whose lease was taken over does not overwrite the job of the new owner.
+        Args:
+            key: key of the table.
+            owner: name of the lease owner, i.e. the pod name
+            value: value which should be inserted against the key
+            logging_msg: msg to be logged
+            correlation_id: identifies the unique transaction
+            ttl: time to live
+        Returns:
+            True if the value is written, False if the owner lost the lease or the table could not be updated.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        param1: str = logging_msg['param1'] if 'param1' in logging_msg else self.table
+        param2: str = logging_msg['param2'] if 'param2' in logging_msg else key
+
+        if self.cache is not None:
+            self.cache.invalidate(key, ttl=ttl)
+        try:
+            is_completed: bool = self.get_table_client().complete_lease(key=key, owner=owner, value=value, ttl=ttl)
+        except Exception as exc:
+            error_message: str = logging_msg['error_message'] if 'error_message' in logging_msg \
+                else 'Completion write to DynamoDB table failed'
+            logging.error(
+                value, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'{error_message} - {type(exc).__name__} - {exc}',
+                        'param1': param1,
+                        'param2': param2
+                    }})
+            return False
+
+        if not is_completed:
+            logging.error(
+                value, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'Lease is not held by the owner any more, the completion is not written',
+                        'param1': param1,
+                        'param2': param2
+                    }})
+            return False
+
+        success_message: str = logging_msg['success_message'] if 'success_message' in logging_msg \
+            else 'Completion write to DynamoDB table succeeded'
+        logging.info(
+            value, extra={
+                'correlation_id': correlation_id,
+                'ds_object': {
+                    'message': success_message,
+                    'param1': param1,
+                    'param2': param2
+                }})
+        return True
+
+    def put_member(self, key: str, member: str, ttl: int, correlation_id: str = None):
+        """This method writes the heartbeat of a member, and removes the members without a heartbeat
+        within the ttl.
+        Args:
+            key: key of the table which keeps the members.
+            member: name of the member, i.e. the pod name
+            ttl: how long a member is alive after its heartbeat, in seconds
+            correlation_id: identifies the unique transaction
+        Returns:
+            dict: {member: last heartbeat in epoch seconds} of the alive members, None if the table
+            could not be updated.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        now: int = int(time.time())
+        if self.cache is not None:
+            self.cache.invalidate(key)
+        try:
+            members: dict = self.get_table_client().put_member(key=key, member=member, heartbeat=now, ttl=ttl)
+            expired_members: list = [name for name, heartbeat in members.items() if heartbeat < now - ttl]
+            if expired_members:
+                self.get_table_client().remove_members(key=key, members=expired_members)
+        except Exception as exc:
+            logging.error(
+                member, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'Member heartbeat failed - {type(exc).__name__} - {exc}',
+                        'param1': self.table,
+                        'param2': key
+                    }})
+            return None
+        return {name: heartbeat for name, heartbeat in members.items() if name not in expired_members}
+
+    def batch_get(self, keys: list, correlation_id: str = None, cache_ttls: dict = None):
+        """This method reads the values of many keys with batched calls.
+        The cached values are given back without reading the table. The values read from
+        the table are cached only for the keys given in cache_ttls.
+        Args:
+            keys: keys of the table.
+            correlation_id: Correlation id
+            cache_ttls: {key: how long the value can be served from the cache}
+        Returns:
+            dict: {key: value} for every given key, the value is None if the key does not exist.
+            None if the table could not be read.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        values: dict = {}
+        keys_to_read: list = list(keys)
+        if self.cache is not None:
+            keys_to_read = []
+            for key in keys:
+                [is_cached, value] = self.cache.get(key)
+                if is_cached:
+                    values[key] = value
+                else:
+                    keys_to_read.append(key)
+        try:
+            if keys_to_read:
+                values.update(self.get_table_client().batch_get(keys_to_read))
+        except Exception as exc:
+            logging.error(
+                'Fatal error in the batch querying the table',
+                extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'{type(exc).__name__} - {exc}',
+                        'param1': self.table}})
+            return None
+        for key, cache_ttl in (cache_ttls or {}).items():
+            if key in keys_to_read:
+                self.remember_value(key, values.get(key), cache_ttl)
+        return {key: values.get(key) for key in keys}
+
+    def batch_upsert(self, items: list, logging_msg: dict, correlation_id: str = None) -> bool:
+        """This method updates the values of many keys with batched calls.
+        Args:
+            items: list of {'key': key, 'value': value, 'ttl': ttl}, ttl is 86400 if not given
+            logging_msg: msg to be logged
+            correlation_id: identifies the unique transaction
+        Returns:
+            bool
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+
+        param1: str = logging_msg['param1'] if 'param1' in logging_msg else self.table
+        keys: list = [item['key'] for item in items]
+        if self.cache is not None:
+            for item in items:
+                self.cache.invalidate(item['key'], ttl=item.get('ttl', 86400))
+        try:
+            result: bool = self.get_table_client().batch_put(
+                [{'key': item['key'], 'value': item['value'], 'ttl': item.get('ttl', 86400)} for item in items])
+        except Exception as exc:
+            error_message: str = logging_msg['error_message'] if 'error_message' in logging_msg \
+                else 'Batch upsert to DynamoDB table failed'
+            logging.error(
+                keys, extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'{error_message} - {type(exc).__name__} - {exc}',
+                        'param1': param1,
+                        'param2': len(keys)
+                    }})
+            return False
+
+        success_message: str = logging_msg['success_message'] if 'success_message' in logging_msg \
+            else 'Batch upsert to DynamoDB table succeeded'
+        logging.info(
+            keys, extra={
+                'correlation_id': correlation_id,
+                'ds_object': {
+                    'message': success_message,
+                    'param1': param1,
+                    'param2': len(keys)
+                }})
+        return result
@@ -0,0 +1,104 @@
+"""Read-through cache of the table values.
+This module keeps the values read from a table in memory, so the values which
+rarely change are not read from DynamoDB on every tick of the scheduler.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReadThroughCache:
+    """Bounded, least recently used cache of the values of a table.
+    Every entry has its own lifetime. An entry never outlives the item in the table
+    when this pod wrote the item, as the time to live of the write is remembered.
+    """
+
+    def __init__(self, max_entries: int, max_age_seconds: int):
+        """Creates the instance of ReadThroughCache.
+        Args:
+            max_entries: max number of values kept, the least recently used value is evicted first
+            max_age_seconds: max lifetime of an entry
+        Raises:
+            ValueError: If max_entries is not positive.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries should be positive")
+        self.max_entries: int = max_entries
+        self.max_age_seconds: int = max_age_seconds
+        self.entries: OrderedDict = OrderedDict()
+        self.item_expiries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+
+    def get(self, key: str) -> [bool, object]:
+        """Gets the value of the key.
+        Args:
+            key: key of the table.
+        Returns:
+            [True, value] if the key is cached and not expired, else [False, None]
+        """
+        now: float = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return [True, entry[0]]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return [False, None]
+
+    def put(self, key: str, value, lifetime_seconds: int):
+        """Caches the value of the key.
+        Args:
+            key: key of the table.
+            value: value read from the table
+            lifetime_seconds: how long the value can be served from the cache, it is capped by the
+                max age of the cache and by the time to live of the last write of this pod.
+        """
+        now: float = time.monotonic()
+        expires_at: float = now + min(lifetime_seconds, self.max_age_seconds)
+        with self.lock:
+            item_expiry = self.item_expiries.get(key)
+            if item_expiry is not None:
+                expires_at = min(expires_at, item_expiry)
+            if expires_at <= now:
+                return
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str, ttl: int = None):
+        """Removes the value of the key, it is called when this pod writes the key.
+        Args:
+            key: key of the table.
+            ttl: time to live of the write, the next cached value of the key does not outlive it
+        """
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+            if ttl is not None:
+                self.item_expiries[key] = time.monotonic() + ttl
+                self.item_expiries.move_to_end(key)
+                while len(self.item_expiries) > self.max_entries:
+                    self.item_expiries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Gets the counters of the cache.
+        Returns:
+            dict: hits, misses, evictions, invalidations and the number of entries
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self.entries)
+            }
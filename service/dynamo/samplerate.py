@@ -16,15 +16,18 @@ class SampleRate:
         self.persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
             table_name)
 
-    def sameplerate_upsert(self, response: dict, correlation_id: str = None) -> dict:
+    def sameplerate_upsert(self, response: dict, correlation_id: str = None, model_version: str = None) -> dict:
         """Upsert the sample rate in datascience-icbc-params table.
         Args:
             response: Value to be inserted
             correlation_id: correlation id to track the transaction
+            model_version: model version of the sample rate, the stable model version if not given
         Returns:
               dict
         """
-        sample_rate_key: str = "sample_rate_" + ModelUtils.get_model_version_with_environment_suffix()
+        if model_version is None:
+            model_version = ModelUtils.get_model_version_with_environment_suffix()
+        sample_rate_key: str = "sample_rate_" + model_version
         sample_rate_result: dict = SampleRate.get_sample_rate(self, correlation_id=correlation_id,
                                                               key=sample_rate_key)
 
@@ -75,5 +78,5 @@ class SampleRate:
              sample_rate_result: dict
         """
         sample_rate_result: dict = self.persistency_manager.get_the_value(
-            key=key, correlation_id=correlation_id)
+            key=key, correlation_id=correlation_id, cache_ttl=TimeToLive.ONE_YEAR_TTL.value)
         return sample_rate_result
\ No newline at end of file
@@ -1,11 +1,20 @@
 """kpi elastic search query.
 This method gets the query
 """
+import threading
+
+from service.configs import config
+from service.elasticsearch.querytemplate import QueryTemplate
 
 
 class KPIQuery:
     """Generates the KPI query."""
 
+    # the serialized templates of the queries, keyed by the kind of the query and its number of windows
+    # or model versions, see get_query_template. There are only a few shapes, so they are all kept.
+    QUERY_TEMPLATES: dict = {}
+    templates_lock = threading.Lock()
+
     def __init__(self):
         """Creates an instance of the KPIQuery class.
         Args:
@@ -64,12 +73,13 @@ class KPIQuery:
 
         return validation_result
 
-    def construct_query(self, request: dict) -> dict:
-        """Construct the query.
+    @staticmethod
+    def get_time_clauses(request: dict) -> [str, str]:
+        """Gets the from and to clauses of the time range of the request.
         Args:
           request: The request which we are sending to query the elastic search
         Returns:
-         :param request:
+          :[from_clause, to_clause]
         """
         time_from: str = request['absolute_time_from_']
         time_from = request['relative_time_from_'] if time_from is None else time_from
@@ -86,174 +96,461 @@ class KPIQuery:
             from_clause: str = str(f'{time_from}')
 
         to_clause: str = str(f'{time_to}')
+        return [from_clause, to_clause]
 
-        model_version: str = request['model_version']
+    def construct_query(self, request: dict) -> dict:
+        """Construct the query.
+        Args:
+          request: The request which we are sending to query the elastic search
+        Returns:
+         :param request:
+        """
+        [from_clause, to_clause] = self.get_time_clauses(request)
+        return self.generate_query(from_clause=from_clause, to_clause=to_clause,
+                                   model_version=request['model_version'])
+
+    def construct_query_body(self, request: dict) -> bytes:
+        """Construct the serialized query from the template of the single window queries.
+        Args:
+          request: The request which we are sending to query the elastic search
+        Returns:
+          bytes: serialized query, the same as the JSON of construct_query
+        """
+        [from_clause, to_clause] = self.get_time_clauses(request)
+        template: QueryTemplate = self.get_query_template(
+            shape=('kpi', 1),
+            generate=lambda: self.generate_query(from_clause=QueryTemplate.placeholder('from_clause'),
+                                                 to_clause=QueryTemplate.placeholder('to_clause'),
+                                                 model_version=QueryTemplate.placeholder('model_version')))
+        return template.render({'from_clause': from_clause, 'to_clause': to_clause,
+                                'model_version': request['model_version']})
 
+    def generate_query(self, from_clause: str, to_clause: str, model_version: str) -> dict:
+        """Generates the query of a single window.
+        Args:
+          from_clause: Start of the time range.
+          to_clause: End of the time range.
+          model_version: model_version.
+        Returns:
+          dict: query
+        """
+        # the time range is applied once to the whole query, not again in every bucket.
         query: dict = \
             {
-                "aggs": {
-                    "ml_audit": {
-                        "aggs": {
-                            "total_ml_audit_questions": {
-                                "sum": {
-                                    "field": "datascience_data.number1"
+                "query": {
+                    "bool": {
+                        "filter": [
+                            self.generate_time_range_filter(from_clause=from_clause, to_clause=to_clause)
+                        ]
+                    }
+                },
+                "aggs": self.generate_kpi_aggregations(model_version=model_version),
+                "size": 0
+            }
+        return query
+
+    def construct_multi_window_query(self, request: dict) -> dict:
+        """Construct one query for many time windows.
+        The documents of every window are read once, and split in a window bucket by a
+        date_range sub-aggregation, so the overlapping windows (the last 24 hours are in
+        the last 7 days) do not scan the same documents again.
+        Args:
+          request: {'windows': [{'key': ..., 'absolute_time_from_': ..., 'time_unit_': ...,
+                    'relative_time_from_': ..., 'relative_time_to_': ...}], 'model_version': ...}
+        Returns:
+         :query
+        """
+        windows: list = [[str(window['key'])] + self.get_time_clauses(KPIQuery.get_window_request(window))
+                         for window in request['windows']]
+        return self.generate_multi_window_query(windows=windows, model_version=request['model_version'])
+
+    def construct_multi_window_query_body(self, request: dict) -> bytes:
+        """Construct the serialized multi window query from the template of its number of windows.
+        Args:
+          request: see construct_multi_window_query
+        Returns:
+          bytes: serialized query, the same as the JSON of construct_multi_window_query
+        """
+        values: dict = {'model_version': request['model_version']}
+        for index, window in enumerate(request['windows']):
+            [values[f'from_clause_{index}'], values[f'to_clause_{index}']] = \
+                self.get_time_clauses(KPIQuery.get_window_request(window))
+            values[f'key_{index}'] = str(window['key'])
+        template: QueryTemplate = self.get_query_template(
+            shape=('multi_window', len(request['windows'])),
+            generate=lambda: self.generate_multi_window_query(
+                windows=[[QueryTemplate.placeholder(f'{name}_{index}') for name in ['key', 'from_clause', 'to_clause']]
+                         for index in range(len(request['windows']))],
+                model_version=QueryTemplate.placeholder('model_version')))
+        return template.render(values)
+
+    def generate_multi_window_query(self, windows: list, model_version: str) -> dict:
+        """Generates the query of many time windows.
+        Args:
+          windows: [key, from_clause, to_clause] of every window
+          model_version: model_version.
+        Returns:
+          dict: query
+        """
+        ranges: list = []
+        window_filters: list = []
+        for [key, from_clause, to_clause] in windows:
+            ranges.append({"key": key, "from": from_clause, "to": to_clause})
+            window_filters.append(self.generate_time_range_filter(from_clause=from_clause, to_clause=to_clause))
+
+        query: dict = \
+            {
+                "query": {
+                    "bool": {
+                        "filter": [
+                            {
+                                "bool": {
+                                    "should": window_filters,
+                                    "minimum_should_match": 1
                                 }
                             }
+                        ]
+                    }
+                },
+                "aggs": {
+                    "windows": {
+                        "date_range": {
+                            "field": str(self.TIMESTAMP),
+                            "keyed": True,
+                            "ranges": ranges
                         },
-                        "filters": {
-                            "filters": {
-                                "ml_audit_questions": {
-                                    "bool": {
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause=from_clause,
-                                                                            to_clause=to_clause),
-                                            {
-                                                "term": {
-                                                    "datascience_data.message": "total audit questions parsed"
-                                                }
-                                            },
-                                            {
-                                                "term": {
-                                                    "application": "datascience-ml-audit"
-                                                }
+                        "aggs": self.generate_kpi_aggregations(model_version=model_version)
+                    }
+                },
+                "size": 0
+            }
+        return query
+
+    def construct_company_query(self, request: dict, after_key: dict = None) -> dict:
+        """Construct the query of a page of the recall of every company.
+        The true_fails and the auditor_fails buckets are split per company by a composite
+        aggregation on config.company_field, a page has config.company_buckets_size companies
+        and the next page starts after the after_key of the previous page.
+        Args:
+          request: The request which we are sending to query the elastic search
+          after_key: after_key of the previous page, the first page if None
+        Returns:
+         :query
+        """
+        [from_clause, to_clause] = self.get_time_clauses(request)
+        pfc_buckets: dict = self.generate_pfc_buckets(model_version=request['model_version'])
+        companies: dict = {
+            "size": config.company_buckets_size,
+            "sources": [
+                {
+                    "company": {
+                        "terms": {
+                            "field": str(config.company_field)
+                        }
+                    }
+                }
+            ]
+        }
+        if after_key is not None:
+            companies["after"] = after_key
+        query: dict = \
+            {
+                "query": {
+                    "bool": {
+                        "filter": [
+                            self.generate_time_range_filter(from_clause=from_clause, to_clause=to_clause)
+                        ]
+                    }
+                },
+                "aggs": {
+                    "pfc_stable": {
+                        "filter": self.generate_metric_service_term("pfc_stable"),
+                        "aggs": {
+                            "companies": {
+                                "composite": companies,
+                                "aggs": {
+                                    "pfc": {
+                                        "filters": {
+                                            "filters": {
+                                                "true_fails": pfc_buckets["true_fails"],
+                                                "auditor_fails": pfc_buckets["auditor_fails"]
                                             }
-                                        ]
+                                        }
                                     }
                                 }
                             }
                         }
-                    },
+                    }
+                },
+                "size": 0
+            }
+        return query
+
+    def construct_multi_version_query(self, request: dict) -> dict:
+        """Construct one query for many model versions.
+        Args:
+          request: {'absolute_time_from_': ..., 'time_unit_': ..., 'relative_time_from_': ...,
+                    'relative_time_to_': ..., 'model_versions': [model_version, ...]}
+        Returns:
+         :query
+        """
+        [from_clause, to_clause] = self.get_time_clauses(request)
+        return self.generate_multi_version_query(from_clause=from_clause, to_clause=to_clause,
+                                                 model_versions=request['model_versions'])
+
+    def construct_multi_version_query_body(self, request: dict) -> bytes:
+        """Construct the serialized multi version query from the template of its number of model versions.
+        Args:
+          request: see construct_multi_version_query
+        Returns:
+          bytes: serialized query, the same as the JSON of construct_multi_version_query
+        """
+        [from_clause, to_clause] = self.get_time_clauses(request)
+        values: dict = {f'model_version_{index}': model_version
+                        for index, model_version in enumerate(request['model_versions'])}
+        template: QueryTemplate = self.get_query_template(
+            shape=('multi_version', len(values)),
+            generate=lambda: self.generate_multi_version_query(
+                from_clause=QueryTemplate.placeholder('from_clause'),
+                to_clause=QueryTemplate.placeholder('to_clause'),
+                model_versions=[QueryTemplate.placeholder(name) for name in values.keys()]))
+        return template.render(dict(values, from_clause=from_clause, to_clause=to_clause))
+
+    def generate_multi_version_query(self, from_clause: str, to_clause: str, model_versions: list) -> dict:
+        """Generates the query of many model versions.
+        Args:
+          from_clause: Start of the time range.
+          to_clause: End of the time range.
+          model_versions: model versions.
+        Returns:
+          dict: query
+        """
+        query: dict = \
+            {
+                "query": {
+                    "bool": {
+                        "filter": [
+                            self.generate_time_range_filter(from_clause=from_clause, to_clause=to_clause)
+                        ]
+                    }
+                },
+                "aggs": self.generate_multi_version_aggregations(model_versions=model_versions),
+                "size": 0
+            }
+        return query
+
+    @staticmethod
+    def get_query_template(shape: tuple, generate) -> QueryTemplate:
+        """Gets the template of the queries of a shape, it is generated only once.
+        Args:
+            shape: kind of the query and its number of windows or model versions
+            generate: function which generates the query with the placeholders of its parameters
+        Returns:
+            QueryTemplate: template of the shape
+        """
+        template: QueryTemplate = KPIQuery.QUERY_TEMPLATES.get(shape)
+        if template is None:
+            template = QueryTemplate(generate())
+            with KPIQuery.templates_lock:
+                template = KPIQuery.QUERY_TEMPLATES.setdefault(shape, template)
+        return template
+
+    def generate_kpi_aggregations(self, model_version: str) -> dict:
+        """Generates the ml_audit and pfc aggregations.
+        The time range is not part of the aggregations, it is filtered by the query.
+        The pfc buckets are wrapped in the pfc_stable filter aggregation, so the metric
+        service term is evaluated once and every bucket keeps only its own filters.
+        Args:
+            model_version: model_version.
+        Returns:
+            dict: ml_audit and pfc_stable aggregations.
+        """
+        return {
+            "ml_audit": self.generate_ml_audit_aggregation(),
+            "pfc_stable": {
+                "filter": self.generate_metric_service_term("pfc_stable"),
+                "aggs": {
+                    "pfc": {
+                        "filters": {
+                            "filters": self.generate_pfc_buckets(model_version=model_version)
+                        }
+                    }
+                }
+            }
+        }
+
+    def generate_multi_version_aggregations(self, model_versions: list) -> dict:
+        """Generates the ml_audit and pfc aggregations of many model versions.
+        The pfc buckets which depend on the model version are split per version by a terms
+        aggregation on the metric path, so the documents are read once for every version.
+        The pfc_bypass bucket and the ml_audit aggregation do not depend on the model version,
+        they are evaluated once.
+        Args:
+            model_versions: model versions.
+        Returns:
+            dict: ml_audit and pfc_stable aggregations.
+        """
+        pfc_buckets: dict = self.generate_pfc_buckets(model_version=None)
+        pfc_bypass: dict = pfc_buckets.pop("pfc_bypass")
+        return {
+            "ml_audit": self.generate_ml_audit_aggregation(),
+            "pfc_stable": {
+                "filter": self.generate_metric_service_term("pfc_stable"),
+                "aggs": {
                     "pfc": {
                         "filters": {
                             "filters": {
-                                "true_fails": {
-                                    "bool": {
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause, to_clause),
-                                            self.generate_metric_service_term("pfc_stable"),
-                                            {
-                                                "terms": {
-                                                    str(self.DAVINCI_DATA_TASK_EVENT): [
-                                                        "fail-fail",
-                                                        "fail-pend",
-                                                        "fail-none",
-                                                        "fail-pwe",
-                                                        "fail-99"
-                                                    ]
-                                                }
-                                            },
-
-                                            self.generate_metric_value_term(value=1),
-                                            self.generate_metric_path_term(model_version=model_version)
-
-                                        ]
-                                    }
-                                },
-                                "true_fails_trained_entities": {
-                                    "bool": {
-                                        "must_not": {
-                                            "term": {
-                                                "datascience_data.param2": "entity_not_in_allow_list"
-                                            }
-                                        },
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause=from_clause,
-                                                                            to_clause=to_clause),
-                                            self.generate_metric_service_term("pfc_stable"),
-                                            {
-                                                "terms": {
-                                                    str(self.DAVINCI_DATA_TASK_EVENT): [
-                                                        "fail-fail",
-                                                        "fail-pend",
-                                                        "fail-none",
-                                                        "fail-pwe",
-                                                        "fail-99"
-                                                    ]
-                                                }
-                                            },
-                                            self.generate_metric_value_term(value=1),
-                                            self.generate_metric_path_term(model_version=model_version)
-                                        ]
-                                    }
-                                },
-                                "pfc_bypass": {
-                                    "bool": {
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause=from_clause,
-                                                                            to_clause=to_clause),
-                                            self.generate_metric_service_term("pfc_stable"),
-
-                                            {
-                                                "term": {
-                                                    str(self.DAVINCI_DATA_TASK_EVENT): "pass-bypass"
-                                                }
-                                            }
-                                        ]
-                                    }
-                                },
-                                "auditor_fails_trained_entities": {
-                                    "bool": {
-                                        "must_not": {
-                                            "term": {
-                                                "datascience_data.param2": "entity_not_in_allow_list"
-                                            }
-                                        },
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause, to_clause),
-                                            self.generate_metric_service_term(service_name="pfc_stable"),
-                                            self.generate_davinci_data_task_event_terms(),
-                                            self.generate_metric_value_term(value=1),
-                                            self.generate_metric_path_term(model_version=model_version)
-                                        ]
-                                    }
-                                },
-                                "sampled_questions": {
-                                    "bool": {
-                                        "must": {
-                                            "exists": {
-                                                "field": str(self.DAVINCI_DATA_TASK_EVENT)
-                                            }
-                                        },
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause, to_clause),
-                                            self.generate_metric_service_term(service_name="pfc_stable"),
-                                            self.generate_metric_value_term(value=1),
-                                            self.generate_metric_path_term(model_version=model_version)
-                                        ]
-                                    }
-                                },
-                                "received_questions": {
-                                    "bool": {
-                                        "must": {
-                                            "exists": {
-                                                "field": str(self.DAVINCI_DATA_TASK_EVENT)
-                                            }
-                                        },
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause, to_clause),
-                                            self.generate_metric_service_term('pfc_stable'),
-                                            self.generate_metric_path_term(model_version=model_version),
-                                        ]
+                                "pfc_bypass": pfc_bypass
+                            }
+                        }
+                    },
+                    "model_versions": {
+                        "terms": {
+                            "field": str(self.METRIC_PATH),
+                            "include": list(model_versions),
+                            "size": len(model_versions)
+                        },
+                        "aggs": {
+                            "pfc": {
+                                "filters": {
+                                    "filters": pfc_buckets
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
+    @staticmethod
+    def generate_ml_audit_aggregation() -> dict:
+        """Generates the ml_audit aggregation.
+        Returns:
+            dict: ml_audit aggregation.
+        """
+        return {
+            "aggs": {
+                "total_ml_audit_questions": {
+                    "sum": {
+                        "field": "datascience_data.number1"
+                    }
+                }
+            },
+            "filters": {
+                "filters": {
+                    "ml_audit_questions": {
+                        "bool": {
+                            "filter": [
+                                {
+                                    "term": {
+                                        "datascience_data.message": "total audit questions parsed"
                                     }
                                 },
-                                "auditor_fails": {
-                                    "bool": {
-                                        "filter": [
-                                            self.generate_time_range_filter(from_clause, to_clause),
-                                            self.generate_metric_service_term('pfc_stable'),
-                                            self.generate_davinci_data_task_event_terms(),
-                                            self.generate_metric_value_term(value=1),
-                                            self.generate_metric_path_term(model_version=model_version),
-                                        ]
+                                {
+                                    "term": {
+                                        "application": "datascience-ml-audit"
                                     }
-                                },
-                            }
+                                }
+                            ]
                         }
                     }
-                },
-                "size": 0
+                }
             }
-        return query
+        }
+
+    def generate_pfc_buckets(self, model_version: str) -> dict:
+        """Generates the buckets of the pfc filters aggregation.
+        Args:
+            model_version: model_version, the buckets are not filtered on the metric path if None.
+        Returns:
+            dict: pfc buckets.
+        """
+        metric_path_terms: list = [] if model_version is None else \
+            [self.generate_metric_path_term(model_version=model_version)]
+        return {
+            "true_fails": {
+                "bool": {
+                    "filter": [
+                        self.generate_true_fails_task_event_terms(),
+                        self.generate_metric_value_term(value=1),
+                        *metric_path_terms
+                    ]
+                }
+            },
+            "true_fails_trained_entities": {
+                "bool": {
+                    "must_not": {
+                        "term": {
+                            "datascience_data.param2": "entity_not_in_allow_list"
+                        }
+                    },
+                    "filter": [
+                        self.generate_true_fails_task_event_terms(),
+                        self.generate_metric_value_term(value=1),
+                        *metric_path_terms
+                    ]
+                }
+            },
+            "pfc_bypass": {
+                "bool": {
+                    "filter": [
+                        {
+                            "term": {
+                                str(self.DAVINCI_DATA_TASK_EVENT): "pass-bypass"
+                            }
+                        }
+                    ]
+                }
+            },
+            "auditor_fails_trained_entities": {
+                "bool": {
+                    "must_not": {
+                        "term": {
+                            "datascience_data.param2": "entity_not_in_allow_list"
+                        }
+                    },
+                    "filter": [
+                        self.generate_davinci_data_task_event_terms(),
+                        self.generate_metric_value_term(value=1),
+                        *metric_path_terms
+                    ]
+                }
+            },
+            "sampled_questions": {
+                "bool": {
+                    "must": {
+                        "exists": {
+                            "field": str(self.DAVINCI_DATA_TASK_EVENT)
+                        }
+                    },
+                    "filter": [
+                        self.generate_metric_value_term(value=1),
+                        *metric_path_terms
+                    ]
+                }
+            },
+            "received_questions": {
+                "bool": {
+                    "must": {
+                        "exists": {
+                            "field": str(self.DAVINCI_DATA_TASK_EVENT)
+                        }
+                    },
+                    "filter": [
+                        *metric_path_terms
+                    ]
+                }
+            },
+            "auditor_fails": {
+                "bool": {
+                    "filter": [
+                        self.generate_davinci_data_task_event_terms(),
+                        self.generate_metric_value_term(value=1),
+                        *metric_path_terms
+                    ]
+                }
+            }
+        }
 
     def generate_metric_value_term(self, value: int) -> dict:
         """Generates the term for the metric value.
@@ -311,6 +608,23 @@ class KPIQuery:
             }
         }
 
+    def generate_true_fails_task_event_terms(self) -> dict:
+        """Generates the terms for the Davinci Data Task Events of the true fails.
+        Returns:
+            dict: Terms for the true fails.
+        """
+        return {
+            "terms": {
+                str(self.DAVINCI_DATA_TASK_EVENT): [
+                    "fail-fail",
+                    "fail-pend",
+                    "fail-none",
+                    "fail-pwe",
+                    "fail-99"
+                ]
+            }
+        }
+
     def generate_davinci_data_task_event_terms(self) -> dict:
         """Generates the terms for Davinci Data Task Events.
         Returns:
@@ -333,17 +647,150 @@ class KPIQuery:
             }
         }
 
-    def get_query(self, request: dict) -> dict:
+    def get_query(self, request: dict, serialized: bool = False) -> dict:
         """Generates the query if inputs are valid.
         Args:
           :param request: The request which we are sending to query the elastic search
+          :param serialized: give the serialized query from the template of its shape, see QueryTemplate
+        Returns:
+          :response
+        """
+        validation_result = self.validate_input(request)
+        response = {}
+        if len(validation_result) == 0:
+            response['query'] = self.construct_query_body(request) if serialized else self.construct_query(request)
+        else:
+            response['validation_error'] = validation_result
+
+        return response
+
+    @staticmethod
+    def get_window_request(window: dict) -> dict:
+        """Gets the request of a single window, the time keys which are not given are None.
+        Args:
+          window: window of the multi window request
+        Returns:
+         :request
+        """
+        window_request: dict = {
+            'absolute_time_from_': None,
+            'time_unit_': None,
+            'relative_time_from_': None,
+            'relative_time_to_': None,
+            'model_version': None
+        }
+        window_request.update(window)
+        return window_request
+
+    @staticmethod
+    def validate_multi_window_input(request: dict) -> dict:
+        """Validate the multi window request.
+        Args:
+          request: The request which we are sending to query the elastic search
+        Returns:
+         :validation_result
+        """
+        validation_result: dict = {}
+        count: int = -1
+        if 'model_version' not in request:
+            [validation_result, count] = (
+                KPIQuery.append_to_validation(validation_result,
+                                              "Please provide the model_version for the stable model",
+                                              count))
+        if 'windows' not in request or not request['windows']:
+            [validation_result, count] = (
+                KPIQuery.append_to_validation(validation_result, "Please provide the windows", count))
+            return validation_result
+
+        window_keys: list = [window.get('key') for window in request['windows']]
+        if None in window_keys or len(set(window_keys)) != len(window_keys):
+            [validation_result, count] = (
+                KPIQuery.append_to_validation(validation_result, "Please provide a unique key for every window",
+                                              count))
+        for window in request['windows']:
+            window_request: dict = KPIQuery.get_window_request(window)
+            if window_request['absolute_time_from_'] is None and window_request['relative_time_from_'] is None:
+                [validation_result, count] = (
+                    KPIQuery.append_to_validation(
+                        validation_result,
+                        f"{window.get('key')}: Please provide the absolute_time_from_ or relative_time_from_", count))
+            window_validation: dict = KPIQuery.validate_input(window_request)
+            for msg in window_validation.values():
+                [validation_result, count] = (
+                    KPIQuery.append_to_validation(validation_result, f"{window.get('key')}: {msg}", count))
+        return validation_result
+
+    def get_multi_window_query(self, request: dict, serialized: bool = False) -> dict:
+        """Generates the multi window query if inputs are valid.
+        Args:
+          :param request: The request which we are sending to query the elastic search
+          :param serialized: give the serialized query from the template of its shape, see QueryTemplate
+        Returns:
+          :response
+        """
+        validation_result = self.validate_multi_window_input(request)
+        response = {}
+        if len(validation_result) == 0:
+            response['query'] = self.construct_multi_window_query_body(request) if serialized \
+                else self.construct_multi_window_query(request)
+        else:
+            response['validation_error'] = validation_result
+
+        return response
+
+    @staticmethod
+    def validate_multi_version_input(request: dict) -> dict:
+        """Validate the multi version request.
+        Args:
+          request: The request which we are sending to query the elastic search
+        Returns:
+         :validation_result
+        """
+        validation_result: dict = {}
+        count: int = -1
+        model_versions: list = request.get('model_versions')
+        if not model_versions:
+            [validation_result, count] = (
+                KPIQuery.append_to_validation(validation_result, "Please provide the model_versions", count))
+        elif None in model_versions or len(set(model_versions)) != len(model_versions):
+            [validation_result, count] = (
+                KPIQuery.append_to_validation(validation_result, "Please provide unique model_versions", count))
+        # the time clauses are validated as in a single version request.
+        version_validation: dict = KPIQuery.validate_input(dict(request, model_version=None))
+        for msg in version_validation.values():
+            [validation_result, count] = KPIQuery.append_to_validation(validation_result, msg, count)
+        return validation_result
+
+    def get_company_query(self, request: dict, after_key: dict = None) -> dict:
+        """Generates the company query if inputs are valid.
+        Args:
+          :param request: The request which we are sending to query the elastic search
+          :param after_key: after_key of the previous page, the first page if None
         Returns:
           :response
         """
         validation_result = self.validate_input(request)
         response = {}
         if len(validation_result) == 0:
-            response['query'] = self.construct_query(request)
+            response['query'] = self.construct_company_query(request, after_key=after_key)
+        else:
+            response['validation_error'] = validation_result
+
+        return response
+
+    def get_multi_version_query(self, request: dict, serialized: bool = False) -> dict:
+        """Generates the multi version query if inputs are valid.
+        Args:
+          :param request: The request which we are sending to query the elastic search
+          :param serialized: give the serialized query from the template of its shape, see QueryTemplate
+        Returns:
+          :response
+        """
+        validation_result = self.validate_multi_version_input(request)
+        response = {}
+        if len(validation_result) == 0:
+            response['query'] = self.construct_multi_version_query_body(request) if serialized \
+                else self.construct_multi_version_query(request)
         else:
             response['validation_error'] = validation_result
 
@@ -0,0 +1,52 @@
+"""Query Template.
+This class keeps an elastic search query serialized once, with placeholders in place of its
+parameters. A query is rendered by joining the serialized segments with the JSON of the
+parameter values, so the nested query is neither built nor serialized again.
+"""
+import json
+import re
+
+
+class QueryTemplate:
+    """Serialized query with placeholders for its parameters."""
+
+    # a placeholder is a string which can not be in a query, it is serialized as "\u0000name".
+    PLACEHOLDER_PREFIX: str = '\x00'
+
+    def __init__(self, skeleton: dict):
+        """Creates the instance of QueryTemplate.
+        Args:
+            skeleton: query with the placeholders of its parameters as values, see placeholder
+        """
+        serialized: str = json.dumps(skeleton)
+        pattern: str = re.escape(json.dumps(self.PLACEHOLDER_PREFIX)[:-1]) + r'([^"\\]+)"'
+        pieces: list = re.split(pattern, serialized)
+        # the pieces are the segments of the serialized query and the names of the parameters between them.
+        self.segments: list = [piece.encode() for piece in pieces[0::2]]
+        self.parameters: list = pieces[1::2]
+
+    @staticmethod
+    def placeholder(name: str) -> str:
+        """Gets the placeholder of a parameter.
+        Args:
+            name: name of the parameter
+        Returns:
+            str: placeholder
+        """
+        return f'{QueryTemplate.PLACEHOLDER_PREFIX}{name}'
+
+    def render(self, values: dict) -> bytes:
+        """Renders the query with the values of its parameters.
+        Args:
+            values: {name of the parameter: value}, a value is serialized as JSON
+        Returns:
+            bytes: serialized query
+        Raises:
+            KeyError: If the value of a parameter is not given.
+        """
+        encoded: dict = {name: json.dumps(values[name]).encode() for name in set(self.parameters)}
+        pieces: list = [self.segments[0]]
+        for name, segment in zip(self.parameters, self.segments[1:]):
+            pieces.append(encoded[name])
+            pieces.append(segment)
+        return b''.join(pieces)
\ No newline at end of file
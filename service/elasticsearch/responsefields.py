@@ -0,0 +1,112 @@
+"""Response Fields.
+This class reads only the wanted fields of an elastic search response from its byte
+stream. The JSON events are pulled from the stream with ijson, the values at the wanted
+paths are built and every other value is skipped without being decoded into Python
+objects, so the memory is proportional to the fields which are read, not to the body.
+"""
+import ijson
+
+# an item of an array on a path.
+ITEM: str = None
+# the events which start and end a map or an array.
+START_EVENTS: frozenset = frozenset(['start_map', 'start_array'])
+END_EVENTS: frozenset = frozenset(['end_map', 'end_array'])
+
+
+class ResponseFields:
+    """Reads the values at the wanted paths of a JSON document."""
+
+    def __init__(self, paths: list):
+        """Creates the instance of ResponseFields.
+        Args:
+            paths: wanted paths, tuples of keys from the root. '*' matches any key and any array item,
+                the whole value at the end of a path is read.
+        """
+        self.paths: list = [tuple(path) for path in paths]
+
+    def match(self, path: tuple) -> int:
+        """Checks a path against the wanted paths.
+        Args:
+            path: keys from the root, ITEM for an array item
+        Returns:
+            int: 0 if no wanted path goes through it, 1 if a wanted path goes below it, 2 if it is at
+                or below the end of a wanted path
+        """
+        matched: int = 0
+        for wanted in self.paths:
+            if all(key == '*' or key == component for key, component in zip(wanted, path)):
+                if len(path) >= len(wanted):
+                    return 2
+                matched = 1
+        return matched
+
+    @staticmethod
+    def add(frames: list, field):
+        """Adds a field to the map or the array which is read.
+        Args:
+            frames: [container, path, key of the next field] of the maps and arrays which are read
+            field: value of the field
+        """
+        [container, _, key] = frames[-1]
+        if isinstance(container, dict):
+            container[key] = field
+        else:
+            container.append(field)
+
+    def parse(self, stream) -> dict:
+        """Reads the wanted paths of a JSON document.
+        The events are walked once: a value at the end of a wanted path is built with an
+        ijson.ObjectBuilder, a map or an array on the way to a wanted path is kept with only its
+        wanted fields and every other value is skipped. The path is tracked from the map keys, as
+        the dotted prefix of ijson.parse is ambiguous for the keys with a dot, like 'entity.v2'.
+        Args:
+            stream: file-like object or bytes of the document
+        Returns:
+            dict: the document with only the values at the wanted paths, the missing paths are left out
+        Raises:
+            ValueError: If the document is not valid JSON.
+        """
+        # the root is read like the field of an array.
+        frames: list = [[[], (), None]]
+        # depth of the value which is skipped or built, 0 while the events are walked.
+        depth: int = 0
+        builder = None
+        try:
+            for event, value in ijson.basic_parse(stream, use_float=True):
+                if depth:
+                    depth += (event in START_EVENTS) - (event in END_EVENTS)
+                    if builder is not None:
+                        builder.event(event, value)
+                        if not depth:
+                            self.add(frames, builder.value)
+                            builder = None
+                    continue
+                if event == 'map_key':
+                    frames[-1][2] = value
+                    continue
+                if event in END_EVENTS:
+                    frames.pop()
+                    continue
+                [container, path, key] = frames[-1]
+                if len(frames) > 1:
+                    path += (key,) if isinstance(container, dict) else (ITEM,)
+                matched: int = self.match(path)
+                if matched == 2:
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    if event in START_EVENTS:
+                        depth = 1
+                    else:
+                        self.add(frames, builder.value)
+                        builder = None
+                elif matched == 1 and event in START_EVENTS:
+                    # the maps and arrays are added when they start, their fields are added as they are read.
+                    field = {} if event == 'start_map' else []
+                    self.add(frames, field)
+                    frames.append([field, path, None])
+                elif event in START_EVENTS:
+                    depth = 1
+        except ijson.JSONError as ex:
+            raise ValueError(f'invalid JSON document: {ex}') from ex
+        document: list = frames[0][0]
+        return document[0] if document and isinstance(document[0], dict) else {}
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""Lease Status."""
+
+from enum import Enum
+
+
+class LeaseStatus(Enum):
+    """Lease status attributes."""
+    ACQUIRED: str = "ACQUIRED"
+    HELD_BY_OTHER: str = "HELD_BY_OTHER"
+    FAILED: str = "FAILED"
\ No newline at end of file
@@ -2,22 +2,33 @@
 import logging
 import uuid
 
+import numpy as np
+import pandas as pd
+
 from service.common.errormessages import ErrorMessage
 from service.dynamo.samplerate import SampleRate
+from service.reports.kpibatch import KPIBatch
 from service.configs import config
 
 
 class ICBCManager:
     """Provides the sample rates."""
 
-    def __init__(self, kpiresponse: dict):
+    # the model impacts the performance when the recall is below the threshold with enough auditor fails.
+    RECALL_THRESHOLD: float = 99.5
+    AUDITOR_FAILS_THRESHOLD: int = 100
+
+    def __init__(self, kpiresponse: dict, company_counts=None):
         """Creates the ICBCManager instance.
         Args:
            kpiresponse: response
+           company_counts: pages of the counts of every company, iterable of DataFrame, see
+               KPIReport.query_es_company_pages. The companies are not checked if not given.
         Returns:
             None:
         """
         self.kpiresponse = kpiresponse
+        self.company_counts = company_counts
 
     @staticmethod
     def get_model_performance(response: dict) -> dict:
@@ -36,16 +47,89 @@ class ICBCManager:
         if response['total_recall'] is None or response['auditor_fails_count'] is None:
             raise ValueError(ErrorMessage.TOTAL_RECALL_AUDITOR_FAILS_COUNT_ERROR1)
         if 'total_recall' in response and 'auditor_fails_count' in response:
-            if float(response['total_recall']) < 99.5 and float(response['auditor_fails_count']) >= 100:
+            if float(response['total_recall']) < ICBCManager.RECALL_THRESHOLD \
+                    and float(response['auditor_fails_count']) >= ICBCManager.AUDITOR_FAILS_THRESHOLD:
                 model_performance_impact['set_pfc_in_silent_mode'] = True
             else:
                 model_performance_impact['set_pfc_in_silent_mode'] = False
         return model_performance_impact
 
-    def check_the_model_performance_and_actioned_icbc_service(self, correlation_id: str = None) -> dict:
+    @staticmethod
+    def get_company_performance(company_counts: pd.DataFrame) -> pd.DataFrame:
+        """Checks the performance of the model for every company at once.
+        The recall of the companies is computed on the columns of the counts, the rule of
+        get_model_performance is applied to every company.
+        Args:
+            company_counts: company, true_fails and auditor_fails columns
+        Returns:
+            DataFrame: company, total_recall and auditor_fails_count of the companies below the thresholds
+        """
+        true_fails: np.ndarray = company_counts['true_fails'].to_numpy(dtype=np.float64)
+        auditor_fails: np.ndarray = company_counts['auditor_fails'].to_numpy(dtype=np.float64)
+        # the recall is rounded like the total recall of the report, np.round can differ from it on a half.
+        total_recall: np.ndarray = KPIBatch.get_rates(true_fails, auditor_fails)
+        impacted: np.ndarray = (total_recall < ICBCManager.RECALL_THRESHOLD) \
+            & (auditor_fails >= ICBCManager.AUDITOR_FAILS_THRESHOLD)
+        return pd.DataFrame({
+            'company': company_counts['company'].to_numpy()[impacted],
+            'total_recall': total_recall[impacted],
+            'auditor_fails_count': company_counts['auditor_fails'].to_numpy()[impacted]
+        })
+
+    @staticmethod
+    def check_company_performance(company_counts) -> [pd.DataFrame, int]:
+        """Checks the performance of the model for the companies of every page.
+        Only the companies below the thresholds are kept, the pages are not kept in memory.
+        Args:
+            company_counts: pages of the counts of every company, iterable of DataFrame
+        Returns:
+            [DataFrame of the companies below the thresholds, number of companies]
+        """
+        impacted_companies: list = []
+        companies_count: int = 0
+        for page in company_counts:
+            impacted_companies.append(ICBCManager.get_company_performance(page))
+            companies_count += len(page)
+        if not impacted_companies:
+            return [pd.DataFrame(columns=['company', 'total_recall', 'auditor_fails_count']), 0]
+        return [pd.concat(impacted_companies, ignore_index=True), companies_count]
+
+    def check_the_company_performance(self, model_performance: dict, correlation_id: str):
+        """Checks the performance of the model for every company, the companies below the
+        thresholds are given in model_performance['companies']. A page which is not read does
+        not fail the check of the overall performance.
+        Args:
+           model_performance: model performance of the overall check
+           correlation_id: correlation_id
+        """
+        try:
+            [companies, companies_count] = self.check_company_performance(self.company_counts)
+        except (ValueError, KeyError) as ex:
+            logging.error(
+                ex,
+                extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'company recall is not checked',
+                        'param1': 'scheduler'
+                    }})
+            return
+        model_performance['companies'] = companies.to_dict('records')
+        logging.info(
+            model_performance['companies'],
+            extra={
+                'correlation_id': correlation_id,
+                'ds_object': {
+                    'message': f'{len(companies)} of {companies_count} companies are below the recall threshold',
+                    'param1': 'scheduler'
+                }})
+
+    def check_the_model_performance_and_actioned_icbc_service(self, correlation_id: str = None,
+                                                              model_version: str = None) -> dict:
         """Checks the model performance.
         Args:
            correlation_id: correlation_id
+           model_version: model version of the report, the stable model version if not given
         Returns: dict
         """
         if correlation_id is None:
@@ -58,11 +142,15 @@ class ICBCManager:
                 if model_performance_impact['set_pfc_in_silent_mode'] is False:
                     logging.info("calling the company recall")
                     model_performance['message'] = 'company recall'
+                    if self.company_counts is not None:
+                        self.check_the_company_performance(model_performance=model_performance,
+                                                           correlation_id=correlation_id)
 
                 elif model_performance_impact['set_pfc_in_silent_mode'] is True:
                     upsert_response = SampleRate(config.icbc_params_table_name).sameplerate_upsert(
                         response=self.kpiresponse['icbc_calculation_kpis'],
-                        correlation_id=correlation_id)
+                        correlation_id=correlation_id,
+                        model_version=model_version)
 
                     if upsert_response['is_value_inserted'] is False:
                         sample_rate = upsert_response['sample_rate']
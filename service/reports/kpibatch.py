@@ -0,0 +1,102 @@
+"""KPI Batch.
+The KPIs of many bucket sets, like the windows, the model versions or the companies of
+one response, are computed at once on the columns of their counts. The rates follow the
+scalar calc methods of the KPIReport: a rate is 0 if its denominator is 0 and -1 if one
+of its buckets is missing, and it is rounded like the built-in round.
+"""
+import numpy as np
+import pandas as pd
+
+from service.reports.kpicounts import KPICounts
+
+
+class KPIBatch:
+    """Computes the KPIs of many bucket sets at once."""
+
+    # rate: (numerator, denominator), see the get methods of KPICounts.
+    RATES: dict = {
+        'total_recall': ('true_fails', 'auditor_fails'),
+        'local_recall': ('true_fails_trained_entities', 'auditor_fails_trained_entities'),
+        'total_bypass': ('pfc_bypass', 'total_ml_audit_questions'),
+        'local_bypass': ('pfc_bypass', 'received_questions'),
+        'sample_rate': ('sampled_questions', 'received_questions')
+    }
+    COUNTS: list = ['auditor_fails', 'sampled_questions']
+    # the scaled rates above this are rounded by the built-in round, the product of np.round can be off there.
+    MAX_SCALED_RATE: float = 1e9
+
+    @staticmethod
+    def get_count_frame(counts_list: list, index: list = None) -> pd.DataFrame:
+        """Gets the columns of the counts of the bucket sets.
+        Args:
+            counts_list: KPICounts of every bucket set
+            index: key of every bucket set, like the window keys, a range if not given
+        Returns:
+            DataFrame: one float column per bucket and one row per bucket set, NaN where a bucket is missing
+        """
+        return pd.DataFrame({
+            field: np.fromiter((np.nan if getattr(counts, field) is None else getattr(counts, field)
+                                for counts in counts_list), dtype=np.float64, count=len(counts_list))
+            for field in KPICounts.__slots__
+        }, index=index)
+
+    @staticmethod
+    def round_rates(rates: np.ndarray) -> np.ndarray:
+        """Rounds the rates to 2 decimals, the same as the built-in round.
+        np.round rounds the rate multiplied by 100, so the rates whose product is close to a
+        half are rounded again by the built-in round, which rounds the exact binary value.
+        Args:
+            rates: rates in percent
+        Returns:
+            np.ndarray: rounded rates
+        """
+        rounded: np.ndarray = np.round(rates, 2)
+        scaled: np.ndarray = rates * 100
+        unsure: np.ndarray = (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6) | \
+            (np.abs(scaled) >= KPIBatch.MAX_SCALED_RATE)
+        for position in np.flatnonzero(unsure):
+            rounded[position] = round(float(rates[position]), 2)
+        return rounded
+
+    @staticmethod
+    def get_rates(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        """Gets the rates in percent, see KPICounts.get_ratio.
+        Args:
+            numerator: counts, NaN where the bucket is missing
+            denominator: counts, NaN where the bucket is missing
+        Returns:
+            np.ndarray: rates rounded to 2 decimals, 0 where the denominator is 0 and -1 where a bucket is missing
+        """
+        present: np.ndarray = ~np.isnan(numerator) & ~np.isnan(denominator)
+        positive: np.ndarray = present & (denominator > 0)
+        rates: np.ndarray = np.where(present, 0.0, -1.0)
+        rates[positive] = KPIBatch.round_rates(100 * numerator[positive] / denominator[positive])
+        return rates
+
+    @staticmethod
+    def get_kpis(counts: pd.DataFrame) -> pd.DataFrame:
+        """Computes the KPIs of every bucket set.
+        Args:
+            counts: one column per bucket, see get_count_frame. A missing column is a missing bucket.
+        Returns:
+            DataFrame: the rates of RATES, auditor_fails_count and sampled_questions (-1 where missing),
+                the status of the total recall and error, True where report_payload gives the error payload.
+                It has the index of the counts.
+        """
+        def column(field: str) -> np.ndarray:
+            if field not in counts:
+                return np.full(len(counts), np.nan)
+            return counts[field].to_numpy(dtype=np.float64)
+
+        kpis: dict = {rate: KPIBatch.get_rates(column(numerator), column(denominator))
+                      for rate, (numerator, denominator) in KPIBatch.RATES.items()}
+        for field in KPIBatch.COUNTS:
+            values: np.ndarray = column(field)
+            kpis['auditor_fails_count' if field == 'auditor_fails' else field] = \
+                np.where(np.isnan(values), -1, values).astype(np.int64)
+        kpis['status'] = np.select([kpis['total_recall'] < 98, kpis['total_recall'] < 99], ['danger', 'warning'],
+                                   default='good')
+        kpis['error'] = (kpis['auditor_fails_count'] == -1)
+        for rate in ['total_recall', 'local_recall', 'total_bypass', 'local_bypass']:
+            kpis['error'] |= kpis[rate] == -1
+        return pd.DataFrame(kpis, index=counts.index)
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""KPI Counts.
+The doc counts of the KPI buckets of a response are read in one pass into a compact
+record, and every ratio of the report is computed from the record instead of walking
+the aggregations of the response again for every ratio.
+"""
+
+
+class KPICounts:
+    """Doc counts of the KPI buckets of one response, a count is None if its bucket is missing."""
+
+    PFC_BUCKETS: tuple = ('true_fails', 'true_fails_trained_entities', 'pfc_bypass',
+                          'auditor_fails_trained_entities', 'sampled_questions', 'received_questions',
+                          'auditor_fails')
+    # thousands of records are made for the buckets of the companies or the windows of one response.
+    __slots__ = PFC_BUCKETS + ('ml_audit_questions', 'total_ml_audit_questions')
+
+    def __init__(self, **counts):
+        """Creates the instance of KPICounts.
+        Args:
+            counts: {bucket: count}, the buckets which are not given are missing
+        """
+        for field in self.__slots__:
+            setattr(self, field, counts.get(field))
+
+    @classmethod
+    def from_buckets(cls, pfc_buckets: dict, ml_audit_questions: dict = None) -> 'KPICounts':
+        """Reads the doc counts of the buckets.
+        Args:
+            pfc_buckets: buckets of the pfc filters aggregation
+            ml_audit_questions: ml_audit_questions bucket of the ml_audit aggregation, missing if None
+        Returns:
+            KPICounts: counts of the buckets
+        """
+        counts: KPICounts = cls()
+        for bucket in cls.PFC_BUCKETS:
+            doc_count = pfc_buckets.get(bucket, {}).get('doc_count')
+            if doc_count is not None:
+                setattr(counts, bucket, doc_count)
+        if ml_audit_questions is not None:
+            counts.ml_audit_questions = ml_audit_questions.get('doc_count')
+            total_ml_audit_questions: dict = ml_audit_questions.get('total_ml_audit_questions')
+            if total_ml_audit_questions is not None:
+                # the sum of a bucket without documents can be null.
+                counts.total_ml_audit_questions = total_ml_audit_questions.get('value') or 0
+        return counts
+
+    @classmethod
+    def from_response(cls, resp: dict) -> 'KPICounts':
+        """Reads the doc counts of the buckets of a response. The pfc aggregation is read from the
+        pfc_stable filter aggregation when the query nests it there.
+        Args:
+            resp: response from the elastic search
+        Returns:
+            KPICounts: counts of the buckets
+        """
+        aggregations: dict = resp.get('aggregations', {})
+        pfc: dict = aggregations.get('pfc_stable', {}).get('pfc', aggregations.get('pfc', {}))
+        return cls.from_buckets(
+            pfc_buckets=pfc.get('buckets', {}),
+            ml_audit_questions=aggregations.get('ml_audit', {}).get('buckets', {}).get('ml_audit_questions'))
+
+    @staticmethod
+    def get_ratio(numerator: int, denominator) -> float:
+        """Gets a ratio in percent.
+        Args:
+            numerator: count, None if its bucket is missing
+            denominator: count, None if its bucket is missing
+        Returns:
+            float: ratio rounded to 2 decimals, 0 if the denominator is 0 and -1 if a bucket is missing
+        """
+        if numerator is None or denominator is None:
+            return -1
+        if denominator > 0:
+            return round(100 * numerator / denominator, 2)
+        return 0
+
+    def get_total_recall(self) -> float:
+        """Gets the total recall, the true fails of the auditor fails."""
+        return self.get_ratio(self.true_fails, self.auditor_fails)
+
+    def get_local_recall(self) -> float:
+        """Gets the local recall, the true fails of the auditor fails of the trained entities."""
+        return self.get_ratio(self.true_fails_trained_entities, self.auditor_fails_trained_entities)
+
+    def get_total_bypass(self) -> float:
+        """Gets the total bypass, the bypassed questions of the ml audit questions."""
+        return self.get_ratio(self.pfc_bypass, self.total_ml_audit_questions)
+
+    def get_local_bypass(self) -> float:
+        """Gets the local bypass, the bypassed questions of the received questions."""
+        return self.get_ratio(self.pfc_bypass, self.received_questions)
+
+    def get_sample_rate(self) -> float:
+        """Gets the sample rate, the sampled questions of the received questions."""
+        return self.get_ratio(self.sampled_questions, self.received_questions)
+
+    def get_count(self, bucket: str) -> int:
+        """Gets the count of a bucket.
+        Args:
+            bucket: name of the bucket
+        Returns:
+            int: doc count, -1 if the bucket is missing
+        """
+        count = getattr(self, bucket)
+        return -1 if count is None else count
+
+    def is_complete(self) -> bool:
+        """Checks that every bucket is given.
+        Returns:
+            True if no bucket is missing
+        """
+        return all(getattr(self, field) is not None for field in self.__slots__)
+
+    def to_dict(self) -> dict:
+        """Gets the counts as a dictionary.
+        Returns:
+            dict: {bucket: count}
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
\ No newline at end of file
@@ -1,25 +1,44 @@
-""Report to calculate the recall and bypass."""
+"""Report to calculate the recall and bypass."""
+from datetime import date, datetime, timedelta, timezone
+from service.common.dateutils import DateUtils
 from service.common.errormessages import ErrorMessage
 from service.configs import config
+from service.dynamo.dailykpicounters import DailyKPICounters
+import json
 import uuid
 import logging
+import numpy as np
+import pandas as pd
+from service.common.httpsession import AsyncPooledHTTPSession, PooledHTTPSession
 from service.elasticsearch.kpiquery import KPIQuery
-from concurdatascience.utility import (
-    create_http_client, prepare_request_headers
-)
+from service.elasticsearch.responsefields import ResponseFields
+from service.reports.kpicounts import KPICounts
+from concurdatascience.utility import prepare_request_headers
 from urllib.parse import urlparse
 
 
 class KPIReport:
     """Generates the KPI report."""
 
+    REQUEST_TIMEOUT: tuple = (60.0, 120.0)
+    COMPANY_BUCKETS: list = ['true_fails', 'auditor_fails']
+    PFC_BUCKETS: list = list(KPICounts.PFC_BUCKETS)
+    # the fields of the aggregations which are read by report_payload and get_counts, see ResponseFields.
+    KPI_PATHS: list = [
+        ('ml_audit', 'buckets', 'ml_audit_questions', 'doc_count'),
+        ('ml_audit', 'buckets', 'ml_audit_questions', 'total_ml_audit_questions', 'value'),
+        ('pfc', 'buckets', '*', 'doc_count'),
+        ('pfc_stable', 'pfc', 'buckets', '*', 'doc_count')
+    ]
+
     def __init__(
             self, logging_service_endpoint: str, request_max_retries: int = 2,
             request_req_timeout_per_try_ms: int = 60000,
             request_req_timeout_total_ms: int = 120000,
             sleep_time_after_initial_request_ms: int = 5000,
             sleep_time_between_checks_ms: int = 2000,
-            max_wait_time_ms: int = 90000):
+            max_wait_time_ms: int = 90000,
+            streaming_parse: bool = None):
         """Creates an instance of the KPIReport class.
         Args:
             logging_service_endpoint (str): The base URL for the logging service
@@ -30,6 +49,8 @@ class KPIReport:
                 request and the first check.
             sleep_time_between_checks_ms (int): Sleep time (ms) between each check.
             max_wait_time_ms (int): Max timeout of the entire process.
+            streaming_parse (bool): Read only the KPI fields from the byte stream of the responses,
+                config.es_streaming_parse_enabled if not given.
         Raises:
             ValueError: If logging_service_endpoint is empty.
         """
@@ -37,6 +58,7 @@ class KPIReport:
             raise ValueError("logging service endpoint is null")
 
         self.logging_service_url: str = f"{logging_service_endpoint}/*:log-2/_search"
+        self.logging_service_msearch_url: str = f"{logging_service_endpoint}/*:log-2/_msearch"
         self.request_max_retries: int = max(1, int(request_max_retries))
         self.request_req_timeout_per_try_ms: int = max(1000, int(request_req_timeout_per_try_ms))
         self.request_req_timeout_total_ms: int = max(2000, int(request_req_timeout_total_ms))
@@ -44,171 +66,78 @@ class KPIReport:
         self.sleep_time_between_checks_ms: int = max(1000, int(sleep_time_between_checks_ms))
         self.max_wait_time_ms: int = max(1000, int(max_wait_time_ms))
         self.environment: str = config.environment
+        self.streaming_parse: bool = config.es_streaming_parse_enabled if streaming_parse is None \
+            else streaming_parse
 
     @staticmethod
     def calc_local_recall(resp) -> float:
         """Calculate the local recall.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-          :aram resp:
+            float: -1 if the buckets are missing, see KPICounts
         """
-        if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'auditor_fails_trained_entities' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["auditor_fails_trained_entities"] \
-                and 'true_fails_trained_entities' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["true_fails_trained_entities"]:
-
-            auditor_fails_trained_entities_doc_count = (
-                resp)["aggregations"]["pfc"]["buckets"]["auditor_fails_trained_entities"]["doc_count"]
-            if auditor_fails_trained_entities_doc_count > 0:
-                return round(
-                    100 * resp["aggregations"]["pfc"]["buckets"]["true_fails_trained_entities"]["doc_count"] /
-                    auditor_fails_trained_entities_doc_count, 2)
-            else:
-                return 0
-        else:
-            return -1
+        return KPICounts.from_response(resp).get_local_recall()
 
     @staticmethod
     def calc_total_recall(resp) -> float:
         """Calculate the total recall.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-           :param resp:
+            float: -1 if the buckets are missing, see KPICounts
         """
-        if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'auditor_fails' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["auditor_fails"] \
-                and 'true_fails' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["true_fails"]:
-
-            auditor_fails_doc_count = resp["aggregations"]["pfc"]["buckets"]["auditor_fails"]["doc_count"]
-            if auditor_fails_doc_count > 0:
-                return round(
-                    100 * resp["aggregations"]["pfc"]["buckets"]["true_fails"]["doc_count"] /
-                    auditor_fails_doc_count, 2)
-            else:
-                return 0
-        else:
-            return -1
+        return KPICounts.from_response(resp).get_total_recall()
 
     @staticmethod
     def calc_total_bypass(resp) -> float:
         """Calculate total bypass.
         Args:
-          resp: The request which we are sending to query the elastic search
-        Returns:
-           :param resp:
-        """
-        if 'aggregations' in resp \
-                and 'ml_audit' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["ml_audit"] \
-                and 'ml_audit_questions' in resp["aggregations"]["ml_audit"]["buckets"] \
-                and 'total_ml_audit_questions' in resp["aggregations"]["ml_audit"]["buckets"]["ml_audit_questions"] \
-                and 'pfc_bypass' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["pfc_bypass"]:
-
-            total_ml_audit_questions = (
-                resp)["aggregations"]["ml_audit"]["buckets"]["ml_audit_questions"]["total_ml_audit_questions"][
-                "value"]
-            if total_ml_audit_questions > 0:
-                return round(
-                    100 * resp["aggregations"]["pfc"]["buckets"]["pfc_bypass"]["doc_count"] /
-                    total_ml_audit_questions, 2)
-            else:
-                return 0
-        else:
-            return -1
+          resp: response from the elastic search
+        Returns:
+            float: -1 if the buckets are missing, see KPICounts
+        """
+        return KPICounts.from_response(resp).get_total_bypass()
 
     @staticmethod
     def calc_local_bypass(resp) -> float:
         """Calculate the local bypass.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-            :param resp:
+            float: -1 if the buckets are missing, see KPICounts
         """
-        if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'received_questions' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["received_questions"] \
-                and 'pfc_bypass' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["pfc_bypass"]:
-
-            received_questions_doc_count = resp["aggregations"]["pfc"]["buckets"]["received_questions"]["doc_count"]
-            if received_questions_doc_count > 0:
-                return round(
-                    100 * resp["aggregations"]["pfc"]["buckets"]["pfc_bypass"]["doc_count"] /
-                    received_questions_doc_count, 2)
-            else:
-                return 0
-        else:
-            return -1
+        return KPICounts.from_response(resp).get_local_bypass()
 
     @staticmethod
     def calc_sample_rate(resp) -> float:
         """Calculate the sample rate.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-            :param resp:
+            float: -1 if the buckets are missing, see KPICounts
         """
-        if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'received_questions' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["received_questions"] \
-                and 'sampled_questions' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["sampled_questions"]:
-
-            received_questions_doc_count = resp["aggregations"]["pfc"]["buckets"]["received_questions"]["doc_count"]
-            if received_questions_doc_count > 0:
-                return round(
-                    100 * resp["aggregations"]["pfc"]["buckets"]["sampled_questions"]["doc_count"] /
-                    received_questions_doc_count, 2)
-            else:
-                return 0
-        else:
-            return -1
+        return KPICounts.from_response(resp).get_sample_rate()
 
     @staticmethod
     def get_auditor_fails_document(resp) -> int:
         """Gets the auditor fails document.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-            :param resp:
-       """
-       if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'auditor_fails' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["auditor_fails"]:
-            return resp["aggregations"]["pfc"]["buckets"]["auditor_fails"]["doc_count"]
-        return -1
+            int: -1 if the buckets are missing, see KPICounts
+        """
+        return KPICounts.from_response(resp).get_count('auditor_fails')
 
     @staticmethod
     def get_sampled_questions(resp) -> int:
         """Gets the number sampled questions.
         Args:
-          resp: The request which we are sending to query the elastic search
+          resp: response from the elastic search
         Returns:
-            :param resp:
-      """
-      if 'aggregations' in resp \
-                and 'pfc' in resp["aggregations"] \
-                and 'buckets' in resp["aggregations"]["pfc"] \
-                and 'sampled_questions' in resp["aggregations"]["pfc"]["buckets"] \
-                and 'doc_count' in resp["aggregations"]["pfc"]["buckets"]["sampled_questions"]:
-            return resp["aggregations"]["pfc"]["buckets"]["sampled_questions"]["doc_count"]
-        return -1
+            int: -1 if the buckets are missing, see KPICounts
+        """
+        return KPICounts.from_response(resp).get_count('sampled_questions')
 
     @staticmethod
     def set_status(total_recall: float) -> str:
@@ -225,6 +154,27 @@ class KPIReport:
             status = "warning"
         return status
 
+    @staticmethod
+    def lift_pfc_stable_aggregation(resp: dict) -> dict:
+        """Moves the pfc aggregation out of the pfc_stable filter aggregation.
+        The query applies the metric service filter once in the pfc_stable aggregation, and
+        the pfc buckets are nested in it. The model versions are read from aggregations.model_versions.
+        Args:
+          resp: response from the elastic search
+        Returns:
+            :resp with the pfc aggregation at the top level
+        """
+        if 'aggregations' not in resp \
+                or 'pfc_stable' not in resp["aggregations"] \
+                or 'pfc' not in resp["aggregations"]["pfc_stable"]:
+            return resp
+        aggregations: dict = dict(resp["aggregations"])
+        pfc_stable: dict = aggregations.pop('pfc_stable')
+        aggregations['pfc'] = pfc_stable['pfc']
+        if 'model_versions' in pfc_stable:
+            aggregations['model_versions'] = pfc_stable['model_versions']
+        return dict(resp, aggregations=aggregations)
+
     def report_payload(self, resp: dict) -> dict:
         """Report the payload.
         Args:
@@ -232,12 +182,22 @@ class KPIReport:
         Returns:
             :param resp:
         """
-        total_recall: float = self.calc_total_recall(resp)
-        local_recall: float = self.calc_local_recall(resp)
-        total_bypass: float = self.calc_total_bypass(resp)
-        local_bypass: float = self.calc_local_bypass(resp)
-        auditor_fails_count: int = self.get_auditor_fails_document(resp)
-        sampled_questions: int = self.get_sampled_questions(resp)
+        return self.get_payload(KPICounts.from_response(resp))
+
+    @staticmethod
+    def get_payload(counts: KPICounts) -> dict:
+        """Gets the payload of the counts of the KPI buckets.
+        Args:
+          counts: counts read from the response in one pass
+        Returns:
+            dict: payload, see report_payload
+        """
+        total_recall: float = counts.get_total_recall()
+        local_recall: float = counts.get_local_recall()
+        total_bypass: float = counts.get_total_bypass()
+        local_bypass: float = counts.get_local_bypass()
+        auditor_fails_count: int = counts.get_count('auditor_fails')
+        sampled_questions: int = counts.get_count('sampled_questions')
         if (total_recall == -1 or
                 local_recall == -1 or
                 total_bypass == -1 or
@@ -249,7 +209,7 @@ class KPIReport:
             }
             return payload
 
-        status: str = self.set_status(total_recall)
+        status: str = KPIReport.set_status(total_recall)
         payload: dict = {
             "kibana_kpis": (
                 f"Total Recall: {str(total_recall)}% || Total Bypass: {str(total_bypass)}% || Local Recall: "
@@ -266,6 +226,307 @@ class KPIReport:
         }
         return payload
 
+    def report_payload_per_window(self, resp: dict) -> dict:
+        """Report the payload of every window of a multi window response.
+        Args:
+          resp: response of the multi window query from the elastic search
+        Returns:
+            dict: {window key: payload}
+        """
+        if 'aggregations' not in resp \
+                or 'windows' not in resp["aggregations"] \
+                or 'buckets' not in resp["aggregations"]["windows"]:
+            return {
+                "error": ErrorMessage.KEY_ERROR1,
+                "status": "danger"
+            }
+        return {
+            key: self.report_payload({'aggregations': bucket})
+            for key, bucket in resp["aggregations"]["windows"]["buckets"].items()
+        }
+
+    def report_payload_per_model_version(self, resp: dict, model_versions: list) -> dict:
+        """Report the payload of every model version of a multi version response.
+        The ml_audit aggregation and the pfc_bypass bucket are shared by every model version.
+        Args:
+          resp: response of the multi version query from the elastic search
+          model_versions: model versions of the query
+        Returns:
+            dict: {model version: payload}, a model version without documents gets the error payload.
+        """
+        resp = self.lift_pfc_stable_aggregation(resp)
+        if 'aggregations' not in resp \
+                or 'model_versions' not in resp["aggregations"] \
+                or 'buckets' not in resp["aggregations"]["model_versions"]:
+            return {
+                "error": ErrorMessage.KEY_ERROR1,
+                "status": "danger"
+            }
+        aggregations: dict = resp["aggregations"]
+        shared_buckets: dict = aggregations.get('pfc', {}).get('buckets', {})
+        ml_audit_questions: dict = aggregations.get('ml_audit', {}).get('buckets', {}).get('ml_audit_questions')
+        version_buckets: dict = {
+            bucket['key']: bucket.get('pfc', {}).get('buckets', {})
+            for bucket in aggregations["model_versions"]["buckets"]
+        }
+        payloads: dict = {}
+        for model_version in model_versions:
+            if model_version not in version_buckets:
+                payloads[model_version] = {
+                    "error": ErrorMessage.KEY_ERROR1,
+                    "status": "danger"
+                }
+                continue
+            payloads[model_version] = self.get_payload(KPICounts.from_buckets(
+                pfc_buckets=dict(version_buckets[model_version], **shared_buckets),
+                ml_audit_questions=ml_audit_questions))
+        return payloads
+
+    @staticmethod
+    def get_counts(resp: dict):
+        """Gets the counts of the KPI buckets of a response.
+        Args:
+          resp: response from the elastic search
+        Returns:
+          dict: {bucket: count}, None if some buckets are missing
+        """
+        counts: KPICounts = KPICounts.from_response(resp)
+        return counts.to_dict() if counts.is_complete() else None
+
+    @staticmethod
+    def get_counts_response(counts: dict) -> dict:
+        """Gets a response with the given counts of the KPI buckets, it can be given to report_payload.
+        Args:
+          counts: {bucket: count}
+        Returns:
+          dict: response
+        """
+        return {
+            'aggregations': {
+                'ml_audit': {
+                    'buckets': {
+                        'ml_audit_questions': {
+                            'doc_count': counts['ml_audit_questions'],
+                            'total_ml_audit_questions': {'value': counts['total_ml_audit_questions']}
+                        }
+                    }
+                },
+                'pfc': {
+                    'buckets': {bucket: {'doc_count': counts[bucket]} for bucket in KPIReport.PFC_BUCKETS}
+                }
+            }
+        }
+
+    @staticmethod
+    def add_counts(counts_list: list) -> dict:
+        """Adds the counts of the KPI buckets.
+        Args:
+          counts_list: list of {bucket: count}
+        Returns:
+          dict: {bucket: sum of the counts}
+        """
+        total: dict = {}
+        for counts in counts_list:
+            for bucket, count in counts.items():
+                total[bucket] = total.get(bucket, 0) + count
+        return total
+
+    def query_window_counts(self, kpi_input_request: dict, correlation_id: str) -> dict:
+        """Query the elastic search once for many time windows, and gets the counts of every window.
+        Args:
+          kpi_input_request: multi window request, see query_es_multi_window
+          correlation_id: correlation_id
+        Returns:
+          dict: {window key: counts}, or {'error': error}
+        """
+        try:
+            # validating the elastic search url.
+            result = self.is_url(self.logging_service_url)
+            if result is False:
+                raise ValueError(f"invalid url {self.logging_service_url}")
+            query_res: dict = KPIQuery().get_multi_window_query(kpi_input_request, serialized=True)
+            if 'validation_error' in query_res:
+                raise ValueError(query_res['validation_error'])
+            resp = self.post_query(query=query_res['query'], correlation_id=correlation_id)
+        except Exception as ex:
+            return self.log_query_error(ex=ex, correlation_id=correlation_id)
+        try:
+            if resp.status_code != 200:
+                logging.error({resp},
+                              extra={
+                                  'correlation_id': correlation_id,
+                                  'ds_object': {
+                                      'message': f'error calling the {self.logging_service_url} ',
+                                      'param1': 'scheduler'
+                                  }})
+                return {'error': resp}
+            body: dict = self.read_body(resp, paths=self.get_kpi_paths(('aggregations', 'windows', 'buckets', '*')))
+        finally:
+            # the connection is given back to the pool, also when the body is not read.
+            resp.close()
+        buckets: dict = body.get('aggregations', {}).get('windows', {}).get('buckets', {})
+        counts: dict = {key: self.get_counts({'aggregations': bucket}) for key, bucket in buckets.items()}
+        if len(counts) != len(kpi_input_request['windows']) or None in counts.values():
+            return {
+                "error": ErrorMessage.KEY_ERROR1,
+                "status": "danger"
+            }
+        return counts
+
+    @staticmethod
+    def get_company_counts(resp: dict) -> pd.DataFrame:
+        """Gets the true fails and the auditor fails of every company of a page.
+        Args:
+          resp: response of the company query
+        Returns:
+          DataFrame: company, true_fails and auditor_fails columns, one row per company
+        """
+        buckets: list = resp.get('aggregations', {}).get('pfc_stable', {}).get('companies', {}).get('buckets', [])
+        columns: dict = {'company': [bucket.get('key', {}).get('company') for bucket in buckets]}
+        # a bucket without the count of a column has no document of the column.
+        for column in KPIReport.COMPANY_BUCKETS:
+            columns[column] = np.fromiter(
+                (bucket.get('pfc', {}).get('buckets', {}).get(column, {}).get('doc_count', 0) for bucket in buckets),
+                dtype=np.int64, count=len(buckets))
+        return pd.DataFrame(columns)
+
+    def query_es_company_pages(self, kpi_input_request: dict, correlation_id: str = None):
+        """Query the elastic search for the counts of every company, one page at a time.
+        The next page is read only when the consumer asks for it, so only one page of
+        companies is kept in memory however many companies there are.
+        Args:
+          kpi_input_request: The request which we are sending to query the elastic search
+          correlation_id: correlation_id
+        Yields:
+          DataFrame: counts of the companies of a page, see get_company_counts
+        Raises:
+          ValueError: If a page is not read.
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        after_key: dict = None
+        while True:
+            try:
+                query: dict = self.get_kpi_query(
+                    kpi_input_request,
+                    get_query=lambda kpiquery, request: kpiquery.get_company_query(request, after_key=after_key))
+                resp = self.post_query(query=query, correlation_id=correlation_id)
+            except Exception as ex:
+                self.log_query_error(ex=ex, correlation_id=correlation_id)
+                raise ValueError(f'companies after {after_key} are not read: {ex}') from ex
+            try:
+                if resp.status_code != 200:
+                    logging.error({resp},
+                                  extra={
+                                      'correlation_id': correlation_id,
+                                      'ds_object': {
+                                          'message': f'error calling the {self.logging_service_url} ',
+                                          'param1': 'scheduler'
+                                      }})
+                    raise ValueError(f'companies after {after_key} are not read: {resp.status_code}')
+                body: dict = self.read_body(resp, paths=[
+                    ('aggregations', 'pfc_stable', 'companies', 'after_key'),
+                    ('aggregations', 'pfc_stable', 'companies', 'buckets', '*', 'key'),
+                    ('aggregations', 'pfc_stable', 'companies', 'buckets', '*', 'pfc', 'buckets', '*', 'doc_count')])
+            finally:
+                resp.close()
+            page: pd.DataFrame = self.get_company_counts(body)
+            if len(page) > 0:
+                yield page
+            after_key = body.get('aggregations', {}).get('pfc_stable', {}).get('companies', {}).get('after_key')
+            # a page which is not full is the last page.
+            if after_key is None or len(page) < config.company_buckets_size:
+                return
+
+    def query_es_companies(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search for the counts of every company.
+        Args:
+          kpi_input_request: The request which we are sending to query the elastic search
+          correlation_id: correlation_id
+        Returns:
+          dict: {'companies': DataFrame of get_company_counts}, or {'error': error}
+        """
+        try:
+            pages: list = list(self.query_es_company_pages(kpi_input_request, correlation_id=correlation_id))
+        except ValueError as ex:
+            return {'error': ex}
+        if not pages:
+            return {'companies': self.get_company_counts({})}
+        return {'companies': pd.concat(pages, ignore_index=True)}
+
+    @staticmethod
+    def get_day_window(day: date) -> dict:
+        """Gets the window of a complete UTC day.
+        Args:
+          day: UTC day
+        Returns:
+          dict: window of the multi window request, the key is the day in iso format
+        """
+        day_start: datetime = datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc)
+        return {
+            'key': day.isoformat(),
+            'relative_time_from_': day_start.isoformat(),
+            'relative_time_to_': (day_start + timedelta(days=1)).isoformat()
+        }
+
+    def query_es_incremental(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search for the last 24 hours or the last 7 days with the daily KPI counters.
+        The 24 hours report also counts the newest settled day, and stores its counts. The 7 days
+        report adds the stored days to the counts of the oldest and the newest slices of the week,
+        so only these slices are read from the elastic search. The whole week is read, and the
+        missing days are stored, only when some days are not stored. The other requests are
+        given to query_es.
+        Args:
+          kpi_input_request: The request which we are sending to query the elastic search
+          correlation_id: correlation_id
+        Returns:
+          payload: dictionary, see query_es
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        window: tuple = (str(kpi_input_request.get('absolute_time_from_')), kpi_input_request.get('time_unit_'))
+        if kpi_input_request.get('relative_time_from_') is not None or kpi_input_request.get('relative_time_to_') \
+                or window not in [('24', 'h'), ('7', 'd')]:
+            return self.query_es(kpi_input_request, correlation_id=correlation_id)
+
+        model_version: str = kpi_input_request.get('model_version')
+        daily_kpi_counters: DailyKPICounters = DailyKPICounters(config.icbc_params_table_name)
+        now: datetime = DateUtils.get_current_utc_time()
+        today: date = now.date()
+        days: list = [DailyKPICounters.get_settled_day(today)] if window == ('24', 'h') \
+            else DailyKPICounters.get_stored_days(today)
+        stored_counts: dict = daily_kpi_counters.get_days(
+            model_version=model_version, days=days, correlation_id=correlation_id) or {}
+        missing_days: list = [day for day in days if stored_counts.get(day) is None]
+
+        windows: list = [{'key': 'report', 'absolute_time_from_': window[0], 'time_unit_': window[1]}]
+        if window == ('7', 'd') and not missing_days:
+            # the week is the oldest slice, the stored days and the newest slice.
+            windows = [
+                {'key': 'oldest',
+                 'relative_time_from_': (now - timedelta(days=7)).isoformat(),
+                 'relative_time_to_': self.get_day_window(days[0])['relative_time_from_']},
+                {'key': 'newest',
+                 'relative_time_from_': self.get_day_window(days[-1])['relative_time_to_'],
+                 'relative_time_to_': now.isoformat()}
+            ]
+        windows += [self.get_day_window(day) for day in missing_days]
+        counts: dict = self.query_window_counts(
+            {'windows': windows, 'model_version': model_version}, correlation_id=correlation_id)
+        if 'error' in counts:
+            return counts
+
+        for day in missing_days:
+            daily_kpi_counters.put_day(model_version=model_version, day=day, counts=counts[day.isoformat()],
+                                       correlation_id=correlation_id)
+        if 'report' in counts:
+            report_counts: dict = counts['report']
+        else:
+            report_counts: dict = self.add_counts(
+                [counts['oldest'], counts['newest']] + [stored_counts[day] for day in days])
+        return self.report_response(resp=None, status_code=200, body=self.get_counts_response(report_counts),
+                                    correlation_id=correlation_id)
+
     @staticmethod
     def is_url(url: str) -> bool:
         """Report the payload.
@@ -280,6 +541,197 @@ class KPIReport:
         except ValueError:
             return False
 
+    def get_request_headers(self, correlation_id: str) -> dict:
+        """Gets the headers of the request to the logging service.
+        Args:
+          correlation_id: correlation_id
+        Returns:
+          dict: headers
+        """
+        return prepare_request_headers(
+            correlation_id=correlation_id,
+            request_max_retries=self.request_max_retries,
+            request_req_timeout_per_try_ms=self.request_req_timeout_per_try_ms,
+            connection_close=False
+        )
+
+    def post_query(self, query, correlation_id: str):
+        """Posts the query to the elastic search.
+        Args:
+          query: elastic search query, dict or bytes of the serialized query
+          correlation_id: correlation_id
+        Returns:
+          response of the logging service
+        """
+        headers: dict = self.get_request_headers(correlation_id=correlation_id)
+        body: dict = {'json': query}
+        if isinstance(query, bytes):
+            # a serialized query is sent as it is, it is not serialized again.
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+            body = {'data': query}
+        # the session of the process is shared, so the keep-alive connections are reused.
+        resp = PooledHTTPSession.post(
+            url=self.logging_service_url,
+            headers=headers,
+            timeout=self.REQUEST_TIMEOUT,
+            stream=self.streaming_parse,
+            **body
+        )
+        # the stats are read on every request, they are logged only when debugging the pool.
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(
+                f"http session stats {PooledHTTPSession.get_stats()}", extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'http session stats',
+                        'param1': 'scheduler'
+                    }})
+        return resp
+
+    @staticmethod
+    def get_msearch_body(queries: list) -> bytes:
+        """Gets the NDJSON body of the multi search of the queries.
+        Every query is given after an empty header, so it searches the index of the url.
+        Args:
+          queries: elastic search queries, dict or bytes of the serialized query
+        Returns:
+          bytes: NDJSON body
+        """
+        return b''.join(b'{}\n' + (query if isinstance(query, bytes) else json.dumps(query).encode()) + b'\n'
+                        for query in queries)
+
+    def post_msearch(self, queries: list, correlation_id: str):
+        """Posts the queries to the elastic search with one multi search request.
+        Args:
+          queries: elastic search queries
+          correlation_id: correlation_id
+        Returns:
+          response of the logging service
+        """
+        headers: dict = dict(self.get_request_headers(correlation_id=correlation_id))
+        headers['Content-Type'] = 'application/x-ndjson'
+        return PooledHTTPSession.post(
+            url=self.logging_service_msearch_url,
+            data=self.get_msearch_body(queries),
+            headers=headers,
+            timeout=self.REQUEST_TIMEOUT,
+            stream=self.streaming_parse
+        )
+
+    def read_body(self, resp, paths: list) -> dict:
+        """Decodes the body of a response of the logging service.
+        In the streaming mode only the fields at the paths are read from the byte stream of the
+        body, see ResponseFields. The caller closes the response, so the connection is given back
+        to the pool on every path.
+        Args:
+          resp: response of the logging service
+          paths: paths of the fields which are read in the streaming mode
+        Returns:
+          dict: decoded body
+        """
+        if not self.streaming_parse:
+            return resp.json()
+        resp.raw.decode_content = True
+        return ResponseFields(paths).parse(resp.raw)
+
+    @staticmethod
+    def get_kpi_paths(prefix: tuple) -> list:
+        """Gets the paths of the KPI fields of the aggregations at the prefix.
+        Args:
+          prefix: path of the aggregations
+        Returns:
+          list: paths, see ResponseFields
+        """
+        return [prefix + path for path in KPIReport.KPI_PATHS]
+
+    @staticmethod
+    def get_serialized_query(kpiquery: KPIQuery, kpi_input_request: dict) -> dict:
+        """Generates the serialized query from the template of the single window queries.
+        Args:
+          kpiquery: KPIQuery
+          kpi_input_request: The request which we are sending to query the elastic search
+        Returns:
+          dict: see KPIQuery.get_query
+        """
+        return kpiquery.get_query(kpi_input_request, serialized=True)
+
+    def get_kpi_query(self, kpi_input_request: dict, get_query=KPIQuery.get_query) -> dict:
+        """Validates the url and the request, and gets the elastic search query.
+        Args:
+          kpi_input_request: The request which we are sending to query the elastic search
+          get_query: method of the KPIQuery which generates the query, KPIQuery.get_query if not given
+        Returns:
+          dict: elastic search query, the bytes of the query if get_query gives the serialized query
+        Raises:
+          ValueError: If the url or the request is invalid.
+        """
+        # validating the elastic search url.
+        result = self.is_url(self.logging_service_url)
+        if result is False:
+            raise ValueError(f"invalid url {self.logging_service_url}")
+        kpiquery: KPIQuery = KPIQuery()
+        query_res: dict = get_query(kpiquery, kpi_input_request)
+        if 'validation_error' in query_res:
+            raise ValueError(query_res['validation_error'])
+        return query_res['query']
+
+    @staticmethod
+    def log_query_error(ex: Exception, correlation_id: str) -> dict:
+        """Logs the error raised while querying the elastic search.
+        Args:
+          ex: error
+          correlation_id: correlation_id
+        Returns:
+          dict: {'error': ex}
+        """
+        logging.error({ex},
+                      extra={
+                          'correlation_id': correlation_id,
+                          'ds_object': {
+                              'message': f'{type(ex).__name__} - {ex}',
+                              'param1': 'scheduler'
+                          }})
+        return {'error': ex}
+
+    def report_response(self, resp, status_code: int, body: dict, correlation_id: str) -> dict:
+        """Gets the payload from the response of the elastic search.
+        Args:
+          resp: response of the logging service, given back as the error if the status code is not 200
+          status_code: status code of the response
+          body: decoded body of the response
+          correlation_id: correlation_id
+        Returns:
+          payload: dictionary, see query_es
+        """
+        if status_code != 200:
+            logging.error({resp},
+                          extra={
+                              'correlation_id': correlation_id,
+                              'ds_object': {
+                                  'message': f'error calling the {self.logging_service_url} ',
+                                  'param1': 'scheduler'
+                              }})
+
+            return {'error': resp}
+        payload: dict = self.report_payload(body)
+        if 'error' not in payload:
+            logging.info(
+                f"After calling the report payload {payload['kibana_kpis']}", extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'kpisreport',
+                        'param1': 'scheduler'
+                    }})
+        else:
+            logging.error(
+                f"Error after calling the report payload {payload['error']}", extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'kpisreport',
+                        'param1': 'scheduler'
+                    }})
+        return payload
+
     def query_es(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
         """Query the elastic search.
         Args:
@@ -294,7 +746,61 @@ class KPIReport:
             'local_bypass': 32
           }
         """
-        payload: dict = {}
+        try:
+            if correlation_id is None:
+                correlation_id: str = str(uuid.uuid4())
+            query: bytes = self.get_kpi_query(kpi_input_request, get_query=self.get_serialized_query)
+            resp = self.post_query(query=query, correlation_id=correlation_id)
+        except Exception as ex:
+            return self.log_query_error(ex=ex, correlation_id=correlation_id)
+        try:
+            return self.report_response(resp=resp, status_code=resp.status_code,
+                                        body=self.read_body(resp, paths=self.get_kpi_paths(('aggregations',)))
+                                        if resp.status_code == 200 else None,
+                                        correlation_id=correlation_id)
+        finally:
+            # the connection is given back to the pool, also when the body is not read.
+            resp.close()
+
+    async def query_es_async(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search without blocking the event loop.
+        The query runs on the pooled non-blocking session of the running event loop, so
+        many reports can wait for the elastic search at once on one thread.
+        Args:
+          kpi_input_request: The request which we are sending to query the elastic search
+          correlation_id: correlation_id
+        Returns:
+          payload: dictionary, see query_es
+        """
+        try:
+            if correlation_id is None:
+                correlation_id: str = str(uuid.uuid4())
+            query: dict = self.get_kpi_query(kpi_input_request)
+            [status_code, body] = await AsyncPooledHTTPSession.post(
+                url=self.logging_service_url,
+                json=query,
+                headers=self.get_request_headers(correlation_id=correlation_id),
+                timeout=self.REQUEST_TIMEOUT
+            )
+        except Exception as ex:
+            return self.log_query_error(ex=ex, correlation_id=correlation_id)
+        return self.report_response(resp=status_code, status_code=status_code, body=body,
+                                    correlation_id=correlation_id)
+
+    def query_es_multi_window(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search once for many time windows.
+        Args:
+          kpi_input_request: {'windows': [{'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+                                          {'key': '7-days', 'absolute_time_from_': 7, 'time_unit_': 'd'}],
+                              'model_version': model_version}
+          correlation_id: correlation_id
+        Returns:
+          payloads: dictionary, the payload of every window as given by query_es
+          {
+            '24-hours': {'kibana_kpis': ..., 'status': ..., 'icbc_calculation_kpis': {...}},
+            '7-days': {'kibana_kpis': ..., 'status': ..., 'icbc_calculation_kpis': {...}}
+          }
+        """
         try:
             if correlation_id is None:
                 correlation_id: str = str(uuid.uuid4())
@@ -303,61 +809,165 @@ class KPIReport:
             if result is False:
                 raise ValueError(f"invalid url {self.logging_service_url}")
             kpiquery: KPIQuery = KPIQuery()
-            query_res: dict = kpiquery.get_query(kpi_input_request)
+            query_res: dict = kpiquery.get_multi_window_query(kpi_input_request, serialized=True)
             if 'validation_error' in query_res:
                 raise ValueError(query_res['validation_error'])
-            else:
-                headers = prepare_request_headers(
-                    correlation_id=correlation_id,
-                    request_max_retries=self.request_max_retries,
-                    request_req_timeout_per_try_ms=self.request_req_timeout_per_try_ms,
-                    connection_close=False
-                )
-                timeout = (60.0, 120.0)
-                http_client = create_http_client()
-                resp = http_client.post(
-                    url=self.logging_service_url,
-                    json=query_res['query'],
-                    headers=headers,
-                    timeout=timeout
-                )
+            resp = self.post_query(query=query_res['query'], correlation_id=correlation_id)
 
         except Exception as ex:
-            logging.error({ex},
-                          extra={
-                              'correlation_id': correlation_id,
-                              'ds_object': {
-                                  'message': f'{type(ex).__name__} - {ex}',
-                                  'param1': 'scheduler'
-                              }})
+            return self.log_query_error(ex=ex, correlation_id=correlation_id)
+        return self.report_keyed_response(
+            resp=resp, report_payloads=self.report_payload_per_window,
+            paths=self.get_kpi_paths(('aggregations', 'windows', 'buckets', '*')), correlation_id=correlation_id)
 
-            return {'error': ex}
-        if resp.status_code != 200:
-            logging.error({resp},
-                          extra={
-                              'correlation_id': correlation_id,
-                              'ds_object': {
-                                  'message': f'error calling the {self.logging_service_url} ',
-                                  'param1': 'scheduler'
-                              }})
+    def query_es_multi_version(self, kpi_input_request: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search once for many model versions.
+        Args:
+          kpi_input_request: {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                              'relative_time_to_': None, 'model_versions': [model_version, ...]}
+          correlation_id: correlation_id
+        Returns:
+          payloads: dictionary, the payload of every model version as given by query_es
+          {
+            'v2_US2': {'kibana_kpis': ..., 'status': ..., 'icbc_calculation_kpis': {...}},
+            'v3_US2': {'kibana_kpis': ..., 'status': ..., 'icbc_calculation_kpis': {...}}
+          }
+        """
+        try:
+            if correlation_id is None:
+                correlation_id: str = str(uuid.uuid4())
+            # validating the elastic search url.
+            result = self.is_url(self.logging_service_url)
+            if result is False:
+                raise ValueError(f"invalid url {self.logging_service_url}")
+            kpiquery: KPIQuery = KPIQuery()
+            query_res: dict = kpiquery.get_multi_version_query(kpi_input_request, serialized=True)
+            if 'validation_error' in query_res:
+                raise ValueError(query_res['validation_error'])
+            resp = self.post_query(query=query_res['query'], correlation_id=correlation_id)
 
-            return {'error': resp}
-        else:
-            payload = self.report_payload(resp.json())
+        except Exception as ex:
+            return self.log_query_error(ex=ex, correlation_id=correlation_id)
+        return self.report_keyed_response(
+            resp=resp,
+            report_payloads=lambda body: self.report_payload_per_model_version(
+                body, model_versions=kpi_input_request['model_versions']),
+            paths=self.get_kpi_paths(('aggregations',)) + [
+                ('aggregations', 'pfc_stable', 'model_versions', 'buckets', '*', 'key'),
+                ('aggregations', 'pfc_stable', 'model_versions', 'buckets', '*', 'pfc', 'buckets', '*', 'doc_count')],
+            correlation_id=correlation_id)
+
+    def report_keyed_response(self, resp, report_payloads, paths: list, correlation_id: str) -> dict:
+        """Gets the payload of every key of a multi window or a multi version response.
+        Args:
+          resp: response of the logging service
+          report_payloads: function which gives the payload of every key from the decoded body
+          paths: paths of the fields which are read by report_payloads, see read_body
+          correlation_id: correlation_id
+        Returns:
+          payloads: dictionary, {key: payload}
+        """
+        try:
+            if resp.status_code != 200:
+                logging.error({resp},
+                              extra={
+                                  'correlation_id': correlation_id,
+                                  'ds_object': {
+                                      'message': f'error calling the {self.logging_service_url} ',
+                                      'param1': 'scheduler'
+                                  }})
+
+                return {'error': resp}
+            body: dict = self.read_body(resp, paths=paths)
+        finally:
+            # the connection is given back to the pool, also when the body is not read.
+            resp.close()
+
+        payloads = report_payloads(body)
+        if 'error' in payloads:
+            logging.error(
+                f"Error after calling the report payload {payloads['error']}", extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': 'kpisreport',
+                        'param1': 'scheduler'
+                    }})
+            return payloads
+        for key, payload in payloads.items():
             if 'error' not in payload:
                 logging.info(
-                   f"After calling the report payload {payload['kibana_kpis']}", extra={
+                    f"After calling the report payload of {key} {payload['kibana_kpis']}", extra={
                         'correlation_id': correlation_id,
                         'ds_object': {
                             'message': 'kpisreport',
-                            'param1': 'scheduler'
+                            'param1': 'scheduler',
+                            'param2': key
                         }})
             else:
                 logging.error(
-                    f"Error after calling the report payload {payload['error']}", extra={
+                    f"Error after calling the report payload of {key} {payload['error']}", extra={
                         'correlation_id': correlation_id,
                         'ds_object': {
                             'message': 'kpisreport',
-                            'param1': 'scheduler'
+                            'param1': 'scheduler',
+                            'param2': key
                         }})
-        return payload
\ No newline at end of file
+        return payloads
+
+    def query_es_msearch(self, kpi_input_requests: dict, correlation_id: str = None) -> dict:
+        """Query the elastic search for many requests with one multi search request.
+        The requests can have different time windows, model versions or relative ranges. The
+        payload of every request is given back on its own key, an invalid request or a failed
+        search only fails its own key.
+        Args:
+          kpi_input_requests: {key: the request which we are sending to query the elastic search}
+          correlation_id: correlation_id
+        Returns:
+          payloads: dictionary, {key: payload as given by query_es}
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        payloads: dict = {}
+        queries: dict = {}
+        for key, kpi_input_request in kpi_input_requests.items():
+            try:
+                queries[key] = self.get_kpi_query(kpi_input_request, get_query=self.get_serialized_query)
+            except Exception as ex:
+                payloads[key] = self.log_query_error(ex=ex, correlation_id=correlation_id)
+        if not queries:
+            return payloads
+
+        try:
+            resp = self.post_msearch(queries=list(queries.values()), correlation_id=correlation_id)
+        except Exception as ex:
+            error: dict = self.log_query_error(ex=ex, correlation_id=correlation_id)
+            return dict(payloads, **{key: error for key in queries.keys()})
+        try:
+            if resp.status_code != 200:
+                error: dict = self.report_response(resp=resp, status_code=resp.status_code, body=None,
+                                                   correlation_id=correlation_id)
+                return dict(payloads, **{key: error for key in queries.keys()})
+
+            # the responses are in the order of the queries.
+            responses: list = self.read_body(
+                resp, paths=[('responses', '*', 'status'), ('responses', '*', 'error')]
+                + self.get_kpi_paths(('responses', '*', 'aggregations'))).get('responses', [])
+        finally:
+            # the connection is given back to the pool, also when the body is not read.
+            resp.close()
+        for index, key in enumerate(queries.keys()):
+            search: dict = responses[index] if index < len(responses) else {'status': 500, 'error': 'no response'}
+            if search.get('status', 200) != 200:
+                logging.error(search.get('error'),
+                              extra={
+                                  'correlation_id': correlation_id,
+                                  'ds_object': {
+                                      'message': f'error calling the {self.logging_service_msearch_url} ',
+                                      'param1': 'scheduler',
+                                      'param2': key
+                                  }})
+                payloads[key] = {'error': search.get('error')}
+                continue
+            payloads[key] = self.report_response(resp=search, status_code=200, body=search,
+                                                 correlation_id=correlation_id)
+        return payloads
\ No newline at end of file
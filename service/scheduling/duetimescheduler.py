@@ -0,0 +1,178 @@
+"""Due Time Scheduler.
+The scheduler process sleeps until the next job of the JobRegistry is due instead of
+polling the params table on every call. The due times of the job keys are kept in a
+min-heap which is rebuilt after every tick: a completed job is due at the start of its
+next period, a job run by another pod when its lease expires, and a job which is not
+started or aborted right away.
+"""
+import heapq
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from service.common.dateutils import DateUtils
+from service.common.modelutils import ModelUtils
+from service.configs import config
+from service.dynamo.dynamotableclient import DynamoTableClient
+from service.dynamo.jobrunner import JobRunner
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.timetoliveenum import TimeToLive
+from service.scheduling.jobregistry import JobRegistry
+from service.scheduling.jobspec import JobSpec
+
+
+class DueTimeScheduler:
+    """Runs the scheduler tick of the JobRunner at the due times of the jobs."""
+
+    def __init__(self, job_runner: JobRunner = None, max_sleep_seconds: int = None, retry_seconds: int = None):
+        """Creates the instance of DueTimeScheduler.
+        Args:
+            job_runner: JobRunner which runs the tick, a JobRunner with the default settings if not given
+            max_sleep_seconds: max sleep before the job keys are read again, config.scheduler_max_sleep_seconds
+                if not given. New model versions and the jobs of the other pods are seen after this sleep.
+            retry_seconds: delay before the job keys are read again when the table could not be read,
+                config.scheduler_retry_seconds if not given
+        """
+        self.job_runner: JobRunner = JobRunner() if job_runner is None else job_runner
+        self.max_sleep_seconds: int = config.scheduler_max_sleep_seconds if max_sleep_seconds is None \
+            else max_sleep_seconds
+        self.retry_seconds: int = config.scheduler_retry_seconds if retry_seconds is None else retry_seconds
+        # min-heap of (due time in seconds since the epoch, job key)
+        self.due_times: list = []
+        self.ticks: int = 0
+        self.stopped = threading.Event()
+
+    @staticmethod
+    def get_due_time(key: str, value: dict, now: float) -> float:
+        """Gets the time when the tick has to check a job again.
+        Args:
+            key: key of the job
+            value: value of the key in the table, None if the job is not started
+            now: time in seconds since the epoch
+        Returns:
+            float: due time in seconds since the epoch, now if the job has to be checked right away
+        """
+        job_spec: JobSpec = JobRegistry.get_job_spec(key)
+        if value is None or job_spec is None:
+            return now
+        if 'completion_time' in value:
+            return job_spec.get_next_period_time(now)
+        if DynamoTableClient.LEASE_EXPIRY_FIELD in value:
+            # the job is taken over once the pod which runs it stops renewing the lease.
+            return max(now, float(value[DynamoTableClient.LEASE_EXPIRY_FIELD]))
+        try:
+            running_time: float = (DateUtils.get_current_time()
+                                   - datetime.fromisoformat(value['initiated_time'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return now
+        return now + max(0.0, JobRunner.JOB_TIMEOUT.total_seconds() - running_time)
+
+    def read_job_keys(self, correlation_id: str) -> dict:
+        """Reads the jobs of every model version, the same way as the tick.
+        Args:
+            correlation_id: correlation_id
+        Returns:
+            dict: {job key: value}, None if the table could not be read
+        """
+        persistency_manager: PersistencyManager = PersistencyManager.get_persistency_manager(
+            config.icbc_params_table_name)
+        stable_keys: list = JobRunner.get_job_keys()[1:]
+        values: dict = persistency_manager.batch_get(
+            keys=stable_keys + [ModelUtils.MODEL_VERSIONS_KEY],
+            correlation_id=correlation_id,
+            cache_ttls={ModelUtils.MODEL_VERSIONS_KEY: TimeToLive.ONE_HOUR_TTL.value})
+        if values is None:
+            return None
+        model_versions: list = ModelUtils.get_model_versions_with_environment_suffix(
+            values.pop(ModelUtils.MODEL_VERSIONS_KEY))
+        other_keys: list = [key for model_version in model_versions[1:]
+                            for key in JobRunner.get_job_keys(model_version=model_version)[1:]]
+        if other_keys:
+            other_values: dict = persistency_manager.batch_get(keys=other_keys, correlation_id=correlation_id)
+            if other_values is None:
+                return None
+            values.update(other_values)
+        return values
+
+    def rebuild(self, now: float = None, not_before: float = None, correlation_id: str = None) -> bool:
+        """Rebuilds the due times from the job keys of the table.
+        Args:
+            now: time in seconds since the epoch, the current time if not given
+            not_before: earliest due time in seconds since the epoch, the jobs can be due right away if not given
+            correlation_id: correlation_id
+        Returns:
+            True if the job keys are read, else the job keys are read again after the retry delay
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        values: dict = self.read_job_keys(correlation_id=correlation_id)
+        now = time.time() if now is None else now
+        if values is None:
+            logging.error(
+                'due times of the jobs are not read', extra={
+                    'correlation_id': correlation_id,
+                    'ds_object': {
+                        'message': f'due times of the jobs are not read, retry in {self.retry_seconds} seconds',
+                        'param1': 'scheduler'
+                    }})
+            self.due_times = [(now + self.retry_seconds, '')]
+            return False
+        self.due_times = [(max(self.get_due_time(key=key, value=value, now=now), not_before or now), key)
+                          for key, value in values.items()]
+        heapq.heapify(self.due_times)
+        return True
+
+    def get_next_due_time(self) -> float:
+        """Gets the due time of the next job.
+        Returns:
+            float: due time in seconds since the epoch, None if no job is known
+        """
+        return self.due_times[0][0] if self.due_times else None
+
+    def get_sleep_seconds(self, now: float = None) -> float:
+        """Gets how long the scheduler sleeps before the next job is due.
+        Args:
+            now: time in seconds since the epoch, the current time if not given
+        Returns:
+            float: seconds till the next due time, at most the max sleep
+        """
+        now = time.time() if now is None else now
+        next_due_time: float = self.get_next_due_time()
+        if next_due_time is None:
+            return self.max_sleep_seconds
+        return min(max(0.0, next_due_time - now), self.max_sleep_seconds)
+
+    def run_pending(self, now: float = None) -> bool:
+        """Runs the tick if a job is due, and rebuilds the due times after it.
+        Args:
+            now: time in seconds since the epoch, the current time if not given
+        Returns:
+            True if the tick ran
+        """
+        now = time.time() if now is None else now
+        next_due_time: float = self.get_next_due_time()
+        if next_due_time is None or next_due_time > now:
+            return False
+        self.job_runner.check_job_to_schedule()
+        self.ticks += 1
+        # a job which failed in the tick is retried after the retry delay, not in a busy loop.
+        self.rebuild(not_before=time.time() + self.retry_seconds)
+        return True
+
+    def run(self):
+        """Runs the due jobs until stop is called. The table is read only when a job is due, or
+        once in the max sleep to see the new model versions and the jobs of the other pods."""
+        self.stopped.clear()
+        try:
+            self.rebuild()
+            while not self.stopped.wait(self.get_sleep_seconds()):
+                if not self.run_pending():
+                    self.rebuild()
+        finally:
+            self.job_runner.close()
+
+    def stop(self):
+        """Stops the run after the current tick."""
+        self.stopped.set()
\ No newline at end of file
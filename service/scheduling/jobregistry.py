@@ -0,0 +1,94 @@
+"""Job Registry.
+The scheduler tick runs every job registered here, so a new time window or a new post
+action is added by registering it, without changing the JobRunner. The 24 hours and
+the 7 days jobs are registered by default.
+"""
+import threading
+
+from service.scheduling.jobspec import JobSpec
+
+ICBC_EVALUATION: str = 'icbc_evaluation'
+
+T_24_HOURS_JOB: JobSpec = JobSpec(name='24-hours', window=24, time_unit='h', message_detail='24 hours')
+# model should be checked for the performance only after 7 days of deployment of the model.
+T_7_DAYS_JOB: JobSpec = JobSpec(name='7-days', window=7, time_unit='d', message_detail='7 days',
+                                post_actions=(ICBC_EVALUATION,), post_actions_min_days=7, deployment_header=True)
+
+
+class JobRegistry:
+    """Process wide registry of the job specs and of the post actions."""
+
+    registry: dict = {}
+    post_actions: dict = {}
+    registry_lock = threading.Lock()
+
+    @staticmethod
+    def register(job_spec: JobSpec):
+        """Registers a job, it replaces the job of the same name.
+        Args:
+            job_spec: JobSpec
+        """
+        with JobRegistry.registry_lock:
+            JobRegistry.registry[job_spec.name] = job_spec
+
+    @staticmethod
+    def unregister(name: str):
+        """Removes a job from the registry.
+        Args:
+            name: name of the job
+        """
+        with JobRegistry.registry_lock:
+            JobRegistry.registry.pop(name, None)
+
+    @staticmethod
+    def get_job_specs() -> list:
+        """Gets the registered jobs.
+        Returns:
+            list: JobSpec in the order of registration
+        """
+        with JobRegistry.registry_lock:
+            return list(JobRegistry.registry.values())
+
+    @staticmethod
+    def get_job_spec(key: str) -> JobSpec:
+        """Gets the job of a key.
+        Args:
+            key: job key, or the name of the job
+        Returns:
+            JobSpec, None if no registered job matches the key
+        """
+        for job_spec in JobRegistry.get_job_specs():
+            if job_spec.matches(key):
+                return job_spec
+        return None
+
+    @staticmethod
+    def register_post_action(name: str, action):
+        """Registers a post action.
+        Args:
+            name: name of the post action in JobSpec.post_actions
+            action: function(job_runner, job_detail, response, correlation_id) -> [response, True if the
+                job can be completed]
+        """
+        with JobRegistry.registry_lock:
+            JobRegistry.post_actions[name] = action
+
+    @staticmethod
+    def get_post_action(name: str):
+        """Gets a post action.
+        Args:
+            name: name of the post action
+        Returns:
+            function, see register_post_action
+        Raises:
+            ValueError: If the post action is not registered.
+        """
+        with JobRegistry.registry_lock:
+            action = JobRegistry.post_actions.get(name)
+        if action is None:
+            raise ValueError(f'post action {name} is not registered')
+        return action
+
+
+JobRegistry.register(T_24_HOURS_JOB)
+JobRegistry.register(T_7_DAYS_JOB)
\ No newline at end of file
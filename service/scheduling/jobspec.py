@@ -0,0 +1,103 @@
+"""Job Spec.
+A job spec declares a scheduled kpi report job: the time window of its report, how
+often it runs, how long its keys are kept in the params table and the post actions
+which run after its report, like the icbc evaluation.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from service.enums.timetoliveenum import TimeToLive
+
+# strftime formats of the periods of the jobs, a job runs once a day or once an hour.
+DAILY_CADENCE: str = '%d-%m-%Y'
+HOURLY_CADENCE: str = '%H-%d-%m-%Y'
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    """Declaration of a scheduled kpi report job."""
+    # prefix of the job keys, i.e. 24-hours
+    name: str
+    # length of the time window of the report, i.e. 24
+    window: int
+    # time unit of the window, h or d
+    time_unit: str
+    # time window in the log messages, i.e. 24 hours
+    message_detail: str
+    # strftime format of the period of the job, DAILY_CADENCE or HOURLY_CADENCE. Daily by default.
+    cadence: str = DAILY_CADENCE
+    # time to live of the job keys in seconds
+    ttl: int = TimeToLive.ONE_DAY_TTL.value
+    # names of the post actions of the JobRegistry, they run in order after the report
+    post_actions: tuple = ()
+    # the post actions run only when the model version is deployed for that many days
+    post_actions_min_days: int = 0
+    # the report is logged with the header of the deployment date instead of the time window
+    deployment_header: bool = False
+
+    def __post_init__(self):
+        """Validates the spec.
+        Raises:
+            ValueError: If the name, the window, the time unit or the cadence is not valid.
+        """
+        if not self.name:
+            raise ValueError("Please give the name of the job")
+        if self.window <= 0:
+            raise ValueError(f"Please give a positive window for the job {self.name}")
+        if self.time_unit not in ['h', 'd']:
+            raise ValueError(f"Please give the time unit h or d for the job {self.name}")
+        if self.cadence not in [DAILY_CADENCE, HOURLY_CADENCE]:
+            raise ValueError(f"Please give the daily or the hourly cadence for the job {self.name}")
+
+    @property
+    def hours(self) -> int:
+        """Gets the time window in hours.
+        Returns:
+            int: hours of the time window
+        """
+        return self.window * 24 if self.time_unit == 'd' else self.window
+
+    @property
+    def status_attribute(self) -> str:
+        """Gets the name of the job status in the response and in the JobRunner.
+        Returns:
+            str: t_<name>_job_status, i.e. t_24_hours_job_status
+        """
+        return f"t_{self.name.replace('-', '_')}_job_status"
+
+    def get_key(self, model_version: str = None, now: float = None) -> str:
+        """Gets the key of the job of the current period.
+        Args:
+            model_version: model version appended to the key, the key has no model version if not given
+            now: time in seconds since the epoch whose period is keyed, the current time if not given
+        Returns:
+            str: <name> - <period>, it ends with the model version if given
+        """
+        key: str = f'{self.name} - {time.strftime(self.cadence, time.localtime(now))}'
+        if model_version is not None:
+            key = f'{key} - {model_version}'
+        return key
+
+    def get_next_period_time(self, now: float) -> int:
+        """Gets the start of the next period of the job, when its next key is due.
+        Args:
+            now: time in seconds since the epoch
+        Returns:
+            int: first second since the epoch with another key than now, the next local hour or midnight
+        """
+        current: datetime = datetime.fromtimestamp(now)
+        if self.cadence == HOURLY_CADENCE:
+            next_period: datetime = current.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        else:
+            next_period: datetime = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+        return int(next_period.timestamp())
+
+    def matches(self, key: str) -> bool:
+        """Checks the key belongs to the job.
+        Args:
+            key: job key, or the name of the job
+        Returns:
+            True if the key is the name of the job or one of its keys
+        """
+        return key == self.name or key.startswith(f'{self.name} - ')
\ No newline at end of file
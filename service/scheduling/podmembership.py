@@ -0,0 +1,58 @@
+"""Pod Membership.
+The scheduler pods write a heartbeat into one record of the params table on every tick.
+The pods with a heartbeat within the ttl are alive, and the job keys are spread over
+them with a consistent hash ring. A pod which stops writing heartbeats leaves the ring
+once its heartbeat expires, and its jobs move to the other pods.
+"""
+import uuid
+
+from service.common.hashring import HashRing
+from service.configs import config
+from service.dynamo.persistencymanager import PersistencyManager
+
+
+class PodMembership:
+    """Tracks the alive scheduler pods."""
+
+    MEMBERS_KEY: str = 'scheduler_pods'
+
+    def __init__(self, pod_name: str, table_name: str = None, ttl_seconds: int = None):
+        """Creates the instance of PodMembership.
+        Args:
+            pod_name: name of this pod
+            table_name: Table which keeps the heartbeats, config.icbc_params_table_name if not given
+            ttl_seconds: how long a pod is alive after its heartbeat, config.pod_heartbeat_ttl_seconds if not given.
+                It must be longer than the time between the ticks.
+        Raises:
+            ValueError: If pod_name is empty.
+        """
+        if not pod_name:
+            raise ValueError("Please give the pod name")
+        self.pod_name: str = pod_name
+        self.table_name: str = config.icbc_params_table_name if table_name is None else table_name
+        self.ttl_seconds: int = config.pod_heartbeat_ttl_seconds if ttl_seconds is None else ttl_seconds
+
+    def heartbeat(self, correlation_id: str = None) -> list:
+        """Writes the heartbeat of this pod and reads the alive pods with the same write.
+        Args:
+            correlation_id: correlation_id
+        Returns:
+            list: names of the alive pods, None if the table could not be updated
+        """
+        if correlation_id is None:
+            correlation_id: str = str(uuid.uuid4())
+        members: dict = PersistencyManager.get_persistency_manager(self.table_name).put_member(
+            key=self.MEMBERS_KEY, member=self.pod_name, ttl=self.ttl_seconds, correlation_id=correlation_id)
+        return None if members is None else sorted(members.keys())
+
+    def get_hash_ring(self, correlation_id: str = None) -> HashRing:
+        """Writes the heartbeat of this pod and gets the ring of the alive pods.
+        Args:
+            correlation_id: correlation_id
+        Returns:
+            HashRing, None if the pods could not be read. Every pod attempts every job without a ring.
+        """
+        pods: list = self.heartbeat(correlation_id=correlation_id)
+        if pods is None:
+            return None
+        return HashRing(members=pods + [self.pod_name])
\ No newline at end of file
@@ -0,0 +1,158 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import requests
+
+from benchmarks import kpireport_standin
+from benchmarks.esstandin import ESStandInServer, EventCorpus, SearchEvaluator, parse_date_math
+from service.elasticsearch.kpiquery import KPIQuery
+from service.reports.kpisreport import KPIReport
+
+NOW: int = int(datetime(2024, 1, 5, 12, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def millis(text: str) -> int:
+    return int(datetime.fromisoformat(text).replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def pfc_event(timestamp: str, task_event: str = None, value: int = 1, path: str = 'v2US2',
+              param2: str = 'allowed', company: str = 'c1') -> dict:
+    event = {'@timestamp': timestamp, 'metric': {'service': 'pfc_stable', 'path': path, 'value': value},
+             'datascience_data': {'param2': param2, 'company_id': company}}
+    if task_event is not None:
+        event['davinci_data'] = {'task_event': task_event}
+    return event
+
+
+DOCUMENTS: list = [
+    pfc_event('2024-01-05T10:00:00', 'fail-fail'),
+    pfc_event('2024-01-05T09:00:00', 'fail-pwe', param2='entity_not_in_allow_list', company='c2'),
+    pfc_event('2024-01-05T08:00:00', 'pass-fail', company='c2'),
+    pfc_event('2024-01-05T07:00:00', 'pass-bypass', value=0),
+    pfc_event('2024-01-05T06:00:00'),
+    pfc_event('2024-01-05T05:00:00', 'fail-fail', path='v1US2'),
+    pfc_event('2024-01-01T10:00:00', 'fail-none', company='c3'),
+    {'@timestamp': '2024-01-05T11:00:00', 'application': 'datascience-ml-audit',
+     'datascience_data': {'message': 'total audit questions parsed', 'number1': 40}}
+]
+
+
+class TestESStandIn(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = EventCorpus.from_documents(DOCUMENTS)
+        self.evaluator = SearchEvaluator(self.corpus, now_millis=NOW)
+
+    def count(self, clause: dict) -> int:
+        return int(self.evaluator.evaluate(clause).sum())
+
+    def test_parse_date_math(self):
+        self.assertEqual(parse_date_math('now-24h', NOW), millis('2024-01-04T12:00:00'))
+        self.assertEqual(parse_date_math('now-1M/d', NOW), millis('2023-12-05T00:00:00'))
+        self.assertEqual(parse_date_math('2024-01-05||/d', NOW), millis('2024-01-05T00:00:00'))
+        self.assertEqual(parse_date_math('2024-01-05||/d', NOW, round_up=True), millis('2024-01-06T00:00:00') - 1)
+        self.assertEqual(parse_date_math('2024-01-31||+1M', NOW), millis('2024-02-29T00:00:00'))
+        with self.assertRaises(ValueError):
+            parse_date_math('now-1x', NOW)
+
+    def test_query_clauses(self):
+        self.assertEqual(self.count({'term': {'davinci_data.task_event': 'fail-fail'}}), 2)
+        self.assertEqual(self.count({'terms': {'davinci_data.task_event': ['fail-pwe', 'pass-fail', 'other']}}), 2)
+        self.assertEqual(self.count({'term': {'metric.value': 1}}), 6)
+        self.assertEqual(self.count({'exists': {'field': 'davinci_data.task_event'}}), 6)
+        self.assertEqual(self.count({'range': {'@timestamp': {'from': 'now-24h', 'to': 'now'}}}), 7)
+        self.assertEqual(self.count({'range': {'@timestamp': {'from': '2024-01-01||/d', 'to': '2024-01-01||/d'}}}), 1)
+        self.assertEqual(self.count({'range': {'datascience_data.number1': {'gt': 39}}}), 1)
+        self.assertEqual(self.count({'bool': {'must_not': {'term': {'metric.path': 'v1US2'}},
+                                              'filter': [{'term': {'metric.service': 'pfc_stable'}}]}}), 6)
+        self.assertEqual(self.count({'bool': {'should': [{'term': {'metric.value': 0}},
+                                                         {'term': {'metric.path': 'v1US2'}}],
+                                              'minimum_should_match': 1}}), 2)
+        self.assertEqual(self.count({'term': {'missing.field': 'value'}}), 0)
+        with self.assertRaises(ValueError):
+            self.evaluator.evaluate({'wildcard': {'metric.path': 'v*'}})
+
+    def test_kpi_query_gives_the_counts_of_the_documents(self):
+        query = KPIQuery().construct_query({'absolute_time_from_': 24, 'time_unit_': 'h', 'relative_time_from_': None,
+                                            'relative_time_to_': None, 'model_version': 'v2US2'})
+        counts = KPIReport.get_counts(self.evaluator.search(query))
+        self.assertEqual(counts, {'true_fails': 2, 'true_fails_trained_entities': 1, 'pfc_bypass': 1,
+                                  'auditor_fails_trained_entities': 2, 'sampled_questions': 3,
+                                  'received_questions': 4, 'auditor_fails': 3, 'ml_audit_questions': 1,
+                                  'total_ml_audit_questions': 40.0})
+
+    def test_multi_window_and_company_queries(self):
+        query = KPIQuery().construct_multi_window_query({'model_version': 'v2US2', 'windows': [
+            {'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+            {'key': '7-days', 'absolute_time_from_': 7, 'time_unit_': 'd'}]})
+        buckets = self.evaluator.search(query)['aggregations']['windows']['buckets']
+        self.assertEqual(buckets['24-hours']['pfc_stable']['pfc']['buckets']['auditor_fails']['doc_count'], 3)
+        self.assertEqual(buckets['7-days']['pfc_stable']['pfc']['buckets']['auditor_fails']['doc_count'], 4)
+
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2US2'}
+        with patch('service.elasticsearch.kpiquery.config') as config:
+            config.company_field = 'datascience_data.company_id'
+            config.company_buckets_size = 2
+            first_page = self.evaluator.search(KPIQuery().construct_company_query(request))
+            companies = first_page['aggregations']['pfc_stable']['companies']
+            self.assertEqual([bucket['key']['company'] for bucket in companies['buckets']], ['c1', 'c2'])
+            self.assertEqual(companies['buckets'][1]['pfc']['buckets']['auditor_fails']['doc_count'], 2)
+            second_page = self.evaluator.search(KPIQuery().construct_company_query(
+                request, after_key=companies['after_key']))
+        self.assertEqual(second_page['aggregations']['pfc_stable']['companies']['after_key'], {'company': 'c3'})
+
+    def test_generated_corpus(self):
+        corpus = EventCorpus.generate(events=20000, model_versions=['v2US2', 'v1US2'], now_millis=NOW, seed=3)
+        self.assertEqual(corpus.size, 20000)
+        evaluator = SearchEvaluator(corpus, now_millis=NOW)
+        self.assertEqual(corpus.keywords['davinci_data.task_event'][1][0], 'fail-99')
+        self.assertTrue(evaluator.evaluate({'range': {'@timestamp': {'from': 'now-14d', 'to': 'now'}}}).all())
+        payload = KPIReport(logging_service_endpoint='http://localhost').report_payload(evaluator.search(
+            KPIQuery().construct_query({'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                                        'relative_time_to_': None, 'model_version': 'v2US2'})))
+        self.assertGreater(float(payload['icbc_calculation_kpis']['total_recall']), 95)
+
+    def post(self, url: str, body: bytes) -> [int, dict]:
+        request = urllib.request.Request(url, data=body, method='POST', headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return [response.status, json.loads(response.read())]
+        except urllib.error.HTTPError as ex:
+            return [ex.code, json.loads(ex.read())]
+
+    @patch('service.reports.kpisreport.PooledHTTPSession.post', side_effect=requests.post)
+    def test_server_answers_the_kpi_report(self, _):
+        with ESStandInServer(self.corpus, now_millis=NOW) as server:
+            query = {'size': 0, 'query': {'term': {'metric.path': 'v1US2'}}}
+            [status, response] = self.post(f'{server.url}/*:log-2/_search', json.dumps(query).encode())
+            self.assertEqual([status, response['hits']['total']['value']], [200, 1])
+            [status, response] = self.post(f'{server.url}/*:log-2/_msearch', KPIReport.get_msearch_body(
+                [query, {'size': 0, 'query': {'regexp': {'metric.path': 'v.*'}}}]))
+            self.assertEqual([item['status'] for item in response['responses']], [200, 400])
+            [status, response] = self.post(f'{server.url}/*:log-2/_search', b'{"size": 0, "sort": []}')
+            self.assertEqual([status, response['error']['type']], [400, 'parsing_exception'])
+
+            request = {'absolute_time_from_': 24, 'time_unit_': 'h', 'relative_time_from_': None,
+                       'relative_time_to_': None, 'model_version': 'v2US2'}
+            payload = KPIReport(logging_service_endpoint=server.url).query_es(request)
+            streamed = KPIReport(logging_service_endpoint=server.url, streaming_parse=True).query_es(request)
+        self.assertEqual(streamed, payload)
+        self.assertEqual(payload['icbc_calculation_kpis']['auditor_fails_count'], '3')
+        self.assertEqual(payload['icbc_calculation_kpis']['total_recall'], '66.67')
+
+    @patch('service.reports.kpisreport.PooledHTTPSession.post', side_effect=requests.post)
+    def test_benchmark_run(self, _):
+        result = kpireport_standin.run(events=5000, repeats=2, concurrency=2,
+                                       window={'absolute_time_from_': 24, 'time_unit_': 'h'},
+                                       model_version='v2US2', seed=1)
+        self.assertEqual(result['events'], 5000)
+        self.assertGreater(result['queries_per_s'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
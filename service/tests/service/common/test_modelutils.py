@@ -180,6 +180,15 @@ class TestModelUtils(unittest.TestCase):
             logging_msg=logging_msg
         )
 
+    @patch('service.common.modelutils.config')
+    def test_get_model_versions_with_environment_suffix(self, config_mock):
+        config_mock.model_stable_version = 'v2'
+        config_mock.model_environment = 'EU2'
+        config_mock.model_versions = ['v3']
+        self.assertEqual(ModelUtils.get_model_versions_with_environment_suffix(), ['v2_EU2', 'v3_EU2'])
+        self.assertEqual(ModelUtils.get_model_versions_with_environment_suffix({'versions': ['v4', 'v2']}),
+                         ['v2_EU2', 'v3_EU2', 'v4_EU2'])
+
     def test_dependency_classes_method(self):
         self.assertTrue(hasattr(PersistencyManager, 'get_persistency_manager'))
         self.assertTrue(hasattr(PersistencyManager, 'upsert_value'))
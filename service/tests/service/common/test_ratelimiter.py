@@ -0,0 +1,26 @@
+import unittest
+from unittest.mock import patch
+
+from service.common.ratelimiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    @patch('service.common.ratelimiter.time')
+    def test_acquire_spaces_the_requests(self, time_mock):
+        time_mock.monotonic.return_value = 100.0
+        rate_limiter = RateLimiter(max_requests_per_second=4)
+        self.assertEqual([rate_limiter.acquire() for _ in range(3)], [0, 0.25, 0.5])
+        self.assertEqual([call.args[0] for call in time_mock.sleep.call_args_list], [0.25, 0.5])
+
+        # the unused time is not saved for a burst.
+        time_mock.monotonic.return_value = 200.0
+        self.assertEqual(rate_limiter.acquire(), 0)
+
+    def test_init_when_rate_is_not_positive(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(max_requests_per_second=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,251 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
+
+from service.common.httpsession import AsyncPooledHTTPSession
+from service.common.modelutils import ModelUtils
+from service.dynamo.asyncjobrunner import AsyncJobRunner
+from service.dynamo.asyncpersistencymanager import AsyncPersistencyManager
+from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+
+
+class TestAsyncJobRunner(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        AsyncPersistencyManager.clear_registry()
+
+    def tearDown(self):
+        AsyncPersistencyManager.clear_registry()
+
+    @staticmethod
+    def get_batch_values(deployment_detail, t_24_hours_job_result, t_7_days_job_result) -> dict:
+        date: str = time.strftime("%d-%m-%Y")
+        return {
+            f'deployment_date_{ModelUtils.get_model_version_with_environment_suffix()}': deployment_detail,
+            f'24-hours - {date}': t_24_hours_job_result,
+            f'7-days - {date}': t_7_days_job_result
+        }
+
+    @staticmethod
+    def get_report(auditor_fails_count: str = '45') -> dict:
+        return {
+            'icbc_calculation_kpis': {
+                'total_recall': '10',
+                'local_recall': '20',
+                'total_bypass': '15',
+                'local_bypass': '20',
+                'auditor_fails_count': auditor_fails_count
+            },
+            'status': 'danger',
+            'kibana_kpis': 'Total Recall: 10% || Total Bypass: 15% || Local Recall: 20% || Local Bypass: 20%'
+        }
+
+    @staticmethod
+    def get_persistency_manager(lease_status: LeaseStatus) -> MagicMock:
+        persistency_manager = MagicMock()
+        persistency_manager.batch_get.return_value = TestAsyncJobRunner.get_batch_values(
+            {'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()}, None, None)
+        persistency_manager.acquire_lease.return_value = lease_status
+        return persistency_manager
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_check_job_to_schedule_async_queries_the_jobs_at_once(
+            self, persistency_manager_mock, pod_name_mock, dateutils_mock):
+        persistency_manager_mock.return_value = self.get_persistency_manager(LeaseStatus.ACQUIRED)
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        started: list = []
+        both_started = asyncio.Event()
+
+        async def query_es_async(request, correlation_id=None):
+            started.append(request['time_unit_'])
+            if len(started) == 2:
+                both_started.set()
+            # the query of a job waits for the query of the other job, it fails if the jobs run one by one.
+            await asyncio.wait_for(both_started.wait(), timeout=5)
+            return self.get_report()
+
+        kpi_report = MagicMock()
+        kpi_report.query_es_async.side_effect = query_es_async
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=kpi_report)
+        await jobrunner.check_job_to_schedule_async()
+
+        self.assertEqual(sorted(started), ['d', 'h'])
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name)
+        self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_COMPLETED.name)
+        persistency_manager_mock.return_value.batch_get.assert_called_once()
+        self.assertEqual(persistency_manager_mock.return_value.complete_lease.call_count, 2)
+
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_check_job_to_schedule_async_when_lease_is_held_by_other_pod(
+            self, persistency_manager_mock, pod_name_mock):
+        persistency_manager_mock.return_value = self.get_persistency_manager(LeaseStatus.HELD_BY_OTHER)
+        pod_name_mock.return_value = 'pod2'
+        kpi_report = MagicMock()
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=kpi_report)
+        await jobrunner.check_job_to_schedule_async()
+
+        kpi_report.query_es_async.assert_not_called()
+        persistency_manager_mock.return_value.complete_lease.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_IN_PROGRESS.name)
+
+    @patch('service.common.modelutils.ModelUtils.insert_deployment_detail')
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_check_job_to_schedule_async_for_many_model_versions(
+            self, persistency_manager_mock, pod_name_mock, dateutils_mock, insert_mock):
+        stable_model_version: str = ModelUtils.get_model_version_with_environment_suffix()
+        persistency_manager = self.get_persistency_manager(LeaseStatus.ACQUIRED)
+        persistency_manager.batch_get.side_effect = [
+            persistency_manager.batch_get.return_value,
+            {key: None for key in AsyncJobRunner.get_job_keys(model_version='v3_US2')}]
+        persistency_manager_mock.return_value = persistency_manager
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        insert_mock.return_value = {'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()}
+        kpi_report = MagicMock()
+        kpi_report.query_es_multi_version.return_value = {stable_model_version: self.get_report(),
+                                                          'v3_US2': self.get_report()}
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=kpi_report)
+        heartbeats: list = []
+        get_lease_heartbeat = jobrunner.get_lease_heartbeat
+
+        def get_heartbeat(job_detail, correlation_id):
+            heartbeats.append(get_lease_heartbeat(job_detail=job_detail, correlation_id=correlation_id))
+            return heartbeats[-1]
+
+        with patch.object(jobrunner, 'get_lease_heartbeat', side_effect=get_heartbeat):
+            await jobrunner.check_job_to_schedule_async(model_versions=[stable_model_version, 'v3_US2'])
+
+        # the reports of a time window are queried together for both model versions.
+        self.assertEqual([call.args[0]['model_versions'] for call in kpi_report.query_es_multi_version.call_args_list],
+                         [[stable_model_version, 'v3_US2']] * 2)
+        kpi_report.query_es_async.assert_not_called()
+        insert_mock.assert_called_once_with(correlation_id=ANY, key='deployment_date_v3_US2')
+        leased_keys: list = [call.kwargs['key'] for call in persistency_manager.acquire_lease.call_args_list]
+        self.assertIn(f'7-days - {time.strftime("%d-%m-%Y")} - v3_US2', leased_keys)
+        self.assertEqual(jobrunner.job_statuses['v3_US2'], {'24-hours': JobStatus.JOB_COMPLETED.name,
+                                                            '7-days': JobStatus.JOB_COMPLETED.name})
+        # the leases are renewed by tasks of the event loop, which are cancelled once the jobs are done.
+        self.assertEqual(len(heartbeats), 4)
+        self.assertTrue(all(heartbeat.thread is None and heartbeat.task.cancelled() for heartbeat in heartbeats))
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_check_job_to_schedule_async_when_keys_are_not_read(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.batch_get.return_value = None
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=MagicMock())
+        await jobrunner.check_job_to_schedule_async()
+        persistency_manager_mock.return_value.acquire_lease.assert_not_called()
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_check_job_to_schedule_without_kpi_report(
+            self, persistency_manager_mock, pod_name_mock, report_mock, dateutils_mock):
+        persistency_manager_mock.return_value = self.get_persistency_manager(LeaseStatus.ACQUIRED)
+        pod_name_mock.return_value = 'pod1'
+        report_mock.side_effect = [self.get_report(), {'error': 'timeout'}]
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        jobrunner: AsyncJobRunner = AsyncJobRunner()
+        jobrunner.check_job_to_schedule()
+        jobrunner.close()
+
+        self.assertEqual(report_mock.call_count, 2)
+        self.assertEqual(
+            sorted([jobrunner.t_24_hours_job_status, jobrunner.t_7_days_job_status]),
+            sorted([JobStatus.JOB_COMPLETED.name, JobStatus.JOB_ABORTED.name]))
+
+    @patch('service.dynamo.asyncjobrunner.AsyncJobRunner.check_job_to_schedule_async')
+    def test_check_job_to_schedule_keeps_the_model_versions(self, tick_mock):
+        AsyncJobRunner(kpi_report=MagicMock()).check_job_to_schedule(model_versions=['v2_US2', 'v3_US2'])
+        tick_mock.assert_awaited_once_with(model_versions=['v2_US2', 'v3_US2'])
+
+    def test_check_job_to_schedule_keeps_the_event_loop_and_the_session(self):
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=MagicMock())
+        sessions: list = []
+
+        async def tick(model_versions=None):
+            sessions.append(AsyncPooledHTTPSession.get_session())
+
+        with patch.object(jobrunner, 'check_job_to_schedule_async', side_effect=tick):
+            jobrunner.check_job_to_schedule()
+            jobrunner.check_job_to_schedule()
+        # the second tick reuses the pooled session of the first one.
+        self.assertIs(sessions[0], sessions[1])
+        self.assertFalse(sessions[0].closed)
+        jobrunner.close()
+        self.assertTrue(sessions[0].closed)
+        self.assertTrue(jobrunner.loop.is_closed())
+
+    @patch('service.dynamo.jobrunner.config')
+    @patch('service.dynamo.asyncjobrunner.config')
+    async def test_get_kpi_report_async_with_daily_kpi_counters(self, config_mock, jobrunner_config_mock):
+        kpi_report = MagicMock()
+        kpi_report.query_es_async = AsyncMock()
+        request: dict = {'absolute_time_from_': 7, 'time_unit_': 'd', 'model_version': 'v2'}
+        config_mock.daily_kpi_counters_enabled = jobrunner_config_mock.daily_kpi_counters_enabled = True
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=kpi_report)
+        self.assertIs(await jobrunner.get_kpi_report_async(request, correlation_id='1'),
+                      kpi_report.query_es_incremental.return_value)
+        kpi_report.query_es_incremental.assert_called_once_with(request, correlation_id='1')
+        # the reports of the model versions are counted one by one with the daily kpi counters.
+        reports: dict = await jobrunner.get_kpi_reports_async({'v2': request, 'v3': request}, correlation_id='1')
+        self.assertEqual(list(reports.keys()), ['v2', 'v3'])
+        kpi_report.query_es_multi_version.assert_not_called()
+        kpi_report.query_es_async.assert_not_called()
+
+        config_mock.daily_kpi_counters_enabled = jobrunner_config_mock.daily_kpi_counters_enabled = False
+        self.assertIs(await jobrunner.get_kpi_report_async(request, correlation_id='1'),
+                      kpi_report.query_es_async.return_value)
+
+    @patch('service.dynamo.jobrunner.JobRunner.log_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_finish_job_async_when_the_lease_is_lost(self, persistency_manager_mock, pod_name_mock,
+                                                           log_report_mock):
+        persistency_manager_mock.return_value = self.get_persistency_manager(LeaseStatus.ACQUIRED)
+        pod_name_mock.return_value = 'pod1'
+        kpi_report = MagicMock()
+        kpi_report.query_es_async = AsyncMock(return_value=self.get_report())
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=kpi_report)
+        heartbeat = MagicMock()
+        heartbeat.lease_lost = threading.Event()
+        heartbeat.lease_lost.set()
+        key: str = f'24-hours - {time.strftime("%d-%m-%Y")}'
+        response: dict = await jobrunner.finish_job_async(
+            job_detail=jobrunner.start_job(key=key), response=self.get_report(), correlation_id='1',
+            heartbeat=heartbeat, deployment_detail={'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()})
+        self.assertEqual(response, {})
+        log_report_mock.assert_not_called()
+        persistency_manager_mock.return_value.complete_lease.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_IN_PROGRESS.name)
+
+    async def test_check_job_result_async_takes_over_an_aborted_job(self):
+        jobrunner: AsyncJobRunner = AsyncJobRunner(kpi_report=MagicMock())
+        jobrunner.hash_ring = MagicMock()
+        jobrunner.hash_ring.get_owner.return_value = 'pod2'
+        key: str = f'24-hours - {time.strftime("%d-%m-%Y")}'
+        with patch.object(jobrunner, 'get_pod_name', return_value='pod1'), \
+                patch.object(jobrunner, 'trigger_the_job_async', new=AsyncMock()) as trigger_mock:
+            # a job which is not started is left to its owner.
+            await jobrunner.check_job_result_async(key=key, job_result=None, correlation_id='1', deployment_detail={})
+            trigger_mock.assert_not_called()
+            # the lease of the owner expired, any pod takes the job over.
+            expired_job: dict = {'job_runner_name': 'pod2', 'initiated_time': '2023-12-12T00:00:00',
+                                 'lease_expiry': int(time.time()) - 60}
+            await jobrunner.check_job_result_async(key=key, job_result=expired_job, correlation_id='1',
+                                                   deployment_detail={})
+            trigger_mock.assert_awaited_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,142 @@
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock, patch
+
+from service.common.modelutils import ModelUtils
+from service.dynamo.backfillrunner import BackfillRunner
+from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+from service.scheduling.jobregistry import T_24_HOURS_JOB
+
+
+class TestBackfillRunner(unittest.TestCase):
+
+    def test_get_day_key(self):
+        stable_model_version: str = ModelUtils.get_model_version_with_environment_suffix()
+        self.assertEqual(BackfillRunner.get_day_key(date(2023, 12, 1), stable_model_version), '24-hours - 01-12-2023')
+        self.assertEqual(BackfillRunner.get_day_key(date(2023, 12, 1), 'v3_US2'), '24-hours - 01-12-2023 - v3_US2')
+
+    @patch('service.scheduling.jobspec.time.time')
+    def test_get_day_key_is_the_key_of_the_scheduler_tick(self, time_mock):
+        # the last second of the day is keyed like its midnight, both in the local time of the scheduler.
+        time_mock.return_value = datetime(2023, 12, 1, 23, 59, 59).timestamp()
+        self.assertEqual(BackfillRunner.get_day_key(date(2023, 12, 1), 'v3_US2'),
+                         T_24_HOURS_JOB.get_key(model_version='v3_US2', now=time_mock.return_value))
+
+    def test_get_day_request(self):
+        self.assertEqual(BackfillRunner.get_day_request(date(2023, 12, 1), 'v2_US2'), {
+            'absolute_time_from_': None,
+            'time_unit_': None,
+            'relative_time_from_': datetime(2023, 12, 1).astimezone().isoformat(),
+            'relative_time_to_': datetime(2023, 12, 2).astimezone().isoformat(),
+            'model_version': 'v2_US2'
+        })
+
+    @patch('service.dynamo.backfillrunner.DateUtils.get_current_time')
+    def test_get_days(self, now_mock):
+        now_mock.return_value = datetime(2023, 12, 5, 1)
+        self.assertEqual(BackfillRunner.get_days(date(2023, 12, 2), date(2023, 12, 4)),
+                         [date(2023, 12, 2), date(2023, 12, 3), date(2023, 12, 4)])
+        with self.assertRaises(ValueError):
+            BackfillRunner.get_days(date(2023, 12, 4), date(2023, 12, 2))
+        with self.assertRaises(ValueError):
+            BackfillRunner.get_days(date(2023, 12, 4), date(2023, 12, 5))
+
+    @patch('service.dynamo.backfillrunner.DateUtils.get_current_time')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.backfillrunner.BackfillRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_backfill_skips_the_completed_days(self, persistency_manager_mock, pod_name_mock, report_mock, now_mock):
+        now_mock.return_value = datetime(2023, 12, 5, 1)
+        pod_name_mock.return_value = 'pod-1'
+        mock_response = MagicMock()
+        mock_response.batch_get.return_value = {
+            f'deployment_date_{ModelUtils.get_model_version_with_environment_suffix()}': {
+                'date': '2023-11-01T00:00:00'},
+            '24-hours - 01-12-2023': {'initiated_time': '2023-12-02T00:00:00',
+                                      'completion_time': '2023-12-02T00:01:00'},
+            '24-hours - 02-12-2023': {'initiated_time': '2023-12-03T00:00:00', 'status': 'JOB_ABORTED'}
+        }
+        mock_response.acquire_lease.side_effect = lambda key, **kwargs: (
+            LeaseStatus.HELD_BY_OTHER if key == '24-hours - 04-12-2023' else LeaseStatus.ACQUIRED)
+        persistency_manager_mock.return_value = mock_response
+        report_mock.side_effect = lambda request: (
+            {'error': 'timeout'} if request['relative_time_from_'].startswith('2023-12-03')
+            else {'icbc_calculation_kpis': {'total_recall': '99.6'}})
+
+        statuses: dict = BackfillRunner(max_workers=2, max_requests_per_second=1000).backfill(
+            date(2023, 12, 1), date(2023, 12, 4))
+        self.assertEqual(statuses, {
+            '2023-12-01': JobStatus.JOB_COMPLETED.name,
+            '2023-12-02': JobStatus.JOB_COMPLETED.name,
+            '2023-12-03': JobStatus.JOB_ABORTED.name,
+            '2023-12-04': JobStatus.JOB_IN_PROGRESS.name
+        })
+        self.assertEqual(report_mock.call_count, 2)
+        # the failed day is not completed, the next backfill takes it again once its lease expires.
+        completions: dict = {call.kwargs['key']: call.kwargs['value']
+                             for call in mock_response.complete_lease.call_args_list}
+        self.assertEqual(set(completions.keys()), {'24-hours - 02-12-2023'})
+        self.assertEqual(completions['24-hours - 02-12-2023']['icbc_calculation_kpis'], {'total_recall': '99.6'})
+        self.assertEqual(completions['24-hours - 02-12-2023']['status'], JobStatus.JOB_COMPLETED.name)
+        self.assertIn('completion_time', completions['24-hours - 02-12-2023'])
+
+    @patch('service.dynamo.backfillrunner.DateUtils.get_current_time')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.backfillrunner.BackfillRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_backfill_skips_the_days_of_the_daily_kpi_counters(self, persistency_manager_mock, pod_name_mock,
+                                                               report_mock, now_mock):
+        now_mock.return_value = datetime(2023, 12, 5, 1)
+        pod_name_mock.return_value = 'pod-1'
+        persistency_manager_mock.return_value.batch_get.return_value = {
+            'deployment_date_v3_US2': {'date': '2023-11-01T00:00:00'},
+            # the job key of the day expired, the counts of the day are still stored.
+            'kpi_counts_v3_US2_2023-12-01': {'true_fails': 1}}
+        persistency_manager_mock.return_value.acquire_lease.return_value = LeaseStatus.HELD_BY_OTHER
+
+        statuses: dict = BackfillRunner(max_requests_per_second=1000).backfill(
+            date(2023, 12, 1), date(2023, 12, 2), model_version='v3_US2')
+        self.assertEqual(statuses, {'2023-12-01': JobStatus.JOB_COMPLETED.name,
+                                    '2023-12-02': JobStatus.JOB_IN_PROGRESS.name})
+        self.assertIn('kpi_counts_v3_US2_2023-12-02',
+                      persistency_manager_mock.return_value.batch_get.call_args.kwargs['keys'])
+        persistency_manager_mock.return_value.acquire_lease.assert_called_once()
+        self.assertEqual(persistency_manager_mock.return_value.acquire_lease.call_args.kwargs['key'],
+                         '24-hours - 02-12-2023 - v3_US2')
+        report_mock.assert_not_called()
+
+    @patch('service.dynamo.backfillrunner.DateUtils.get_current_time')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.backfillrunner.BackfillRunner.get_post_actions')
+    @patch('service.dynamo.backfillrunner.BackfillRunner.log_report')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_backfill_runs_the_job_pipeline(self, persistency_manager_mock, log_report_mock, post_actions_mock,
+                                            report_mock, now_mock):
+        now_mock.return_value = datetime(2023, 12, 5, 1)
+        persistency_manager_mock.return_value.batch_get.return_value = {
+            'deployment_date_v3_US2': {'date': '2023-11-01T00:00:00'}}
+        persistency_manager_mock.return_value.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        report_mock.return_value = {'icbc_calculation_kpis': {'total_recall': '99.6'}}
+        post_action = MagicMock(side_effect=lambda runner, response, **kwargs: [response, False])
+        post_actions_mock.return_value = [post_action]
+
+        statuses: dict = BackfillRunner(max_requests_per_second=1000).backfill(
+            date(2023, 12, 1), date(2023, 12, 1), model_version='v3_US2')
+        # the report is logged like the scheduled job, and a post action which is not completed aborts the day.
+        self.assertEqual(statuses, {'2023-12-01': JobStatus.JOB_ABORTED.name})
+        self.assertEqual(log_report_mock.call_args.kwargs['job_detail']['message_detail'], '24 hours of 2023-12-01')
+        self.assertEqual(post_action.call_args.kwargs['job_detail']['key'], '24-hours - 01-12-2023 - v3_US2')
+        persistency_manager_mock.return_value.complete_lease.assert_not_called()
+
+    @patch('service.dynamo.backfillrunner.DateUtils.get_current_time')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_backfill_when_job_keys_are_not_read(self, persistency_manager_mock, now_mock):
+        now_mock.return_value = datetime(2023, 12, 5, 1)
+        persistency_manager_mock.return_value.batch_get.return_value = None
+        self.assertEqual(BackfillRunner().backfill(date(2023, 12, 1), date(2023, 12, 4)), {})
+        persistency_manager_mock.return_value.acquire_lease.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
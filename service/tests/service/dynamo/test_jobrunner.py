@@ -1,17 +1,33 @@
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 from service.common.modelutils import ModelUtils
+from service.common.hashring import HashRing
+from service.configs import config
 from service.dynamo.jobrunner import JobRunner
 from service.dynamo.persistencymanager import PersistencyManager
 from datetime import datetime
 from service.enums.icbcstatus import IcbcStatus
 from service.enums.jobstatus import JobStatus
+from service.enums.leasestatus import LeaseStatus
+from service.enums.timetoliveenum import TimeToLive
+from service.scheduling.jobregistry import JobRegistry
+from service.scheduling.jobspec import JobSpec
 
 
 class TestJobRunner(unittest.TestCase):
 
+    @staticmethod
+    def get_batch_values(deployment_detail, t_24_hours_job_result, t_7_days_job_result) -> dict:
+        date: str = time.strftime("%d-%m-%Y")
+        return {
+            f'deployment_date_{ModelUtils.get_model_version_with_environment_suffix()}': deployment_detail,
+            f'24-hours - {date}': t_24_hours_job_result,
+            f'7-days - {date}': t_7_days_job_result
+        }
+
     @patch('service.common.modelutils.DateUtils')
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
     @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
@@ -20,12 +36,10 @@ class TestJobRunner(unittest.TestCase):
             persistency_manager_mock,
             pod_name_mock,
             report_mock,
-            model_detail_mock,
             dateutils_mock
     ):
         mock_response = MagicMock()
         initiated_time: str = datetime(2023, 12, 12, 0, 0, 0).isoformat()
-        completion_time: str = datetime(2023, 12, 12, 0, 0, 5).isoformat()
         deployment_date: str = datetime(2023, 12, 11, 15, 8, 13, 45678).isoformat()
         current_time: datetime = datetime(2023, 12, 12, 0, 15, 0)
         job_result_without_completion_time = {
@@ -36,18 +50,9 @@ class TestJobRunner(unittest.TestCase):
             'date': deployment_date
         }
 
-        job_result_with_completion_time = {
-            'job_runner_name': 'pod1',
-            'initiated_time': initiated_time,
-            'completion_time': completion_time
-        }
-        mock_response.get_the_value.side_effect = [job_result_without_completion_time,
-                                                   job_result_without_completion_time,
-                                                   job_result_without_completion_time,
-                                                   job_result_without_completion_time,
-                                                   deployment_detail,
-                                                   job_result_with_completion_time]
-        mock_response.upsert.return_value = True
+        mock_response.batch_get.return_value = self.get_batch_values(
+            deployment_detail, job_result_without_completion_time, job_result_without_completion_time)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
         persistency_manager_mock.return_value = mock_response
         pod_name_mock.return_value = 'pod1'
         report_response_for_24hours = {
@@ -77,7 +82,6 @@ class TestJobRunner(unittest.TestCase):
 
         }
         report_mock.side_effect = [report_response_for_24hours, report_response_for_7days]
-        model_detail_mock.return_value = deployment_detail
         dateutils_mock.get_current_time.return_value = current_time
         jobrunner: JobRunner = JobRunner()
         jobrunner.check_job_to_schedule()
@@ -97,7 +101,10 @@ class TestJobRunner(unittest.TestCase):
             'initiated_time': initiated_time,
             'completion_time': completion_time
         }
-        mock_response.get_the_value.return_value = job_result
+        deployment_detail = {
+            'date': datetime(2023, 12, 1, 15, 8, 13, 45678).isoformat()
+        }
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, job_result, job_result)
         persistency_manager_mock.return_value = mock_response
         jobrunner: JobRunner = JobRunner()
 
@@ -105,7 +112,6 @@ class TestJobRunner(unittest.TestCase):
         jobrunner.trigger_the_job = MagicMock()
         jobrunner.trigger_the_job.assert_not_called()
 
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
     @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
@@ -113,8 +119,7 @@ class TestJobRunner(unittest.TestCase):
             self,
             persistency_manager_mock,
             pod_name_mock,
-            report_mock,
-            model_detail_mock):
+            report_mock):
         mock_response = MagicMock()
         initiated_time: str = datetime(2023, 12, 12, 0, 0, 0).isoformat()
         deployment_date: str = datetime(2023, 12, 9, 15, 8, 13, 45678).isoformat()
@@ -127,9 +132,8 @@ class TestJobRunner(unittest.TestCase):
             'date': deployment_date
         }
 
-        # when job_runner been called 2 times, first time, it returns
-        # None and 2nd time, it returns job_result.
-        mock_response.get_the_value.side_effect = [None, job_result, job_result, deployment_detail]
+        # 24 hours job is not started, 7 days job is aborted.
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, None, job_result)
         persistency_manager_mock.return_value = mock_response
         pod_name_mock.return_value = "pod1"
         report_response_for_24hours = {
@@ -159,7 +163,6 @@ class TestJobRunner(unittest.TestCase):
             }
         }
         report_mock.side_effect = [report_response_for_24hours, report_response_for_7days]
-        model_detail_mock.return_value = deployment_detail
 
         jobrunner: JobRunner = JobRunner()
         jobrunner.trigger_the_job = MagicMock()
@@ -172,7 +175,6 @@ class TestJobRunner(unittest.TestCase):
         self.assertEqual(jobrunner.trigger_the_job.call_count, 2,
                          "trigger_the_job")
 
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
     @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
@@ -180,8 +182,7 @@ class TestJobRunner(unittest.TestCase):
             self,
             persistency_manager_mock,
             pod_name_mock,
-            report_mock,
-            model_detail_mock
+            report_mock
     ):
         mock_response = MagicMock()
         initiated_time: str = datetime(2023, 12, 12, 0, 0, 0).isoformat()
@@ -190,19 +191,16 @@ class TestJobRunner(unittest.TestCase):
             'job_runner_name': 'pod1',
             'initiated_time': initiated_time
         }
-        # when job_runner been called 2 times,
-        # first time, it returns  None
-        # 2nd time, it returns job_result.
-        mock_response.get_the_value.side_effect = [None, job_result, job_result, job_result]
-        persistency_manager_mock.return_value = mock_response
-        pod_name_mock.return_value = "pod1"
-
         deployment_date: str = datetime(2023, 12, 9, 15, 8, 13, 45678).isoformat()
         deployment_detail = {
             'date': deployment_date
         }
+        # 24 hours job is not started, 7 days job is aborted.
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, None, job_result)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = "pod1"
 
-        model_detail_mock.return_value = deployment_detail
         report_response_for_24hours = {
             'error': 'exception'
         }
@@ -219,7 +217,6 @@ class TestJobRunner(unittest.TestCase):
         self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_ABORTED.name,
                          "job is not aborted")  # add assertion here
 
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
     @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
@@ -227,24 +224,17 @@ class TestJobRunner(unittest.TestCase):
             self,
             persistency_manager_mock,
             pod_name_mock,
-            report_mock,
-            model_detail_mock
+            report_mock
     ):
         mock_response = MagicMock()
-        initiated_time: str = datetime(2023, 12, 12, 0, 0, 0).isoformat()
         deployment_date: str = datetime(2023, 12, 1, 15, 8, 13, 45678).isoformat()
 
-        job_result = {
-            'job_runner_name': 'pod1',
-            'initiated_time': initiated_time
-        }
         deployment_result = {
             'date': deployment_date
         }
-        # when job_runner been called 2 times,
-        # first time, it returns  None
-        # 2nd time, it returns job_result.
-        mock_response.get_the_value.side_effect = [None, job_result, None, job_result, job_result, deployment_result]
+        # neither of the jobs is scheduled yet.
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_result, None, None)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
         persistency_manager_mock.return_value = mock_response
         pod_name_mock.return_value = "pod1"
         report_response_for_24hours = {
@@ -258,7 +248,6 @@ class TestJobRunner(unittest.TestCase):
             'error': 'exception'
         }
         report_mock.side_effect = [report_response_for_24hours, report_response_for_7days]
-        model_detail_mock.return_value = deployment_result
         jobrunner: JobRunner = JobRunner()
         jobrunner.check_job_to_schedule()
         self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name, "job is not completed")
@@ -272,8 +261,11 @@ class TestJobRunner(unittest.TestCase):
             persistency_manager_mock,
             pod_name_mock):
         mock_response = MagicMock()
-        mock_response.get_the_value.return_value = None
-        mock_response.upsert_value.return_value = False
+        deployment_detail = {
+            'date': datetime(2023, 12, 1, 15, 8, 13, 45678).isoformat()
+        }
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, None, None)
+        mock_response.acquire_lease.return_value = LeaseStatus.FAILED
         persistency_manager_mock.return_value = mock_response
         pod_name_mock.return_value = "pod1"
         jobrunner: JobRunner = JobRunner()
@@ -283,15 +275,112 @@ class TestJobRunner(unittest.TestCase):
         self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_ABORTED.name,
                          "job is not aborted")  # add assertion here
 
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_job_is_not_executed_when_another_pod_holds_the_lease(
+            self,
+            persistency_manager_mock,
+            pod_name_mock,
+            report_mock):
+        mock_response = MagicMock()
+        mock_response.acquire_lease.return_value = LeaseStatus.HELD_BY_OTHER
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = "pod2"
+        deployment_detail = {
+            'date': datetime(2023, 12, 1, 15, 8, 13, 45678).isoformat()
+        }
+        jobrunner: JobRunner = JobRunner()
+        jobrunner.trigger_the_job(key='24-hours - 12-12-2023', deployment_detail=deployment_detail)
+        report_mock.assert_not_called()
+        mock_response.get_the_value.assert_not_called()
+        mock_response.complete_lease.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_IN_PROGRESS.name,
+                         "job is not in progress by the other pod")
+
+    @patch('service.dynamo.jobrunner.ModelUtils.insert_deployment_detail')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_job_keys_are_read_with_one_batched_call(self, persistency_manager_mock, insert_deployment_mock):
+        mock_response = MagicMock()
+        job_result = {
+            'job_runner_name': 'pod1',
+            'initiated_time': datetime(2023, 12, 12, 0, 0, 0).isoformat(),
+            'completion_time': datetime(2023, 12, 12, 0, 0, 5).isoformat()
+        }
+        deployment_detail = {
+            'date': datetime(2023, 12, 1, 15, 8, 13, 45678).isoformat()
+        }
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, job_result, job_result)
+        persistency_manager_mock.return_value = mock_response
+        jobrunner: JobRunner = JobRunner()
+        jobrunner.check_job_to_schedule()
+        mock_response.batch_get.assert_called_once()
+        self.assertEqual(list(mock_response.batch_get.call_args.kwargs['keys']),
+                         list(self.get_batch_values(None, None, None).keys()) + [ModelUtils.MODEL_VERSIONS_KEY])
+        mock_response.get_the_value.assert_not_called()
+        insert_deployment_mock.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name)
+        self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_COMPLETED.name)
+
+    @patch('service.dynamo.jobrunner.ModelUtils.insert_deployment_detail')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_jobs_are_not_triggered_when_job_keys_are_not_read(self, persistency_manager_mock,
+                                                               insert_deployment_mock):
+        mock_response = MagicMock()
+        mock_response.batch_get.return_value = None
+        persistency_manager_mock.return_value = mock_response
+        jobrunner: JobRunner = JobRunner()
+        jobrunner.trigger_the_job = MagicMock()
+        jobrunner.check_job_to_schedule()
+        jobrunner.trigger_the_job.assert_not_called()
+        insert_deployment_mock.assert_not_called()
+
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_concurrent_mode_does_not_delay_the_7_days_job(
+            self,
+            persistency_manager_mock,
+            pod_name_mock,
+            report_mock):
+        mock_response = MagicMock()
+        deployment_detail = {
+            'date': datetime.today().isoformat()
+        }
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, None, None)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = "pod1"
+        t_7_days_report_started = threading.Event()
+
+        def get_report(request: dict) -> dict:
+            if request['time_unit_'] == 'h':
+                # 24 hours query waits for the 7 days query, it would time out if they run one after the other.
+                if not t_7_days_report_started.wait(timeout=5):
+                    return {'error': 'timeout'}
+            else:
+                t_7_days_report_started.set()
+            return {
+                'icbc_calculation_kpis': {'total_recall': '99.9', 'auditor_fails_count': '45'},
+                'status': 'good',
+                'kibana_kpis': 'Total Recall: 99.9%'
+            }
+
+        report_mock.side_effect = get_report
+        jobrunner: JobRunner = JobRunner(concurrent=True)
+        jobrunner.check_job_to_schedule()
+        self.assertEqual(report_mock.call_count, 2)
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name, "job is not completed")
+        self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_COMPLETED.name, "job is not completed")
+        self.assertEqual(mock_response.acquire_lease.call_count, 2, "each job does not take its own lease")
+
     def test_get_persistency_manager(self):
         self.assertIsInstance(PersistencyManager.get_persistency_manager('dummy_table'), PersistencyManager)
 
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
     def test_job_should_not_be_started_in_another_10_minute_if_job_already_started(
             self,
-            persistency_manager_mock,
-            model_detail_mock
+            persistency_manager_mock
     ):
         mock_response = MagicMock()
         initiated_time = datetime.today().isoformat()
@@ -305,12 +394,10 @@ class TestJobRunner(unittest.TestCase):
             'date': deployment_date
         }
 
-        mock_response.get_the_value.side_effect = [job_result_without_completion_time,
-                                                   job_result_without_completion_time,
-                                                   job_result_without_completion_time]
+        mock_response.batch_get.return_value = self.get_batch_values(
+            deployment_detail, job_result_without_completion_time, job_result_without_completion_time)
 
         persistency_manager_mock.return_value = mock_response
-        model_detail_mock.return_value = deployment_detail
         jobrunner: JobRunner = JobRunner()
         jobrunner.check_job_to_schedule()
         self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_IN_PROGRESS.name, "job is already scheduled")
@@ -368,6 +455,38 @@ class TestJobRunner(unittest.TestCase):
         status = jobrunner.check_job_executed_successfully(key=key, job_result=job_result_with_completion_time)
         self.assertEqual(status, "JOB_ABORTED", "job is not aborted")
 
+    def test_check_job_executed_successfully_with_lease_expiry(self):
+        # the lease decides, however long ago the job was initiated.
+        job_result = {
+            'job_runner_name': 'pod1',
+            'initiated_time': datetime(2024, 1, 5, 4, 8, 5).isoformat(),
+            'lease_expiry': int(time.time()) + 30
+        }
+        jobrunner: JobRunner = JobRunner()
+        self.assertEqual(jobrunner.check_job_executed_successfully(key='24-hours', job_result=job_result),
+                         JobStatus.JOB_IN_PROGRESS.name)
+        job_result.update(initiated_time=datetime.today().isoformat(), lease_expiry=int(time.time()) - 1)
+        self.assertEqual(jobrunner.check_job_executed_successfully(key='24-hours', job_result=job_result),
+                         JobStatus.JOB_ABORTED.name)
+
+    @patch('service.dynamo.jobrunner.LeaseHeartbeat')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_trigger_the_job_renews_the_lease_while_the_report_runs(self, persistency_manager_mock, pod_name_mock,
+                                                                    report_mock, heartbeat_mock):
+        pod_name_mock.return_value = 'pod1'
+        persistency_manager_mock.return_value.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        heartbeat_running: list = []
+        report_mock.side_effect = lambda request: heartbeat_running.append(
+            heartbeat_mock.return_value.__enter__.called and not heartbeat_mock.return_value.__exit__.called) \
+            or {'error': 'timeout'}
+        JobRunner().trigger_the_job(key='24-hours - 05-01-2024', deployment_detail={}, correlation_id='1')
+        self.assertEqual(heartbeat_mock.call_args.kwargs['key'], '24-hours - 05-01-2024')
+        self.assertEqual(heartbeat_mock.call_args.kwargs['owner'], 'pod1')
+        self.assertEqual(heartbeat_running, [True])
+        heartbeat_mock.return_value.__exit__.assert_called_once()
+
     def test_check_job_executed_successfully_throws_value_error(
             self):
         # given
@@ -472,13 +591,7 @@ class TestJobRunner(unittest.TestCase):
         }
         model_deployment_header_mock.return_value = model_deployment_detail
 
-        job_result = {
-            'job_runner_name': 'pod1',
-            'initiated_time': initiated_time,
-
-        }
-        mock_response.get_the_value.side_effect = [job_result]
-        mock_response.upsert_return_value = True
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
         persistency_manager_mock.return_value = mock_response
         report_response_for_24hours = {
             'icbc_calculation_kpis': {
@@ -514,7 +627,6 @@ class TestJobRunner(unittest.TestCase):
         jobrunner.check_the_model_performance.assert_not_called()
 
     @patch('service.dynamo.samplerate.SampleRate.sameplerate_upsert')
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.DateUtils.get_current_time')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
@@ -525,7 +637,6 @@ class TestJobRunner(unittest.TestCase):
             pod_name_mock,
             report_mock,
             current_time_mock,
-            model_detail_from_db_mock,
             sample_rate_mock
     ):
         mock_response = MagicMock()
@@ -540,15 +651,11 @@ class TestJobRunner(unittest.TestCase):
             'date': deployment_date
         }
 
-        # when job_runner been called 2 times, first time, it returns
-        # None and 2nd time, it returns job_result.
-        sample_rate_value = None
-        mock_response.get_the_value.side_effect = [None, job_result, job_result, job_result, job_result,
-                                                   deployment_detail,
-                                                   sample_rate_value]
+        # 24 hours job is not started, 7 days job is aborted.
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_detail, None, job_result)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
 
         persistency_manager_mock.return_value = mock_response
-        persistency_manager_mock.upsert.return_value = True
         pod_name_mock.return_value = "pod1"
         report_response_for_24hours = {
             'icbc_calculation_kpis': {
@@ -579,7 +686,6 @@ class TestJobRunner(unittest.TestCase):
         }
         report_mock.side_effect = [report_response_for_24hours, report_response_for_7days]
         current_time_mock.return_value = datetime(2023, 12, 18, 0, 30, 0)
-        model_detail_from_db_mock.return_value = deployment_detail
         sample_rate_dict = {
             '100': {
                 'date_added': '2024:01:01T12:01:12',
@@ -599,7 +705,6 @@ class TestJobRunner(unittest.TestCase):
         jobrunner.check_job_to_schedule()
         self.assertEqual(jobrunner.icbc_service_status, IcbcStatus.SILENT.name, "icbc is active")
 
-    @patch('service.dynamo.jobrunner.ModelUtils.get_model_detail_from_db')
     @patch('service.dynamo.jobrunner.DateUtils.get_current_time')
     @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
     @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
@@ -609,29 +714,19 @@ class TestJobRunner(unittest.TestCase):
             persistency_manager_mock,
             pod_name_mock,
             report_mock,
-            current_time_mock,
-            model_detail_mock
+            current_time_mock
     ):
         mock_response = MagicMock()
-        initiated_time: str = datetime(2023, 12, 18, 0, 0, 0).isoformat()
         deployment_date: str = datetime(2023, 12, 9, 15, 8, 13, 45678).isoformat()
-        job_result = {
-            'job_runner_name': 'pod1',
-            'initiated_time': initiated_time
-
-        }
         deployment_result = {
             'date': deployment_date
         }
 
-        # when job_runner been called 2 times, first time, it returns
-        # None and 2nd time, it returns job_result.
-        sample_rate_value = None
-        mock_response.get_the_value.side_effect = [None, job_result, None, job_result, deployment_result,
-                                                   sample_rate_value]
+        # neither of the jobs is scheduled yet.
+        mock_response.batch_get.return_value = self.get_batch_values(deployment_result, None, None)
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
 
         persistency_manager_mock.return_value = mock_response
-        persistency_manager_mock.upsert.return_value = True
         pod_name_mock.return_value = "pod1"
         report_response_for_24hours = {
             'icbc_calculation_kpis': {
@@ -661,12 +756,289 @@ class TestJobRunner(unittest.TestCase):
         }
         report_mock.side_effect = [report_response_for_24hours, report_response_for_7days]
         current_time_mock.return_value = datetime(2023, 12, 18, 0, 30, 0)
-        model_detail_mock.return_value = deployment_result
         jobrunner: JobRunner = JobRunner()
         jobrunner.check_job_to_schedule()
         self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name, "Job is not completed")
         self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_ABORTED.name, "Job is not aborted")
 
+    def test_get_job_keys_of_other_model_version(self):
+        date: str = time.strftime("%d-%m-%Y")
+        other_model_version: str = f'v3_{config.model_environment}'
+        self.assertEqual(JobRunner.get_job_keys(), list(self.get_batch_values(None, None, None).keys()))
+        self.assertEqual(JobRunner.get_job_keys(model_version=other_model_version),
+                         [f'deployment_date_{other_model_version}', f'24-hours - {date} - {other_model_version}',
+                          f'7-days - {date} - {other_model_version}'])
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_check_job_to_schedule_fans_out_the_model_versions(
+            self, persistency_manager_mock, pod_name_mock, report_mock, dateutils_mock):
+        stable_model_version: str = ModelUtils.get_model_version_with_environment_suffix()
+        other_model_version: str = f'v3_{config.model_environment}'
+        deployment_detail = {'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()}
+        table: dict = dict(self.get_batch_values(deployment_detail, None, None),
+                           model_versions={'versions': ['v3']})
+        table[f'deployment_date_{other_model_version}'] = deployment_detail
+        mock_response = MagicMock()
+        mock_response.batch_get.side_effect = lambda keys, **kwargs: {key: table.get(key) for key in keys}
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        report = {
+            'icbc_calculation_kpis': {'total_recall': '99.9', 'auditor_fails_count': '1'},
+            'status': 'good',
+            'kibana_kpis': 'Total Recall: 99.9%'
+        }
+        kpi_report = MagicMock()
+        kpi_report.query_es_multi_version.side_effect = lambda request, correlation_id=None: {
+            model_version: report for model_version in request['model_versions']}
+
+        jobrunner: JobRunner = JobRunner(kpi_report=kpi_report)
+        jobrunner.check_job_to_schedule()
+
+        self.assertEqual(mock_response.batch_get.call_count, 2)
+        # one query per time window for both model versions.
+        self.assertEqual(kpi_report.query_es_multi_version.call_count, 2)
+        for call in kpi_report.query_es_multi_version.call_args_list:
+            self.assertEqual(call.args[0]['model_versions'], [stable_model_version, other_model_version])
+        report_mock.assert_not_called()
+        leased_keys: list = [call.kwargs['key'] for call in mock_response.acquire_lease.call_args_list]
+        self.assertEqual(sorted(leased_keys), sorted(JobRunner.get_job_keys()[1:] +
+                                                     JobRunner.get_job_keys(model_version=other_model_version)[1:]))
+        self.assertEqual(mock_response.complete_lease.call_count, 4)
+        self.assertEqual(jobrunner.job_statuses[other_model_version], {'24-hours': JobStatus.JOB_COMPLETED.name,
+                                                                       '7-days': JobStatus.JOB_COMPLETED.name})
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_COMPLETED.name)
+        self.assertEqual(jobrunner.t_7_days_job_status, JobStatus.JOB_COMPLETED.name)
+
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_trigger_the_jobs_when_the_query_fails(self, persistency_manager_mock, pod_name_mock, report_mock):
+        mock_response = MagicMock()
+        mock_response.acquire_lease.side_effect = [LeaseStatus.ACQUIRED, LeaseStatus.HELD_BY_OTHER,
+                                                   LeaseStatus.ACQUIRED]
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = 'pod1'
+        kpi_report = MagicMock()
+        kpi_report.query_es_multi_version.return_value = {'error': 'timeout'}
+        jobrunner: JobRunner = JobRunner(kpi_report=kpi_report)
+        responses = jobrunner.trigger_the_jobs(
+            keys={'v2_US2': '24-hours - 12-12-2023', 'v3_US2': '24-hours - 12-12-2023 - v3_US2',
+                  'v4_US2': '24-hours - 12-12-2023 - v4_US2'},
+            deployment_details={}, correlation_id='1')
+        self.assertEqual(kpi_report.query_es_multi_version.call_args.args[0]['model_versions'],
+                         ['v2_US2', 'v4_US2'])
+        self.assertEqual(responses, {'v2_US2': {'error': 'timeout'}, 'v3_US2': {}, 'v4_US2': {'error': 'timeout'}})
+        self.assertEqual(jobrunner.job_statuses['v3_US2']['24-hours'], JobStatus.JOB_IN_PROGRESS.name)
+        self.assertEqual(jobrunner.job_statuses['v4_US2']['24-hours'], JobStatus.JOB_ABORTED.name)
+        mock_response.complete_lease.assert_not_called()
+        report_mock.assert_not_called()
+
+    @patch('service.dynamo.jobrunner.config')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    def test_get_kpi_report_with_daily_kpi_counters(self, report_mock, config_mock):
+        kpi_report = MagicMock()
+        request: dict = {'absolute_time_from_': 7, 'time_unit_': 'd', 'model_version': 'v2'}
+        config_mock.daily_kpi_counters_enabled = True
+        self.assertIs(JobRunner(kpi_report=kpi_report).get_kpi_report(request, correlation_id='1'),
+                      kpi_report.query_es_incremental.return_value)
+        kpi_report.query_es_incremental.assert_called_once_with(request, correlation_id='1')
+        report_mock.assert_not_called()
+
+        config_mock.daily_kpi_counters_enabled = False
+        self.assertIs(JobRunner(kpi_report=kpi_report).get_kpi_report(request, correlation_id='1'),
+                      report_mock.return_value)
+
+    @patch('service.dynamo.jobrunner.config')
+    def test_get_company_counts(self, config_mock):
+        kpi_report = MagicMock()
+        job_detail: dict = {'key': '7-days', 'model_version': 'v2_US2', 'report_type': 7, 'time_unit': 'd'}
+        config_mock.company_recall_enabled = False
+        self.assertIsNone(JobRunner(kpi_report=kpi_report).get_company_counts(job_detail, correlation_id='1'))
+        kpi_report.query_es_company_pages.assert_not_called()
+
+        config_mock.company_recall_enabled = True
+        self.assertIs(JobRunner(kpi_report=kpi_report).get_company_counts(job_detail, correlation_id='1'),
+                      kpi_report.query_es_company_pages.return_value)
+        self.assertEqual(kpi_report.query_es_company_pages.call_args.args[0]['absolute_time_from_'], 7)
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_check_job_to_schedule_runs_a_registered_job(
+            self, persistency_manager_mock, pod_name_mock, report_mock, dateutils_mock):
+        completed_job = {
+            'job_runner_name': 'pod1',
+            'initiated_time': datetime(2023, 12, 12, 0, 0, 0).isoformat(),
+            'completion_time': datetime(2023, 12, 12, 0, 0, 5).isoformat()
+        }
+        post_action = MagicMock(side_effect=lambda job_runner, job_detail, response, correlation_id: [
+            dict(response, checked=True), True])
+        JobRegistry.register_post_action('hourly check', post_action)
+        hourly_job: JobSpec = JobSpec(name='1-hours', window=1, time_unit='h', message_detail='1 hour',
+                                      cadence='%H-%d-%m-%Y', ttl=TimeToLive.ONE_HOUR_TTL.value,
+                                      post_actions=('hourly check',))
+        JobRegistry.register(hourly_job)
+        self.addCleanup(JobRegistry.unregister, '1-hours')
+        mock_response = MagicMock()
+        mock_response.batch_get.return_value = dict(
+            self.get_batch_values({'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()},
+                                  completed_job, completed_job), **{hourly_job.get_key(): None})
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        mock_response.complete_lease.return_value = True
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        report_mock.return_value = {'icbc_calculation_kpis': {'total_recall': '99.9'}, 'status': 'good',
+                                    'kibana_kpis': 'Total Recall: 99.9%'}
+
+        jobrunner: JobRunner = JobRunner(concurrent=False)
+        jobrunner.check_job_to_schedule()
+
+        self.assertEqual(mock_response.batch_get.call_args.kwargs['keys'][:4], JobRunner.get_job_keys())
+        # only the hourly job is due, the completed jobs are remembered.
+        report_mock.assert_called_once()
+        self.assertEqual(report_mock.call_args.args[0]['absolute_time_from_'], '1')
+        self.assertEqual(report_mock.call_args.args[0]['time_unit_'], 'h')
+        post_action.assert_called_once()
+        self.assertEqual(mock_response.acquire_lease.call_args.kwargs['ttl'], TimeToLive.ONE_HOUR_TTL.value)
+        remembered: dict = {call.kwargs['key']: call.kwargs['cache_ttl']
+                            for call in mock_response.remember_value.call_args_list}
+        self.assertEqual(remembered, {key: TimeToLive.ONE_HOUR_TTL.value if key == hourly_job.get_key()
+                                      else TimeToLive.ONE_DAY_TTL.value for key in JobRunner.get_job_keys()[1:]})
+        self.assertEqual(jobrunner.job_statuses[ModelUtils.get_model_version_with_environment_suffix()],
+                         {'24-hours': JobStatus.JOB_COMPLETED.name, '7-days': JobStatus.JOB_COMPLETED.name,
+                          '1-hours': JobStatus.JOB_COMPLETED.name})
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_sharded_pod_attempts_only_its_jobs(self, persistency_manager_mock, pod_name_mock, report_mock,
+                                                dateutils_mock):
+        other_model_versions: list = [f'v{index}_{config.model_environment}' for index in range(3, 9)]
+        deployment_detail = {'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()}
+        table: dict = dict(self.get_batch_values(deployment_detail, None, None),
+                           model_versions={'versions': [f'v{index}' for index in range(3, 9)]})
+        for model_version in other_model_versions:
+            table[f'deployment_date_{model_version}'] = deployment_detail
+        mock_response = MagicMock()
+        mock_response.batch_get.side_effect = lambda keys, **kwargs: {key: table.get(key) for key in keys}
+        mock_response.put_member.return_value = {'pod1': 1700000000, 'pod2': 1700000000}
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        report_mock.return_value = {'icbc_calculation_kpis': {'total_recall': '99.9'}, 'status': 'good',
+                                    'kibana_kpis': 'Total Recall: 99.9%'}
+
+        JobRunner(sharding=True).check_job_to_schedule()
+
+        ring: HashRing = HashRing(members=['pod1', 'pod2'])
+        job_keys: list = [key for model_version in [None] + other_model_versions
+                          for key in JobRunner.get_job_keys(model_version=model_version)[1:]]
+        owned_keys: list = [key for key in job_keys if ring.get_owner(key) == 'pod1']
+        self.assertTrue(0 < len(owned_keys) < len(job_keys))
+        leased_keys: list = [call.kwargs['key'] for call in mock_response.acquire_lease.call_args_list]
+        self.assertEqual(sorted(leased_keys), sorted(owned_keys))
+        mock_response.put_member.assert_called_once()
+
+    @patch('service.common.modelutils.DateUtils')
+    @patch('service.dynamo.jobrunner.get_pfc_kpi_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_sharded_pod_takes_over_the_aborted_jobs(self, persistency_manager_mock, pod_name_mock, report_mock,
+                                                     dateutils_mock):
+        other_model_versions: list = [f'v{index}_{config.model_environment}' for index in range(3, 9)]
+        deployment_detail = {'date': datetime(2023, 12, 11, 15, 8, 13).isoformat()}
+        table: dict = dict(self.get_batch_values(deployment_detail, None, None),
+                           model_versions={'versions': [f'v{index}' for index in range(3, 9)]})
+        for model_version in other_model_versions:
+            table[f'deployment_date_{model_version}'] = deployment_detail
+        ring: HashRing = HashRing(members=['pod1', 'pod2'])
+        job_keys: list = [key for model_version in [None] + other_model_versions
+                          for key in JobRunner.get_job_keys(model_version=model_version)[1:]]
+        # the jobs of pod2 are started, and their leases expired.
+        for key in job_keys:
+            if ring.get_owner(key) == 'pod2':
+                table[key] = {'job_runner_name': 'pod2', 'initiated_time': datetime(2023, 12, 12).isoformat(),
+                              'lease_expiry': int(time.time()) - 60}
+        mock_response = MagicMock()
+        mock_response.batch_get.side_effect = lambda keys, **kwargs: {key: table.get(key) for key in keys}
+        mock_response.put_member.return_value = {'pod1': 1700000000, 'pod2': 1700000000}
+        mock_response.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager_mock.return_value = mock_response
+        pod_name_mock.return_value = 'pod1'
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 15, 0)
+        report_mock.return_value = {'icbc_calculation_kpis': {'total_recall': '99.9'}, 'status': 'good',
+                                    'kibana_kpis': 'Total Recall: 99.9%'}
+
+        JobRunner(sharding=True).check_job_to_schedule()
+
+        leased_keys: list = [call.kwargs['key'] for call in mock_response.acquire_lease.call_args_list]
+        self.assertEqual(sorted(leased_keys), sorted(job_keys))
+
+    @patch('service.dynamo.jobrunner.JobRunner.get_post_actions')
+    @patch('service.dynamo.jobrunner.JobRunner.log_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_finish_job_when_the_lease_is_lost(self, persistency_manager_mock, pod_name_mock, log_report_mock,
+                                               post_actions_mock):
+        pod_name_mock.return_value = 'pod1'
+        heartbeat = MagicMock()
+        heartbeat.lease_lost = threading.Event()
+        post_action = MagicMock(side_effect=lambda job_runner, response, **kwargs: [response, True])
+        post_actions_mock.return_value = [post_action]
+        deployment_detail: dict = {'date': datetime(2023, 12, 1, 15, 8, 13).isoformat()}
+        report: dict = {'icbc_calculation_kpis': {'total_recall': '99.9'}}
+        jobrunner: JobRunner = JobRunner()
+
+        # the lease is lost before the report is logged.
+        heartbeat.lease_lost.set()
+        job_detail: dict = jobrunner.start_job(key='24-hours - 12-12-2023')
+        self.assertEqual(jobrunner.finish_job(job_detail=job_detail, response=dict(report),
+                                              deployment_detail=deployment_detail, correlation_id='1',
+                                              heartbeat=heartbeat), {})
+        log_report_mock.assert_not_called()
+        post_action.assert_not_called()
+
+        # the lease is lost while the post actions run.
+        heartbeat.lease_lost.clear()
+
+        def post_action_which_loses_the_lease(job_runner, response, **kwargs):
+            heartbeat.lease_lost.set()
+            return [response, True]
+
+        post_action.side_effect = post_action_which_loses_the_lease
+        self.assertEqual(jobrunner.finish_job(job_detail=job_detail, response=dict(report),
+                                              deployment_detail=deployment_detail, correlation_id='1',
+                                              heartbeat=heartbeat), {})
+        log_report_mock.assert_called_once()
+        persistency_manager_mock.return_value.complete_lease.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_IN_PROGRESS.name)
+
+    @patch('service.dynamo.jobrunner.JobRunner.log_report')
+    @patch('service.dynamo.jobrunner.JobRunner.get_pod_name')
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_finish_job_when_the_completion_is_not_written(self, persistency_manager_mock, pod_name_mock,
+                                                           log_report_mock):
+        pod_name_mock.return_value = 'pod1'
+        persistency_manager_mock.return_value.complete_lease.return_value = False
+        jobrunner: JobRunner = JobRunner()
+        job_detail: dict = jobrunner.start_job(key='24-hours - 12-12-2023')
+        response: dict = jobrunner.finish_job(
+            job_detail=job_detail, response={'icbc_calculation_kpis': {'total_recall': '99.9'}},
+            deployment_detail={'date': datetime(2023, 12, 1, 15, 8, 13).isoformat()}, correlation_id='1')
+        self.assertIn('error', response)
+        self.assertEqual(persistency_manager_mock.return_value.complete_lease.call_args.kwargs['owner'], 'pod1')
+        persistency_manager_mock.return_value.remember_value.assert_not_called()
+        self.assertEqual(jobrunner.t_24_hours_job_status, JobStatus.JOB_ABORTED.name)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
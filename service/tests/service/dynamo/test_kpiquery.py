@@ -1,4 +1,8 @@
+import json
 import unittest
+from unittest.mock import patch
+
+from service.configs import config
 from service.elasticsearch.kpiquery import KPIQuery
 
 
@@ -8,9 +12,8 @@ class TestKPIQuery(unittest.TestCase):
         self.kpiquery = KPIQuery()
 
     @staticmethod
-    def get_ml_audit_questions_timestamp(query: dict, from_or_to: str):
-        return query['aggs']['ml_audit']['filters']['filters']['ml_audit_questions']['bool']['filter'][0]['range'][
-            '@timestamp'][str(from_or_to)]
+    def get_query_timestamp(query: dict, from_or_to: str):
+        return query['query']['bool']['filter'][0]['range']['@timestamp'][str(from_or_to)]
 
     def test_get_query_when_last24h_given(self):
         request_object_dict = {
@@ -23,8 +26,8 @@ class TestKPIQuery(unittest.TestCase):
         query_resp = self.kpiquery.get_query(request_object_dict)
         if 'query' in query_resp:
             query = query_resp['query']
-            from_clause = self.get_ml_audit_questions_timestamp(query, 'from')
-            to_clause = self.get_ml_audit_questions_timestamp(query, 'to')
+            from_clause = self.get_query_timestamp(query, 'from')
+            to_clause = self.get_query_timestamp(query, 'to')
             self.assertEqual(from_clause, 'now-24h', 'from clause is not equal to now-24h')
             self.assertEqual(to_clause, 'now', 'to clause is not equal to now')
 
@@ -38,6 +41,7 @@ class TestKPIQuery(unittest.TestCase):
         }
         query_resp = self.kpiquery.get_query(request_object_dict)
         expected_query = {
+            'query': {'bool': {'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}}]}},
             'aggs': {
                 'ml_audit': {
                     'aggs': {
@@ -48,69 +52,63 @@ class TestKPIQuery(unittest.TestCase):
                             'ml_audit_questions': {
                                 'bool': {
                                     'filter':
-                                        [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                         {'term': {'datascience_data.message': 'total audit questions parsed'}},
-                                         {'term': {'application': 'datascience-ml-audit'}}]}}}}}, 'pfc': {
-                    'filters': {
-                        'filters': {
-                            'true_fails': {
-                                'bool': {
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}}, {
-                                                   'terms': {
-                                                       'davinci_data.task_event': ['fail-fail', 'fail-pend',
-                                                                                   'fail-none', 'fail-pwe',
-                                                                                   'fail-99']}},
-                                               {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
-                            'true_fails_trained_entities': {
-                                'bool': {
-                                    'must_not': {'term': {'datascience_data.param2': 'entity_not_in_allow_list'}},
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}}, {
-                                                   'terms': {
-                                                       'davinci_data.task_event': ['fail-fail', 'fail-pend',
-                                                                                   'fail-none', 'fail-pwe',
-                                                                                   'fail-99']}},
-                                               {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
-                            'pfc_bypass': {
-                                'bool': {
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}},
-                                               {'term': {'davinci_data.task_event': 'pass-bypass'}}]}},
-                            'auditor_fails_trained_entities': {
-                                'bool': {
-                                    'must_not': {'term': {'datascience_data.param2': 'entity_not_in_allow_list'}},
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}}, {
-                                                   'terms': {
-                                                       'davinci_data.task_event': ['fail-fail', 'fail-pend',
-                                                                                   'fail-none', 'fail-pwe', 'fail-99',
-                                                                                   'pass-fail', 'pass-pend',
-                                                                                   'pass-none', 'pass-pwe',
-                                                                                   'pass-99']}},
-                                               {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
-                            'sampled_questions': {
-                                'bool': {
-                                    'must': {'exists': {'field': 'davinci_data.task_event'}},
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}},
-                                               {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
-                            'received_questions': {
-                                'bool': {
-                                    'must': {'exists': {'field': 'davinci_data.task_event'}},
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}},
-                                               {'term': {'metric.path': 'v2'}}]}}, 'auditor_fails': {
-                                'bool': {
-                                    'filter': [{'range': {'@timestamp': {'from': '2023-12-08', 'to': 'now'}}},
-                                               {'term': {'metric.service': 'pfc_stable'}}, {
-                                                   'terms': {
-                                                       'davinci_data.task_event': ['fail-fail', 'fail-pend',
-                                                                                   'fail-none', 'fail-pwe', 'fail-99',
-                                                                                   'pass-fail', 'pass-pend',
-                                                                                   'pass-none', 'pass-pwe',
-                                                                                   'pass-99']}},
-                                               {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}}}}}},
+                                        [{'term': {'datascience_data.message': 'total audit questions parsed'}},
+                                         {'term': {'application': 'datascience-ml-audit'}}]}}}}},
+                'pfc_stable': {
+                    'filter': {'term': {'metric.service': 'pfc_stable'}},
+                    'aggs': {
+                        'pfc': {
+                            'filters': {
+                                'filters': {
+                                    'true_fails': {
+                                        'bool': {
+                                            'filter':
+                                                [{'terms': {'davinci_data.task_event': ['fail-fail', 'fail-pend',
+                                                                                        'fail-none', 'fail-pwe',
+                                                                                        'fail-99']}},
+                                                 {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
+                                    'true_fails_trained_entities': {
+                                        'bool': {
+                                            'must_not':
+                                                {'term': {'datascience_data.param2': 'entity_not_in_allow_list'}},
+                                            'filter':
+                                                [{'terms': {'davinci_data.task_event': ['fail-fail', 'fail-pend',
+                                                                                        'fail-none', 'fail-pwe',
+                                                                                        'fail-99']}},
+                                                 {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
+                                    'pfc_bypass': {
+                                        'bool': {
+                                            'filter': [{'term': {'davinci_data.task_event': 'pass-bypass'}}]}},
+                                    'auditor_fails_trained_entities': {
+                                        'bool': {
+                                            'must_not':
+                                                {'term': {'datascience_data.param2': 'entity_not_in_allow_list'}},
+                                            'filter':
+                                                [{'terms': {'davinci_data.task_event': ['fail-fail', 'fail-pend',
+                                                                                        'fail-none', 'fail-pwe',
+                                                                                        'fail-99', 'pass-fail',
+                                                                                        'pass-pend', 'pass-none',
+                                                                                        'pass-pwe', 'pass-99']}},
+                                                 {'term': {'metric.value': 1}}, {'term': {'metric.path': 'v2'}}]}},
+                                    'sampled_questions': {
+                                        'bool': {
+                                            'must': {'exists': {'field': 'davinci_data.task_event'}},
+                                            'filter': [{'term': {'metric.value': 1}},
+                                                       {'term': {'metric.path': 'v2'}}]}},
+                                    'received_questions': {
+                                        'bool': {
+                                            'must': {'exists': {'field': 'davinci_data.task_event'}},
+                                            'filter': [{'term': {'metric.path': 'v2'}}]}},
+                                    'auditor_fails': {
+                                        'bool': {
+                                            'filter':
+                                                [{'terms': {'davinci_data.task_event': ['fail-fail', 'fail-pend',
+                                                                                        'fail-none', 'fail-pwe',
+                                                                                        'fail-99', 'pass-fail',
+                                                                                        'pass-pend', 'pass-none',
+                                                                                        'pass-pwe', 'pass-99']}},
+                                                 {'term': {'metric.value': 1}},
+                                                 {'term': {'metric.path': 'v2'}}]}}}}}}}},
             'size': 0}
         self.assertEqual(query_resp['query'], expected_query, "query is not equal")
 
@@ -124,6 +122,20 @@ class TestKPIQuery(unittest.TestCase):
         }
         query_resp = self.kpiquery.get_query(request_object_dict)
         expected_query = {
+            "query": {
+                "bool": {
+                    "filter": [
+                        {
+                            "range": {
+                                "@timestamp": {
+                                    "from": "now-7d",
+                                    "to": "now"
+                                }
+                            }
+                        }
+                    ]
+                }
+            },
             "aggs": {
                 "ml_audit": {
                     "aggs": {
@@ -138,14 +150,6 @@ class TestKPIQuery(unittest.TestCase):
                             "ml_audit_questions": {
                                 "bool": {
                                     "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
-                                                }
-                                            }
-                                        },
                                         {
                                             "term": {
                                                 "datascience_data.message": "total audit questions parsed"
@@ -162,274 +166,192 @@ class TestKPIQuery(unittest.TestCase):
                         }
                     }
                 },
-                "pfc": {
-                    "filters": {
-                        "filters": {
-                            "true_fails": {
-                                "bool": {
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                "pfc_stable": {
+                    "filter": {
+                        "term": {
+                            "metric.service": "pfc_stable"
+                        }
+                    },
+                    "aggs": {
+                        "pfc": {
+                            "filters": {
+                                "filters": {
+                                    "true_fails": {
+                                        "bool": {
+                                            "filter": [
+                                                {
+                                                    "terms": {
+                                                        "davinci_data.task_event": [
+                                                            "fail-fail",
+                                                            "fail-pend",
+                                                            "fail-none",
+                                                            "fail-pwe",
+                                                            "fail-99"
+                                                        ]
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.value": 1
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "terms": {
-                                                "davinci_data.task_event": [
-                                                    "fail-fail",
-                                                    "fail-pend",
-                                                    "fail-none",
-                                                    "fail-pwe",
-                                                    "fail-99"
-                                                ]
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.value": 1
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
-                                        }
-                                    ]
-                                }
-                            },
-                            "true_fails_trained_entities": {
-                                "bool": {
-                                    "must_not": {
-                                        "term": {
-                                            "datascience_data.param2": "entity_not_in_allow_list"
+                                            ]
                                         }
                                     },
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                    "true_fails_trained_entities": {
+                                        "bool": {
+                                            "must_not": {
+                                                "term": {
+                                                    "datascience_data.param2": "entity_not_in_allow_list"
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "terms": {
-                                                "davinci_data.task_event": [
-                                                    "fail-fail",
-                                                    "fail-pend",
-                                                    "fail-none",
-                                                    "fail-pwe",
-                                                    "fail-99"
-                                                ]
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.value": 1
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
-                                        }
-                                    ]
-                                }
-                            },
-                            "pfc_bypass": {
-                                "bool": {
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                            },
+                                            "filter": [
+                                                {
+                                                    "terms": {
+                                                        "davinci_data.task_event": [
+                                                            "fail-fail",
+                                                            "fail-pend",
+                                                            "fail-none",
+                                                            "fail-pwe",
+                                                            "fail-99"
+                                                        ]
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.value": 1
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "davinci_data.task_event": "pass-bypass"
-                                            }
-                                        }
-                                    ]
-                                }
-                            },
-                            "auditor_fails_trained_entities": {
-                                "bool": {
-                                    "must_not": {
-                                        "term": {
-                                            "datascience_data.param2": "entity_not_in_allow_list"
+                                            ]
                                         }
                                     },
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                    "pfc_bypass": {
+                                        "bool": {
+                                            "filter": [
+                                                {
+                                                    "term": {
+                                                        "davinci_data.task_event": "pass-bypass"
+                                                    }
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "terms": {
-                                                "davinci_data.task_event": [
-                                                    "fail-fail",
-                                                    "fail-pend",
-                                                    "fail-none",
-                                                    "fail-pwe",
-                                                    "fail-99",
-                                                    "pass-fail",
-                                                    "pass-pend",
-                                                    "pass-none",
-                                                    "pass-pwe",
-                                                    "pass-99"
-                                                ]
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.value": 1
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
-                                        }
-                                    ]
-                                }
-                            },
-                            "sampled_questions": {
-                                "bool": {
-                                    "must": {
-                                        "exists": {
-                                            "field": "davinci_data.task_event"
+                                            ]
                                         }
                                     },
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                    "auditor_fails_trained_entities": {
+                                        "bool": {
+                                            "must_not": {
+                                                "term": {
+                                                    "datascience_data.param2": "entity_not_in_allow_list"
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.value": 1
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
+                                            },
+                                            "filter": [
+                                                {
+                                                    "terms": {
+                                                        "davinci_data.task_event": [
+                                                            "fail-fail",
+                                                            "fail-pend",
+                                                            "fail-none",
+                                                            "fail-pwe",
+                                                            "fail-99",
+                                                            "pass-fail",
+                                                            "pass-pend",
+                                                            "pass-none",
+                                                            "pass-pwe",
+                                                            "pass-99"
+                                                        ]
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.value": 1
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
+                                                }
+                                            ]
                                         }
-                                    ]
-                                }
-                            },
-                            "received_questions": {
-                                "bool": {
-                                    "must": {
-                                        "exists": {
-                                            "field": "davinci_data.task_event"
+                                    },
+                                    "sampled_questions": {
+                                        "bool": {
+                                            "must": {
+                                                "exists": {
+                                                    "field": "davinci_data.task_event"
+                                                }
+                                            },
+                                            "filter": [
+                                                {
+                                                    "term": {
+                                                        "metric.value": 1
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
+                                                }
+                                            ]
                                         }
                                     },
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                    "received_questions": {
+                                        "bool": {
+                                            "must": {
+                                                "exists": {
+                                                    "field": "davinci_data.task_event"
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
+                                            },
+                                            "filter": [
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
+                                                }
+                                            ]
                                         }
-                                    ]
-                                }
-                            },
-                            "auditor_fails": {
-                                "bool": {
-                                    "filter": [
-                                        {
-                                            "range": {
-                                                "@timestamp": {
-                                                    "from": "now-7d",
-                                                    "to": "now"
+                                    },
+                                    "auditor_fails": {
+                                        "bool": {
+                                            "filter": [
+                                                {
+                                                    "terms": {
+                                                        "davinci_data.task_event": [
+                                                            "fail-fail",
+                                                            "fail-pend",
+                                                            "fail-none",
+                                                            "fail-pwe",
+                                                            "fail-99",
+                                                            "pass-fail",
+                                                            "pass-pend",
+                                                            "pass-none",
+                                                            "pass-pwe",
+                                                            "pass-99"
+                                                        ]
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.value": 1
+                                                    }
+                                                },
+                                                {
+                                                    "term": {
+                                                        "metric.path": "v2.3.2_EU2"
+                                                    }
                                                 }
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.service": "pfc_stable"
-                                            }
-                                        },
-                                        {
-                                            "terms": {
-                                                "davinci_data.task_event": [
-                                                    "fail-fail",
-                                                    "fail-pend",
-                                                    "fail-none",
-                                                    "fail-pwe",
-                                                    "fail-99",
-                                                    "pass-fail",
-                                                    "pass-pend",
-                                                    "pass-none",
-                                                    "pass-pwe",
-                                                    "pass-99"
-                                                ]
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.value": 1
-                                            }
-                                        },
-                                        {
-                                            "term": {
-                                                "metric.path": "v2.3.2_EU2"
-                                            }
+                                            ]
                                         }
-                                    ]
+                                    }
                                 }
                             }
                         }
@@ -452,8 +374,8 @@ class TestKPIQuery(unittest.TestCase):
         query_resp = self.kpiquery.get_query(request_object_dict)
         if 'query' in query_resp:
             query = query_resp['query']
-            from_clause = self.get_ml_audit_questions_timestamp(query, 'from')
-            to_clause = self.get_ml_audit_questions_timestamp(query, 'to')
+            from_clause = self.get_query_timestamp(query, 'from')
+            to_clause = self.get_query_timestamp(query, 'to')
             self.assertEqual(from_clause, '2023-12-08', 'from clause is not equal to 2023-12-08')
             self.assertEqual(to_clause, 'now', 'to clause is not equal to now')
 
@@ -468,8 +390,8 @@ class TestKPIQuery(unittest.TestCase):
         query_resp = self.kpiquery.get_query(request_object_dict)
         if 'query' in query_resp:
             query = query_resp['query']
-            from_clause = self.get_ml_audit_questions_timestamp(query, 'from')
-            to_clause = self.get_ml_audit_questions_timestamp(query, 'to')
+            from_clause = self.get_query_timestamp(query, 'from')
+            to_clause = self.get_query_timestamp(query, 'to')
             self.assertEqual(from_clause, '2023-12-08', 'from clause is not equal to 2023-12-08')
             self.assertEqual(to_clause, '2023-12-10', 'to clause is not equal to 2023-12-10')
 
@@ -557,6 +479,141 @@ class TestKPIQuery(unittest.TestCase):
         self.assertEqual(KPIQuery.generate_metric_value_term(self.kpiquery, value=1), expected_value,
                          "values are not the same")
 
+    def test_get_multi_window_query(self):
+        request_object_dict = {
+            'windows': [
+                {'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+                {'key': '7-days', 'absolute_time_from_': 7, 'time_unit_': 'd'}
+            ],
+            'model_version': 'v2'
+        }
+        query_resp = self.kpiquery.get_multi_window_query(request_object_dict)
+        query = query_resp['query']
+        self.assertEqual(query['query']['bool']['filter'][0]['bool']['should'],
+                         [{'range': {'@timestamp': {'from': 'now-24h', 'to': 'now'}}},
+                          {'range': {'@timestamp': {'from': 'now-7d', 'to': 'now'}}}])
+        self.assertEqual(query['aggs']['windows']['date_range'],
+                         {'field': '@timestamp', 'keyed': True,
+                          'ranges': [{'key': '24-hours', 'from': 'now-24h', 'to': 'now'},
+                                     {'key': '7-days', 'from': 'now-7d', 'to': 'now'}]})
+        # the window aggregations are the single window aggregations, the time range is in the query.
+        single_window_query = self.kpiquery.construct_query({
+            'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+            'relative_time_to_': None, 'model_version': 'v2'})
+        self.assertEqual(query['aggs']['windows']['aggs'], single_window_query['aggs'])
+
+    def test_get_multi_window_query_with_relative_window(self):
+        request_object_dict = {
+            'windows': [
+                {'key': '08-12-2023', 'relative_time_from_': '2023-12-08', 'relative_time_to_': '2023-12-09'}
+            ],
+            'model_version': 'v2'
+        }
+        query = self.kpiquery.get_multi_window_query(request_object_dict)['query']
+        self.assertEqual(query['aggs']['windows']['date_range']['ranges'],
+                         [{'key': '08-12-2023', 'from': '2023-12-08', 'to': '2023-12-09'}])
+
+    def test_get_multi_window_query_validation(self):
+        request_object_dict = {
+            'windows': [
+                {'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+                {'key': '24-hours', 'time_unit_': 'h'}
+            ]
+        }
+        validation = self.kpiquery.get_multi_window_query(request_object_dict)['validation_error']
+        self.assertEqual(validation[0], "Please provide the model_version for the stable model")
+        self.assertEqual(validation[1], "Please provide a unique key for every window")
+        self.assertEqual(validation[2], "24-hours: Please provide the absolute_time_from_ or relative_time_from_")
+        self.assertEqual(self.kpiquery.get_multi_window_query({'model_version': 'v2'})['validation_error'][0],
+                         "Please provide the windows")
+
+    def test_get_multi_version_query(self):
+        request_object_dict = {
+            'absolute_time_from_': 24, 'time_unit_': 'h', 'relative_time_from_': None,
+            'relative_time_to_': None, 'model_versions': ['v2', 'v3']
+        }
+        query = self.kpiquery.get_multi_version_query(request_object_dict)['query']
+        self.assertEqual(self.get_query_timestamp(query, 'from'), 'now-24h')
+        pfc_stable = query['aggs']['pfc_stable']
+        self.assertEqual(pfc_stable['filter'], {'term': {'metric.service': 'pfc_stable'}})
+        self.assertEqual(list(pfc_stable['aggs']['pfc']['filters']['filters'].keys()), ['pfc_bypass'])
+        self.assertEqual(pfc_stable['aggs']['model_versions']['terms'],
+                         {'field': 'metric.path', 'include': ['v2', 'v3'], 'size': 2})
+        # the buckets of a model version are the single version buckets without the metric path term.
+        single_version_query = self.kpiquery.construct_query(dict(request_object_dict, model_version='v2'))
+        single_version_buckets = single_version_query['aggs']['pfc_stable']['aggs']['pfc']['filters']['filters']
+        single_version_buckets.pop('pfc_bypass')
+        for bucket in single_version_buckets.values():
+            bucket['bool']['filter'].remove({'term': {'metric.path': 'v2'}})
+        self.assertEqual(pfc_stable['aggs']['model_versions']['aggs']['pfc']['filters']['filters'],
+                         single_version_buckets)
+        self.assertEqual(query['aggs']['ml_audit'], single_version_query['aggs']['ml_audit'])
+
+    def test_get_multi_version_query_validation(self):
+        validation = self.kpiquery.get_multi_version_query({
+            'absolute_time_from_': 24, 'relative_time_from_': '2023-12-08',
+            'model_versions': ['v2', 'v2']})['validation_error']
+        self.assertEqual(validation[0], "Please provide unique model_versions")
+        self.assertEqual(validation[1], "Don't give both absolute_time_from_ and relative_time_from_")
+        self.assertEqual(self.kpiquery.get_multi_version_query({'absolute_time_from_': 24})['validation_error'][0],
+                         "Please provide the model_versions")
+
+    def test_get_company_query(self):
+        request_object_dict = {
+            'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+            'relative_time_to_': None, 'model_version': 'v2'
+        }
+        query = self.kpiquery.get_company_query(request_object_dict)['query']
+        self.assertEqual(self.get_query_timestamp(query, 'from'), 'now-7d')
+        companies = query['aggs']['pfc_stable']['aggs']['companies']
+        self.assertEqual(companies['composite'], {
+            'size': config.company_buckets_size,
+            'sources': [{'company': {'terms': {'field': config.company_field}}}]
+        })
+        next_page = self.kpiquery.get_company_query(request_object_dict, after_key={'company': 'p0001'})['query']
+        self.assertEqual(next_page['aggs']['pfc_stable']['aggs']['companies']['composite']['after'],
+                         {'company': 'p0001'})
+        single_version_buckets = self.kpiquery.construct_query(request_object_dict)[
+            'aggs']['pfc_stable']['aggs']['pfc']['filters']['filters']
+        self.assertEqual(companies['aggs']['pfc']['filters']['filters'], {
+            'true_fails': single_version_buckets['true_fails'],
+            'auditor_fails': single_version_buckets['auditor_fails']
+        })
+        self.assertIn('validation_error', self.kpiquery.get_company_query({'absolute_time_from_': 7}))
+
+    def test_serialized_queries_are_the_same_as_the_queries(self):
+        request = {'absolute_time_from_': None, 'time_unit_': None, 'relative_time_from_': '2023-12-01',
+                   'relative_time_to_': '2023-12-08', 'model_version': 'v2'}
+        body = self.kpiquery.get_query(request, serialized=True)['query']
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(json.loads(body), self.kpiquery.construct_query(request))
+        windows_request = {'model_version': 'v3', 'windows': [
+            {'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+            {'key': 'december', 'relative_time_from_': '2023-12-01', 'relative_time_to_': '2023-12-08'}]}
+        self.assertEqual(json.loads(self.kpiquery.get_multi_window_query(windows_request, serialized=True)['query']),
+                         self.kpiquery.construct_multi_window_query(windows_request))
+        versions_request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                            'relative_time_to_': None, 'model_versions': ['v2', 'v3', 'v4']}
+        self.assertEqual(json.loads(self.kpiquery.get_multi_version_query(versions_request, serialized=True)['query']),
+                         self.kpiquery.construct_multi_version_query(versions_request))
+        self.assertIn('validation_error', self.kpiquery.get_query({'absolute_time_from_': 7}, serialized=True))
+
+    def test_query_templates_are_generated_once_per_shape(self):
+        KPIQuery.QUERY_TEMPLATES.clear()
+        with patch.object(KPIQuery, 'generate_query', wraps=self.kpiquery.generate_query) as generate_mock:
+            for model_version in ['v2', 'v3']:
+                body = self.kpiquery.construct_query_body(
+                    {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                     'relative_time_to_': None, 'model_version': model_version})
+                self.assertEqual(json.loads(body)['aggs']['pfc_stable']['aggs']['pfc']['filters']['filters'][
+                                     'auditor_fails']['bool']['filter'][2], {'term': {'metric.path': model_version}})
+        generate_mock.assert_called_once()
+        for windows in [1, 2, 2]:
+            self.kpiquery.construct_multi_window_query_body({'model_version': 'v2', 'windows': [
+                {'key': str(index), 'absolute_time_from_': index + 1, 'time_unit_': 'd'} for index in range(windows)]})
+        self.assertEqual(sorted(KPIQuery.QUERY_TEMPLATES.keys()),
+                         [('kpi', 1), ('multi_window', 1), ('multi_window', 2)])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
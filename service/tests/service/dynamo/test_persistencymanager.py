@@ -1,14 +1,21 @@
 import unittest
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 from service.dynamo.persistencymanager import PersistencyManager
+from service.dynamo.readthroughcache import ReadThroughCache
+from service.enums.leasestatus import LeaseStatus
 
 
 class TestPersistencyManager(unittest.TestCase):
 
     def setUp(self):
+        PersistencyManager.clear_registry()
         self.persistency_manager = PersistencyManager("dummy_table")
 
+    def tearDown(self):
+        PersistencyManager.clear_registry()
+
     def test_persistency_manager_is_fail_to_intialized(self):
         try:
             PersistencyManager("")
@@ -77,6 +84,196 @@ class TestPersistencyManager(unittest.TestCase):
         except ValueError:
             self.assertRaises(ValueError)
 
+    def test_get_persistency_manager_returns_one_manager_per_table(self):
+        manager = PersistencyManager.get_persistency_manager("dummy_table")
+        self.assertIs(PersistencyManager.get_persistency_manager("dummy_table"), manager,
+                      "manager is created again")
+        self.assertIsNot(PersistencyManager.get_persistency_manager("other_table"), manager,
+                         "manager is shared across tables")
+
+    @patch('service.dynamo.persistencymanager.get_dynamo')
+    def test_dynamo_handle_is_created_once_per_table(self, dynamo_mock):
+        mock = MagicMock()
+        mock.get.return_value = "some response"
+        mock.upsert.return_value = True
+        dynamo_mock.return_value = mock
+
+        def read_and_write(index: int):
+            manager = PersistencyManager.get_persistency_manager("dummy_table")
+            manager.upsert_value(f"key_{index}", {}, {})
+            return manager.get_the_value(f"key_{index}")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(read_and_write, range(50)))
+
+        self.assertEqual(results, ["some response"] * 50)
+        dynamo_mock.assert_called_once_with("dummy_table")
+        self.assertEqual(PersistencyManager.get_handle_creations()["dummy_table"]["dynamo"], 1,
+                         "dynamo handle is created more than once")
+
+    @patch('service.dynamo.persistencymanager.boto3')
+    def test_table_client_is_created_once_with_a_connection_pool(self, boto3_mock):
+        self.persistency_manager.get_table_client()
+        self.persistency_manager.get_table_client()
+        client_mock = boto3_mock.session.Session.return_value.client
+        client_mock.assert_called_once()
+        self.assertEqual(client_mock.call_args.kwargs['config'].max_pool_connections, 16)
+        self.assertEqual(PersistencyManager.get_handle_creations()["dummy_table"]["table_client"], 1)
+
+    def test_acquire_lease_when_key_is_free(self):
+        table_client_mock = MagicMock()
+        table_client_mock.put_lease.return_value = True
+        self.persistency_manager.table_client = table_client_mock
+        job_dict = {'initiated_time': '2024-01-05T04:08:05'}
+        # when
+        result = self.persistency_manager.acquire_lease(
+            key="24-hours - 05-01-2024", owner="pod1", value=job_dict, lease_seconds=600,
+            logging_msg={}, correlation_id=str(uuid.uuid4()), ttl=86400)
+        # then
+        self.assertEqual(result, LeaseStatus.ACQUIRED, "lease is not acquired")
+        lease_value = table_client_mock.put_lease.call_args.kwargs['value']
+        self.assertEqual(lease_value['job_runner_name'], "pod1", "lease owner is not the pod")
+        self.assertEqual(lease_value['lease_expiry'] - table_client_mock.put_lease.call_args.kwargs['now'], 600,
+                         "lease expiry is not now + lease_seconds")
+        self.assertNotIn('job_runner_name', job_dict, "given value is modified")
+
+    def test_acquire_lease_when_lease_is_held_by_another_pod(self):
+        table_client_mock = MagicMock()
+        table_client_mock.put_lease.return_value = False
+        self.persistency_manager.table_client = table_client_mock
+        result = self.persistency_manager.acquire_lease(
+            key="24-hours - 05-01-2024", owner="pod2", value={}, lease_seconds=600, logging_msg={})
+        self.assertEqual(result, LeaseStatus.HELD_BY_OTHER, "lease is not held by other")
+
+    def test_acquire_lease_when_table_throws_error(self):
+        table_client_mock = MagicMock()
+        table_client_mock.put_lease.side_effect = Exception("throttled")
+        self.persistency_manager.table_client = table_client_mock
+        result = self.persistency_manager.acquire_lease(
+            key="24-hours - 05-01-2024", owner="pod1", value={}, lease_seconds=600, logging_msg={})
+        self.assertEqual(result, LeaseStatus.FAILED, "lease is not failed")
+
+    @patch('service.dynamo.persistencymanager.time.time')
+    def test_renew_lease(self, time_mock):
+        time_mock.return_value = 1700000000
+        table_client_mock = MagicMock()
+        table_client_mock.renew_lease.return_value = True
+        self.persistency_manager.table_client = table_client_mock
+        self.assertEqual(self.persistency_manager.renew_lease(key="24-hours - 05-01-2024", owner="pod1",
+                                                              lease_seconds=60), LeaseStatus.ACQUIRED)
+        table_client_mock.renew_lease.assert_called_once_with(key="24-hours - 05-01-2024", owner="pod1",
+                                                              lease_expiry=1700000060)
+        table_client_mock.renew_lease.return_value = False
+        self.assertEqual(self.persistency_manager.renew_lease(key="key", owner="pod1", lease_seconds=60),
+                         LeaseStatus.HELD_BY_OTHER)
+        table_client_mock.renew_lease.side_effect = Exception("throttled")
+        self.assertEqual(self.persistency_manager.renew_lease(key="key", owner="pod1", lease_seconds=60),
+                         LeaseStatus.FAILED)
+
+    def test_complete_lease(self):
+        table_client_mock = MagicMock()
+        table_client_mock.complete_lease.return_value = True
+        self.persistency_manager.table_client = table_client_mock
+        value = {'job_runner_name': 'pod1', 'completion_time': '2024-01-05T00:01:00'}
+        self.assertTrue(self.persistency_manager.complete_lease(key="24-hours - 05-01-2024", owner="pod1",
+                                                                value=value, logging_msg={}, ttl=3600))
+        table_client_mock.complete_lease.assert_called_once_with(key="24-hours - 05-01-2024", owner="pod1",
+                                                                 value=value, ttl=3600)
+        table_client_mock.complete_lease.return_value = False
+        self.assertFalse(self.persistency_manager.complete_lease(key="key", owner="pod1", value=value,
+                                                                 logging_msg={}))
+        table_client_mock.complete_lease.side_effect = Exception("throttled")
+        self.assertFalse(self.persistency_manager.complete_lease(key="key", owner="pod1", value=value,
+                                                                 logging_msg={}))
+
+    @patch('service.dynamo.persistencymanager.time.time')
+    def test_put_member_removes_the_expired_members(self, time_mock):
+        time_mock.return_value = 1700000000
+        table_client_mock = MagicMock()
+        table_client_mock.put_member.return_value = {'pod1': 1700000000, 'pod2': 1699999500, 'pod3': 1699999000}
+        self.persistency_manager.table_client = table_client_mock
+        self.assertEqual(self.persistency_manager.put_member(key="scheduler_pods", member="pod1", ttl=900),
+                         {'pod1': 1700000000, 'pod2': 1699999500})
+        table_client_mock.remove_members.assert_called_once_with(key="scheduler_pods", members=['pod3'])
+        table_client_mock.put_member.side_effect = Exception("throttled")
+        self.assertIsNone(self.persistency_manager.put_member(key="scheduler_pods", member="pod1", ttl=900))
+
+    def test_batch_get_gives_none_for_missing_keys(self):
+        table_client_mock = MagicMock()
+        table_client_mock.batch_get.return_value = {"key_1": {'id': 1}}
+        self.persistency_manager.table_client = table_client_mock
+        result = self.persistency_manager.batch_get(["key_1", "key_2"])
+        self.assertEqual(result, {"key_1": {'id': 1}, "key_2": None})
+        table_client_mock.batch_get.assert_called_once_with(["key_1", "key_2"])
+
+    def test_batch_get_throws_exception(self):
+        table_client_mock = MagicMock()
+        table_client_mock.batch_get.side_effect = RuntimeError("keys are unprocessed")
+        self.persistency_manager.table_client = table_client_mock
+        self.assertIsNone(self.persistency_manager.batch_get(["key_1"]), "result is not None")
+
+    def test_batch_upsert(self):
+        table_client_mock = MagicMock()
+        table_client_mock.batch_put.return_value = True
+        self.persistency_manager.table_client = table_client_mock
+        items = [{'key': "key_1", 'value': {'id': 1}, 'ttl': 10}, {'key': "key_2", 'value': {'id': 2}}]
+        self.assertTrue(self.persistency_manager.batch_upsert(items, logging_msg={}))
+        table_client_mock.batch_put.assert_called_once_with(
+            [{'key': "key_1", 'value': {'id': 1}, 'ttl': 10}, {'key': "key_2", 'value': {'id': 2}, 'ttl': 86400}])
+
+    def test_batch_upsert_throws_error(self):
+        table_client_mock = MagicMock()
+        table_client_mock.batch_put.side_effect = RuntimeError("items are unprocessed")
+        self.persistency_manager.table_client = table_client_mock
+        self.assertFalse(self.persistency_manager.batch_upsert([{'key': "key_1", 'value': {}}], logging_msg={}))
+
+    @patch('service.dynamo.persistencymanager.get_dynamo')
+    def test_get_the_value_is_read_through_the_cache(self, dynamo_mock):
+        mock = MagicMock()
+        mock.get.return_value = {'date': '2024-01-05T04:08:05'}
+        mock.upsert.return_value = True
+        dynamo_mock.return_value = mock
+        self.persistency_manager.cache = ReadThroughCache(max_entries=10, max_age_seconds=3600)
+        # when
+        for _ in range(3):
+            self.assertEqual(self.persistency_manager.get_the_value("deployment_date_v2", cache_ttl=86400),
+                             {'date': '2024-01-05T04:08:05'})
+        self.persistency_manager.upsert_value("deployment_date_v2", {'date': '2024-01-06T04:08:05'}, {})
+        self.persistency_manager.get_the_value("deployment_date_v2", cache_ttl=86400)
+        # then
+        self.assertEqual(mock.get.call_count, 2, "value is not read again after the upsert")
+        stats = self.persistency_manager.get_cache_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+
+    @patch('service.dynamo.persistencymanager.get_dynamo')
+    def test_get_the_value_without_cache_ttl_is_not_cached(self, dynamo_mock):
+        mock = MagicMock()
+        mock.get.return_value = {'job_runner_name': 'pod1'}
+        dynamo_mock.return_value = mock
+        self.persistency_manager.cache = ReadThroughCache(max_entries=10, max_age_seconds=3600)
+        self.persistency_manager.get_the_value("24-hours - 05-01-2024")
+        self.persistency_manager.get_the_value("24-hours - 05-01-2024")
+        self.assertEqual(mock.get.call_count, 2, "value is cached")
+
+    def test_batch_get_reads_only_the_keys_which_are_not_cached(self):
+        table_client_mock = MagicMock()
+        table_client_mock.batch_get.return_value = {"deployment_date_v2": {'date': '2024-01-05'},
+                                                    "24-hours - 05-01-2024": {'job_runner_name': 'pod1'}}
+        self.persistency_manager.table_client = table_client_mock
+        self.persistency_manager.cache = ReadThroughCache(max_entries=10, max_age_seconds=3600)
+        keys = ["deployment_date_v2", "24-hours - 05-01-2024"]
+        # when
+        self.persistency_manager.batch_get(keys, cache_ttls={"deployment_date_v2": 86400})
+        result = self.persistency_manager.batch_get(keys, cache_ttls={"deployment_date_v2": 86400})
+        # then
+        self.assertEqual(result["deployment_date_v2"], {'date': '2024-01-05'})
+        self.assertEqual(table_client_mock.batch_get.call_args_list[1].args[0], ["24-hours - 05-01-2024"])
+
+    def test_get_cache_stats_when_cache_is_disabled(self):
+        self.persistency_manager.cache = None
+        self.assertIsNone(self.persistency_manager.get_cache_stats())
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
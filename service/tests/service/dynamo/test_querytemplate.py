@@ -0,0 +1,38 @@
+import json
+import unittest
+
+from service.elasticsearch.querytemplate import QueryTemplate
+
+
+class TestQueryTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.template = QueryTemplate({
+            'query': {'range': {'@timestamp': {'from': QueryTemplate.placeholder('from_clause'), 'to': 'now'}}},
+            'aggs': {'versions': {'terms': {'include': [QueryTemplate.placeholder('model_version')], 'size': 1}},
+                     'path': {'term': {'metric.path': QueryTemplate.placeholder('model_version')}}}
+        })
+
+    def test_template_keeps_the_parameters_in_their_order(self):
+        self.assertEqual(self.template.parameters, ['from_clause', 'model_version', 'model_version'])
+        self.assertEqual(len(self.template.segments), 4)
+
+    def test_render(self):
+        body = self.template.render({'from_clause': 'now-7d', 'model_version': 'v2 "US2"'})
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(json.loads(body), {
+            'query': {'range': {'@timestamp': {'from': 'now-7d', 'to': 'now'}}},
+            'aggs': {'versions': {'terms': {'include': ['v2 "US2"'], 'size': 1}},
+                     'path': {'term': {'metric.path': 'v2 "US2"'}}}
+        })
+        with self.assertRaises(KeyError):
+            self.template.render({'from_clause': 'now-7d'})
+
+    def test_template_without_parameters(self):
+        template = QueryTemplate({'size': 0})
+        self.assertEqual(template.parameters, [])
+        self.assertEqual(template.render({}), b'{"size": 0}')
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import patch
+
+from service.dynamo.readthroughcache import ReadThroughCache
+
+
+class TestReadThroughCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ReadThroughCache(max_entries=2, max_age_seconds=3600)
+
+    def test_cache_is_fail_to_intialized(self):
+        with self.assertRaises(ValueError):
+            ReadThroughCache(max_entries=0, max_age_seconds=3600)
+
+    def test_get_when_key_is_cached(self):
+        self.cache.put("deployment_date_v2_US2", {'date': '2024-01-05T04:08:05'}, 86400)
+        self.assertEqual(self.cache.get("deployment_date_v2_US2"), [True, {'date': '2024-01-05T04:08:05'}])
+        self.assertEqual(self.cache.get("sample_rate_v2_US2"), [False, None])
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1, "hit is not counted")
+        self.assertEqual(stats['misses'], 1, "miss is not counted")
+
+    def test_least_recently_used_key_is_evicted(self):
+        self.cache.put("key_1", 1, 86400)
+        self.cache.put("key_2", 2, 86400)
+        self.cache.get("key_1")
+        self.cache.put("key_3", 3, 86400)
+        self.assertEqual(self.cache.get("key_2"), [False, None], "least recently used key is not evicted")
+        self.assertEqual(self.cache.get("key_1"), [True, 1])
+        self.assertEqual(self.cache.get("key_3"), [True, 3])
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    @patch('service.dynamo.readthroughcache.time.monotonic')
+    def test_entry_expires_after_its_lifetime(self, monotonic_mock):
+        monotonic_mock.return_value = 1000
+        self.cache.put("key_1", 1, 60)
+        self.cache.put("key_2", 2, 86400)
+        monotonic_mock.return_value = 1061
+        self.assertEqual(self.cache.get("key_1"), [False, None], "entry outlived its lifetime")
+        self.assertEqual(self.cache.get("key_2"), [True, 2])
+        monotonic_mock.return_value = 1000 + 3601
+        self.assertEqual(self.cache.get("key_2"), [False, None], "entry outlived the max age")
+
+    @patch('service.dynamo.readthroughcache.time.monotonic')
+    def test_invalidate_caps_the_lifetime_with_the_ttl_of_the_write(self, monotonic_mock):
+        monotonic_mock.return_value = 1000
+        self.cache.put("key_1", 1, 86400)
+        self.cache.invalidate("key_1", ttl=120)
+        self.assertEqual(self.cache.get("key_1"), [False, None], "entry is not invalidated")
+        self.cache.put("key_1", 2, 86400)
+        monotonic_mock.return_value = 1100
+        self.assertEqual(self.cache.get("key_1"), [True, 2])
+        monotonic_mock.return_value = 1121
+        self.assertEqual(self.cache.get("key_1"), [False, None], "entry outlived the item in the table")
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
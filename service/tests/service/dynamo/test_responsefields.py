@@ -0,0 +1,78 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+import ijson
+
+from service.elasticsearch.responsefields import ResponseFields
+
+
+class TestResponseFields(unittest.TestCase):
+
+    def setUp(self):
+        self.document = {
+            'took': 5,
+            'hits': {'total': {'value': 3}, 'hits': [{'_id': '1'}]},
+            'aggregations': {
+                'pfc_stable': {
+                    'doc_count': 3,
+                    'pfc': {'buckets': {'true_fails': {'doc_count': 1, 'meta': [1, 2]},
+                                        'entity.v2': {'doc_count': 2}}}
+                },
+                'ml_audit': {'buckets': {'ml_audit_questions': {'doc_count': 2,
+                                                                'total_ml_audit_questions': {'value': 40.0}}}}
+            },
+            'responses': [{'status': 200, 'took': 1}, {'status': 503, 'error': {'type': 'timeout'}}]
+        }
+
+    def test_parse_keeps_only_the_wanted_paths(self):
+        fields = ResponseFields([('aggregations', 'pfc_stable', 'pfc', 'buckets', '*', 'doc_count'),
+                                 ('aggregations', 'ml_audit', 'buckets', 'ml_audit_questions'),
+                                 ('responses', '*', 'status'), ('responses', '*', 'error')])
+        self.assertEqual(fields.parse(io.BytesIO(json.dumps(self.document).encode())), {
+            'aggregations': {
+                'pfc_stable': {'pfc': {'buckets': {'true_fails': {'doc_count': 1}, 'entity.v2': {'doc_count': 2}}}},
+                'ml_audit': self.document['aggregations']['ml_audit']
+            },
+            'responses': [{'status': 200}, {'status': 503, 'error': {'type': 'timeout'}}]
+        })
+
+    def test_parse_when_paths_are_missing_or_json_is_invalid(self):
+        fields = ResponseFields([('aggregations', 'windows', 'buckets', '*', 'doc_count')])
+        self.assertEqual(fields.parse(json.dumps(self.document).encode()), {'aggregations': {}})
+        self.assertEqual(fields.parse(b'{"took": 1}'), {})
+        with self.assertRaises(ValueError):
+            fields.parse(b'{"aggregations": {"windows": ')
+
+    def test_parse_of_a_large_document(self):
+        buckets: dict = {f'company.{index}': {'doc_count': index, 'hits': ['x' * 100] * 10} for index in range(500)}
+        document: dict = {'hits': [{'_source': 'y' * 1000}] * 200, 'aggregations': {'companies': {'buckets': buckets}},
+                          'responses': [{'status': 200, 'took': 1}, {'took': 2}]}
+        fields = ResponseFields([('aggregations', 'companies', 'buckets', '*', 'doc_count'),
+                                 ('responses', '*', 'status')])
+        # the items of an array are kept in order, also when they have no wanted field.
+        self.assertEqual(fields.parse(io.BytesIO(json.dumps(document).encode())), {
+            'aggregations': {'companies': {'buckets': {key: {'doc_count': bucket['doc_count']}
+                                                       for key, bucket in buckets.items()}}},
+            'responses': [{'status': 200}, {}]
+        })
+
+    def test_parse_does_not_build_the_unselected_siblings(self):
+        built: list = []
+
+        class RecordingBuilder(ijson.ObjectBuilder):
+            def event(self, event, value):
+                built.append((event, value))
+                super().event(event, value)
+
+        fields = ResponseFields([('aggregations', 'pfc_stable', 'pfc', 'buckets', '*', 'doc_count'),
+                                 ('responses', '*', 'status')])
+        with patch('service.elasticsearch.responsefields.ijson.ObjectBuilder', RecordingBuilder):
+            fields.parse(io.BytesIO(json.dumps(self.document).encode()))
+        # only the wanted scalars are built, the hits, the meta of the buckets and the errors are skipped.
+        self.assertEqual(built, [('number', 1), ('number', 2), ('number', 200), ('number', 503)])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
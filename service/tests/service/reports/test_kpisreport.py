@@ -0,0 +1,423 @@
+import asyncio
+import io
+import json
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from service.common.httpsession import PooledHTTPSession
+from service.elasticsearch.kpiquery import KPIQuery
+from service.reports.kpisreport import KPIReport
+
+
+class TestKPIReport(unittest.TestCase):
+
+    def setUp(self):
+        PooledHTTPSession.close()
+        self.kpireport = KPIReport("http://logging-service")
+
+    def tearDown(self):
+        PooledHTTPSession.close()
+
+    @staticmethod
+    def get_aggregations(true_fails: int, auditor_fails: int) -> dict:
+        return {
+            'ml_audit': {
+                'buckets': {
+                    'ml_audit_questions': {'doc_count': 2, 'total_ml_audit_questions': {'value': 1000}}
+                }
+            },
+            'pfc': {
+                'buckets': {
+                    'true_fails': {'doc_count': true_fails},
+                    'true_fails_trained_entities': {'doc_count': true_fails},
+                    'pfc_bypass': {'doc_count': 100},
+                    'auditor_fails_trained_entities': {'doc_count': auditor_fails},
+                    'sampled_questions': {'doc_count': 400},
+                    'received_questions': {'doc_count': 800},
+                    'auditor_fails': {'doc_count': auditor_fails}
+                }
+            }
+        }
+
+    @staticmethod
+    def get_window_response(windows: dict) -> MagicMock:
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {'aggregations': {'windows': {'buckets': windows}}}
+        return resp
+
+    def test_get_counts(self):
+        counts = KPIReport.get_counts({'aggregations': self.get_aggregations(995, 1000)})
+        self.assertEqual(counts['true_fails'], 995)
+        self.assertEqual(counts['total_ml_audit_questions'], 1000)
+        self.assertEqual(KPIReport.get_counts_response(counts)['aggregations'], self.get_aggregations(995, 1000))
+        self.assertEqual(KPIReport.add_counts([counts, counts])['auditor_fails'], 2000)
+        self.assertIsNone(KPIReport.get_counts({'aggregations': {'pfc': {'buckets': {}}}}))
+
+    @patch('service.reports.kpisreport.DateUtils.get_current_utc_time')
+    @patch('service.reports.kpisreport.DailyKPICounters')
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_incremental_for_24_hours_stores_the_settled_day(self, http_client_mock, counters_mock,
+                                                                      now_mock):
+        now_mock.return_value = datetime(2023, 5, 10, 12, tzinfo=timezone.utc)
+        counters_mock.get_settled_day.return_value = date(2023, 5, 8)
+        counters_mock.return_value.get_days.return_value = {date(2023, 5, 8): None}
+        http_client_mock.return_value.post.return_value = self.get_window_response({
+            'report': self.get_aggregations(995, 1000), '2023-05-08': self.get_aggregations(97, 100)})
+        request = {'absolute_time_from_': 24, 'time_unit_': 'h', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+
+        payload = self.kpireport.query_es_incremental(request)
+        self.assertEqual(payload['icbc_calculation_kpis']['total_recall'], '99.5')
+        query = json.loads(http_client_mock.return_value.post.call_args.kwargs['data'])
+        ranges = query['aggs']['windows']['date_range']['ranges']
+        self.assertEqual(ranges[1], {'key': '2023-05-08', 'from': '2023-05-08T00:00:00+00:00',
+                                     'to': '2023-05-09T00:00:00+00:00'})
+        put_day = counters_mock.return_value.put_day.call_args.kwargs
+        self.assertEqual(put_day['day'], date(2023, 5, 8))
+        self.assertEqual(put_day['counts']['true_fails'], 97)
+
+    @patch('service.reports.kpisreport.DateUtils.get_current_utc_time')
+    @patch('service.reports.kpisreport.DailyKPICounters')
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_incremental_for_7_days_adds_the_stored_days(self, http_client_mock, counters_mock, now_mock):
+        now_mock.return_value = datetime(2023, 5, 10, 12, tzinfo=timezone.utc)
+        days = [date(2023, 5, day) for day in range(4, 9)]
+        counters_mock.get_stored_days.return_value = days
+        counters_mock.return_value.get_days.return_value = {
+            day: KPIReport.get_counts({'aggregations': self.get_aggregations(199, 200)}) for day in days}
+        http_client_mock.return_value.post.return_value = self.get_window_response({
+            'oldest': self.get_aggregations(0, 0), 'newest': self.get_aggregations(0, 0)})
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+
+        payload = self.kpireport.query_es_incremental(request)
+        self.assertEqual(payload['icbc_calculation_kpis']['total_recall'], '99.5')
+        self.assertEqual(payload['icbc_calculation_kpis']['auditor_fails_count'], '1000')
+        query = json.loads(http_client_mock.return_value.post.call_args.kwargs['data'])
+        ranges = query['aggs']['windows']['date_range']['ranges']
+        self.assertEqual(ranges, [
+            {'key': 'oldest', 'from': '2023-05-03T12:00:00+00:00', 'to': '2023-05-04T00:00:00+00:00'},
+            {'key': 'newest', 'from': '2023-05-09T00:00:00+00:00', 'to': '2023-05-10T12:00:00+00:00'}
+        ])
+        counters_mock.return_value.put_day.assert_not_called()
+
+    @patch('service.reports.kpisreport.DailyKPICounters')
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_incremental_for_7_days_when_days_are_missing(self, http_client_mock, counters_mock):
+        days = [date(2023, 5, day) for day in range(4, 9)]
+        counters_mock.get_stored_days.return_value = days
+        # the table is not read, the whole week is counted and every day is stored again.
+        counters_mock.return_value.get_days.return_value = None
+        windows = {day.isoformat(): self.get_aggregations(0, 0) for day in days}
+        windows['report'] = self.get_aggregations(995, 1000)
+        http_client_mock.return_value.post.return_value = self.get_window_response(windows)
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+
+        self.assertEqual(self.kpireport.query_es_incremental(request)['icbc_calculation_kpis']['total_recall'],
+                         '99.5')
+        self.assertEqual(counters_mock.return_value.put_day.call_count, 5)
+
+    @patch('service.reports.kpisreport.KPIReport.query_es')
+    def test_query_es_incremental_for_other_windows(self, query_es_mock):
+        request = {'absolute_time_from_': 3, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        self.assertIs(self.kpireport.query_es_incremental(request, correlation_id='1'), query_es_mock.return_value)
+        query_es_mock.assert_called_once_with(request, correlation_id='1')
+
+    @staticmethod
+    def get_company_page(companies: list, after_key: dict = None) -> MagicMock:
+        resp = MagicMock()
+        resp.status_code = 200
+        buckets = [{'key': {'company': company},
+                    'pfc': {'buckets': {'true_fails': {'doc_count': true_fails},
+                                        'auditor_fails': {'doc_count': auditor_fails}}}}
+                   for company, true_fails, auditor_fails in companies]
+        page = {'buckets': buckets}
+        if after_key is not None:
+            page['after_key'] = after_key
+        resp.json.return_value = {'aggregations': {'pfc_stable': {'companies': page}}}
+        return resp
+
+    @patch('service.reports.kpisreport.config')
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_company_pages(self, http_client_mock, config_mock):
+        config_mock.company_buckets_size = 2
+        http_client_mock.return_value.post.side_effect = [
+            self.get_company_page([('p0001', 9, 10), ('p0002', 0, 0)], after_key={'company': 'p0002'}),
+            self.get_company_page([('p0003', 5, 5)], after_key={'company': 'p0003'})
+        ]
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        pages = self.kpireport.query_es_company_pages(request)
+        # the pages are read only when they are consumed.
+        http_client_mock.return_value.post.assert_not_called()
+        self.assertEqual(next(pages).to_dict('list'), {'company': ['p0001', 'p0002'], 'true_fails': [9, 0],
+                                                       'auditor_fails': [10, 0]})
+        self.assertEqual(next(pages)['company'].tolist(), ['p0003'])
+        with self.assertRaises(StopIteration):
+            next(pages)
+        queries = [call.kwargs['json'] for call in http_client_mock.return_value.post.call_args_list]
+        self.assertNotIn('after', queries[0]['aggs']['pfc_stable']['aggs']['companies']['composite'])
+        self.assertEqual(queries[1]['aggs']['pfc_stable']['aggs']['companies']['composite']['after'],
+                         {'company': 'p0002'})
+
+    def test_get_company_counts_of_partial_buckets(self):
+        buckets: list = [{'key': {'company': 'p0001'}, 'pfc': {'buckets': {'true_fails': {'doc_count': 9}}}},
+                         {'key': {'company': 'p0002'}}]
+        counts = KPIReport.get_company_counts({'aggregations': {'pfc_stable': {'companies': {'buckets': buckets}}}})
+        # the missing counts of a bucket are 0.
+        self.assertEqual(counts.to_dict('list'), {'company': ['p0001', 'p0002'], 'true_fails': [9, 0],
+                                                  'auditor_fails': [0, 0]})
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_companies(self, http_client_mock):
+        resp = self.get_company_page([('p0001', 9, 10)], after_key={'company': 'p0001'})
+        http_client_mock.return_value.post.return_value = resp
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        self.assertEqual(self.kpireport.query_es_companies(request)['companies']['auditor_fails'].tolist(), [10])
+        http_client_mock.return_value.post.return_value = self.get_company_page([])
+        self.assertEqual(len(self.kpireport.query_es_companies(request)['companies']), 0)
+        resp.status_code = 503
+        http_client_mock.return_value.post.return_value = resp
+        self.assertIsInstance(self.kpireport.query_es_companies(request)['error'], ValueError)
+        self.assertIsInstance(self.kpireport.query_es_companies({'absolute_time_from_': 7})['error'], ValueError)
+
+    def test_get_msearch_body(self):
+        self.assertEqual(KPIReport.get_msearch_body([{'size': 0}, {'query': {}}]),
+                         b'{}\n{"size": 0}\n{}\n{"query": {}}\n')
+        self.assertEqual(KPIReport.get_msearch_body([b'{"size": 0}']), b'{}\n{"size": 0}\n')
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_sends_the_serialized_query(self, http_client_mock):
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {'aggregations': self.get_aggregations(995, 1000)}
+        http_client_mock.return_value.post.return_value = resp
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        self.assertEqual(self.kpireport.query_es(request)['icbc_calculation_kpis']['total_recall'], '99.5')
+        call = http_client_mock.return_value.post.call_args.kwargs
+        self.assertNotIn('json', call)
+        self.assertEqual(call['headers']['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(call['data']), KPIQuery().construct_query(request))
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_msearch(self, http_client_mock):
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {'responses': [
+            {'aggregations': self.get_aggregations(995, 1000), 'status': 200},
+            {'error': {'type': 'search_phase_execution_exception'}, 'status': 503}
+        ]}
+        http_client_mock.return_value.post.return_value = resp
+        requests = {
+            '7-days': {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                       'relative_time_to_': None, 'model_version': 'v2'},
+            'december': {'absolute_time_from_': None, 'time_unit_': None, 'relative_time_from_': '2023-12-01',
+                         'relative_time_to_': '2023-12-08', 'model_version': 'v3'},
+            'invalid': {'absolute_time_from_': 7, 'relative_time_from_': '2023-12-01', 'model_version': 'v2'}
+        }
+        payloads = self.kpireport.query_es_msearch(requests)
+        self.assertEqual(payloads['7-days']['icbc_calculation_kpis']['total_recall'], '99.5')
+        self.assertEqual(payloads['december'], {'error': {'type': 'search_phase_execution_exception'}})
+        self.assertIsInstance(payloads['invalid']['error'], ValueError)
+
+        http_client_mock.return_value.post.assert_called_once()
+        call = http_client_mock.return_value.post.call_args.kwargs
+        self.assertEqual(call['url'], 'http://logging-service/*:log-2/_msearch')
+        self.assertEqual(call['headers']['Content-Type'], 'application/x-ndjson')
+        lines = call['data'].decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[3]), KPIQuery().construct_query(requests['december']))
+
+        resp.status_code = 503
+        self.assertEqual(self.kpireport.query_es_msearch(requests)['7-days'], {'error': resp})
+
+    def test_report_payload(self):
+        payload = self.kpireport.report_payload({'aggregations': self.get_aggregations(995, 1000)})
+        self.assertEqual(payload['status'], 'good')
+        self.assertEqual(payload['icbc_calculation_kpis'], {
+            'total_recall': '99.5',
+            'local_recall': '99.5',
+            'total_bypass': '10.0',
+            'local_bypass': '12.5',
+            'auditor_fails_count': '1000',
+            'sampled_questions': '400'
+        })
+
+    def test_report_payload_when_pfc_is_nested_in_pfc_stable(self):
+        aggregations = self.get_aggregations(995, 1000)
+        aggregations['pfc_stable'] = {'doc_count': 900, 'pfc': aggregations.pop('pfc')}
+        payload = self.kpireport.report_payload({'aggregations': aggregations})
+        self.assertEqual(payload, self.kpireport.report_payload({'aggregations': self.get_aggregations(995, 1000)}))
+        self.assertIn('pfc_stable', aggregations)
+
+    def test_report_payload_when_buckets_are_missing(self):
+        payload = self.kpireport.report_payload({'aggregations': {}})
+        self.assertEqual(payload['status'], 'danger')
+        self.assertIn('error', payload)
+
+    def test_report_payload_per_window(self):
+        resp = {
+            'aggregations': {
+                'windows': {
+                    'buckets': {
+                        '24-hours': dict(self.get_aggregations(97, 100), doc_count=1000),
+                        '7-days': dict(self.get_aggregations(995, 1000), doc_count=7000)
+                    }
+                }
+            }
+        }
+        payloads = self.kpireport.report_payload_per_window(resp)
+        self.assertEqual(payloads['24-hours'], self.kpireport.report_payload(
+            {'aggregations': self.get_aggregations(97, 100)}))
+        self.assertEqual(payloads['7-days']['icbc_calculation_kpis']['total_recall'], '99.5')
+
+    def test_report_payload_per_model_version(self):
+        stable = self.get_aggregations(995, 1000)
+        other = self.get_aggregations(97, 100)
+        pfc_bypass = stable['pfc']['buckets'].pop('pfc_bypass')
+        other['pfc']['buckets'].pop('pfc_bypass')
+        resp = {
+            'aggregations': {
+                'ml_audit': stable['ml_audit'],
+                'pfc_stable': {
+                    'doc_count': 9000,
+                    'pfc': {'buckets': {'pfc_bypass': pfc_bypass}},
+                    'model_versions': {
+                        'buckets': [
+                            {'key': 'v2', 'doc_count': 7000, 'pfc': stable['pfc']},
+                            {'key': 'v3', 'doc_count': 2000, 'pfc': other['pfc']}
+                        ]
+                    }
+                }
+            }
+        }
+        payloads = self.kpireport.report_payload_per_model_version(resp, model_versions=['v2', 'v3', 'v4'])
+        self.assertEqual(payloads['v2'], self.kpireport.report_payload(
+            {'aggregations': self.get_aggregations(995, 1000)}))
+        self.assertEqual(payloads['v3'], self.kpireport.report_payload(
+            {'aggregations': self.get_aggregations(97, 100)}))
+        self.assertEqual(payloads['v4']['status'], 'danger')
+        self.assertEqual(self.kpireport.report_payload_per_model_version({}, model_versions=['v2'])['status'],
+                         'danger')
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_multi_version(self, http_client_mock):
+        resp = MagicMock()
+        resp.status_code = 503
+        http_client_mock.return_value.post.return_value = resp
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_versions': ['v2', 'v3']}
+        self.assertEqual(self.kpireport.query_es_multi_version(request), {'error': resp})
+        query = json.loads(http_client_mock.return_value.post.call_args.kwargs['data'])
+        self.assertIn('model_versions', query['aggs']['pfc_stable']['aggs'])
+        self.assertIsInstance(self.kpireport.query_es_multi_version({'model_versions': []})['error'], ValueError)
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_multi_window(self, http_client_mock):
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.json.return_value = {
+            'aggregations': {
+                'windows': {
+                    'buckets': {
+                        '24-hours': self.get_aggregations(97, 100),
+                        '7-days': self.get_aggregations(995, 1000)
+                    }
+                }
+            }
+        }
+        http_client_mock.return_value.post.return_value = resp
+        request = {
+            'windows': [
+                {'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'},
+                {'key': '7-days', 'absolute_time_from_': 7, 'time_unit_': 'd'}
+            ],
+            'model_version': 'v2'
+        }
+        payloads = self.kpireport.query_es_multi_window(request)
+        http_client_mock.return_value.post.assert_called_once()
+        self.assertEqual(set(payloads.keys()), {'24-hours', '7-days'})
+        self.assertEqual(payloads['24-hours']['status'], 'danger')
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_query_es_streaming_parse(self, http_client_mock):
+        body = {'took': 12, 'hits': {'hits': [{'_id': str(index)} for index in range(100)]},
+                'aggregations': self.get_aggregations(995, 1000)}
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.raw = io.BytesIO(json.dumps(body).encode())
+        http_client_mock.return_value.post.return_value = resp
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        payload = KPIReport("http://logging-service", streaming_parse=True).query_es(request)
+        self.assertEqual(payload, self.kpireport.report_payload(body))
+        self.assertTrue(http_client_mock.return_value.post.call_args.kwargs['stream'])
+        resp.json.assert_not_called()
+        resp.close.assert_called_once()
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_streamed_responses_are_closed_when_status_is_not_200(self, http_client_mock):
+        resp = MagicMock()
+        resp.status_code = 503
+        http_client_mock.return_value.post.return_value = resp
+        kpireport = KPIReport("http://logging-service", streaming_parse=True)
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        windows_request = {'windows': [{'key': '24-hours', 'absolute_time_from_': 24, 'time_unit_': 'h'}],
+                           'model_version': 'v2'}
+        self.assertEqual(kpireport.query_es(request), {'error': resp})
+        self.assertEqual(kpireport.query_es_multi_window(windows_request), {'error': resp})
+        self.assertEqual(kpireport.query_window_counts(windows_request, correlation_id='1'), {'error': resp})
+        self.assertEqual(kpireport.query_es_msearch({'24-hours': request}), {'24-hours': {'error': resp}})
+        with self.assertRaises(ValueError):
+            list(kpireport.query_es_company_pages(request))
+        self.assertEqual(resp.close.call_count, 5)
+        resp.raw.read.assert_not_called()
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_post_query_reuses_the_session(self, http_client_mock):
+        self.kpireport.post_query(query={}, correlation_id='1')
+        KPIReport("http://other-logging-service").post_query(query={}, correlation_id='2')
+        http_client_mock.assert_called_once()
+        self.assertEqual(http_client_mock.return_value.post.call_count, 2)
+        self.assertEqual(PooledHTTPSession.get_stats()['requests'], 2)
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_post_query_logs_the_session_stats_at_debug(self, http_client_mock):
+        with self.assertNoLogs(level='INFO'):
+            self.kpireport.post_query(query={}, correlation_id='1')
+        with self.assertLogs(level='DEBUG') as logs:
+            self.kpireport.post_query(query={}, correlation_id='1')
+        self.assertEqual([record.levelname for record in logs.records], ['DEBUG'])
+        self.assertIn('http session stats', logs.records[0].getMessage())
+
+    @patch('service.reports.kpisreport.AsyncPooledHTTPSession.post', new_callable=AsyncMock)
+    def test_query_es_async(self, post_mock):
+        post_mock.return_value = [200, {'aggregations': self.get_aggregations(995, 1000)}]
+        request = {'absolute_time_from_': 7, 'time_unit_': 'd', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        payload = asyncio.run(self.kpireport.query_es_async(request))
+        post_mock.assert_awaited_once()
+        self.assertEqual(post_mock.call_args.kwargs['url'], 'http://logging-service/*:log-2/_search')
+        self.assertEqual(payload, self.kpireport.report_payload({'aggregations': self.get_aggregations(995, 1000)}))
+
+    @patch('service.reports.kpisreport.AsyncPooledHTTPSession.post', new_callable=AsyncMock)
+    def test_query_es_async_when_status_is_not_200(self, post_mock):
+        post_mock.return_value = [503, None]
+        request = {'absolute_time_from_': 24, 'time_unit_': 'h', 'relative_time_from_': None,
+                   'relative_time_to_': None, 'model_version': 'v2'}
+        self.assertEqual(asyncio.run(self.kpireport.query_es_async(request)), {'error': 503})
+
+    def test_query_es_multi_window_when_request_is_invalid(self):
+        payloads = self.kpireport.query_es_multi_window({'model_version': 'v2'})
+        self.assertIsInstance(payloads['error'], ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,29 @@
+import unittest
+from unittest.mock import patch
+
+from service.scheduling.podmembership import PodMembership
+
+
+class TestPodMembership(unittest.TestCase):
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_get_hash_ring(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.put_member.return_value = {'pod2': 1700000000, 'pod1': 1699999990}
+        ring = PodMembership(pod_name='pod1', table_name='table', ttl_seconds=900).get_hash_ring(correlation_id='id')
+        self.assertEqual(ring.members, ['pod1', 'pod2'])
+        persistency_manager_mock.assert_called_once_with('table')
+        persistency_manager_mock.return_value.put_member.assert_called_once_with(
+            key=PodMembership.MEMBERS_KEY, member='pod1', ttl=900, correlation_id='id')
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_get_hash_ring_when_the_table_is_not_updated(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.put_member.return_value = None
+        self.assertIsNone(PodMembership(pod_name='pod1').get_hash_ring())
+
+    def test_pod_name_is_required(self):
+        with self.assertRaises(ValueError):
+            PodMembership(pod_name=None)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -6,10 +6,16 @@ from concurlogging import setup_logging
 from xmlrunner import XMLTestRunner
 
 from tests import test_service_api, test_service_worker
-from tests.service.dynamo import test_jobrunner, test_persistencymanager, test_samplerate
+from tests.service.dynamo import (test_jobrunner, test_persistencymanager, test_samplerate,
+                                  test_asyncjobrunner, test_asyncpersistencymanager,
+                                  test_dynamotableclient, test_readthroughcache, test_dailykpicounters,
+                                  test_backfillrunner, test_leaseheartbeat, test_responsefields,
+                                  test_querytemplate)
 from tests.service.elasticsearch import test_kpiquery
-from tests.service.reports import (test_kpisreport, test_icbcmanager)
-from tests.service.common import test_modelutils
+from tests.service.reports import (test_kpisreport, test_icbcmanager, test_kpicounts, test_kpibatch)
+from tests.service.common import test_modelutils, test_httpsession, test_ratelimiter, test_hashring
+from tests.benchmarks import test_dynamostandin, test_esstandin
+from tests.service.scheduling import test_jobregistry, test_duetimescheduler, test_podmembership
 from tests.service import (
     test_api, test_application, test_configs,
     test_handlers, test_integration, test_processors, test_schemas,
@@ -33,12 +39,35 @@ suite_list = [
     unittest.TestLoader().loadTestsFromTestCase(test_application.TestApplication),
     unittest.TestLoader().loadTestsFromTestCase(test_endpoints.TestEndPoints),
     unittest.TestLoader().loadTestsFromTestCase(test_jobrunner.TestJobRunner),
+    unittest.TestLoader().loadTestsFromTestCase(test_asyncjobrunner.TestAsyncJobRunner),
     unittest.TestLoader().loadTestsFromTestCase(test_persistencymanager.TestPersistencyManager),
+    unittest.TestLoader().loadTestsFromTestCase(test_asyncpersistencymanager.TestAsyncPersistencyManager),
+    unittest.TestLoader().loadTestsFromTestCase(test_dynamotableclient.TestDynamoTableClient),
+    unittest.TestLoader().loadTestsFromTestCase(test_dynamotableclient.TestDynamoTableClientRoundTrip),
+    unittest.TestLoader().loadTestsFromTestCase(test_readthroughcache.TestReadThroughCache),
     unittest.TestLoader().loadTestsFromTestCase(test_kpiquery.TestKPIQuery),
+    unittest.TestLoader().loadTestsFromTestCase(test_responsefields.TestResponseFields),
+    unittest.TestLoader().loadTestsFromTestCase(test_querytemplate.TestQueryTemplate),
     unittest.TestLoader().loadTestsFromTestCase(test_kpisreport.TestKPIReport),
+    unittest.TestLoader().loadTestsFromTestCase(test_kpicounts.TestKPICounts),
+    unittest.TestLoader().loadTestsFromTestCase(test_kpibatch.TestKPIBatch),
     unittest.TestLoader().loadTestsFromTestCase(test_icbcmanager.TestICBCManager),
     unittest.TestLoader().loadTestsFromTestCase(test_samplerate.TestSampleRate),
-    unittest.TestLoader().loadTestsFromTestCase(test_modelutils.TestModelUtils)
+    unittest.TestLoader().loadTestsFromTestCase(test_dailykpicounters.TestDailyKPICounters),
+    unittest.TestLoader().loadTestsFromTestCase(test_backfillrunner.TestBackfillRunner),
+    unittest.TestLoader().loadTestsFromTestCase(test_leaseheartbeat.TestLeaseHeartbeat),
+    unittest.TestLoader().loadTestsFromTestCase(test_leaseheartbeat.TestAsyncLeaseHeartbeat),
+    unittest.TestLoader().loadTestsFromTestCase(test_modelutils.TestModelUtils),
+    unittest.TestLoader().loadTestsFromTestCase(test_httpsession.TestPooledHTTPSession),
+    unittest.TestLoader().loadTestsFromTestCase(test_httpsession.TestAsyncPooledHTTPSession),
+    unittest.TestLoader().loadTestsFromTestCase(test_ratelimiter.TestRateLimiter),
+    unittest.TestLoader().loadTestsFromTestCase(test_jobregistry.TestJobSpec),
+    unittest.TestLoader().loadTestsFromTestCase(test_jobregistry.TestJobRegistry),
+    unittest.TestLoader().loadTestsFromTestCase(test_duetimescheduler.TestDueTimeScheduler),
+    unittest.TestLoader().loadTestsFromTestCase(test_podmembership.TestPodMembership),
+    unittest.TestLoader().loadTestsFromTestCase(test_hashring.TestHashRing),
+    unittest.TestLoader().loadTestsFromTestCase(test_dynamostandin.TestInMemoryDynamoTable),
+    unittest.TestLoader().loadTestsFromTestCase(test_esstandin.TestESStandIn)
 ]
 
 # Run the tests
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import patch
+
+from benchmarks import scheduler_contention
+from benchmarks.dynamostandin import InMemoryDynamoError, InMemoryDynamoTable
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.leasestatus import LeaseStatus
+
+
+class TestInMemoryDynamoTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = InMemoryDynamoTable()
+
+    def test_get_and_upsert_with_ttl(self):
+        self.assertTrue(self.table.upsert(key='key', value={'id': 1}, ttl=60))
+        value = self.table.get('key')
+        value['id'] = 2
+        self.assertEqual(self.table.get('key'), {'id': 1})
+        self.assertEqual(self.table.batch_get(['key', 'other_key']), {'key': {'id': 1}})
+        with patch('benchmarks.dynamostandin.time.time', return_value=self.table.items['key'][1]):
+            self.assertIsNone(self.table.get('key'))
+
+    def test_lease(self):
+        self.assertTrue(self.table.put_lease(key='job', value={'job_runner_name': 'pod1', 'lease_expiry': 1060},
+                                             now=1000, ttl=60))
+        self.assertFalse(self.table.put_lease(key='job', value={'job_runner_name': 'pod2', 'lease_expiry': 1070},
+                                              now=1010, ttl=60))
+        self.assertFalse(self.table.renew_lease(key='job', owner='pod2', lease_expiry=1090))
+        self.assertTrue(self.table.renew_lease(key='job', owner='pod1', lease_expiry=1090))
+        self.assertTrue(self.table.put_lease(key='job', value={'job_runner_name': 'pod2', 'lease_expiry': 1160},
+                                             now=1100, ttl=60))
+        self.assertFalse(self.table.complete_lease(key='job', owner='pod1', value={'job_runner_name': 'pod1'}, ttl=60))
+        self.assertTrue(self.table.complete_lease(
+            key='job', owner='pod2', value={'job_runner_name': 'pod2', 'completion_time': '2024-01-05T00:00:00'},
+            ttl=60))
+        self.assertFalse(self.table.complete_lease(key='job', owner='pod2', value={'job_runner_name': 'pod2'}, ttl=60))
+        self.assertFalse(self.table.put_lease(key='job', value={'job_runner_name': 'pod1'}, now=2000, ttl=60))
+
+    def test_members(self):
+        self.table.put_member(key='pods', member='pod1', heartbeat=1000, ttl=900)
+        self.assertEqual(self.table.put_member(key='pods', member='pod2', heartbeat=1010, ttl=900),
+                         {'pod1': 1000, 'pod2': 1010})
+        self.table.remove_members(key='pods', members=['pod1'])
+        self.assertEqual(self.table.get('pods'), {'pod2': 1010})
+
+    def test_failures_are_injected(self):
+        table = InMemoryDynamoTable(failure_rate=1.0)
+        self.assertFalse(table.upsert(key='key', value={}))
+        with self.assertRaises(InMemoryDynamoError):
+            table.batch_get(['key'])
+        self.assertEqual(table.stats(), {'calls': {'upsert': 1, 'batch_get': 1},
+                                         'failures': {'upsert': 1, 'batch_get': 1}})
+        with self.assertRaises(ValueError):
+            InMemoryDynamoTable(failure_rate=2)
+
+    def test_persistency_manager_leases_through_the_table(self):
+        PersistencyManager.clear_registry()
+        self.addCleanup(PersistencyManager.clear_registry)
+        persistency_manager = PersistencyManager.get_persistency_manager('table')
+        self.table.install(persistency_manager)
+        lease = {'key': 'job', 'value': {}, 'lease_seconds': 60, 'logging_msg': {}}
+        self.assertEqual(persistency_manager.acquire_lease(owner='pod1', **lease), LeaseStatus.ACQUIRED)
+        self.assertEqual(persistency_manager.acquire_lease(owner='pod2', **lease), LeaseStatus.HELD_BY_OTHER)
+
+    def test_pods_run_every_job_once(self):
+        for sharding in [False, True]:
+            results = scheduler_contention.run(pods=4, rounds=2, model_versions=1, latency_seconds=0,
+                                               failure_rate=0, report_seconds=0, sharding=sharding)
+            self.assertEqual([result['jobs_run'] for result in results], [4, 4])
+            self.assertEqual(sum(result['duplicate_executions'] for result in results), 0)
+            self.assertEqual(sum(result['tick_errors'] for result in results), 0)
+            self.assertLess(results[1]['dynamo_calls_per_tick'], results[0]['dynamo_calls_per_tick'])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import unittest
+from collections import Counter
+
+from service.common.hashring import HashRing
+
+
+class TestHashRing(unittest.TestCase):
+
+    def test_get_owner_is_the_same_for_every_ring(self):
+        keys = [f'24-hours - 12-12-2023 - v{index}_dev' for index in range(100)]
+        ring = HashRing(members=['pod1', 'pod2', 'pod3'], replicas=64)
+        other_ring = HashRing(members=['pod3', 'pod1', 'pod2', 'pod1'], replicas=64)
+        self.assertEqual([ring.get_owner(key) for key in keys], [other_ring.get_owner(key) for key in keys])
+        self.assertEqual(HashRing(members=['pod1']).get_owner(keys[0]), 'pod1')
+
+    def test_keys_are_spread_over_the_members(self):
+        keys = [f'job - {index}' for index in range(3000)]
+        owners = Counter(HashRing(members=['pod1', 'pod2', 'pod3'], replicas=64).get_owner(key) for key in keys)
+        self.assertEqual(set(owners.keys()), {'pod1', 'pod2', 'pod3'})
+        self.assertGreater(min(owners.values()), 600)
+
+    def test_only_the_keys_of_a_removed_member_move(self):
+        keys = [f'job - {index}' for index in range(1000)]
+        ring = HashRing(members=['pod1', 'pod2', 'pod3'], replicas=64)
+        smaller_ring = HashRing(members=['pod1', 'pod2'], replicas=64)
+        for key in keys:
+            if ring.get_owner(key) != 'pod3':
+                self.assertEqual(smaller_ring.get_owner(key), ring.get_owner(key))
+
+    def test_invalid_ring(self):
+        with self.assertRaises(ValueError):
+            HashRing(members=[])
+        with self.assertRaises(ValueError):
+            HashRing(members=['pod1'], replicas=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock, patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from requests.adapters import HTTPAdapter
+
+from service.common.httpsession import AsyncPooledHTTPSession, PooledHTTPSession
+from service.configs import config
+
+
+class TestPooledHTTPSession(unittest.TestCase):
+
+    def setUp(self):
+        PooledHTTPSession.close()
+
+    def tearDown(self):
+        PooledHTTPSession.close()
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_get_session_is_created_once(self, http_client_mock):
+        session = PooledHTTPSession.get_session()
+        self.assertIs(PooledHTTPSession.get_session(), session)
+        http_client_mock.assert_called_once()
+        mounted = {call.args[0]: call.args[1] for call in session.mount.call_args_list}
+        self.assertEqual(set(mounted.keys()), {'http://', 'https://'})
+        self.assertIsInstance(mounted['https://'], HTTPAdapter)
+        self.assertEqual(mounted['https://']._pool_maxsize, config.http_pool_size)
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_get_stats(self, http_client_mock):
+        pool = MagicMock(num_connections=1)
+        adapter = MagicMock()
+        adapter.poolmanager.pools.keys.return_value = ['logging-service']
+        adapter.poolmanager.pools.get.return_value = pool
+        http_client_mock.return_value.adapters = {'http://': adapter, 'https://': adapter}
+        for _ in range(3):
+            PooledHTTPSession.post(url='http://logging-service', json={})
+        self.assertEqual(PooledHTTPSession.get_stats(),
+                         {'requests': 3, 'connections_opened': 1, 'connections_reused': 2})
+
+    @patch('service.common.httpsession.create_http_client')
+    def test_close(self, http_client_mock):
+        session = PooledHTTPSession.get_session()
+        PooledHTTPSession.close()
+        session.close.assert_called_once()
+        self.assertEqual(PooledHTTPSession.get_stats()['requests'], 0)
+        PooledHTTPSession.get_session()
+        self.assertEqual(http_client_mock.call_count, 2)
+
+
+class TestAsyncPooledHTTPSession(unittest.TestCase):
+
+    def test_post_reuses_the_session_of_the_loop(self):
+        async def search(request):
+            if request.headers.get('x-fail'):
+                return web.Response(status=503)
+            return web.json_response({'took': 1, 'query': await request.json()})
+
+        async def run() -> list:
+            app = web.Application()
+            app.router.add_post('/_search', search)
+            async with TestServer(app) as server:
+                url: str = str(server.make_url('/_search'))
+                session = AsyncPooledHTTPSession.get_session()
+                responses: list = [
+                    await AsyncPooledHTTPSession.post(url=url, json={'size': 0}, headers={}, timeout=(1, 5)),
+                    await AsyncPooledHTTPSession.post(url=url, json={}, headers={'x-fail': '1'}, timeout=(1, 5))
+                ]
+                self.assertIs(AsyncPooledHTTPSession.get_session(), session)
+                await AsyncPooledHTTPSession.close()
+                self.assertTrue(session.closed)
+                return responses
+
+        responses = asyncio.run(run())
+        self.assertEqual(responses[0], [200, {'took': 1, 'query': {'size': 0}}])
+        self.assertEqual(responses[1], [503, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
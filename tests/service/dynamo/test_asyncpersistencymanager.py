@@ -0,0 +1,70 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from service.dynamo.asyncpersistencymanager import AsyncPersistencyManager
+from service.dynamo.persistencymanager import PersistencyManager
+from service.enums.leasestatus import LeaseStatus
+
+
+class TestAsyncPersistencyManager(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        AsyncPersistencyManager.clear_registry()
+        PersistencyManager.clear_registry()
+
+    def tearDown(self):
+        AsyncPersistencyManager.clear_registry()
+        PersistencyManager.clear_registry()
+
+    def test_get_persistency_manager_is_shared(self):
+        persistency_manager = AsyncPersistencyManager.get_persistency_manager('table')
+        self.assertIs(AsyncPersistencyManager.get_persistency_manager('table'), persistency_manager)
+        self.assertIs(persistency_manager.persistency_manager, PersistencyManager.get_persistency_manager('table'))
+
+    def test_init_when_table_is_empty(self):
+        with self.assertRaises(ValueError):
+            AsyncPersistencyManager('')
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_operations_run_off_the_event_loop(self, persistency_manager_mock):
+        threads: list = []
+
+        def get_the_value(key, correlation_id=None, cache_ttl=None):
+            threads.append(threading.current_thread())
+            return {'key': key}
+
+        persistency_manager_mock.return_value.get_the_value.side_effect = get_the_value
+        persistency_manager_mock.return_value.acquire_lease.return_value = LeaseStatus.ACQUIRED
+        persistency_manager = AsyncPersistencyManager.get_persistency_manager('table')
+        values = await asyncio.gather(persistency_manager.get_the_value(key='a'),
+                                      persistency_manager.get_the_value(key='b'))
+        self.assertEqual(values, [{'key': 'a'}, {'key': 'b'}])
+        self.assertNotIn(threading.current_thread(), threads)
+
+        lease_status = await persistency_manager.acquire_lease(
+            key='a', owner='pod1', value={}, lease_seconds=600, logging_msg={})
+        self.assertEqual(lease_status, LeaseStatus.ACQUIRED)
+        persistency_manager_mock.return_value.acquire_lease.assert_called_once_with(
+            key='a', owner='pod1', value={}, lease_seconds=600, logging_msg={}, correlation_id=None, ttl=86400)
+
+        persistency_manager_mock.return_value.renew_lease.return_value = LeaseStatus.FAILED
+        lease_status = await persistency_manager.renew_lease(key='a', owner='pod1', lease_seconds=600)
+        self.assertEqual(lease_status, LeaseStatus.FAILED)
+        persistency_manager_mock.return_value.renew_lease.assert_called_once_with(
+            key='a', owner='pod1', lease_seconds=600, correlation_id=None)
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_batch_operations(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.batch_get.return_value = {'a': 1}
+        persistency_manager_mock.return_value.batch_upsert.return_value = True
+        persistency_manager = AsyncPersistencyManager.get_persistency_manager('table')
+        self.assertEqual(await persistency_manager.batch_get(keys=['a']), {'a': 1})
+        self.assertTrue(await persistency_manager.batch_upsert(items=[], logging_msg={}))
+        persistency_manager.remember_value(key='a', value=1, cache_ttl=60)
+        persistency_manager_mock.return_value.remember_value.assert_called_once_with(key='a', value=1, cache_ttl=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from service.dynamo.dailykpicounters import DailyKPICounters
+from service.enums.timetoliveenum import TimeToLive
+
+
+class TestDailyKPICounters(unittest.TestCase):
+
+    def test_days(self):
+        today: date = date(2023, 5, 10)
+        self.assertEqual(DailyKPICounters.get_settled_day(today), date(2023, 5, 8))
+        self.assertEqual(DailyKPICounters.get_stored_days(today),
+                         [date(2023, 5, 4), date(2023, 5, 5), date(2023, 5, 6), date(2023, 5, 7), date(2023, 5, 8)])
+        self.assertEqual(DailyKPICounters.get_day_key('v2_US2', today), 'kpi_counts_v2_US2_2023-05-10')
+
+    @patch('service.dynamo.dailykpicounters.PersistencyManager.get_persistency_manager')
+    def test_get_days(self, persistency_manager_mock):
+        mock_response = MagicMock()
+        mock_response.batch_get.return_value = {'kpi_counts_v2_US2_2023-05-08': {'true_fails': 1}}
+        persistency_manager_mock.return_value = mock_response
+        days: dict = DailyKPICounters('table').get_days(
+            model_version='v2_US2', days=[date(2023, 5, 7), date(2023, 5, 8)], correlation_id='1')
+        self.assertEqual(days, {date(2023, 5, 7): None, date(2023, 5, 8): {'true_fails': 1}})
+        self.assertEqual(mock_response.batch_get.call_args.kwargs['cache_ttls'],
+                         {'kpi_counts_v2_US2_2023-05-07': TimeToLive.ONE_DAY_TTL.value,
+                          'kpi_counts_v2_US2_2023-05-08': TimeToLive.ONE_DAY_TTL.value})
+
+        mock_response.batch_get.return_value = None
+        self.assertIsNone(DailyKPICounters('table').get_days(model_version='v2_US2', days=[date(2023, 5, 8)]))
+
+    @patch('service.dynamo.dailykpicounters.PersistencyManager.get_persistency_manager')
+    def test_put_day(self, persistency_manager_mock):
+        mock_response = MagicMock()
+        mock_response.upsert_value.return_value = True
+        persistency_manager_mock.return_value = mock_response
+        self.assertTrue(DailyKPICounters('table').put_day(model_version='v2_US2', day=date(2023, 5, 8),
+                                                          counts={'true_fails': 1}, correlation_id='1'))
+        upsert = mock_response.upsert_value.call_args.kwargs
+        self.assertEqual(upsert['key'], 'kpi_counts_v2_US2_2023-05-08')
+        self.assertEqual(upsert['value'], {'true_fails': 1})
+        self.assertEqual(upsert['ttl'], TimeToLive.SEVEN_DAY_TTL.value + TimeToLive.ONE_DAY_TTL.value)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,198 @@
+import os
+import time
+import unittest
+import uuid
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+from concurdatascience.dynamo import get_dynamo
+
+from service.dynamo.dynamotableclient import DynamoTableClient
+from service.dynamo.persistencymanager import PersistencyManager
+
+
+class TestDynamoTableClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client_mock = MagicMock()
+        self.table_client = DynamoTableClient("dummy_table", client=self.client_mock)
+
+    def test_table_client_is_fail_to_intialized(self):
+        with self.assertRaises(ValueError):
+            DynamoTableClient("", client=self.client_mock)
+
+    def test_put_lease_when_condition_passes(self):
+        value = {'job_runner_name': 'pod1', 'lease_expiry': 1700000600}
+        result = self.table_client.put_lease(key="24-hours - 05-01-2024", value=value, now=1700000000, ttl=86400)
+        self.assertTrue(result, "lease is not written")
+        kwargs = self.client_mock.put_item.call_args.kwargs
+        self.assertEqual(kwargs['TableName'], "dummy_table")
+        self.assertEqual(kwargs['Item']['key'], {'S': "24-hours - 05-01-2024"})
+        self.assertEqual(kwargs['ExpressionAttributeValues'], {':now': {'N': '1700000000'}})
+        self.assertIn('attribute_not_exists(#key)', kwargs['ConditionExpression'])
+
+    def test_put_lease_when_condition_fails(self):
+        self.client_mock.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        result = self.table_client.put_lease(key="key", value={}, now=1700000000, ttl=86400)
+        self.assertFalse(result, "lease is written")
+
+    def test_put_lease_raises_other_errors(self):
+        self.client_mock.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'PutItem')
+        with self.assertRaises(ClientError):
+            self.table_client.put_lease(key="key", value={}, now=1700000000, ttl=86400)
+
+    def test_renew_lease(self):
+        self.assertTrue(self.table_client.renew_lease(key="24-hours - 05-01-2024", owner="pod1",
+                                                      lease_expiry=1700000060))
+        kwargs = self.client_mock.update_item.call_args.kwargs
+        self.assertEqual(kwargs['Key'], {'key': {'S': "24-hours - 05-01-2024"}})
+        self.assertEqual(kwargs['ExpressionAttributeValues'],
+                         {':owner': {'S': 'pod1'}, ':lease_expiry': {'N': '1700000060'}})
+        self.assertIn('attribute_not_exists(#value.#completion_time)', kwargs['ConditionExpression'])
+
+        self.client_mock.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'UpdateItem')
+        self.assertFalse(self.table_client.renew_lease(key="key", owner="pod1", lease_expiry=1700000060))
+        self.client_mock.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'UpdateItem')
+        with self.assertRaises(ClientError):
+            self.table_client.renew_lease(key="key", owner="pod1", lease_expiry=1700000060)
+
+    def test_complete_lease(self):
+        self.assertTrue(self.table_client.complete_lease(key="24-hours - 05-01-2024", owner="pod1",
+                                                         value={'job_runner_name': 'pod1'}, ttl=86400))
+        kwargs = self.client_mock.put_item.call_args.kwargs
+        self.assertEqual(kwargs['Item']['value'], {'M': {'job_runner_name': {'S': 'pod1'}}})
+        self.assertEqual(kwargs['ExpressionAttributeValues'], {':owner': {'S': 'pod1'}})
+        self.assertEqual(kwargs['ConditionExpression'],
+                         '#value.#owner = :owner AND attribute_not_exists(#value.#completion_time)')
+
+        self.client_mock.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException'}}, 'PutItem')
+        self.assertFalse(self.table_client.complete_lease(key="key", owner="pod1", value={}, ttl=86400))
+        self.client_mock.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'PutItem')
+        with self.assertRaises(ClientError):
+            self.table_client.complete_lease(key="key", owner="pod1", value={}, ttl=86400)
+
+    def test_put_member(self):
+        self.client_mock.update_item.return_value = {
+            'Attributes': self.table_client.to_item(key="scheduler_pods", value={'pod1': 1700000000,
+                                                                                 'pod2': 1699999990}, ttl=900)}
+        self.assertEqual(self.table_client.put_member(key="scheduler_pods", member="pod1", heartbeat=1700000000,
+                                                      ttl=900), {'pod1': 1700000000, 'pod2': 1699999990})
+        kwargs = self.client_mock.update_item.call_args.kwargs
+        self.assertEqual(kwargs['ExpressionAttributeNames']['#member'], 'pod1')
+        self.assertEqual(kwargs['ReturnValues'], 'ALL_NEW')
+        self.client_mock.put_item.assert_not_called()
+
+    def test_put_member_creates_the_members(self):
+        self.client_mock.update_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException'}}, 'UpdateItem')
+        self.assertEqual(self.table_client.put_member(key="scheduler_pods", member="pod1", heartbeat=1700000000,
+                                                      ttl=900), {'pod1': 1700000000})
+        kwargs = self.client_mock.put_item.call_args.kwargs
+        self.assertEqual(kwargs['Item']['value'], {'M': {'pod1': {'N': '1700000000'}}})
+        self.assertIn('attribute_not_exists(#key)', kwargs['ConditionExpression'])
+
+    def test_remove_members(self):
+        self.table_client.remove_members(key="scheduler_pods", members=["pod2", "pod3"])
+        kwargs = self.client_mock.update_item.call_args.kwargs
+        self.assertEqual(kwargs['UpdateExpression'], 'REMOVE #value.#member0, #value.#member1')
+        self.assertEqual(kwargs['ExpressionAttributeNames'],
+                         {'#member0': 'pod2', '#member1': 'pod3', '#value': 'value'})
+        self.client_mock.update_item.reset_mock()
+        self.table_client.remove_members(key="scheduler_pods", members=[])
+        self.client_mock.update_item.assert_not_called()
+
+    def test_from_item_converts_decimals(self):
+        item = self.table_client.to_item(key="key", value={'count': 5, 'rate': 99.5, 'name': 'pod1'}, ttl=10)
+        self.assertEqual(self.table_client.from_item(item), {'count': 5, 'rate': 99.5, 'name': 'pod1'})
+        self.assertEqual(DynamoTableClient.from_decimal([Decimal('2'), Decimal('2.5')]), [2, 2.5])
+
+    def get_item(self, key: str, value: dict) -> dict:
+        return self.table_client.to_item(key=key, value=value, ttl=10)
+
+    def test_batch_get_chunks_the_keys(self):
+        keys = [f"key_{index}" for index in range(250)]
+        self.client_mock.batch_get_item.side_effect = lambda RequestItems: {
+            'Responses': {'dummy_table': [self.get_item(key['key']['S'], {'id': key['key']['S']})
+                                          for key in RequestItems['dummy_table']['Keys']]}}
+        # when
+        values = self.table_client.batch_get(keys + ["key_0"])
+        # then
+        self.assertEqual(self.client_mock.batch_get_item.call_count, 3, "keys are not chunked by 100")
+        self.assertEqual(len(values), 250)
+        self.assertEqual(values["key_249"], {'id': "key_249"})
+
+    @patch('service.dynamo.dynamotableclient.time.sleep')
+    def test_batch_get_retries_the_unprocessed_keys(self, sleep_mock):
+        unprocessed = {'dummy_table': {'Keys': [{'key': {'S': "key_2"}}]}}
+        self.client_mock.batch_get_item.side_effect = [
+            {'Responses': {'dummy_table': [self.get_item("key_1", {'id': 1})]}, 'UnprocessedKeys': unprocessed},
+            {'Responses': {'dummy_table': [self.get_item("key_2", {'id': 2})]}, 'UnprocessedKeys': {}}
+        ]
+        values = self.table_client.batch_get(["key_1", "key_2", "key_3"])
+        self.assertEqual(values, {"key_1": {'id': 1}, "key_2": {'id': 2}})
+        self.assertEqual(self.client_mock.batch_get_item.call_args.kwargs['RequestItems'], unprocessed)
+        sleep_mock.assert_called_once()
+
+    @patch('service.dynamo.dynamotableclient.time.sleep')
+    def test_batch_get_raises_when_keys_stay_unprocessed(self, sleep_mock):
+        unprocessed = {'dummy_table': {'Keys': [{'key': {'S': "key_1"}}]}}
+        self.client_mock.batch_get_item.return_value = {'Responses': {}, 'UnprocessedKeys': unprocessed}
+        with self.assertRaises(RuntimeError):
+            self.table_client.batch_get(["key_1"])
+
+    @patch('service.dynamo.dynamotableclient.time.sleep')
+    def test_batch_put_chunks_and_retries_the_unprocessed_items(self, sleep_mock):
+        items = [{'key': f"key_{index}", 'value': {'id': index}, 'ttl': 10} for index in range(30)]
+        unprocessed = {'dummy_table': [{'PutRequest': {'Item': self.get_item("key_0", {'id': 0})}}]}
+        self.client_mock.batch_write_item.side_effect = [{'UnprocessedItems': unprocessed}, {}, {}]
+        # when
+        result = self.table_client.batch_put(items)
+        # then
+        self.assertTrue(result)
+        calls = self.client_mock.batch_write_item.call_args_list
+        self.assertEqual(len(calls[0].kwargs['RequestItems']['dummy_table']), 25, "items are not chunked by 25")
+        self.assertEqual(calls[1].kwargs['RequestItems'], unprocessed)
+        self.assertEqual(len(calls[2].kwargs['RequestItems']['dummy_table']), 5)
+
+
+@unittest.skipUnless(os.environ.get('DYNAMO_ROUND_TRIP_TABLE'),
+                     'the round trip needs a table of the wrapper in DYNAMO_ROUND_TRIP_TABLE')
+class TestDynamoTableClientRoundTrip(unittest.TestCase):
+    """Checks the items of the table client against the concurdatascience dynamo wrapper on a real table."""
+
+    def setUp(self):
+        self.table = os.environ['DYNAMO_ROUND_TRIP_TABLE']
+        self.dynamo = get_dynamo(self.table)
+        self.table_client = PersistencyManager(self.table).get_table_client()
+        self.key = f'round-trip-{uuid.uuid4()}'
+        self.value = {'job_runner_name': 'pod1', 'initiated_time': '2024-01-05T10:00:00',
+                      'lease_expiry': int(time.time()) + 60, 'total_recall': 99.5, 'counts': {'true_fails': 3}}
+
+    def test_wrapper_reads_the_items_of_the_table_client(self):
+        self.assertTrue(self.table_client.put_lease(key=self.key, value=self.value, now=int(time.time()), ttl=600))
+        self.assertEqual(self.dynamo.get(self.key, correlation_id='round-trip'), self.value)
+        self.assertTrue(self.table_client.batch_put([{'key': f'{self.key}-batch', 'value': self.value, 'ttl': 600}]))
+        self.assertEqual(self.dynamo.get(f'{self.key}-batch', correlation_id='round-trip'), self.value)
+        self.table_client.put_member(key=f'{self.key}-members', member='pod1', heartbeat=1700000000, ttl=600)
+        self.assertEqual(self.dynamo.get(f'{self.key}-members', correlation_id='round-trip'), {'pod1': 1700000000})
+
+    def test_table_client_reads_the_items_of_the_wrapper(self):
+        self.assertTrue(self.dynamo.upsert(key=self.key, value=self.value, correlation_id='round-trip', ttl=600))
+        self.assertEqual(self.table_client.batch_get([self.key]), {self.key: self.value})
+        self.assertTrue(self.table_client.renew_lease(key=self.key, owner='pod1', lease_expiry=1700000060))
+        self.assertEqual(self.dynamo.get(self.key, correlation_id='round-trip'),
+                         dict(self.value, lease_expiry=1700000060))
+        completed_value: dict = dict(self.value, completion_time='2024-01-05T10:01:00')
+        self.assertTrue(self.table_client.complete_lease(key=self.key, owner='pod1', value=completed_value, ttl=600))
+        self.assertEqual(self.dynamo.get(self.key, correlation_id='round-trip'), completed_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from service.dynamo.asyncpersistencymanager import AsyncPersistencyManager
+from service.dynamo.leaseheartbeat import LeaseHeartbeat
+from service.enums.leasestatus import LeaseStatus
+
+
+class TestLeaseHeartbeat(unittest.TestCase):
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_lease_is_renewed_until_the_heartbeat_stops(self, persistency_manager_mock):
+        renewed = threading.Event()
+
+        def renew_lease(**kwargs):
+            renewed.set()
+            return LeaseStatus.ACQUIRED
+
+        persistency_manager_mock.return_value.renew_lease.side_effect = renew_lease
+        with LeaseHeartbeat(table_name='table', key='24-hours - 05-01-2024', owner='pod1', lease_seconds=30,
+                            interval_seconds=0.01) as heartbeat:
+            self.assertTrue(renewed.wait(5))
+        self.assertFalse(heartbeat.thread.is_alive())
+        self.assertFalse(heartbeat.lease_lost.is_set())
+        self.assertEqual(persistency_manager_mock.return_value.renew_lease.call_args.kwargs,
+                         {'key': '24-hours - 05-01-2024', 'owner': 'pod1', 'lease_seconds': 30,
+                          'correlation_id': heartbeat.correlation_id})
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_heartbeat_stops_when_the_lease_is_lost(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.renew_lease.return_value = LeaseStatus.HELD_BY_OTHER
+        heartbeat = LeaseHeartbeat(table_name='table', key='key', owner='pod1', interval_seconds=0.01).start()
+        self.assertTrue(heartbeat.lease_lost.wait(5))
+        heartbeat.thread.join(5)
+        self.assertFalse(heartbeat.thread.is_alive())
+        persistency_manager_mock.return_value.renew_lease.assert_called_once()
+        heartbeat.stop()
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_failed_renewals_are_retried_until_the_lease_expires(self, persistency_manager_mock):
+        renew_lease = persistency_manager_mock.return_value.renew_lease
+        renew_lease.side_effect = [LeaseStatus.FAILED, LeaseStatus.ACQUIRED] + [LeaseStatus.FAILED] * 1000
+        heartbeat = LeaseHeartbeat(table_name='table', key='key', owner='pod1', lease_seconds=0.2,
+                                   interval_seconds=0.01).start()
+        # the lease is lost once it expires, the renewals which failed before do not lose it.
+        self.assertTrue(heartbeat.lease_lost.wait(5))
+        heartbeat.stop()
+        self.assertEqual(heartbeat.renewals, 1)
+        self.assertGreater(renew_lease.call_count, 3)
+        self.assertLessEqual(heartbeat.lease_expiry, time.time())
+
+
+class TestAsyncLeaseHeartbeat(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        AsyncPersistencyManager.clear_registry()
+
+    def tearDown(self):
+        AsyncPersistencyManager.clear_registry()
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_lease_is_renewed_by_a_task_until_it_is_cancelled(self, persistency_manager_mock):
+        renew_lease = persistency_manager_mock.return_value.renew_lease
+        renew_lease.side_effect = [LeaseStatus.FAILED, LeaseStatus.ACQUIRED] + [LeaseStatus.ACQUIRED] * 1000
+        threads: int = threading.active_count()
+        heartbeat = LeaseHeartbeat(table_name='table', key='key', owner='pod1', lease_seconds=30,
+                                   interval_seconds=0.01).start_async()
+        while heartbeat.renewals < 2:
+            await asyncio.sleep(0.01)
+        await heartbeat.stop_async()
+        self.assertTrue(heartbeat.task.cancelled())
+        self.assertIsNone(heartbeat.thread)
+        self.assertFalse(heartbeat.lease_lost.is_set())
+        # the renewals run on the shared thread pool of the AsyncPersistencyManager, no thread is started per job.
+        self.assertLessEqual(threading.active_count() - threads, 1)
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    async def test_task_stops_when_the_lease_expires(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.renew_lease.return_value = LeaseStatus.FAILED
+        heartbeat = LeaseHeartbeat(table_name='table', key='key', owner='pod1', lease_seconds=0.1,
+                                   interval_seconds=0.01).start_async()
+        await asyncio.wait_for(heartbeat.task, 5)
+        self.assertTrue(heartbeat.lease_lost.is_set())
+        self.assertEqual(heartbeat.renewals, 0)
+        self.assertGreater(persistency_manager_mock.return_value.renew_lease.call_count, 1)
+        await heartbeat.stop_async()
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -2,6 +2,8 @@ import unittest
 import uuid
 from unittest.mock import patch
 
+import pandas as pd
+
 from service.reports.icbcmanager import ICBCManager
 
 
@@ -254,6 +256,46 @@ class TestICBCManager(unittest.TestCase):
         self.assertEqual(response.get('message'), 'company recall',
                          'company recall is not called')
 
+    def test_get_company_performance(self):
+        company_counts = pd.DataFrame({
+            'company': ['p0001', 'p0002', 'p0003', 'p0004'],
+            'true_fails': [994, 99, 995, 0],
+            'auditor_fails': [1000, 100, 1000, 0]
+        })
+        companies = ICBCManager.get_company_performance(company_counts)
+        self.assertEqual(companies.to_dict('records'), [
+            {'company': 'p0001', 'total_recall': 99.4, 'auditor_fails_count': 1000},
+            {'company': 'p0002', 'total_recall': 99.0, 'auditor_fails_count': 100}
+        ])
+
+    def test_check_the_model_performance_with_company_counts(self):
+        kpiresponse = {
+            'icbc_calculation_kpis': {
+                'total_recall': '99.56',
+                'auditor_fails_count': '45.0'
+            }
+        }
+        company_counts = pd.DataFrame({'company': ['p0001', 'p0002'], 'true_fails': [90, 10],
+                                       'auditor_fails': [100, 10]})
+        response: dict = ICBCManager(kpiresponse, company_counts=[company_counts, company_counts]) \
+            .check_the_model_performance_and_actioned_icbc_service()
+        self.assertEqual(response['message'], 'company recall')
+        self.assertEqual(response['companies'],
+                         [{'company': 'p0001', 'total_recall': 90.0, 'auditor_fails_count': 100}] * 2)
+
+        def company_pages():
+            yield company_counts
+            raise ValueError('companies are not read')
+
+        response: dict = ICBCManager(kpiresponse, company_counts=company_pages()) \
+            .check_the_model_performance_and_actioned_icbc_service()
+        # the overall check is not failed by the company pages.
+        self.assertEqual(response, {'message': 'company recall'})
+
+        response: dict = ICBCManager(kpiresponse, company_counts=[pd.DataFrame({'company': ['p0001']})]) \
+            .check_the_model_performance_and_actioned_icbc_service()
+        self.assertEqual(response, {'message': 'company recall'})
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from service.reports.kpibatch import KPIBatch
+from service.reports.kpicounts import KPICounts
+from service.reports.kpisreport import KPIReport
+
+
+class TestKPIBatch(unittest.TestCase):
+
+    @staticmethod
+    def get_counts_list(size: int) -> list:
+        rng = np.random.default_rng(11)
+        counts_list = []
+        for _ in range(size):
+            counts = {field: int(rng.integers(0, 3000)) for field in KPICounts.__slots__}
+            counts['true_fails'] = int(rng.integers(0, counts['auditor_fails'] + 1))
+            for field in KPICounts.__slots__:
+                if rng.random() < 0.05:
+                    counts[field] = 0
+                elif rng.random() < 0.03:
+                    counts[field] = None
+            counts_list.append(KPICounts(**counts))
+        return counts_list
+
+    def test_kpis_are_the_kpis_of_the_scalar_methods(self):
+        counts_list = self.get_counts_list(3000)
+        kpis = KPIBatch.get_kpis(KPIBatch.get_count_frame(counts_list))
+        for position, counts in enumerate(counts_list):
+            row = kpis.iloc[position]
+            self.assertEqual([row['total_recall'], row['local_recall'], row['total_bypass'], row['local_bypass'],
+                              row['sample_rate'], row['auditor_fails_count'], row['sampled_questions']],
+                             [counts.get_total_recall(), counts.get_local_recall(), counts.get_total_bypass(),
+                              counts.get_local_bypass(), counts.get_sample_rate(), counts.get_count('auditor_fails'),
+                              counts.get_count('sampled_questions')])
+            payload = KPIReport.get_payload(counts)
+            self.assertEqual(row['error'], 'error' in payload)
+            if 'error' not in payload:
+                self.assertEqual(row['status'], payload['status'])
+
+    def test_round_rates_like_the_built_in_round(self):
+        rates = np.array([2.675, 1.005, 0.125, 8.345, 3e10 + 0.125])
+        self.assertEqual(KPIBatch.round_rates(rates).tolist(), [round(float(rate), 2) for rate in rates])
+
+    def test_missing_column_and_index(self):
+        counts = pd.DataFrame({'true_fails': [1.0, 0.0], 'auditor_fails': [4.0, 0.0]}, index=['24-hours', '7-days'])
+        kpis = KPIBatch.get_kpis(counts)
+        self.assertEqual(kpis['total_recall'].to_dict(), {'24-hours': 25.0, '7-days': 0.0})
+        self.assertEqual(kpis['local_bypass'].tolist(), [-1, -1])
+        self.assertTrue(kpis['error'].all())
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
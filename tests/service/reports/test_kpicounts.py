@@ -0,0 +1,63 @@
+import unittest
+
+from service.reports.kpicounts import KPICounts
+
+
+class TestKPICounts(unittest.TestCase):
+
+    @staticmethod
+    def get_response(true_fails: int, auditor_fails: int) -> dict:
+        return {
+            'aggregations': {
+                'ml_audit': {
+                    'buckets': {
+                        'ml_audit_questions': {'doc_count': 2, 'total_ml_audit_questions': {'value': 1000}}
+                    }
+                },
+                'pfc_stable': {
+                    'doc_count': 900,
+                    'pfc': {
+                        'buckets': {
+                            'true_fails': {'doc_count': true_fails},
+                            'true_fails_trained_entities': {'doc_count': true_fails - 5},
+                            'pfc_bypass': {'doc_count': 100},
+                            'auditor_fails_trained_entities': {'doc_count': auditor_fails - 5},
+                            'sampled_questions': {'doc_count': 400},
+                            'received_questions': {'doc_count': 800},
+                            'auditor_fails': {'doc_count': auditor_fails}
+                        }
+                    }
+                }
+            }
+        }
+
+    def test_from_response(self):
+        counts = KPICounts.from_response(self.get_response(995, 1000))
+        self.assertTrue(counts.is_complete())
+        self.assertEqual(counts.get_total_recall(), 99.5)
+        self.assertEqual(counts.get_local_recall(), 99.5)
+        self.assertEqual(counts.get_total_bypass(), 10.0)
+        self.assertEqual(counts.get_local_bypass(), 12.5)
+        self.assertEqual(counts.get_sample_rate(), 50.0)
+        self.assertEqual(counts.get_count('auditor_fails'), 1000)
+        self.assertEqual(counts.to_dict()['total_ml_audit_questions'], 1000)
+        self.assertFalse(hasattr(counts, '__dict__'))
+
+    def test_missing_buckets_and_zero_counts(self):
+        resp = self.get_response(0, 0)
+        buckets = resp['aggregations']['pfc_stable']['pfc']['buckets']
+        del buckets['received_questions']
+        buckets['auditor_fails_trained_entities'] = {}
+        resp['aggregations']['ml_audit']['buckets']['ml_audit_questions']['total_ml_audit_questions']['value'] = None
+        counts = KPICounts.from_response(resp)
+        self.assertFalse(counts.is_complete())
+        self.assertEqual(counts.get_total_recall(), 0)
+        self.assertEqual(counts.get_total_bypass(), 0)
+        self.assertEqual(counts.get_local_recall(), -1)
+        self.assertEqual(counts.get_local_bypass(), -1)
+        self.assertEqual(counts.get_count('received_questions'), -1)
+        self.assertEqual(KPICounts.from_response({}).get_total_bypass(), -1)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
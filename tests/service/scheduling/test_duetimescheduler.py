@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from service.common.modelutils import ModelUtils
+from service.dynamo.jobrunner import JobRunner
+from service.scheduling.duetimescheduler import DueTimeScheduler
+from service.scheduling.jobregistry import T_24_HOURS_JOB, T_7_DAYS_JOB
+from service.scheduling.jobspec import JobSpec
+
+
+class TestDueTimeScheduler(unittest.TestCase):
+
+    @staticmethod
+    def get_table(t_24_hours_job_result, t_7_days_job_result) -> dict:
+        [_, t_24_hours_key, t_7_days_key] = JobRunner.get_job_keys()
+        return {t_24_hours_key: t_24_hours_job_result, t_7_days_key: t_7_days_job_result,
+                ModelUtils.MODEL_VERSIONS_KEY: None}
+
+    def test_get_next_period_time(self):
+        now: float = time.mktime((2023, 12, 12, 13, 45, 10, 0, 0, -1))
+        self.assertEqual(T_24_HOURS_JOB.get_next_period_time(now), time.mktime((2023, 12, 13, 0, 0, 0, 0, 0, -1)))
+        hourly_job: JobSpec = JobSpec(name='1-hours', window=1, time_unit='h', message_detail='1 hour',
+                                      cadence='%H-%d-%m-%Y')
+        self.assertEqual(hourly_job.get_next_period_time(now), time.mktime((2023, 12, 12, 14, 0, 0, 0, 0, -1)))
+        # the last period of the day and of the year moves to the next day.
+        now = time.mktime((2023, 12, 31, 23, 30, 0, 0, 0, -1))
+        self.assertEqual(T_24_HOURS_JOB.get_next_period_time(now), time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, -1)))
+        self.assertEqual(hourly_job.get_next_period_time(now), time.mktime((2024, 1, 1, 0, 0, 0, 0, 0, -1)))
+        self.assertNotEqual(hourly_job.get_key(now=now), hourly_job.get_key(now=hourly_job.get_next_period_time(now)))
+
+    @patch('service.scheduling.duetimescheduler.DateUtils')
+    def test_get_due_time(self, dateutils_mock):
+        now: float = time.time()
+        key: str = T_7_DAYS_JOB.get_key()
+        self.assertEqual(DueTimeScheduler.get_due_time(key=key, value=None, now=now), now)
+        completed_job: dict = {'initiated_time': '2023-12-12T00:00:00', 'completion_time': '2023-12-12T00:00:05'}
+        self.assertEqual(DueTimeScheduler.get_due_time(key=key, value=completed_job, now=now),
+                         T_7_DAYS_JOB.get_next_period_time(now))
+        leased_job: dict = {'initiated_time': '2023-12-12T00:00:00', 'lease_expiry': int(now) + 45}
+        self.assertEqual(DueTimeScheduler.get_due_time(key=key, value=leased_job, now=now), int(now) + 45)
+        leased_job['lease_expiry'] = int(now) - 45
+        self.assertEqual(DueTimeScheduler.get_due_time(key=key, value=leased_job, now=now), now)
+        dateutils_mock.get_current_time.return_value = datetime(2023, 12, 12, 0, 4, 0)
+        self.assertEqual(DueTimeScheduler.get_due_time(key=key, value={'initiated_time': '2023-12-12T00:00:00'},
+                                                       now=now), now + 360)
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_tick_runs_only_when_a_job_is_due(self, persistency_manager_mock):
+        now: float = time.time()
+        completed_job: dict = {'initiated_time': '2023-12-12T00:00:00', 'completion_time': '2023-12-12T00:00:05'}
+        leased_job: dict = {'initiated_time': '2023-12-12T00:00:00', 'lease_expiry': int(now) + 30}
+        table: dict = self.get_table(completed_job, leased_job)
+        persistency_manager_mock.return_value.batch_get.side_effect = lambda keys, **kwargs: {
+            key: table.get(key) for key in keys}
+        job_runner = MagicMock()
+        scheduler: DueTimeScheduler = DueTimeScheduler(job_runner=job_runner, max_sleep_seconds=300)
+
+        self.assertTrue(scheduler.rebuild(now=now))
+        self.assertEqual(scheduler.get_next_due_time(), int(now) + 30)
+        self.assertEqual(scheduler.get_sleep_seconds(now=now), int(now) + 30 - now)
+        self.assertFalse(scheduler.run_pending(now=now))
+        job_runner.check_job_to_schedule.assert_not_called()
+        self.assertEqual(persistency_manager_mock.return_value.batch_get.call_count, 1)
+
+        table[JobRunner.get_job_keys()[2]] = completed_job
+        self.assertTrue(scheduler.run_pending(now=now + 30))
+        job_runner.check_job_to_schedule.assert_called_once()
+        # both jobs are completed, the scheduler sleeps till the next period.
+        self.assertEqual(scheduler.get_next_due_time(), T_24_HOURS_JOB.get_next_period_time(time.time()))
+        self.assertEqual(scheduler.get_sleep_seconds(now=now), min(300, scheduler.get_next_due_time() - now))
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_failed_job_is_retried_after_the_retry_delay(self, persistency_manager_mock):
+        table: dict = self.get_table(None, None)
+        persistency_manager_mock.return_value.batch_get.side_effect = lambda keys, **kwargs: {
+            key: table.get(key) for key in keys}
+        scheduler: DueTimeScheduler = DueTimeScheduler(job_runner=MagicMock(), retry_seconds=60)
+        scheduler.rebuild(now=1000.0)
+        self.assertEqual(scheduler.get_sleep_seconds(now=1000.0), 0)
+        self.assertTrue(scheduler.run_pending(now=1000.0))
+        # the jobs are still not started after the tick.
+        self.assertGreaterEqual(scheduler.get_sleep_seconds(), 59)
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_rebuild_when_the_table_is_not_read(self, persistency_manager_mock):
+        persistency_manager_mock.return_value.batch_get.return_value = None
+        scheduler: DueTimeScheduler = DueTimeScheduler(job_runner=MagicMock(), retry_seconds=60)
+        self.assertFalse(scheduler.rebuild(now=1000.0))
+        self.assertEqual(scheduler.get_next_due_time(), 1060.0)
+
+    @patch('service.dynamo.persistencymanager.PersistencyManager.get_persistency_manager')
+    def test_run_until_stop(self, persistency_manager_mock):
+        table: dict = self.get_table(None, None)
+        persistency_manager_mock.return_value.batch_get.side_effect = lambda keys, **kwargs: {
+            key: table.get(key) for key in keys}
+        job_runner = MagicMock()
+        scheduler: DueTimeScheduler = DueTimeScheduler(job_runner=job_runner, max_sleep_seconds=300)
+
+        def check_job_to_schedule():
+            completed_job: dict = {'initiated_time': '2023-12-12T00:00:00', 'completion_time': '2023-12-12T00:00:05'}
+            table.update(self.get_table(completed_job, completed_job))
+            scheduler.stop()
+
+        job_runner.check_job_to_schedule.side_effect = check_job_to_schedule
+        thread = threading.Thread(target=scheduler.run)
+        thread.start()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(scheduler.ticks, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
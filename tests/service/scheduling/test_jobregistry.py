@@ -0,0 +1,73 @@
+import time
+import unittest
+
+from service.enums.timetoliveenum import TimeToLive
+from service.scheduling.jobregistry import ICBC_EVALUATION, T_24_HOURS_JOB, T_7_DAYS_JOB, JobRegistry
+from service.scheduling.jobspec import JobSpec
+
+
+class TestJobSpec(unittest.TestCase):
+
+    def test_get_key(self):
+        date: str = time.strftime("%d-%m-%Y")
+        self.assertEqual(T_24_HOURS_JOB.get_key(), f'24-hours - {date}')
+        self.assertEqual(T_7_DAYS_JOB.get_key(model_version='v3_dev'), f'7-days - {date} - v3_dev')
+        hourly_job: JobSpec = JobSpec(name='1-hours', window=1, time_unit='h', message_detail='1 hour',
+                                      cadence='%H-%d-%m-%Y')
+        self.assertEqual(hourly_job.get_key(), f'1-hours - {time.strftime("%H-%d-%m-%Y")}')
+
+    def test_matches(self):
+        self.assertTrue(T_24_HOURS_JOB.matches('24-hours'))
+        self.assertTrue(T_24_HOURS_JOB.matches('24-hours - 12-12-2023 - v3_dev'))
+        self.assertFalse(T_24_HOURS_JOB.matches('7-days - 12-12-2023'))
+        self.assertFalse(T_24_HOURS_JOB.matches('24-hours-backup - 12-12-2023'))
+
+    def test_hours_and_status_attribute(self):
+        self.assertEqual(T_24_HOURS_JOB.hours, 24)
+        self.assertEqual(T_7_DAYS_JOB.hours, 168)
+        self.assertEqual(T_24_HOURS_JOB.status_attribute, 't_24_hours_job_status')
+        self.assertEqual(T_7_DAYS_JOB.status_attribute, 't_7_days_job_status')
+
+    def test_invalid_spec(self):
+        with self.assertRaises(ValueError):
+            JobSpec(name='', window=1, time_unit='h', message_detail='1 hour')
+        with self.assertRaises(ValueError):
+            JobSpec(name='0-hours', window=0, time_unit='h', message_detail='0 hours')
+        with self.assertRaises(ValueError):
+            JobSpec(name='1-weeks', window=1, time_unit='w', message_detail='1 week')
+        with self.assertRaises(ValueError):
+            JobSpec(name='1-weeks', window=7, time_unit='d', message_detail='1 week', cadence='%W-%Y')
+
+
+class TestJobRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        JobRegistry.unregister('30-days')
+        JobRegistry.register(T_24_HOURS_JOB)
+        JobRegistry.register(T_7_DAYS_JOB)
+
+    def test_default_jobs(self):
+        self.assertEqual(JobRegistry.get_job_specs()[:2], [T_24_HOURS_JOB, T_7_DAYS_JOB])
+        self.assertEqual(T_7_DAYS_JOB.post_actions, (ICBC_EVALUATION,))
+        self.assertEqual(T_24_HOURS_JOB.ttl, TimeToLive.ONE_DAY_TTL.value)
+        self.assertIsNotNone(JobRegistry.get_post_action(ICBC_EVALUATION))
+
+    def test_register_and_get_job_spec(self):
+        monthly_job: JobSpec = JobSpec(name='30-days', window=30, time_unit='d', message_detail='30 days',
+                                       ttl=TimeToLive.SEVEN_DAY_TTL.value)
+        JobRegistry.register(monthly_job)
+        self.assertEqual(JobRegistry.get_job_specs()[-1], monthly_job)
+        self.assertEqual(JobRegistry.get_job_spec('30-days - 12-12-2023'), monthly_job)
+        self.assertEqual(JobRegistry.get_job_spec('7-days - 12-12-2023'), T_7_DAYS_JOB)
+        self.assertIsNone(JobRegistry.get_job_spec('job-2024-01-24'))
+
+        JobRegistry.unregister('30-days')
+        self.assertIsNone(JobRegistry.get_job_spec('30-days - 12-12-2023'))
+
+    def test_get_post_action_which_is_not_registered(self):
+        with self.assertRaises(ValueError):
+            JobRegistry.get_post_action('not registered')
+
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file